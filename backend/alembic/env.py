@@ -18,11 +18,11 @@ from src.infrastructure.database import Base
 # Import all models so Alembic can detect them
 from src.domain.models.patient import Patient, Insurance, InsuranceCompany, EmergencyContact, MedicalProvider, PatientPhoto  # noqa: F401
 from src.domain.models.clinical import VitalSign, Encounter, Alarm, Medication, MedicationAdministration, NursingEntry, NursingAssessment, ClinicalNote  # noqa: F401
-from src.domain.models.system import AppUser, AuditLog, UserMessage  # noqa: F401
+from src.domain.models.system import AppUser, AuditLog, EventOutbox, UserMessage  # noqa: F401
 from src.domain.models.planning import Appointment, DischargeCriteria  # noqa: F401
 from src.domain.models.legal import Consent, AdvanceDirective, PatientWishes, PalliativeCare, DeathNotification  # noqa: F401
 from src.domain.models.home_spital import HomeVisit, Teleconsult, RemoteDevice, SelfMedicationLog  # noqa: F401
-from src.domain.models.lab import LabResult  # noqa: F401
+from src.domain.models.lab import HL7InboundMessage, LabLatest, LabResult  # noqa: F401
 from src.domain.models.fluid_balance import FluidEntry  # noqa: F401
 from src.domain.models.therapy import (  # noqa: F401
     TreatmentPlan, TreatmentPlanItem, Consultation, MedicalLetter,
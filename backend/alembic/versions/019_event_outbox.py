@@ -0,0 +1,31 @@
+"""019 — event_outbox Tabelle für transaktional publizierte Domain-Events.
+
+Revision ID: 019_event_outbox
+Revises: 018_user_messages
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "019_event_outbox"
+down_revision = "018_user_messages"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Erstellt event_outbox Tabelle."""
+    op.create_table(
+        "event_outbox",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column("routing_key", sa.String(100), nullable=False),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    """Entfernt event_outbox Tabelle."""
+    op.drop_table("event_outbox")
@@ -0,0 +1,31 @@
+"""020 — Indizes für Keyset-Paging der FHIR Observation-Suche.
+
+Revision ID: 020_observation_search_indexes
+Revises: 019_event_outbox
+"""
+
+from alembic import op
+
+revision = "020_observation_search_indexes"
+down_revision = "019_event_outbox"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Erstellt (patient_id, Zeit, id)-Indizes auf vital_signs und lab_results."""
+    # Auf der Hypertable legt TimescaleDB den Index pro Chunk an
+    op.create_index(
+        "ix_vital_signs_patient_recorded_id", "vital_signs", ["patient_id", "recorded_at", "id"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_lab_results_patient_resulted_id", "lab_results", ["patient_id", "resulted_at", "id"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Entfernt die Keyset-Indizes."""
+    op.drop_index("ix_lab_results_patient_resulted_id", table_name="lab_results", if_exists=True)
+    op.drop_index("ix_vital_signs_patient_recorded_id", table_name="vital_signs", if_exists=True)
@@ -0,0 +1,53 @@
+"""021 — lab_latest Projektion (letzter Wert pro Patient und Analyt).
+
+Revision ID: 021_lab_latest
+Revises: 020_observation_search_indexes
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "021_lab_latest"
+down_revision = "020_observation_search_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Erstellt lab_latest und befüllt sie aus der bestehenden Laborhistorie."""
+    op.create_table(
+        "lab_latest",
+        sa.Column("patient_id", UUID(as_uuid=True), nullable=False),
+        sa.Column("analyte", sa.String(50), nullable=False),
+        sa.Column("result_id", UUID(as_uuid=True), nullable=False),
+        sa.Column("display_name", sa.String(100), nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.Column("unit", sa.String(20), nullable=False),
+        sa.Column("ref_min", sa.Float(), nullable=True),
+        sa.Column("ref_max", sa.Float(), nullable=True),
+        sa.Column("flag", sa.String(10), nullable=True),
+        sa.Column("interpretation", sa.String(20), nullable=True),
+        sa.Column("trend", sa.String(5), nullable=True),
+        sa.Column("category", sa.String(30), nullable=False, server_default="chemistry"),
+        sa.Column("resulted_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["patient_id"], ["patients.id"]),
+        sa.ForeignKeyConstraint(["result_id"], ["lab_results.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("patient_id", "analyte"),
+    )
+    op.execute(
+        """
+        INSERT INTO lab_latest (patient_id, analyte, result_id, display_name, value, unit, ref_min, ref_max,
+                                flag, interpretation, trend, category, resulted_at)
+        SELECT DISTINCT ON (patient_id, analyte)
+               patient_id, analyte, id, display_name, value, unit, ref_min, ref_max,
+               flag, interpretation, trend, category, resulted_at
+        FROM lab_results
+        ORDER BY patient_id, analyte, resulted_at DESC, id DESC
+        """
+    )
+
+
+def downgrade() -> None:
+    """Entfernt lab_latest."""
+    op.drop_table("lab_latest")
@@ -0,0 +1,64 @@
+"""022 — Katalogsuche: gefaltete Suchschlüssel + GIN-Trigramm-Indizes.
+
+Revision ID: 022_catalog_search
+Revises: 021_lab_latest
+"""
+
+from alembic import op
+
+revision = "022_catalog_search"
+down_revision = "021_lab_latest"
+branch_labels = None
+depends_on = None
+
+# Identisch zu catalog_search.fold(): klein, ohne Diakritika, ß→ss, ae/oe/ue→a/o/u.
+# Grossbuchstaben stehen zusätzlich in der translate-Tabelle, falls lower()
+# unter einer C-Locale Nicht-ASCII-Zeichen nicht umwandelt.
+FOLD_FUNCTION = """
+CREATE OR REPLACE FUNCTION pdms_catalog_fold(value text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS $$
+    SELECT replace(replace(replace(replace(
+        translate(lower(value),
+                  'àáâãäåçèéêëìíîïñòóôõöøùúûüýÿÀÁÂÃÄÅÇÈÉÊËÌÍÎÏÑÒÓÔÕÖØÙÚÛÜÝŸ',
+                  'aaaaaaceeeeiiiinoooooouuuuyyaaaaaaceeeeiiiinoooooouuuuyy'),
+        'ß', 'ss'), 'ae', 'a'), 'oe', 'o'), 'ue', 'u')
+$$
+"""
+
+
+def upgrade() -> None:
+    """Legt pdms_catalog_fold(), die search_key-Spalten und die Suchindizes an."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(FOLD_FUNCTION)
+
+    op.execute(
+        "ALTER TABLE icd10_catalog ADD COLUMN search_key text "
+        "GENERATED ALWAYS AS (pdms_catalog_fold(code || ' ' || title)) STORED"
+    )
+    op.execute(
+        "ALTER TABLE medikament_katalog ADD COLUMN search_key text "
+        "GENERATED ALWAYS AS (pdms_catalog_fold(name || ' ' || wirkstoff || ' ' || coalesce(atc_code, ''))) STORED"
+    )
+
+    # Trigramm-Indizes: LIKE '%…%', Ähnlichkeit und Wort-Ähnlichkeit
+    op.execute("CREATE INDEX ix_icd10_catalog_search_key_trgm ON icd10_catalog USING gin (search_key gin_trgm_ops)")
+    op.execute(
+        "CREATE INDEX ix_medikament_katalog_search_key_trgm ON medikament_katalog USING gin (search_key gin_trgm_ops)"
+    )
+    # Präfixsuche auf Codes unabhängig von der Datenbank-Collation
+    op.execute("CREATE INDEX ix_icd10_catalog_code_prefix ON icd10_catalog (code text_pattern_ops)")
+    op.execute("CREATE INDEX ix_medikament_katalog_atc_prefix ON medikament_katalog (atc_code text_pattern_ops)")
+    # Ersetzt durch den Trigramm-Index
+    op.drop_index("ix_icd10_catalog_title", table_name="icd10_catalog")
+
+
+def downgrade() -> None:
+    """Entfernt Suchindizes, search_key-Spalten und pdms_catalog_fold()."""
+    op.create_index("ix_icd10_catalog_title", "icd10_catalog", ["title"])
+    op.drop_index("ix_medikament_katalog_atc_prefix", table_name="medikament_katalog")
+    op.drop_index("ix_icd10_catalog_code_prefix", table_name="icd10_catalog")
+    op.drop_index("ix_medikament_katalog_search_key_trgm", table_name="medikament_katalog")
+    op.drop_index("ix_icd10_catalog_search_key_trgm", table_name="icd10_catalog")
+    op.drop_column("medikament_katalog", "search_key")
+    op.drop_column("icd10_catalog", "search_key")
+    op.execute("DROP FUNCTION IF EXISTS pdms_catalog_fold(text)")
@@ -0,0 +1,76 @@
+"""023 — audit_logs als Hypertable mit patient_id/route, Kompression und Retention.
+
+Revision ID: 023_audit_hypertable
+Revises: 022_catalog_search
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "023_audit_hypertable"
+down_revision = "022_catalog_search"
+branch_labels = None
+depends_on = None
+
+CHUNK_INTERVAL = "1 month"
+# Ältere Chunks werden komprimiert (segmentiert nach Patient → Patientenabfragen bleiben schnell)
+COMPRESS_AFTER = "90 days"
+# Aufbewahrung der Behandlungsdokumentation: 20 Jahre (Art. 128a OR, Kantone teils abweichend)
+RETAIN_FOR = "20 years"
+
+UUID_PATTERN = "[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+
+
+def upgrade() -> None:
+    """Fügt patient_id/route hinzu, befüllt sie und wandelt audit_logs in eine Hypertable um."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS timescaledb")
+    op.add_column("audit_logs", sa.Column("patient_id", UUID(as_uuid=True), nullable=True))
+    op.add_column("audit_logs", sa.Column("route", sa.String(200), nullable=True))
+
+    # Bestehende Einträge: Pfad steht in details->>'path' (ältere Einträge nur in resource_type).
+    # Parameternamen sind nicht mehr rekonstruierbar → UUID-Segmente werden zu {id}.
+    op.execute(
+        f"""
+        UPDATE audit_logs SET
+            patient_id = substring(coalesce(details->>'path', resource_type) FROM '/patients/({UUID_PATTERN})')::uuid,
+            route = left(regexp_replace(coalesce(details->>'path', resource_type), '{UUID_PATTERN}', '{{id}}', 'g'), 200)
+        """
+    )
+
+    # Hypertable: Zeitspalte muss Teil des Primärschlüssels sein
+    op.drop_constraint("audit_logs_pkey", "audit_logs", type_="primary")
+    op.create_primary_key("audit_logs_pkey", "audit_logs", ["id", "created_at"])
+    op.execute(
+        f"SELECT create_hypertable('audit_logs', 'created_at', "
+        f"chunk_time_interval => INTERVAL '{CHUNK_INTERVAL}', migrate_data => TRUE, if_not_exists => TRUE)"
+    )
+
+    op.drop_index("ix_audit_logs_user_id", table_name="audit_logs")
+    op.execute("CREATE INDEX ix_audit_logs_user_created ON audit_logs (user_id, created_at DESC)")
+    op.execute("CREATE INDEX ix_audit_logs_patient_created ON audit_logs (patient_id, created_at DESC)")
+    op.execute("CREATE INDEX ix_audit_logs_route_created ON audit_logs (route, created_at DESC)")
+    op.execute("CREATE INDEX ix_audit_logs_action_created ON audit_logs (action, created_at DESC)")
+    # Freitext-Filter resource_type ILIKE '%…%' (pg_trgm seit Migration 022)
+    op.execute("CREATE INDEX ix_audit_logs_resource_type_trgm ON audit_logs USING gin (resource_type gin_trgm_ops)")
+
+    op.execute(
+        "ALTER TABLE audit_logs SET (timescaledb.compress, "
+        "timescaledb.compress_segmentby = 'patient_id', timescaledb.compress_orderby = 'created_at DESC')"
+    )
+    op.execute(f"SELECT add_compression_policy('audit_logs', INTERVAL '{COMPRESS_AFTER}', if_not_exists => TRUE)")
+    op.execute(f"SELECT add_retention_policy('audit_logs', INTERVAL '{RETAIN_FOR}', if_not_exists => TRUE)")
+
+
+def downgrade() -> None:
+    """Kopiert audit_logs zurück in eine normale Tabelle (Hypertables lassen sich nicht zurückwandeln)."""
+    op.execute("SELECT remove_retention_policy('audit_logs', if_exists => TRUE)")
+    op.execute("SELECT remove_compression_policy('audit_logs', if_exists => TRUE)")
+    op.execute("CREATE TABLE audit_logs_plain (LIKE audit_logs INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO audit_logs_plain SELECT * FROM audit_logs")
+    op.execute("DROP TABLE audit_logs")
+    op.execute("ALTER TABLE audit_logs_plain RENAME TO audit_logs")
+    op.drop_column("audit_logs", "route")
+    op.drop_column("audit_logs", "patient_id")
+    op.create_primary_key("audit_logs_pkey", "audit_logs", ["id"])
+    op.create_index("ix_audit_logs_user_id", "audit_logs", ["user_id"])
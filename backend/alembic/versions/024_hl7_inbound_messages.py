@@ -0,0 +1,31 @@
+"""024 — hl7_inbound_messages für idempotenten HL7-Empfang (MSH-10 pro Absender).
+
+Revision ID: 024_hl7_inbound_messages
+Revises: 023_audit_hypertable
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "024_hl7_inbound_messages"
+down_revision = "023_audit_hypertable"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Erstellt hl7_inbound_messages (Primärschlüssel = Absender + Control-ID)."""
+    op.create_table(
+        "hl7_inbound_messages",
+        sa.Column("sending_application", sa.String(200), nullable=False),
+        sa.Column("sending_facility", sa.String(200), nullable=False),
+        sa.Column("control_id", sa.String(200), nullable=False),
+        sa.Column("result_count", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("received_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
+        sa.PrimaryKeyConstraint("sending_application", "sending_facility", "control_id"),
+    )
+
+
+def downgrade() -> None:
+    """Entfernt hl7_inbound_messages."""
+    op.drop_table("hl7_inbound_messages")
@@ -0,0 +1,45 @@
+"""025 — audit_daily_counts: Continuous Aggregate für die Audit-Statistik.
+
+Revision ID: 025_audit_daily_counts
+Revises: 024_hl7_inbound_messages
+"""
+
+from alembic import op
+
+revision = "025_audit_daily_counts"
+down_revision = "024_hl7_inbound_messages"
+branch_labels = None
+depends_on = None
+
+# Der jüngste Abschnitt wird live aus audit_logs ergänzt (materialized_only = false)
+REFRESH_END_OFFSET = "1 hour"
+REFRESH_INTERVAL = "30 minutes"
+
+
+def upgrade() -> None:
+    """Tageszähler pro Aktion und Ressource; befüllt durch die Refresh-Policy."""
+    # WITH NO DATA: das erste Materialisieren übernimmt die Policy (ausserhalb der Migrationstransaktion)
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW audit_daily_counts
+        WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+        SELECT time_bucket(INTERVAL '1 day', created_at) AS bucket,
+               action,
+               resource_type,
+               count(*) AS entries
+        FROM audit_logs
+        GROUP BY bucket, action, resource_type
+        WITH NO DATA
+        """
+    )
+    op.execute(
+        f"SELECT add_continuous_aggregate_policy('audit_daily_counts', start_offset => NULL, "
+        f"end_offset => INTERVAL '{REFRESH_END_OFFSET}', schedule_interval => INTERVAL '{REFRESH_INTERVAL}', "
+        f"if_not_exists => TRUE)"
+    )
+
+
+def downgrade() -> None:
+    """Entfernt den Continuous Aggregate samt Policy."""
+    op.execute("SELECT remove_continuous_aggregate_policy('audit_daily_counts', if_exists => TRUE)")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS audit_daily_counts")
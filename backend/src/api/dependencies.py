@@ -1,6 +1,6 @@
 """FastAPI Dependencies — DB Session, Current User, RBAC."""
 
-from src.infrastructure.database import get_db
+from src.infrastructure.database import get_db, get_session_factory
 from src.infrastructure.keycloak import get_current_user, require_role
 
-__all__ = ["get_db", "get_current_user", "require_role"]
+__all__ = ["get_db", "get_session_factory", "get_current_user", "require_role"]
@@ -1,17 +1,21 @@
-"""Middleware: audit logging, CORS, rate limiting."""
+"""Middleware: request timing, metrics and audit capture (pure ASGI)."""
 
 import logging
+import re
 import time
+from typing import Any
 from uuid import UUID
 
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from src.infrastructure.audit_db import log_action
-from src.infrastructure.database import AsyncSessionLocal
+from src.infrastructure.audit_writer import audit_writer
+from src.infrastructure.metrics import HTTP_DURATION, HTTP_REQUESTS
+from src.infrastructure.query_stats import query_stats
 
 logger = logging.getLogger("pdms.audit")
 
+AUDITED_METHODS = frozenset({"POST", "PATCH", "PUT", "DELETE"})
+
 
 def _safe_uuid(value: str | None) -> UUID | None:
     """Parse a UUID string safely; return None on failure."""
@@ -23,44 +27,152 @@ def _safe_uuid(value: str | None) -> UUID | None:
         return None
 
 
-class AuditMiddleware(BaseHTTPMiddleware):
-    """Log every mutating API request to the audit trail."""
-
-    async def dispatch(self, request: Request, call_next):
-        start = time.time()
-        response = await call_next(request)
-        duration_ms = round((time.time() - start) * 1000)
-
-        # Log mutating API requests to the database
-        if request.url.path.startswith("/api/") and request.method in ("POST", "PATCH", "PUT", "DELETE"):
-            try:
-                # Extract user info from request state (set by get_current_user dependency)
-                raw_user_id = getattr(request.state, "user_id", None)
-                user_id = _safe_uuid(raw_user_id)
-                user_role = getattr(request.state, "user_role", "anonymous")
-
-                if user_id is None:
-                    logger.debug("Audit: skipping log for unauthenticated request %s %s", request.method, request.url.path)
-                else:
-                    async with AsyncSessionLocal() as session:
-                        await log_action(
-                            session,
-                            user_id=user_id,
-                            user_role=user_role,
-                            action=request.method,
-                            resource_type=request.url.path,
-                            resource_id=None,
-                            details={"status": response.status_code, "duration_ms": duration_ms},
-                            ip_address=request.client.host if request.client else None,
-                        )
-                        await session.commit()
-            except Exception as e:
-                logger.warning(f"Audit log failed: {e}")
-
-        # Always log to stdout for debugging
-        if request.url.path.startswith("/api/"):
-            logger.debug(
-                f"{request.method} {request.url.path} → {response.status_code} ({duration_ms}ms)"
-            )
+_PATIENT_IN_PATH = re.compile(r"/patients/([0-9a-fA-F-]{36})")
+
+
+def _router_prefix(scope: Scope) -> str:
+    """Accumulated prefix of the included router(s) that handled the request.
+
+    FastAPI keeps included routers nested, so ``route.path_format`` is
+    relative to its own router; the full prefix is in the include context.
+    """
+    included = (scope.get("fastapi") or {}).get("included_router")
+    context = getattr(included, "include_context", None)
+    return getattr(context, "prefix", "") or ""
+
+
+def _route_template(scope: Scope) -> str | None:
+    """Matched route template, e.g. ``/api/v1/patients/{patient_id}/vitals``.
+
+    Mount path + router prefix + the matched route's ``path_format``.
+    Mounted apps without routes (``/media`` static files) never set
+    ``scope["route"]``; they are recognised by the ``root_path`` the mount
+    appended and collapse to ``<mount>/{path}``.
+    """
+    mount_path = ""
+    if "app_root_path" in scope:  # only set once a Mount matched
+        mount_path = scope.get("root_path", "")[len(scope["app_root_path"]):]
+    route = scope.get("route")
+    if route is not None:
+        path_format = getattr(route, "path_format", route.path)
+        return f"{mount_path}{_router_prefix(scope)}{path_format}"[:200]
+    if mount_path:
+        return f"{mount_path}/{{path}}"[:200]
+    return None
+
+
+def _patient_id(scope: Scope) -> UUID | None:
+    """Patient the request refers to: ``patient_id`` path parameter, else ``/patients/<uuid>`` in the path."""
+    patient_id = _safe_uuid(scope.get("path_params", {}).get("patient_id"))
+    if patient_id is None:
+        match = _PATIENT_IN_PATH.search(scope["path"])
+        patient_id = _safe_uuid(match.group(1)) if match else None
+    return patient_id
+
+
+def _client_host(scope: Scope) -> str | None:
+    client = scope.get("client")
+    return client[0] if client else None
+
 
-        return response
+def http_summary(top: int = 10) -> dict[str, Any]:
+    """JSON view of this worker's HTTP metrics (``/metrics``): totals and top endpoints."""
+    counts = {labels: HTTP_DURATION.count(*labels) for labels in HTTP_DURATION.values}
+    errors: dict[tuple[str, ...], float] = {}
+    for (method, route, status), value in HTTP_REQUESTS.values.items():
+        if int(status) >= 400:
+            errors[(method, route)] = errors.get((method, route), 0) + value
+    total_requests = sum(counts.values())
+    total_errors = int(sum(errors.values()))
+    top_endpoints = sorted(counts.items(), key=lambda x: x[1], reverse=True)[:top]
+    return {
+        "total_requests": total_requests,
+        "total_errors": total_errors,
+        "error_rate": round(total_errors / max(total_requests, 1) * 100, 2),
+        "top_endpoints": [
+            {
+                "endpoint": f"{method} {route}",
+                "requests": cnt,
+                "errors": int(errors.get((method, route), 0)),
+                "avg_duration_ms": round(HTTP_DURATION.total(method, route) / max(cnt, 1) * 1000, 2),
+            }
+            for (method, route), cnt in top_endpoints
+        ],
+    }
+
+
+class ObservabilityMiddleware:
+    """Timing, request metrics and audit capture in one pure ASGI middleware.
+
+    Only ``send`` is wrapped to read the status code from
+    ``http.response.start``; the response body is passed through untouched
+    (no task group, no memory streams as with ``BaseHTTPMiddleware``).
+    WebSocket and lifespan scopes are forwarded without any wrapping.
+
+    Metrics (``pdms_http_*``) are labelled with the matched route template,
+    so path parameters do not create one series per patient. Mutating
+    ``/api/`` requests of an authenticated user are queued on
+    ``audit_writer``; the user is read from the request state set by
+    ``get_current_user``.
+
+    Each request also opens a ``query_stats`` scope, so the statements it
+    runs are attributed to its route (N+1 and chatty-request detection).
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        queries = query_stats.begin_request(lambda: _route_template(scope))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            query_stats.end_request(queries)
+            self._observe(scope, status, duration)
+
+    def _observe(self, scope: Scope, status: int, duration: float) -> None:
+        method, path = scope["method"], scope["path"]
+        route = _route_template(scope)
+        HTTP_REQUESTS.inc(method, route or "unmatched", str(status))
+        HTTP_DURATION.observe(duration, method, route or "unmatched")
+
+        if not path.startswith("/api/"):
+            return
+        duration_ms = round(duration * 1000)
+        logger.debug("%s %s → %s (%sms)", method, path, status, duration_ms)
+        if method not in AUDITED_METHODS:
+            return
+        try:
+            state = scope.get("state") or {}
+            user_id = _safe_uuid(state.get("user_id"))
+            if user_id is None:
+                logger.debug("Audit: skipping log for unauthenticated request %s %s", method, path)
+                return
+            audit_writer.enqueue(
+                user_id=user_id,
+                user_role=state.get("user_role", "anonymous"),
+                action=method,
+                # resource_type is VARCHAR(50); an over-long value would fail the whole batch
+                resource_type=path[:50],
+                resource_id=None,
+                details={"status": status, "duration_ms": duration_ms, "path": path},
+                ip_address=_client_host(scope),
+                patient_id=_patient_id(scope),
+                route=route,
+            )
+        except Exception as e:
+            logger.warning(f"Audit log failed: {e}")
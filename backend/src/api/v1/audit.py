@@ -6,16 +6,16 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy import func, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from src.api.dependencies import get_db, require_role
-from src.domain.models.system import AuditLog
+from src.api.dependencies import get_db, get_session_factory, require_role
+from src.domain.services import audit_service
 
 router = APIRouter()
 
 AdminUser = Annotated[dict, Depends(require_role("admin"))]
 DbSession = Annotated[AsyncSession, Depends(get_db)]
+Sessions = Annotated[async_sessionmaker[AsyncSession], Depends(get_session_factory)]
 
 
 # ── Schemas ─────────────────────────────────────────────────────────
@@ -31,12 +31,15 @@ class AuditLogResponse(BaseModel):
     resource_id: str | None
     details: dict
     ip_address: str | None
+    patient_id: uuid.UUID | None = None
+    route: str | None = None
     created_at: datetime
 
 
 class PaginatedAuditLogs(BaseModel):
     items: list[AuditLogResponse]
     total: int
+    total_estimated: bool = False
     page: int
     per_page: int
 
@@ -46,50 +49,52 @@ class PaginatedAuditLogs(BaseModel):
 @router.get("/audit", response_model=PaginatedAuditLogs)
 async def get_audit_log(
     db: DbSession,
+    sessions: Sessions,
     user: AdminUser,
     page: int = Query(1, ge=1),
     per_page: int = Query(50, ge=1, le=200),
     user_id: uuid.UUID | None = None,
+    patient_id: uuid.UUID | None = None,
     action: str | None = Query(None, pattern=r"^(POST|PATCH|PUT|DELETE)$"),
+    route: str | None = Query(None, max_length=200, description="Routen-Template, z.B. /api/v1/patients/{patient_id}"),
     resource_type: str | None = None,
     date_from: date | None = None,
     date_to: date | None = None,
 ):
     """Audit-Log abrufen (nur Admin).
 
-    Unterstützt Filterung nach user_id, action, resource_type und Datum.
+    Unterstützt Filterung nach user_id, patient_id, action, route,
+    resource_type und Datum. Ab ``audit_count_exact_limit`` Treffern ist
+    ``total`` eine Schätzung (``total_estimated``).
     """
-    query = select(AuditLog)
-
-    # Filter
-    if user_id:
-        query = query.where(AuditLog.user_id == user_id)
-    if action:
-        query = query.where(AuditLog.action == action)
-    if resource_type:
-        query = query.where(AuditLog.resource_type.ilike(f"%{resource_type}%"))
-    if date_from:
-        query = query.where(AuditLog.created_at >= datetime.combine(date_from, datetime.min.time()))
-    if date_to:
-        query = query.where(AuditLog.created_at <= datetime.combine(date_to, datetime.max.time()))
-
-    # Count
-    count_query = select(func.count()).select_from(query.subquery())
-    total = (await db.execute(count_query)).scalar_one()
-
-    # Paginate (neueste zuerst)
-    query = query.order_by(AuditLog.created_at.desc()).offset((page - 1) * per_page).limit(per_page)
-    result = await db.execute(query)
-    logs = list(result.scalars().all())
-
-    return PaginatedAuditLogs(
-        items=[AuditLogResponse.model_validate(log) for log in logs],
-        total=total,
+    return await audit_service.list_audit_logs(
+        db,
+        sessions,
+        user_id=user_id,
+        patient_id=patient_id,
+        action=action,
+        route=route,
+        resource_type=resource_type,
+        date_from=date_from,
+        date_to=date_to,
         page=page,
         per_page=per_page,
     )
 
 
+@router.get("/audit/patients/{patient_id}", response_model=PaginatedAuditLogs)
+async def get_patient_audit_log(
+    patient_id: uuid.UUID,
+    db: DbSession,
+    sessions: Sessions,
+    user: AdminUser,
+    page: int = Query(1, ge=1),
+    per_page: int = Query(50, ge=1, le=200),
+):
+    """Alle protokollierten Zugriffe auf einen Patienten (nur Admin)."""
+    return await audit_service.get_patient_audit_logs(db, sessions, patient_id, page=page, per_page=per_page)
+
+
 @router.get("/audit/{log_id}", response_model=AuditLogResponse)
 async def get_audit_entry(
     log_id: uuid.UUID,
@@ -97,8 +102,7 @@ async def get_audit_entry(
     user: AdminUser,
 ):
     """Einzelnen Audit-Eintrag abrufen (nur Admin)."""
-    result = await db.execute(select(AuditLog).where(AuditLog.id == log_id))
-    entry = result.scalar_one_or_none()
+    entry = await audit_service.get_audit_entry(db, log_id)
     if entry is None:
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Audit-Eintrag nicht gefunden")
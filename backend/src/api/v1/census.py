@@ -0,0 +1,39 @@
+"""Census API endpoint — Übersicht aller aktiven Patienten in einem Request."""
+
+import hashlib
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.dependencies import get_current_user, get_db
+from src.domain.schemas.census import CensusResponse
+from src.domain.services.census_service import get_census
+
+router = APIRouter()
+
+DbSession = Annotated[AsyncSession, Depends(get_db)]
+CurrentUser = Annotated[dict, Depends(get_current_user)]
+
+
+@router.get("/census", response_model=CensusResponse)
+async def census_endpoint(
+    request: Request,
+    db: DbSession,
+    user: CurrentUser,
+    ward: str | None = Query(None, max_length=50),
+):
+    """Alle aktiven Aufenthalte mit letzten Vitalwerten, Alarm-/Medikamenten-
+    Zählern und heutigem Hausbesuch.
+
+    Unterstützt ETag/If-None-Match: unveränderte Übersicht → 304 ohne Body,
+    damit das Dashboard günstig pollen kann.
+    """
+    patients = await get_census(db, ward=ward)
+    body = CensusResponse(ward=ward, total=len(patients), patients=patients).model_dump_json()
+    etag = f'W/"{hashlib.sha256(body.encode()).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if etag in {tag.strip() for tag in request.headers.get("if-none-match", "").split(",")}:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -4,24 +4,31 @@ import uuid
 from typing import Annotated
 
 from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from src.api.dependencies import get_current_user, get_db
+from src.api.dependencies import get_current_user, get_session_factory
 from src.domain.services.dossier_service import get_patient_dossier
+from src.infrastructure.valkey import TTL_DOSSIER, CacheKeys, get_or_load
 
 router = APIRouter()
 
-DbSession = Annotated[AsyncSession, Depends(get_db)]
+Sessions = Annotated[async_sessionmaker[AsyncSession], Depends(get_session_factory)]
 CurrentUser = Annotated[dict, Depends(get_current_user)]
 
 
 @router.get("/patients/{patient_id}/dossier")
-async def patient_dossier(patient_id: uuid.UUID, db: DbSession, user: CurrentUser):
+async def patient_dossier(patient_id: uuid.UUID, sessions: Sessions, user: CurrentUser):
     """Aggregierte Patientenübersicht — alle Module auf einen Blick.
 
     Gibt Zähler, letzte Einträge und Statusübersicht für:
     Encounter, Vitals, Alarme, Medikamente, Therapiepläne,
     Konsilien, Arztbriefe, Pflegediagnosen, Schichtübergabe,
     Ernährung, klinische Notizen und Pflege-Einträge zurück.
+    Eine DB-Abfrage; Ergebnis gecacht und per Domain-Event invalidiert.
     """
-    return await get_patient_dossier(db, patient_id)
+    async def _load() -> dict:
+        # eigene Session: der Cache lädt ggf. nach Request-Ende (Early Refresh)
+        async with sessions() as db:
+            return await get_patient_dossier(db, patient_id)
+
+    return await get_or_load(CacheKeys.dossier(str(patient_id)), _load, ttl=TTL_DOSSIER)
@@ -3,28 +3,56 @@
 Stellt FHIR-konforme Ressourcen bereit:
 - GET /fhir/Patient            → Patienten-Suche
 - GET /fhir/Patient/{id}       → Einzelner Patient
-- GET /fhir/Patient/{id}/$everything → Alle Ressourcen eines Patienten
+- GET /fhir/Observation        → Observation-Suche (Vitaldaten + Labor, _bucket-Aggregation)
+- GET /fhir/Patient/{id}/$everything → Alle Ressourcen eines Patienten (gestreamt, _count/_since)
+- GET /fhir/$export, /fhir/Patient/$export, /fhir/Group/{station}/$export
+                                → Bulk Data Export (NDJSON, asynchron)
 - GET /fhir/metadata           → CapabilityStatement
 """
 
 import uuid
-from datetime import date
+from collections.abc import AsyncIterator
+from datetime import UTC, date, datetime
 from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import URL
 
-from src.api.dependencies import get_current_user, get_db
+from src.api.dependencies import get_current_user, get_db, require_role
+from src.domain.models.patient import Patient
+from src.domain.services.fhir_export_service import (
+    EXPORT_TYPES,
+    ExportJob,
+    cancel_export,
+    export_file_name,
+    get_export_file,
+    get_export_status,
+    start_export,
+)
+from src.domain.services.fhir_observation_service import (
+    SearchParamError,
+    build_query,
+    search_observations,
+)
 from src.domain.services.fhir_service import (
+    EverythingCursor,
+    PatientEverything,
     get_fhir_patient,
-    get_fhir_patient_everything,
     search_fhir_patients,
 )
+from src.infrastructure.database import AsyncSessionLocal
 
 router = APIRouter(prefix="/fhir")
 
 DbSession = Annotated[AsyncSession, Depends(get_db)]
 CurrentUser = Annotated[dict, Depends(get_current_user)]
+ExportUser = Annotated[dict, Depends(require_role("arzt", "admin"))]
+
+# Bundle-Entries werden zu Chunks dieser Grösse zusammengefasst
+STREAM_CHUNK_BYTES = 64 * 1024
 
 
 @router.get("/metadata")
@@ -58,12 +86,21 @@ async def capability_statement(user: CurrentUser) -> dict[str, Any]:
                         ],
                         "operation": [
                             {"name": "everything", "definition": "http://hl7.org/fhir/OperationDefinition/Patient-everything"},
+                            {"name": "export", "definition": "http://hl7.org/fhir/uv/bulkdata/OperationDefinition/patient-export"},
                         ],
                     },
                     {
                         "type": "Observation",
                         "profile": "http://fhir.ch/ig/ch-core/StructureDefinition/ch-core-observation-vitalsigns",
-                        "interaction": [{"code": "read"}],
+                        "interaction": [{"code": "search-type"}],
+                        "searchParam": [
+                            {"name": "patient", "type": "reference"},
+                            {"name": "code", "type": "token"},
+                            {"name": "date", "type": "date"},
+                            {"name": "category", "type": "token"},
+                            {"name": "_count", "type": "number"},
+                            {"name": "_sort", "type": "string"},
+                        ],
                     },
                     {
                         "type": "Encounter",
@@ -75,6 +112,9 @@ async def capability_statement(user: CurrentUser) -> dict[str, Any]:
                         "interaction": [{"code": "read"}],
                     },
                 ],
+                "operation": [
+                    {"name": "export", "definition": "http://hl7.org/fhir/uv/bulkdata/OperationDefinition/export"},
+                ],
             }
         ],
     }
@@ -103,6 +143,142 @@ async def search_patients(
     }
 
 
+@router.get("/Observation", response_model=None)
+async def search_observations_endpoint(
+    request: Request,
+    db: DbSession,
+    user: CurrentUser,
+    patient: str = Query(..., description="Patient/<id> oder <id>"),
+    code: list[str] = Query(default=[], description="LOINC-Codes (system|code), kommagetrennt oder mehrfach"),
+    date_: list[str] = Query(default=[], alias="date", description="z.B. ge2026-03-01, lt2026-03-08T12:00:00Z"),
+    category: str | None = Query(None, description="vital-signs oder laboratory"),
+    count: int = Query(100, alias="_count", ge=1, le=1000),
+    sort: str | None = Query(None, alias="_sort", description="date (Default) oder -date"),
+    bucket: str | None = Query(None, alias="_bucket", description="Aggregation je Intervall, z.B. 15min, 1h, 1d"),
+    cursor: str | None = Query(None, alias="_cursor", description="Fortsetzung aus dem next-Link"),
+) -> Response:
+    """FHIR Observation-Suche über Vitaldaten und Laborwerte (Keyset-Paging, optional aggregiert)."""
+    try:
+        query = build_query(
+            patient=patient, codes=code, dates=date_, category=category,
+            count=count, sort=sort, bucket=bucket, cursor=cursor,
+        )
+    except SearchParamError as exc:
+        raise HTTPException(400, detail=str(exc)) from None
+
+    page = await search_observations(db, query)
+    links = [{"relation": "self", "url": str(request.url)}]
+    if page.next_cursor is not None:
+        links.append({"relation": "next", "url": str(request.url.include_query_params(_cursor=page.next_cursor))})
+
+    body = bytearray(b'{"resourceType":"Bundle","type":"searchset","link":')
+    body += orjson.dumps(links)
+    body += b',"entry":['
+    for i, resource in enumerate(page.resources):
+        if i:
+            body += b","
+        body += b'{"resource":' + resource + b',"search":{"mode":"match"}}'
+    body += b"]}"
+    return Response(bytes(body), media_type="application/fhir+json")
+
+
+# ─── Bulk Data Export ($export) ──────────────────────────────
+
+
+def _kick_off_export(
+    request: Request,
+    level: str,
+    type_: str | None,
+    since: datetime | None,
+    group: str | None = None,
+) -> Response:
+    """Export starten — 202 mit Content-Location auf den Status-Endpoint."""
+    types = tuple(t.strip() for t in type_.split(",") if t.strip()) if type_ else EXPORT_TYPES
+    unknown = [t for t in types if t not in EXPORT_TYPES]
+    if unknown:
+        raise HTTPException(400, detail=f"Nicht unterstützte Ressourcentypen: {', '.join(unknown)}")
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=UTC)
+
+    job = ExportJob(level=level, request_url=str(request.url), types=types, since=since, group=group)
+    file_urls = {
+        t: str(request.url_for("export_file", job_id=job.id, file_name=export_file_name(t))) for t in types
+    }
+    start_export(AsyncSessionLocal, job, file_urls)
+    return Response(
+        status_code=202,
+        headers={"Content-Location": str(request.url_for("export_status", job_id=job.id))},
+    )
+
+
+ExportType = Query(None, alias="_type", description="Ressourcentypen, kommagetrennt")
+ExportSince = Query(None, alias="_since", description="Nur Ressourcen geändert seit (ISO 8601)")
+
+
+@router.get("/$export", status_code=202, response_class=Response)
+async def system_export(
+    request: Request,
+    user: ExportUser,
+    type_: str | None = ExportType,
+    since: datetime | None = ExportSince,
+) -> Response:
+    """FHIR Bulk Data Export über alle Patienten (System-Ebene)."""
+    return _kick_off_export(request, "system", type_, since)
+
+
+@router.get("/Patient/$export", status_code=202, response_class=Response)
+async def patient_export(
+    request: Request,
+    user: ExportUser,
+    type_: str | None = ExportType,
+    since: datetime | None = ExportSince,
+) -> Response:
+    """FHIR Bulk Data Export aller Patienten-Kompartimente."""
+    return _kick_off_export(request, "patient", type_, since)
+
+
+@router.get("/Group/{group_id}/$export", status_code=202, response_class=Response)
+async def group_export(
+    group_id: str,
+    request: Request,
+    user: ExportUser,
+    type_: str | None = ExportType,
+    since: datetime | None = ExportSince,
+) -> Response:
+    """FHIR Bulk Data Export einer Gruppe — Gruppe = Station mit aktiven Aufenthalten."""
+    return _kick_off_export(request, "group", type_, since, group=group_id)
+
+
+@router.get("/$export-status/{job_id}", name="export_status", response_model=None)
+async def export_status(job_id: str, user: ExportUser) -> Response:
+    """Status eines Exports: 202 mit X-Progress während der Laufzeit, 200 mit Manifest."""
+    status = get_export_status(job_id)
+    if status is None:
+        raise HTTPException(404, detail="Export nicht gefunden")
+    if status["status"] == "in-progress":
+        return Response(status_code=202, headers={"X-Progress": status["progress"], "Retry-After": "5"})
+    if status["status"] == "failed":
+        return JSONResponse(status["error"][0], status_code=500, media_type="application/fhir+json")
+    return JSONResponse({k: v for k, v in status.items() if k != "status"})
+
+
+@router.delete("/$export-status/{job_id}", status_code=202, response_class=Response)
+async def export_cancel(job_id: str, user: ExportUser) -> Response:
+    """Export abbrechen bzw. Exportdateien löschen."""
+    if not cancel_export(job_id):
+        raise HTTPException(404, detail="Export nicht gefunden")
+    return Response(status_code=202)
+
+
+@router.get("/$export-file/{job_id}/{file_name}", name="export_file", response_class=FileResponse)
+async def export_file(job_id: str, file_name: str, user: ExportUser) -> FileResponse:
+    """NDJSON-Datei eines fertigen Exports (gzip, Content-Encoding: gzip)."""
+    path = get_export_file(job_id, file_name)
+    if path is None:
+        raise HTTPException(404, detail="Exportdatei nicht gefunden")
+    return FileResponse(path, media_type="application/fhir+ndjson", headers={"Content-Encoding": "gzip"})
+
+
 @router.get("/Patient/{patient_id}", response_model=None)
 async def get_patient(
     patient_id: uuid.UUID,
@@ -119,11 +295,51 @@ async def get_patient(
 @router.get("/Patient/{patient_id}/$everything", response_model=None)
 async def patient_everything(
     patient_id: uuid.UUID,
+    request: Request,
     db: DbSession,
     user: CurrentUser,
-) -> dict[str, Any]:
-    """FHIR $everything — Alle Ressourcen eines Patienten als Bundle."""
-    bundle = await get_fhir_patient_everything(db, patient_id)
-    if bundle["total"] == 0:
-        raise HTTPException(404, detail="Patient nicht gefunden oder keine Daten vorhanden")
-    return bundle
+    count: int | None = Query(None, alias="_count", ge=1, le=10000, description="Datensätze pro Seite"),
+    since: datetime | None = Query(None, alias="_since", description="Nur Ressourcen geändert seit (ISO 8601)"),
+    cursor: str | None = Query(None, alias="_cursor", description="Fortsetzung aus dem next-Link"),
+) -> StreamingResponse:
+    """FHIR $everything — Alle Ressourcen eines Patienten als gestreamtes Bundle.
+
+    Ohne ``_count`` wird alles in einer Antwort geliefert, mit ``_count``
+    seitenweise mit ``next``-Link. Der Body wird chunked geschrieben.
+    """
+    try:
+        position = EverythingCursor.decode(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(400, detail="Ungültiger _cursor") from None
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=UTC)
+
+    patient = await db.get(Patient, patient_id)
+    if not patient:
+        raise HTTPException(404, detail="Patient nicht gefunden")
+
+    page = PatientEverything(db, patient, count=count, since=since, cursor=position)
+    return StreamingResponse(_bundle_stream(page, request.url), media_type="application/fhir+json")
+
+
+async def _bundle_stream(page: PatientEverything, url: URL) -> AsyncIterator[bytes]:
+    """Bundle-JSON stückweise erzeugen; die Links folgen nach den Entries."""
+    head = {"resourceType": "Bundle", "type": "searchset", "timestamp": datetime.now(UTC).isoformat()}
+    yield orjson.dumps(head)[:-1] + b',"entry":['
+
+    chunk = bytearray()
+    first = True
+    async for entry in page.entries():
+        if not first:
+            chunk += b","
+        chunk += entry
+        first = False
+        if len(chunk) >= STREAM_CHUNK_BYTES:
+            yield bytes(chunk)
+            chunk.clear()
+
+    links = [{"relation": "self", "url": str(url)}]
+    if page.next_cursor is not None:
+        links.append({"relation": "next", "url": str(url.include_query_params(_cursor=page.next_cursor.encode()))})
+    chunk += b'],"link":' + orjson.dumps(links) + b"}"
+    yield bytes(chunk)
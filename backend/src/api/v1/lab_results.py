@@ -4,9 +4,9 @@ import uuid
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from src.api.dependencies import get_current_user, get_db, require_role
+from src.api.dependencies import get_current_user, get_db, get_session_factory, require_role
 from src.domain.schemas.lab import (
     ANALYTE_LABELS,
     ANALYTES,
@@ -31,10 +31,12 @@ from src.domain.services.lab_service import (
     list_lab_results,
     update_lab_result,
 )
+from src.infrastructure.valkey import TTL_LAB_SUMMARY, CacheKeys, get_or_load, invalidate
 
 router = APIRouter()
 
 DbSession = Annotated[AsyncSession, Depends(get_db)]
+Sessions = Annotated[async_sessionmaker[AsyncSession], Depends(get_session_factory)]
 CurrentUser = Annotated[dict, Depends(get_current_user)]
 DoctorOrAdmin = Annotated[dict, Depends(require_role("arzt", "admin"))]
 
@@ -71,8 +73,13 @@ async def list_results(
 # ─── Summary (latest per analyte) ──────────────────────────────
 
 @router.get("/patients/{patient_id}/lab-results/summary", response_model=LabSummaryResponse)
-async def summary(patient_id: uuid.UUID, db: DbSession, user: CurrentUser):
-    items = await get_lab_summary(db, patient_id)
+async def summary(patient_id: uuid.UUID, sessions: Sessions, user: CurrentUser):
+    """Letzter Wert pro Analyt — aus der lab_latest-Projektion, gecacht."""
+    async def _load() -> list[dict]:
+        async with sessions() as db:
+            return await get_lab_summary(db, patient_id)
+
+    items = await get_or_load(CacheKeys.lab_summary(str(patient_id)), _load, ttl=TTL_LAB_SUMMARY)
     return {"items": items}
 
 
@@ -103,14 +110,16 @@ async def get_result(result_id: uuid.UUID, db: DbSession, user: CurrentUser):
 
 @router.post("/lab-results", response_model=LabResultResponse, status_code=201)
 async def create_result(data: LabResultCreate, db: DbSession, user: DoctorOrAdmin):
-    return await create_lab_result(db, data, ordered_by=user.get("sub"))
+    result = await create_lab_result(db, data, ordered_by=user.get("sub"))
+    await invalidate(CacheKeys.lab_summary(str(data.patient_id)))
+    return result
 
 
 # ─── Batch create ──────────────────────────────────────────────
 
 @router.post("/lab-results/batch", response_model=list[LabResultResponse], status_code=201)
 async def create_batch(data: LabResultBatchCreate, db: DbSession, user: DoctorOrAdmin):
-    return await create_lab_results_batch(
+    results = await create_lab_results_batch(
         db,
         data.patient_id,
         data.results,
@@ -120,6 +129,8 @@ async def create_batch(data: LabResultBatchCreate, db: DbSession, user: DoctorOr
         sample_type=data.sample_type,
         ordered_by=user.get("sub"),
     )
+    await invalidate(CacheKeys.lab_summary(str(data.patient_id)))
+    return results
 
 
 # ─── Update ─────────────────────────────────────────────────────
@@ -129,6 +140,7 @@ async def update_result(result_id: uuid.UUID, data: LabResultUpdate, db: DbSessi
     result = await update_lab_result(db, result_id, data)
     if not result:
         raise HTTPException(404, "Lab result not found")
+    await invalidate(CacheKeys.lab_summary(str(result.patient_id)))
     return result
 
 
@@ -136,6 +148,7 @@ async def update_result(result_id: uuid.UUID, data: LabResultUpdate, db: DbSessi
 
 @router.delete("/lab-results/{result_id}", status_code=204)
 async def delete_result(result_id: uuid.UUID, db: DbSession, user: DoctorOrAdmin):
-    ok = await delete_lab_result(db, result_id)
-    if not ok:
+    deleted = await delete_lab_result(db, result_id)
+    if not deleted:
         raise HTTPException(404, "Lab result not found")
+    await invalidate(CacheKeys.lab_summary(str(deleted.patient_id)))
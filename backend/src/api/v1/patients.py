@@ -10,9 +10,9 @@ from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
 from fastapi.responses import FileResponse
 from PIL import Image, ImageOps, UnidentifiedImageError
 from sqlalchemy import select, text, update
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from src.api.dependencies import get_current_user, get_db
+from src.api.dependencies import get_current_user, get_db, get_session_factory
 from src.config import get_media_root_path, settings
 from src.domain.models.patient import PatientPhoto
 from src.domain.schemas.patient import PaginatedPatients, PatientCreate, PatientResponse, PatientUpdate
@@ -27,14 +27,14 @@ from src.infrastructure.valkey import (
     CacheKeys,
     TTL_PATIENT,
     TTL_PATIENT_LIST,
-    get_cached,
+    get_or_load,
     invalidate,
-    set_cached,
 )
 
 router = APIRouter()
 
 DbSession = Annotated[AsyncSession, Depends(get_db)]
+Sessions = Annotated[async_sessionmaker[AsyncSession], Depends(get_session_factory)]
 CurrentUser = Annotated[dict, Depends(get_current_user)]
 
 _ALLOWED_IMAGE_MIME_TYPES: dict[str, str] = {
@@ -115,49 +115,43 @@ def _normalize_patient_photo(image_bytes: bytes) -> bytes:
 
 @router.get("/patients", response_model=PaginatedPatients)
 async def list_patients_endpoint(
-    db: DbSession,
+    sessions: Sessions,
     user: CurrentUser,
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
     search: str | None = None,
 ):
     """Patientenliste mit Suche und Pagination."""
-    # Check cache
-    cache_key = CacheKeys.patient_list(page, per_page, search)
-    cached = await get_cached(cache_key)
-    if cached is not None:
-        return PaginatedPatients(**cached)
-
-    patients, total = await list_patients(db, page=page, per_page=per_page, search=search)
-    result = PaginatedPatients(
-        items=[PatientResponse.model_validate(p) for p in patients],
-        total=total,
-        page=page,
-        per_page=per_page,
-    )
-    await set_cached(cache_key, result.model_dump(), ttl=TTL_PATIENT_LIST)
-    return result
+    async def _load() -> dict:
+        async with sessions() as db:
+            patients, total = await list_patients(db, page=page, per_page=per_page, search=search)
+        return PaginatedPatients(
+            items=[PatientResponse.model_validate(p) for p in patients],
+            total=total,
+            page=page,
+            per_page=per_page,
+        ).model_dump(mode="json")
+
+    cached = await get_or_load(CacheKeys.patient_list(page, per_page, search), _load, ttl=TTL_PATIENT_LIST)
+    return PaginatedPatients(**cached)
 
 
 @router.get("/patients/{patient_id}", response_model=PatientResponse)
 async def get_patient_endpoint(
     patient_id: uuid.UUID,
-    db: DbSession,
+    sessions: Sessions,
     user: CurrentUser,
 ):
     """Einzelnen Patient abrufen."""
-    # Check cache
-    cache_key = CacheKeys.patient(str(patient_id))
-    cached = await get_cached(cache_key)
-    if cached is not None:
-        return PatientResponse(**cached)
-
-    patient = await get_patient(db, patient_id)
-    if not patient:
-        raise HTTPException(status_code=404, detail="Patient nicht gefunden")
-    result = PatientResponse.model_validate(patient)
-    await set_cached(cache_key, result.model_dump(), ttl=TTL_PATIENT)
-    return result
+    async def _load() -> dict:
+        async with sessions() as db:
+            patient = await get_patient(db, patient_id)
+        if not patient:
+            raise HTTPException(status_code=404, detail="Patient nicht gefunden")
+        return PatientResponse.model_validate(patient).model_dump(mode="json")
+
+    cached = await get_or_load(CacheKeys.patient(str(patient_id)), _load, ttl=TTL_PATIENT)
+    return PatientResponse(**cached)
 
 
 @router.post("/patients", response_model=PatientResponse, status_code=201)
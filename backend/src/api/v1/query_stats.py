@@ -0,0 +1,29 @@
+"""Query-Statistik Router — SQL-Profiling pro Statement-Fingerprint (nur Admin)."""
+
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+
+from src.api.dependencies import require_role
+from src.infrastructure.query_stats import query_stats
+
+router = APIRouter(prefix="/admin/query-stats", tags=["Admin"])
+
+
+@router.get("")
+async def get_query_stats(
+    sort: Literal["total_ms", "mean_ms", "p99_ms", "count", "rows"] = Query("total_ms"),
+    limit: int = Query(50, ge=1, le=500),
+    user: dict = Depends(require_role("admin")),
+):
+    """Statements (Anzahl, Gesamt-/Mittel-/p99-Zeit, Zeilen), N+1-Verdacht pro Route und langsame Queries.
+
+    Werte gelten pro Worker-Prozess seit dem Start bzw. dem letzten Zurücksetzen.
+    """
+    return query_stats.report(sort=sort, limit=limit)
+
+
+@router.delete("", status_code=204)
+async def reset_query_stats(user: dict = Depends(require_role("admin"))):
+    """Setzt die Statistik dieses Workers zurück (z.B. vor einem Lasttest)."""
+    query_stats.reset()
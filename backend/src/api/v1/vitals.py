@@ -1,14 +1,30 @@
 """Vitals API endpoints — record + query time series."""
 
 import uuid
+from collections.abc import AsyncIterator
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api.dependencies import get_current_user, get_db
-from src.domain.schemas.vital import VitalSignCreate, VitalSignResponse, VitalSignUpdate
-from src.domain.services.vital_service import get_vitals, record_vital, update_vital
+from src.config import settings
+from src.domain.schemas.vital import (
+    VitalBatchResponse,
+    VitalSignBatchCreate,
+    VitalSignCreate,
+    VitalSignResponse,
+    VitalSignUpdate,
+)
+from src.domain.services.vital_service import (
+    VitalBatchResult,
+    get_vitals,
+    ingest_vitals_batch,
+    publish_vitals_batch,
+    record_vital,
+    update_vital,
+)
 
 router = APIRouter()
 
@@ -40,6 +56,82 @@ async def record_vital_endpoint(
     return VitalSignResponse.model_validate(vital)
 
 
+@router.post("/vitals/batch", response_model=VitalBatchResponse, status_code=201)
+async def record_vitals_batch_endpoint(
+    data: VitalSignBatchCreate,
+    db: DbSession,
+    user: CurrentUser,
+):
+    """Gepufferte Vitaldaten eines Geräts/Gateways gesammelt erfassen (COPY)."""
+    user_id = uuid.UUID(user.get("sub", "00000000-0000-0000-0000-000000000000"))
+    result = VitalBatchResult()
+    chunk_size = settings.vitals_copy_chunk_size
+    for start in range(0, len(data.readings), chunk_size):
+        await ingest_vitals_batch(db, data.readings[start:start + chunk_size], user_id, result)
+    await publish_vitals_batch(db, result, user_id)
+    return _batch_response(result)
+
+
+@router.post("/vitals/batch/ndjson", response_model=VitalBatchResponse, status_code=201)
+async def record_vitals_ndjson_endpoint(
+    request: Request,
+    db: DbSession,
+    user: CurrentUser,
+):
+    """Vitaldaten als NDJSON-Stream erfassen (ein VitalSignCreate pro Zeile).
+
+    Der Body wird zeilenweise gelesen und in Chunks per COPY geschrieben;
+    der ganze Upload bleibt eine Transaktion (ungültige Zeile → 422, nichts gespeichert).
+    """
+    user_id = uuid.UUID(user.get("sub", "00000000-0000-0000-0000-000000000000"))
+    result = VitalBatchResult()
+    chunk: list[VitalSignCreate] = []
+    line_no = 0
+
+    async for line in _iter_lines(request):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            chunk.append(VitalSignCreate.model_validate_json(line))
+        except ValidationError as exc:
+            raise HTTPException(
+                status_code=422,
+                detail={"line": line_no, "errors": exc.errors(include_url=False, include_context=False)},
+            ) from exc
+        if len(chunk) >= settings.vitals_copy_chunk_size:
+            await ingest_vitals_batch(db, chunk, user_id, result)
+            chunk = []
+
+    await ingest_vitals_batch(db, chunk, user_id, result)
+    if not result.inserted:
+        raise HTTPException(status_code=422, detail="Keine Messwerte im Body")
+    await publish_vitals_batch(db, result, user_id)
+    return _batch_response(result)
+
+
+async def _iter_lines(request: Request) -> AsyncIterator[bytes]:
+    """Request-Body zeilenweise liefern, ohne ihn komplett zu puffern."""
+    buffer = b""
+    async for block in request.stream():
+        buffer += block
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+def _batch_response(result: VitalBatchResult) -> VitalBatchResponse:
+    return VitalBatchResponse(
+        inserted=result.inserted,
+        patients=len(result.patient_counts),
+        alarms_triggered=len(result.alarms),
+        earliest=result.earliest,
+        latest=result.latest,
+    )
+
+
 @router.patch("/vitals/{vital_id}", response_model=VitalSignResponse)
 async def update_vital_endpoint(
     vital_id: uuid.UUID,
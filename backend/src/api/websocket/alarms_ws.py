@@ -6,14 +6,16 @@ from typing import Any
 
 from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
 
+from src.api.websocket.broker import CHANNEL_ALARMS, ws_broker
+from src.api.websocket.connections import ConnectionGroup
 from src.api.websocket.ws_auth import authenticate_websocket
 
 logger = logging.getLogger("pdms.ws.alarms")
 
 router = APIRouter()
 
-# In-memory connection store (in Produktion: Redis/Valkey PubSub)
-_alarm_connections: list[WebSocket] = []
+# Lokale Verbindungen dieses Workers; workerübergreifend via Valkey PubSub (broker.py)
+_alarm_connections = ConnectionGroup("alarms")
 
 
 @router.websocket("/ws/alarms")
@@ -27,7 +29,7 @@ async def alarm_stream(websocket: WebSocket, token: str | None = Query(None)):
     if user is None:
         return  # Connection was rejected
 
-    _alarm_connections.append(websocket)
+    conn = _alarm_connections.add(websocket)
     client = websocket.client
     logger.info("🔌 Alarm-WS verbunden: %s (user=%s)", client, user.get("preferred_username"))
 
@@ -36,34 +38,35 @@ async def alarm_stream(websocket: WebSocket, token: str | None = Query(None)):
             # Client kann Filter senden (z.B. {"patient_id": "..."})
             # oder einfach keepalive-Pings
             data = await websocket.receive_text()
-            # Ping/Pong für Keepalive
+            # Ping/Pong für Keepalive (über die Sende-Queue, nie parallel zum Writer)
             if data == "ping":
-                await websocket.send_text("pong")
+                conn.offer("pong", priority=True)
     except WebSocketDisconnect:
         logger.info("🔌 Alarm-WS getrennt: %s", client)
     finally:
-        if websocket in _alarm_connections:
-            _alarm_connections.remove(websocket)
+        await _alarm_connections.remove(websocket)
 
 
 async def broadcast_alarm(event: dict[str, Any]) -> None:
-    """Sendet ein Alarm-Event an alle verbundenen WebSocket-Clients."""
-    if not _alarm_connections:
-        return
-
-    message = json.dumps(event)
-    disconnected: list[WebSocket] = []
-
-    for ws in _alarm_connections:
-        try:
-            await ws.send_text(message)
-        except Exception:
-            disconnected.append(ws)
-
-    # Tote Verbindungen aufräumen
-    for ws in disconnected:
-        if ws in _alarm_connections:
-            _alarm_connections.remove(ws)
-
-    if _alarm_connections:
-        logger.debug(f"📡 Alarm broadcast an {len(_alarm_connections)} Client(s)")
+    """Sendet ein Alarm-Event an alle verbundenen WebSocket-Clients (alle Worker).
+
+    Das Event wird genau einmal serialisiert. Alarme jeder Schwere werden
+    nie verworfen: läuft die Sende-Queue eines Clients voll, wird er
+    getrennt und lädt nach dem Reconnect /alarms neu.
+    """
+    await ws_broker.publish(CHANNEL_ALARMS, json.dumps(event), key=event.get("severity"))
+
+
+async def _deliver_alarm(_severity: str | None, message: str, _exclude: int | None) -> None:
+    """Lokaler Fan-out: nur Einreihen in die Sende-Queues, kein Warten auf Sockets."""
+    reached = _alarm_connections.broadcast(message, priority=True)
+    if reached:
+        logger.debug(f"📡 Alarm broadcast an {reached} Client(s)")
+
+
+def alarm_ws_stats() -> dict[str, int]:
+    """Queue-Tiefe, Drops und Slow-Consumer-Disconnects des Alarm-Streams."""
+    return _alarm_connections.stats()
+
+
+ws_broker.register(CHANNEL_ALARMS, _deliver_alarm)
@@ -0,0 +1,140 @@
+"""WebSocket fan-out broker — cross-worker delivery via Valkey pub/sub.
+
+Every uvicorn worker only knows its own sockets. ``broadcast_alarm`` /
+``broadcast_vitals`` therefore publish to a Valkey channel, and each
+worker's listener task fans the message out to its local connections.
+
+Envelope (JSON):
+    {"o": <origin worker>, "k": <routing key, e.g. patient_id>,
+     "x": <local connection id to skip or null>, "m": <pre-serialized event>}
+
+``m`` stays a string end-to-end, so an event is serialized exactly once.
+If Valkey is unavailable the broker delivers locally (single-worker mode).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections.abc import Awaitable, Callable
+
+from src.infrastructure.valkey import get_valkey
+
+logger = logging.getLogger("pdms.ws.broker")
+
+CHANNEL_ALARMS = "pdms:ws:alarms"
+CHANNEL_VITALS = "pdms:ws:vitals"
+
+# Local delivery callback: (routing_key, message, exclude_connection_id)
+LocalHandler = Callable[[str | None, str, int | None], Awaitable[None]]
+
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class WebSocketBroker:
+    """Publishes WebSocket events to all workers, delivers them locally."""
+
+    def __init__(self) -> None:
+        self._handlers: dict[str, LocalHandler] = {}
+        self._listener: asyncio.Task | None = None
+        self._subscribed = False
+
+    @property
+    def is_distributed(self) -> bool:
+        """True while the pub/sub listener is subscribed."""
+        return self._subscribed
+
+    def register(self, channel: str, handler: LocalHandler) -> None:
+        """Register the local fan-out for a channel (one per channel)."""
+        self._handlers[channel] = handler
+
+    async def publish(
+        self,
+        channel: str,
+        message: str,
+        *,
+        key: str | None = None,
+        exclude: int | None = None,
+    ) -> None:
+        """Send a pre-serialized event to every worker (incl. this one)."""
+        if self.is_distributed:
+            envelope = json.dumps({"o": WORKER_ID, "k": key, "x": exclude, "m": message})
+            try:
+                client = await get_valkey()
+                await client.publish(channel, envelope)
+                return
+            except Exception as exc:
+                logger.warning("WS broker publish failed, delivering locally: %s", exc)
+        await self._deliver(channel, key, message, exclude)
+
+    async def _deliver(self, channel: str, key: str | None, message: str, exclude: int | None) -> None:
+        handler = self._handlers.get(channel)
+        if handler is None:
+            return
+        try:
+            await handler(key, message, exclude)
+        except Exception as exc:
+            logger.error("WS local fan-out failed (%s): %s", channel, exc, exc_info=True)
+
+    async def dispatch(self, channel: str, raw: str) -> None:
+        """Handle one pub/sub message from Valkey."""
+        try:
+            envelope = json.loads(raw)
+        except (TypeError, ValueError):
+            logger.warning("WS broker: malformed envelope on %s", channel)
+            return
+        # Connection ids are only meaningful inside the publishing worker
+        exclude = envelope.get("x") if envelope.get("o") == WORKER_ID else None
+        await self._deliver(channel, envelope.get("k"), envelope["m"], exclude)
+
+    # ─── Lifecycle ────────────────────────────────────────────
+
+    async def start(self) -> None:
+        """Start the pub/sub listener (reconnects with backoff)."""
+        if self._listener is not None and not self._listener.done():
+            return
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is None:
+            return
+        self._listener.cancel()
+        try:
+            await self._listener
+        except asyncio.CancelledError:
+            pass
+        self._listener = None
+        self._subscribed = False
+
+    async def _listen(self) -> None:
+        backoff = 1.0
+        while True:
+            pubsub = None
+            try:
+                client = await get_valkey()
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(*self._handlers)
+                self._subscribed = True
+                backoff = 1.0
+                logger.info("WS broker subscribed: %s (worker=%s)", list(self._handlers), WORKER_ID)
+                async for msg in pubsub.listen():
+                    if msg.get("type") == "message":
+                        await self.dispatch(msg["channel"], msg["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self._subscribed = False
+                logger.warning("WS broker connection lost, retry in %.0fs: %s", backoff, exc)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                self._subscribed = False
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+
+ws_broker = WebSocketBroker()
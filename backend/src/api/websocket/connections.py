@@ -0,0 +1,189 @@
+"""WebSocket connection registry with per-client send queues.
+
+Each connection gets a bounded outgoing queue and its own writer task, so
+a broadcast only enqueues (never awaits a socket) and one slow tablet on
+a bad mobile link cannot stall delivery to everyone else.
+
+Backpressure policy when a client's queue is full:
+  - the oldest *normal* message is dropped (coalescing: for vitals only
+    the newest readings matter),
+  - *priority* messages (alarm events of any severity, pongs) are never
+    dropped; if the queue holds nothing but priority messages the client
+    is too slow and gets disconnected (code 1013) — it reconnects and
+    reloads /alarms.
+
+A send that does not complete within ``send_timeout`` also disconnects
+the client.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any
+
+from fastapi import WebSocket
+
+from src.config import settings
+from src.infrastructure.metrics import WS_CONNECTIONS
+
+logger = logging.getLogger("pdms.ws.connections")
+
+WS_CLOSE_TRY_AGAIN_LATER = 1013
+
+
+class ClientConnection:
+    """One WebSocket with a bounded send queue drained by a writer task."""
+
+    __slots__ = (
+        "websocket", "max_queue", "send_timeout", "dropped", "sent", "slow",
+        "_queue", "_wakeup", "_writer", "_closing", "_closed", "_on_close",
+    )
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        *,
+        max_queue: int,
+        send_timeout: float,
+        on_close: Any = None,
+    ) -> None:
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.dropped = 0
+        self.sent = 0
+        self.slow = False
+        self._queue: deque[tuple[str, bool]] = deque()
+        self._wakeup = asyncio.Event()
+        self._closing: asyncio.Task | None = None
+        self._closed = False
+        self._on_close = on_close
+        self._writer = asyncio.create_task(self._run())
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def offer(self, message: str, *, priority: bool = False) -> bool:
+        """Enqueue a message without blocking. Returns False if not queued."""
+        if self._closed:
+            return False
+        if len(self._queue) >= self.max_queue and not self._make_room(priority):
+            self.dropped += 1
+            return False
+        self._queue.append((message, priority))
+        self._wakeup.set()
+        return True
+
+    def _make_room(self, priority: bool) -> bool:
+        """Drop the oldest normal message; disconnect if only priority ones are left."""
+        for i, (_msg, queued_priority) in enumerate(self._queue):
+            if not queued_priority:
+                del self._queue[i]
+                self.dropped += 1
+                return True
+        if priority:
+            logger.warning("WS client %s too slow (queue full of priority messages) — disconnecting",
+                           self.websocket.client)
+            if self._closing is None:
+                self._closing = asyncio.create_task(self.close(WS_CLOSE_TRY_AGAIN_LATER))
+        return False
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while self._queue:
+                    message, _priority = self._queue.popleft()
+                    await asyncio.wait_for(self.websocket.send_text(message), self.send_timeout)
+                    self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except TimeoutError:
+            logger.warning("WS send timeout (%.0fs) for %s — disconnecting", self.send_timeout, self.websocket.client)
+            await self.close(WS_CLOSE_TRY_AGAIN_LATER)
+        except Exception:
+            # Socket already gone — the endpoint's receive loop cleans up
+            await self.close()
+
+    async def close(self, code: int | None = None) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self.slow = code == WS_CLOSE_TRY_AGAIN_LATER
+        self._queue.clear()
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        if code is not None:
+            try:
+                await self.websocket.close(code=code)
+            except Exception:
+                pass
+        if self._on_close is not None:
+            self._on_close(self)
+
+
+class ConnectionGroup:
+    """A set of client connections that receive the same broadcasts."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        # Metric label: "vitals:<patient>" → "vitals" (bounded cardinality)
+        self.channel = name.split(":", 1)[0]
+        self._connections: dict[int, ClientConnection] = {}
+        self.dropped_total = 0
+        self.slow_disconnects = 0
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    def add(self, websocket: WebSocket) -> ClientConnection:
+        conn = ClientConnection(
+            websocket,
+            max_queue=settings.ws_send_queue_size,
+            send_timeout=settings.ws_send_timeout_seconds,
+            on_close=self._forget,
+        )
+        self._connections[id(websocket)] = conn
+        WS_CONNECTIONS.inc(self.channel)
+        return conn
+
+    async def remove(self, websocket: WebSocket) -> None:
+        conn = self._connections.get(id(websocket))
+        if conn is not None:
+            await conn.close()
+
+    def _forget(self, conn: ClientConnection) -> None:
+        if self._connections.pop(id(conn.websocket), None) is not None:
+            WS_CONNECTIONS.dec(self.channel)
+            self.dropped_total += conn.dropped
+            if conn.slow:
+                self.slow_disconnects += 1
+
+    def get(self, websocket: WebSocket) -> ClientConnection | None:
+        return self._connections.get(id(websocket))
+
+    def broadcast(self, message: str, *, priority: bool = False, exclude: int | None = None) -> int:
+        """Enqueue a pre-serialized message for every client. Returns clients reached."""
+        queued = 0
+        for conn_id, conn in list(self._connections.items()):
+            if conn_id == exclude:
+                continue
+            if conn.offer(message, priority=priority):
+                queued += 1
+        return queued
+
+    def stats(self) -> dict[str, int]:
+        depths = [c.depth for c in self._connections.values()]
+        return {
+            "connections": len(depths),
+            "queue_depth": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "dropped": self.dropped_total + sum(c.dropped for c in self._connections.values()),
+            "slow_disconnects": self.slow_disconnects,
+        }
@@ -11,14 +11,17 @@ from typing import Any
 
 from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
 
+from src.api.websocket.broker import CHANNEL_VITALS, ws_broker
+from src.api.websocket.connections import ConnectionGroup
 from src.api.websocket.ws_auth import authenticate_websocket
 
 logger = logging.getLogger("pdms.ws.vitals")
 
 router = APIRouter()
 
-# In-memory connection store: patient_id → list of WebSockets
-_vitals_connections: dict[str, list[WebSocket]] = {}
+# Local connections of this worker: patient_id → connection group
+# (cross-worker delivery via Valkey pub/sub, see broker.py)
+_vitals_connections: dict[str, ConnectionGroup] = {}
 
 
 @router.websocket("/ws/vitals/{patient_id}")
@@ -32,9 +35,8 @@ async def vitals_stream(websocket: WebSocket, patient_id: str, token: str | None
     if user is None:
         return  # Connection was rejected
 
-    if patient_id not in _vitals_connections:
-        _vitals_connections[patient_id] = []
-    _vitals_connections[patient_id].append(websocket)
+    group = _vitals_connections.setdefault(patient_id, ConnectionGroup(f"vitals:{patient_id}"))
+    conn = group.add(websocket)
     client = websocket.client
     logger.info("🔌 Vitals-WS verbunden: patient=%s client=%s user=%s", patient_id, client, user.get("preferred_username"))
 
@@ -42,7 +44,7 @@ async def vitals_stream(websocket: WebSocket, patient_id: str, token: str | None
         while True:
             data = await websocket.receive_text()
             if data == "ping":
-                await websocket.send_text("pong")
+                conn.offer("pong", priority=True)
                 continue
 
             # Client can push vitals data (from device gateway)
@@ -51,17 +53,14 @@ async def vitals_stream(websocket: WebSocket, patient_id: str, token: str | None
                 # Re-broadcast to all other clients watching this patient
                 await broadcast_vitals(patient_id, payload, exclude=websocket)
             except json.JSONDecodeError:
-                await websocket.send_text(json.dumps({"error": "Invalid JSON"}))
+                conn.offer(json.dumps({"error": "Invalid JSON"}), priority=True)
 
     except WebSocketDisconnect:
         logger.info("🔌 Vitals-WS getrennt: patient=%s client=%s", patient_id, client)
     finally:
-        if patient_id in _vitals_connections:
-            conns = _vitals_connections[patient_id]
-            if websocket in conns:
-                conns.remove(websocket)
-            if not conns:
-                del _vitals_connections[patient_id]
+        await group.remove(websocket)
+        if not group and _vitals_connections.get(patient_id) is group:
+            del _vitals_connections[patient_id]
 
 
 async def broadcast_vitals(
@@ -69,26 +68,36 @@ async def broadcast_vitals(
     event: dict[str, Any],
     exclude: WebSocket | None = None,
 ) -> None:
-    """Send vitals data to all connected WebSocket clients for a patient."""
-    conns = _vitals_connections.get(patient_id, [])
-    if not conns:
+    """Send vitals data to all connected WebSocket clients for a patient (all workers)."""
+    await ws_broker.publish(
+        CHANNEL_VITALS,
+        json.dumps(event),
+        key=patient_id,
+        exclude=id(exclude) if exclude is not None else None,
+    )
+
+
+async def _deliver_vitals(patient_id: str | None, message: str, exclude: int | None) -> None:
+    """Local fan-out of a pre-serialized vitals event (enqueue only; old readings coalesce)."""
+    group = _vitals_connections.get(patient_id or "")
+    if group is None:
         return
 
-    message = json.dumps(event)
-    disconnected: list[WebSocket] = []
+    reached = group.broadcast(message, exclude=exclude)
+    if reached > 0:
+        logger.debug("📡 Vitals broadcast patient=%s → %d client(s)", patient_id, reached)
 
-    for ws in conns:
-        if ws is exclude:
-            continue
-        try:
-            await ws.send_text(message)
-        except Exception:
-            disconnected.append(ws)
 
-    for ws in disconnected:
-        if ws in conns:
-            conns.remove(ws)
+def vitals_ws_stats() -> dict[str, int]:
+    """Aggregated queue depth / drop counters over all patient streams."""
+    totals = {"patients": len(_vitals_connections)}
+    for group in list(_vitals_connections.values()):
+        for name, value in group.stats().items():
+            if name == "queue_depth_max":
+                totals[name] = max(totals.get(name, 0), value)
+            else:
+                totals[name] = totals.get(name, 0) + value
+    return totals
 
-    active = len(conns) - (1 if exclude else 0)
-    if active > 0:
-        logger.debug("📡 Vitals broadcast patient=%s → %d client(s)", patient_id, active)
+
+ws_broker.register(CHANNEL_VITALS, _deliver_vitals)
@@ -18,6 +18,8 @@ logger = logging.getLogger("pdms.events.handlers")
 
 
 # ─── Alarm Handlers ────────────────────────────────────────────
+# The per-worker active-alarm index is NOT fed from here: this queue is
+# shared, so each event reaches only one worker. See subscribe_worker().
 
 
 @on_event("alarm.critical")
@@ -206,36 +208,44 @@ async def handle_nursing_assessment_created(payload: dict) -> None:
 
 @on_event("lab.resulted")
 async def handle_lab_resulted(payload: dict) -> None:
-    flag = payload.get("flag")
-    interpretation = payload.get("interpretation")
-    logger.info(
-        "🔬 Lab result: patient=%s analyte=%s value=%s flag=%s interpretation=%s",
-        payload.get("patient_id"),
-        payload.get("analyte"),
-        payload.get("value"),
-        flag,
-        interpretation,
-    )
+    if "results" in payload:
+        # Batch-Event: ein Event pro Panel
+        logger.info(
+            "🔬 Lab panel: patient=%s order=%s results=%s flagged=%s",
+            payload.get("patient_id"),
+            payload.get("order_number"),
+            payload.get("count"),
+            sum(1 for r in payload["results"] if r.get("flag")),
+        )
+    else:
+        logger.info(
+            "🔬 Lab result: patient=%s analyte=%s value=%s flag=%s interpretation=%s",
+            payload.get("patient_id"),
+            payload.get("analyte"),
+            payload.get("value"),
+            payload.get("flag"),
+            payload.get("interpretation"),
+        )
     # Invalidate lab caches (if applicable)
     try:
-        from src.infrastructure.valkey import invalidate
+        from src.infrastructure.valkey import CacheKeys, invalidate
         pid = payload.get("patient_id")
         if pid:
-            await invalidate(f"lab:summary:{pid}")
-            await invalidate(f"lab:list:{pid}")
+            await invalidate(CacheKeys.lab_summary(pid), f"lab:list:{pid}")
     except Exception:
         pass
 
 
 @on_event("lab.critical")
 async def handle_lab_critical(payload: dict) -> None:
-    logger.warning(
-        "🚨 CRITICAL lab result: patient=%s analyte=%s value=%s flag=%s",
-        payload.get("patient_id"),
-        payload.get("analyte"),
-        payload.get("value"),
-        payload.get("flag"),
-    )
+    for result in payload.get("results", [payload]):
+        logger.warning(
+            "🚨 CRITICAL lab result: patient=%s analyte=%s value=%s flag=%s",
+            payload.get("patient_id"),
+            result.get("analyte"),
+            result.get("value"),
+            result.get("flag"),
+        )
 
 
 # ─── Fluid Balance ─────────────────────────────────────────────
@@ -258,3 +268,25 @@ async def handle_fluid_balance_alert(payload: dict) -> None:
         payload.get("patient_id"),
         payload.get("balance_ml", 0),
     )
+
+
+# ─── Dossier Summary ──────────────────────────────────────────
+
+# Domains whose events change counters/latest entries in the dossier
+DOSSIER_EVENTS = (
+    "vital.#", "alarm.#", "medication.#", "encounter.#", "note.#", "nursing.#",
+    "treatment_plan.#", "consultation.#", "letter.#", "shift_handover.#", "nutrition.#",
+)
+
+
+async def invalidate_dossier(payload: dict) -> None:
+    """Drop cached dossier summaries of the affected patient(s)."""
+    patient_ids = list(payload.get("patients") or [])  # vital.batch
+    if payload.get("patient_id"):
+        patient_ids.append(payload["patient_id"])
+    if patient_ids:
+        await invalidate(*(CacheKeys.dossier(str(pid)) for pid in patient_ids))
+
+
+for _pattern in DOSSIER_EVENTS:
+    on_event(_pattern)(invalidate_dossier)
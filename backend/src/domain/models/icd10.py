@@ -2,7 +2,7 @@
 
 import uuid
 
-from sqlalchemy import String, Text
+from sqlalchemy import Computed, String, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -19,3 +19,7 @@ class Icd10Code(Base):
     chapter: Mapped[str | None] = mapped_column(String(10))  # I-XXII
     block: Mapped[str | None] = mapped_column(String(20))  # z.B. I00-I99
     category: Mapped[str | None] = mapped_column(String(100))  # z.B. Kreislaufsystem
+    # Gefalteter Suchtext (GIN-Trigramm-Index), siehe catalog_search.fold
+    search_key: Mapped[str | None] = mapped_column(
+        Text, Computed("pdms_catalog_fold(code || ' ' || title)", persisted=True), deferred=True
+    )
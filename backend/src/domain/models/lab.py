@@ -52,3 +52,46 @@ class LabResult(Base):
     extra: Mapped[dict | None] = mapped_column(JSONB)
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
+
+
+class LabLatest(Base):
+    """Projection: latest result per (patient, analyte) for the summary mini-table.
+
+    Maintained by ``lab_service`` on insert (upsert), correction and delete,
+    so the summary is a primary-key range read instead of a GROUP BY over
+    the whole lab history.
+    """
+
+    __tablename__ = "lab_latest"
+
+    patient_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("patients.id"), primary_key=True)
+    analyte: Mapped[str] = mapped_column(String(50), primary_key=True)
+    result_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("lab_results.id", ondelete="CASCADE"))
+
+    display_name: Mapped[str] = mapped_column(String(100))
+    value: Mapped[float] = mapped_column(Float)
+    unit: Mapped[str] = mapped_column(String(20))
+    ref_min: Mapped[float | None] = mapped_column(Float)
+    ref_max: Mapped[float | None] = mapped_column(Float)
+    flag: Mapped[str | None] = mapped_column(String(10))
+    interpretation: Mapped[str | None] = mapped_column(String(20))
+    trend: Mapped[str | None] = mapped_column(String(5))
+    category: Mapped[str] = mapped_column(String(30), default="chemistry")
+    resulted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+
+
+class HL7InboundMessage(Base):
+    """Idempotency record of an applied HL7 ORU message.
+
+    Keyed by MSH-10 (control id) per sender (MSH-3/MSH-4) and written in the
+    same transaction as the results, so a retransmit after a lost ACK is
+    recognised and acknowledged without inserting the results twice.
+    """
+
+    __tablename__ = "hl7_inbound_messages"
+
+    sending_application: Mapped[str] = mapped_column(String(200), primary_key=True)
+    sending_facility: Mapped[str] = mapped_column(String(200), primary_key=True)
+    control_id: Mapped[str] = mapped_column(String(200), primary_key=True)
+    result_count: Mapped[int] = mapped_column(Integer, default=0)
+    received_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
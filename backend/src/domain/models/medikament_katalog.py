@@ -2,7 +2,7 @@
 
 import uuid
 
-from sqlalchemy import String
+from sqlalchemy import Computed, String, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -23,3 +23,9 @@ class MedikamentKatalog(Base):
     route_label: Mapped[str | None] = mapped_column(String(50))               # Kurzform (p.o., i.v., s.c.)
     atc_code: Mapped[str | None] = mapped_column(String(20), index=True)      # ATC-Code
     kategorie: Mapped[str | None] = mapped_column(String(100))                # Therapeutische Kategorie
+    # Gefalteter Suchtext (GIN-Trigramm-Index), siehe catalog_search.fold
+    search_key: Mapped[str | None] = mapped_column(
+        Text,
+        Computed("pdms_catalog_fold(name || ' ' || wirkstoff || ' ' || coalesce(atc_code, ''))", persisted=True),
+        deferred=True,
+    )
@@ -1,11 +1,11 @@
-"""AppUser, AuditLog models."""
+"""AppUser, AuditLog, EventOutbox models."""
 
 import hashlib
 import os
 import uuid
 from datetime import UTC, datetime
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, String, Text, func
+from sqlalchemy import BigInteger, Boolean, DateTime, ForeignKey, Identity, Index, Integer, String, Text, func, text
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -52,17 +52,36 @@ class AppUser(Base):
 
 
 class AuditLog(Base):
+    """Audit-Trail (TimescaleDB-Hypertable, Monats-Chunks — Migration 023).
+
+    ``patient_id`` und ``route`` (Routen-Template, z.B.
+    ``/api/v1/patients/{patient_id}/vitals``) werden beim Schreiben aus dem
+    Request extrahiert, damit Patienten- und Routenabfragen über Indizes
+    laufen statt über ``ILIKE`` auf dem Pfad.
+    """
+
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index("ix_audit_logs_user_created", "user_id", text("created_at DESC")),
+        Index("ix_audit_logs_patient_created", "patient_id", text("created_at DESC")),
+        Index("ix_audit_logs_route_created", "route", text("created_at DESC")),
+        Index("ix_audit_logs_action_created", "action", text("created_at DESC")),
+    )
 
+    # Hypertable: der Primärschlüssel muss die Zeitspalte enthalten
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), index=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True))
     user_role: Mapped[str] = mapped_column(String(20))
     action: Mapped[str] = mapped_column(String(50))  # create, read, update, delete
     resource_type: Mapped[str] = mapped_column(String(50))  # patient, vital_sign, medication, etc.
     resource_id: Mapped[str | None] = mapped_column(String(100))
     details: Mapped[dict] = mapped_column(JSONB, default=dict)
     ip_address: Mapped[str | None] = mapped_column(String(45))
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
+    patient_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True))
+    route: Mapped[str | None] = mapped_column(String(200))
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, default=lambda: datetime.now(UTC)
+    )
 
 
 class UserMessage(Base):
@@ -85,3 +104,19 @@ class UserMessage(Base):
     is_read: Mapped[bool] = mapped_column(Boolean, default=False)
     read_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
+
+
+class EventOutbox(Base):
+    """Transaktionale Outbox — Domain-Events, die mit der Änderung committed werden.
+
+    Der Outbox-Relay liest die Zeilen in ID-Reihenfolge, publiziert sie nach
+    RabbitMQ (pdms.events) und löscht sie nach Broker-Bestätigung.
+    """
+
+    __tablename__ = "event_outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    routing_key: Mapped[str] = mapped_column(String(100))
+    body: Mapped[str] = mapped_column(Text)  # bereits serialisiertes JSON
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
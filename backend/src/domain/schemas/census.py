@@ -0,0 +1,48 @@
+"""Census (Stations-/Home-Spital-Übersicht) Pydantic schemas."""
+
+import uuid
+from datetime import date, datetime
+
+from pydantic import BaseModel
+
+
+class CensusVitals(BaseModel):
+    recorded_at: datetime
+    heart_rate: float | None = None
+    systolic_bp: float | None = None
+    diastolic_bp: float | None = None
+    spo2: float | None = None
+    temperature: float | None = None
+    respiratory_rate: float | None = None
+
+
+class CensusHomeVisit(BaseModel):
+    id: uuid.UUID
+    status: str
+    planned_start: datetime
+    assigned_nurse_name: str | None = None
+
+
+class CensusPatient(BaseModel):
+    """Eine Zeile der Übersicht: aktiver Aufenthalt + Kennzahlen."""
+
+    patient_id: uuid.UUID
+    first_name: str
+    last_name: str
+    date_of_birth: date
+    encounter_id: uuid.UUID
+    encounter_type: str
+    ward: str | None = None
+    bed: str | None = None
+    admitted_at: datetime
+    latest_vitals: CensusVitals | None = None
+    active_alarms: int = 0
+    critical_alarms: int = 0
+    active_medications: int = 0
+    home_visit_today: CensusHomeVisit | None = None
+
+
+class CensusResponse(BaseModel):
+    ward: str | None = None
+    total: int
+    patients: list[CensusPatient]
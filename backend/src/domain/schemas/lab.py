@@ -75,6 +75,7 @@ class LabResultCreate(BaseModel):
     category: str = Field("chemistry", pattern=r"^(chemistry|hematology|coagulation|blood_gas|urinalysis)$")
     sample_type: str | None = None
     collected_at: datetime | None = None
+    resulted_at: datetime | None = None  # default: time of import
     order_number: str | None = None
     notes: str | None = None
 
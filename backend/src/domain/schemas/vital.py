@@ -21,6 +21,24 @@ class VitalSignCreate(BaseModel):
     source: str = "manual"
 
 
+# Obergrenze für JSON-Batches; grössere Uploads via NDJSON-Stream
+VITALS_BATCH_MAX = 10_000
+
+
+class VitalSignBatchCreate(BaseModel):
+    """Gepufferte Messwerte eines Geräts/Gateways (z.B. nach Offline-Phase)."""
+
+    readings: list[VitalSignCreate] = Field(..., min_length=1, max_length=VITALS_BATCH_MAX)
+
+
+class VitalBatchResponse(BaseModel):
+    inserted: int
+    patients: int
+    alarms_triggered: int
+    earliest: datetime | None = None
+    latest: datetime | None = None
+
+
 class VitalSignUpdate(BaseModel):
     recorded_at: datetime | None = None
     heart_rate: float | None = Field(None, ge=0, le=300)
@@ -0,0 +1,211 @@
+"""Alarm rule engine — compiled threshold tables + in-process active-alarm index.
+
+``THRESHOLDS`` (see alarm_service) is compiled once into per-parameter
+interval tables, so evaluating a vital is a handful of ``bisect`` calls
+instead of nested dict lookups.
+
+``ActiveAlarmIndex`` keeps the set of (patient, parameter) pairs with an
+active alarm in process memory. It is warmed from the DB at startup,
+kept current from alarm.* events and periodically re-synchronised, so
+duplicate suppression no longer needs one SELECT per parameter.
+"""
+
+import asyncio
+import logging
+import uuid
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger("pdms.alarms.rules")
+
+_SEVERITY_RANK = {None: 0, "warning": 1, "critical": 2}
+
+
+# ─── Compiled Rules ────────────────────────────────────────────
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledRule:
+    """Interval table for one vital parameter.
+
+    ``low_edges`` are ascending lower bounds (critical, warning) evaluated
+    with ``bisect_right`` — a value *equal* to a bound is inside the range.
+    ``high_edges`` are ascending upper bounds (warning, critical) evaluated
+    with ``bisect_left`` — same inclusive semantics on the upper side.
+    """
+
+    parameter: str
+    low_edges: tuple[float, ...]
+    low_severities: tuple[str | None, ...]
+    high_edges: tuple[float, ...]
+    high_severities: tuple[str | None, ...]
+    threshold_min: float | None
+    threshold_max: float | None
+
+    def evaluate(self, value: float) -> str | None:
+        """Severity for a value: 'critical', 'warning' or None."""
+        low = self.low_severities[bisect_right(self.low_edges, value)]
+        high = self.high_severities[bisect_left(self.high_edges, value)]
+        return low if _SEVERITY_RANK[low] >= _SEVERITY_RANK[high] else high
+
+
+def compile_rule(parameter: str, levels: dict[str, tuple[float | None, float | None]]) -> CompiledRule:
+    """Compile one THRESHOLDS entry into an interval table."""
+    crit_min, crit_max = levels["critical"]
+    warn_min, warn_max = levels["warning"]
+
+    low_edges: list[float] = []
+    low_sev: list[str | None] = []
+    for bound, severity in ((crit_min, "critical"), (warn_min, "warning")):
+        if bound is not None:
+            low_edges.append(float(bound))
+            low_sev.append(severity)
+    low_sev.append(None)
+
+    high_edges: list[float] = []
+    high_sev: list[str | None] = [None]
+    for bound, severity in ((warn_max, "warning"), (crit_max, "critical")):
+        if bound is not None:
+            high_edges.append(float(bound))
+            high_sev.append(severity)
+
+    return CompiledRule(
+        parameter=parameter,
+        low_edges=tuple(low_edges),
+        low_severities=tuple(low_sev),
+        high_edges=tuple(high_edges),
+        high_severities=tuple(high_sev),
+        threshold_min=warn_min,
+        threshold_max=warn_max,
+    )
+
+
+def compile_rules(
+    thresholds: dict[str, dict[str, tuple[float | None, float | None]]],
+) -> tuple[CompiledRule, ...]:
+    """Compile the full THRESHOLDS table (order is preserved)."""
+    return tuple(compile_rule(param, levels) for param, levels in thresholds.items())
+
+
+def evaluate_vital(rules: tuple[CompiledRule, ...], vital: Any) -> list[tuple[CompiledRule, float, str]]:
+    """Evaluate all rules against a vital (ORM row or any attribute object).
+
+    Returns (rule, value, severity) for every parameter out of range.
+    """
+    hits: list[tuple[CompiledRule, float, str]] = []
+    for rule in rules:
+        value = getattr(vital, rule.parameter, None)
+        if value is None:
+            continue
+        severity = rule.evaluate(value)
+        if severity is not None:
+            hits.append((rule, value, severity))
+    return hits
+
+
+# ─── Active Alarm Index ────────────────────────────────────────
+
+
+class ActiveAlarmIndex:
+    """Per-patient set of parameters with an active alarm (per worker).
+
+    Fed by a per-worker fan-out subscription on ``alarm.#`` and re-warmed
+    periodically. It may lag behind other workers, so it is a hint: an
+    absent entry saves the database lookup, a present one must be
+    confirmed there. Before ``warm()`` has run callers use the database.
+    """
+
+    def __init__(self) -> None:
+        self._active: dict[uuid.UUID, set[str]] = {}
+        self._warm = False
+        self._refresh_task: asyncio.Task | None = None
+
+    @property
+    def is_warm(self) -> bool:
+        return self._warm
+
+    def __len__(self) -> int:
+        return sum(len(params) for params in self._active.values())
+
+    def active_parameters(self, patient_id: uuid.UUID) -> frozenset[str]:
+        return frozenset(self._active.get(patient_id, ()))
+
+    def contains(self, patient_id: uuid.UUID, parameter: str) -> bool:
+        params = self._active.get(patient_id)
+        return params is not None and parameter in params
+
+    def add(self, patient_id: uuid.UUID, parameter: str) -> None:
+        self._active.setdefault(patient_id, set()).add(parameter)
+
+    def discard(self, patient_id: uuid.UUID, parameter: str) -> None:
+        params = self._active.get(patient_id)
+        if params is None:
+            return
+        params.discard(parameter)
+        if not params:
+            del self._active[patient_id]
+
+    def clear(self) -> None:
+        self._active.clear()
+        self._warm = False
+
+    async def warm(self, session: AsyncSession) -> int:
+        """(Re-)load all active alarms from the database. Returns entry count."""
+        from src.domain.models.clinical import Alarm
+
+        result = await session.execute(
+            select(Alarm.patient_id, Alarm.parameter).where(Alarm.status == "active")
+        )
+        active: dict[uuid.UUID, set[str]] = {}
+        for patient_id, parameter in result.all():
+            active.setdefault(patient_id, set()).add(parameter)
+        self._active = active
+        self._warm = True
+        return len(self)
+
+    def start_refresh(self, session_factory: Any, interval_seconds: float) -> None:
+        """Periodically re-warm to heal events this worker did not receive."""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+
+        async def _refresh() -> None:
+            while True:
+                await asyncio.sleep(interval_seconds)
+                try:
+                    async with session_factory() as session:
+                        await self.warm(session)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:
+                    logger.warning("Active-alarm index refresh failed: %s", exc)
+
+        self._refresh_task = asyncio.create_task(_refresh())
+
+    async def stop_refresh(self) -> None:
+        if self._refresh_task is None:
+            return
+        self._refresh_task.cancel()
+        try:
+            await self._refresh_task
+        except asyncio.CancelledError:
+            pass
+        self._refresh_task = None
+
+    def apply_event(self, routing_key: str, payload: dict) -> None:
+        """Update the index from an alarm.* event payload."""
+        raw_pid = payload.get("patient_id")
+        parameter = payload.get("parameter")
+        if not raw_pid or not parameter:
+            return
+        try:
+            patient_id = uuid.UUID(str(raw_pid))
+        except ValueError:
+            return
+        if routing_key in ("alarm.warning", "alarm.critical"):
+            self.add(patient_id, parameter)
+        elif routing_key in ("alarm.acknowledged", "alarm.resolved"):
+            self.discard(patient_id, parameter)
@@ -3,13 +3,16 @@
 import json
 import logging
 import uuid
+from collections.abc import Sequence
 from datetime import UTC, datetime, timedelta
+from typing import Any
 
-from sqlalchemy import func, select, update
+from sqlalchemy import event, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.domain.events.routing_keys import RoutingKeys
 from src.domain.models.clinical import Alarm, VitalSign
+from src.domain.services.alarm_rules import ActiveAlarmIndex, compile_rules, evaluate_vital
 from src.infrastructure.rabbitmq import emit_event
 
 logger = logging.getLogger("pdms.alarms")
@@ -46,6 +49,11 @@ THRESHOLDS: dict[str, dict[str, tuple[float | None, float | None]]] = {
 }
 
 
+# Kompilierte Intervall-Tabellen + prozesslokaler Index aktiver Alarme
+RULES = compile_rules(THRESHOLDS)
+active_alarms = ActiveAlarmIndex()
+
+
 # ─── Threshold Check ───────────────────────────────────────────
 
 async def check_thresholds(
@@ -53,50 +61,125 @@ async def check_thresholds(
     vital: VitalSign,
 ) -> list[Alarm]:
     """Prüft alle Vitalparameter gegen Schwellenwerte und erzeugt Alarme."""
-    new_alarms: list[Alarm] = []
-
-    for param, levels in THRESHOLDS.items():
-        value = getattr(vital, param, None)
-        if value is None:
-            continue
+    return await check_thresholds_batch(session, [vital])
 
-        severity = _evaluate_severity(value, levels)
-        if severity is None:
-            continue
 
+async def check_thresholds_batch(
+    session: AsyncSession,
+    vitals: Sequence[Any],
+) -> list[Alarm]:
+    """Prüft mehrere Vitalwerte in einem Durchgang gegen die Schwellenwerte.
+
+    ``vitals`` sind VitalSign-Zeilen oder beliebige Objekte mit denselben
+    Attributen (z.B. Batch-Records), in Messreihenfolge. Duplikate (aktiver
+    Alarm für Patient+Parameter) prüft eine einzige Abfrage für alle
+    betroffenen Patienten; der In-Memory-Index spart sie, solange er für
+    keinen Treffer einen aktiven Alarm kennt. Innerhalb eines Batches löst nur die erste
+    Überschreitung pro Patient+Parameter einen Alarm aus.
+    """
+    hits = [(vital, *hit) for vital in vitals for hit in evaluate_vital(RULES, vital)]
+    if not hits:
+        return []
+
+    already_active = await _active_pairs(session, {(vital.patient_id, rule.parameter) for vital, rule, *_ in hits})
+
+    now = datetime.now(UTC)
+    new_alarms: list[Alarm] = []
+    for vital, rule, value, severity in hits:
         # Kein Duplikat-Alarm wenn bereits ein aktiver Alarm für diesen Parameter+Patient existiert
-        existing = await session.execute(
-            select(Alarm).where(
-                Alarm.patient_id == vital.patient_id,
-                Alarm.parameter == param,
-                Alarm.status == "active",
-            )
-        )
-        if existing.scalar_one_or_none() is not None:
+        key = (vital.patient_id, rule.parameter)
+        if key in already_active:
             continue
+        already_active.add(key)
 
         alarm = Alarm(
             patient_id=vital.patient_id,
             vital_sign_id=vital.id,
-            parameter=param,
+            parameter=rule.parameter,
             value=value,
-            threshold_min=levels["warning"][0],
-            threshold_max=levels["warning"][1],
+            threshold_min=rule.threshold_min,
+            threshold_max=rule.threshold_max,
             severity=severity,
             status="active",
+            # Zeitpunkt der Messung, nicht des (ggf. verspäteten) Batch-Imports
+            triggered_at=_as_utc(getattr(vital, "recorded_at", None)) or now,
         )
         session.add(alarm)
         new_alarms.append(alarm)
         logger.warning(
-            f"🚨 Alarm: patient={vital.patient_id} param={param} value={value} severity={severity}"
+            f"🚨 Alarm: patient={vital.patient_id} param={rule.parameter} value={value} severity={severity}"
         )
 
     if new_alarms:
         await session.flush()
+        _track_new_alarms(session, new_alarms)
 
     return new_alarms
 
 
+def _as_utc(value: datetime | None) -> datetime | None:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value
+
+
+async def _active_pairs(
+    session: AsyncSession, candidates: set[tuple[uuid.UUID, str]]
+) -> set[tuple[uuid.UUID, str]]:
+    """Die Kandidaten-Paare (patient_id, parameter), für die ein Alarm aktiv ist.
+
+    Der Index ist pro Worker und kann kurz nachhinken. Er darf deshalb nur
+    die DB-Abfrage sparen, wenn er *keinen* aktiven Alarm kennt; ein vom
+    Index gemeldeter aktiver Alarm unterdrückt einen neuen erst, wenn die
+    DB ihn bestätigt (sonst ginge ein Alarm nach Quittierung auf einem
+    anderen Worker verloren).
+    """
+    if active_alarms.is_warm:
+        candidates = {(pid, param) for pid, param in candidates if active_alarms.contains(pid, param)}
+        if not candidates:
+            return set()
+
+    result = await session.execute(
+        select(Alarm.patient_id, Alarm.parameter).where(
+            Alarm.patient_id.in_({pid for pid, _ in candidates}),
+            Alarm.status == "active",
+        )
+    )
+    return {(pid, param) for pid, param in result.all() if (pid, param) in candidates}
+
+
+def _track_new_alarms(session: AsyncSession, alarms: list[Alarm]) -> None:
+    """Neue Alarme sofort im Index vermerken und bei Rollback wieder entfernen."""
+    pairs = [(a.patient_id, a.parameter) for a in alarms]
+    for patient_id, parameter in pairs:
+        active_alarms.add(patient_id, parameter)
+
+    if not isinstance(session, AsyncSession):
+        return
+
+    def _on_rollback(_sync_session) -> None:
+        for patient_id, parameter in pairs:
+            active_alarms.discard(patient_id, parameter)
+
+    event.listen(session.sync_session, "after_rollback", _on_rollback, once=True)
+
+
+def _untrack_after_commit(session: AsyncSession, alarm: Alarm) -> None:
+    """Alarm erst nach erfolgreichem Commit aus dem Index nehmen.
+
+    Scheitert der Commit, bleibt der Alarm aktiv und muss im Index bleiben.
+    """
+    patient_id, parameter = alarm.patient_id, alarm.parameter
+    if not isinstance(session, AsyncSession):
+        active_alarms.discard(patient_id, parameter)
+        return
+
+    def _on_commit(_sync_session) -> None:
+        active_alarms.discard(patient_id, parameter)
+
+    event.listen(session.sync_session, "after_commit", _on_commit, once=True)
+
+
 def _evaluate_severity(
     value: float,
     levels: dict[str, tuple[float | None, float | None]],
@@ -171,13 +254,14 @@ async def acknowledge_alarm(
     alarm.acknowledged_at = datetime.now(UTC)
     alarm.acknowledged_by = user_id
     await session.flush()
+    _untrack_after_commit(session, alarm)
 
     await emit_event(RoutingKeys.ALARM_ACKNOWLEDGED, {
         "alarm_id": str(alarm.id),
         "patient_id": str(alarm.patient_id),
         "parameter": alarm.parameter,
         "acknowledged_by": str(user_id),
-    })
+    }, session=session)
 
     return alarm
 
@@ -193,13 +277,14 @@ async def resolve_alarm(
 
     alarm.status = "resolved"
     await session.flush()
+    _untrack_after_commit(session, alarm)
 
     await emit_event(RoutingKeys.ALARM_RESOLVED, {
         "alarm_id": str(alarm.id),
         "patient_id": str(alarm.patient_id),
         "parameter": alarm.parameter,
         "resolved_by": "system",
-    })
+    }, session=session)
 
     return alarm
 
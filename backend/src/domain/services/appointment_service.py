@@ -69,7 +69,7 @@ async def get_appointment(db: AsyncSession, appointment_id: uuid.UUID) -> Appoin
 async def create_appointment(db: AsyncSession, data: AppointmentCreate) -> Appointment:
     appt = Appointment(**data.model_dump())
     db.add(appt)
-    await db.commit()
+    await db.flush()
     await db.refresh(appt)
     logger.info("Appointment created: %s type=%s date=%s", appt.id, appt.appointment_type, appt.scheduled_date)
 
@@ -78,12 +78,13 @@ async def create_appointment(db: AsyncSession, data: AppointmentCreate) -> Appoi
         "patient_id": str(appt.patient_id),
         "appointment_type": appt.appointment_type,
         "scheduled_date": str(appt.scheduled_date),
-    })
+    }, session=db)
 
     # Generate recurring instances
     if data.is_recurring and data.recurrence_rule and data.recurrence_end:
         await _expand_recurrence(db, appt, data.recurrence_rule, data.recurrence_end)
 
+    await db.commit()
     return appt
 
 
@@ -104,14 +105,15 @@ async def cancel_appointment(db: AsyncSession, appointment_id: uuid.UUID) -> App
     if not appt:
         return None
     appt.status = "cancelled"
-    await db.commit()
+    await db.flush()
     await db.refresh(appt)
     logger.info("Appointment cancelled: %s", appt.id)
 
     await emit_event(RoutingKeys.APPOINTMENT_CANCELLED, {
         "appointment_id": str(appt.id),
         "patient_id": str(appt.patient_id),
-    })
+    }, session=db)
+    await db.commit()
     return appt
 
 
@@ -195,7 +197,6 @@ async def _expand_recurrence(
         )
         db.add(child)
         current += delta
-    await db.commit()
     logger.info("Expanded recurrence for %s, rule=%s until %s", parent.id, rule, end_date)
 
 
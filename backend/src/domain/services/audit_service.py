@@ -1,59 +1,162 @@
-"""Audit-Service — Abfrage und Analyse von Audit-Log-Einträgen."""
-
+"""Audit-Service — Abfrage und Analyse von Audit-Log-Einträgen.
+
+``audit_logs`` ist eine Hypertable (Monats-Chunks, Migration 023); alle
+Listen filtern über indizierte Spalten (``patient_id``, ``route``,
+``user_id``, ``action`` jeweils mit ``created_at DESC``) und sortieren
+nach ``created_at``, sodass nur die betroffenen Chunks gelesen werden.
+
+Gesamtzahlen für die Paginierung werden bis ``audit_count_exact_limit``
+exakt gezählt (``count`` über ``LIMIT n+1``), darüber liefert der Planer
+eine Schätzung (``total_estimated``). Das Ergebnis wird kurz in Valkey
+gecacht, weil beim Blättern dieselbe Zahl immer wieder abgefragt wird;
+die Zählung läuft dabei auf einer eigenen Session (``sessions``), weil der
+Cache sie auch parallel zur Seitenabfrage oder nach dem Request ausführt.
+"""
+
+import hashlib
+import json
 import logging
 import uuid
 from datetime import date, datetime
 
-from sqlalchemy import func, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import ColumnElement, Select, column, func, select, table
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from src.config import settings
 from src.domain.models.system import AuditLog
+from src.infrastructure.valkey import TTL_AUDIT_COUNT, CacheKeys, get_or_load
 
 logger = logging.getLogger("pdms.audit")
 
+# Continuous Aggregate (Migration 025): Einträge pro Tag, Aktion und Ressource
+audit_daily_counts = table(
+    "audit_daily_counts",
+    column("bucket"),
+    column("action"),
+    column("resource_type"),
+    column("entries"),
+)
 
-async def list_audit_logs(
-    db: AsyncSession,
+
+def audit_filters(
     *,
     user_id: uuid.UUID | None = None,
+    patient_id: uuid.UUID | None = None,
     action: str | None = None,
+    route: str | None = None,
     resource_type: str | None = None,
     date_from: date | None = None,
     date_to: date | None = None,
-    page: int = 1,
-    per_page: int = 50,
-) -> dict:
-    """Paginierte Liste von Audit-Log-Einträgen mit optionalen Filtern."""
-    query = select(AuditLog)
-    count_q = select(func.count()).select_from(AuditLog)
-
+) -> list[ColumnElement[bool]]:
+    """WHERE-Bedingungen für die Audit-Suche."""
+    conditions: list[ColumnElement[bool]] = []
     if user_id:
-        query = query.where(AuditLog.user_id == user_id)
-        count_q = count_q.where(AuditLog.user_id == user_id)
+        conditions.append(AuditLog.user_id == user_id)
+    if patient_id:
+        conditions.append(AuditLog.patient_id == patient_id)
     if action:
-        query = query.where(AuditLog.action == action)
-        count_q = count_q.where(AuditLog.action == action)
+        conditions.append(AuditLog.action == action)
+    if route:
+        conditions.append(AuditLog.route == route)
     if resource_type:
-        query = query.where(AuditLog.resource_type.ilike(f"%{resource_type}%"))
-        count_q = count_q.where(AuditLog.resource_type.ilike(f"%{resource_type}%"))
+        conditions.append(AuditLog.resource_type.ilike(f"%{resource_type}%"))
     if date_from:
-        dt_from = datetime.combine(date_from, datetime.min.time())
-        query = query.where(AuditLog.created_at >= dt_from)
-        count_q = count_q.where(AuditLog.created_at >= dt_from)
+        conditions.append(AuditLog.created_at >= datetime.combine(date_from, datetime.min.time()))
     if date_to:
-        dt_to = datetime.combine(date_to, datetime.max.time())
-        query = query.where(AuditLog.created_at <= dt_to)
-        count_q = count_q.where(AuditLog.created_at <= dt_to)
+        conditions.append(AuditLog.created_at <= datetime.combine(date_to, datetime.max.time()))
+    return conditions
+
+
+async def _planner_estimate(db: AsyncSession, query: Select) -> int:
+    """Zeilenschätzung des Planers (EXPLAIN, ohne Ausführung)."""
+    conn = await db.connection()
+    sql = query.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_audit_logs(db: AsyncSession, conditions: list[ColumnElement[bool]]) -> dict:
+    """Anzahl Treffer: exakt bis ``audit_count_exact_limit``, darüber geschätzt."""
+    limit = settings.audit_count_exact_limit
+    matches = select(AuditLog.id).where(*conditions)
+    exact = (await db.execute(select(func.count()).select_from(matches.limit(limit + 1).subquery()))).scalar() or 0
+    if exact <= limit:
+        return {"total": exact, "estimated": False}
+    try:
+        estimate = await _planner_estimate(db, matches)
+    except Exception as e:
+        logger.warning("Audit count estimate failed: %s", e)
+        estimate = 0
+    return {"total": max(estimate, exact), "estimated": True}
+
+
+async def cached_audit_count(
+    sessions: async_sessionmaker[AsyncSession], conditions: list[ColumnElement[bool]]
+) -> dict:
+    """``count_audit_logs`` mit kurzem Valkey-Cache (Schlüssel = kompilierte Filter)."""
+    compiled = select(AuditLog.id).where(*conditions).compile()
+    fingerprint = hashlib.sha1(f"{compiled}|{sorted(compiled.params.items())}".encode()).hexdigest()
 
-    total = (await db.execute(count_q)).scalar() or 0
-    offset = (page - 1) * per_page
+    async def _load() -> dict:
+        async with sessions() as session:
+            return await count_audit_logs(session, conditions)
+
+    return await get_or_load(CacheKeys.audit_count(fingerprint), _load, ttl=TTL_AUDIT_COUNT)
+
+
+async def _page(
+    db: AsyncSession,
+    sessions: async_sessionmaker[AsyncSession],
+    conditions: list[ColumnElement[bool]],
+    page: int,
+    per_page: int,
+) -> dict:
+    count = await cached_audit_count(sessions, conditions)
     rows = (
         await db.execute(
-            query.order_by(AuditLog.created_at.desc()).offset(offset).limit(per_page)
+            select(AuditLog)
+            .where(*conditions)
+            .order_by(AuditLog.created_at.desc())
+            .offset((page - 1) * per_page)
+            .limit(per_page)
         )
     ).scalars().all()
+    return {
+        "items": rows,
+        "total": count["total"],
+        "total_estimated": count["estimated"],
+        "page": page,
+        "per_page": per_page,
+    }
 
-    return {"items": rows, "total": total, "page": page, "per_page": per_page}
+
+async def list_audit_logs(
+    db: AsyncSession,
+    sessions: async_sessionmaker[AsyncSession],
+    *,
+    user_id: uuid.UUID | None = None,
+    patient_id: uuid.UUID | None = None,
+    action: str | None = None,
+    route: str | None = None,
+    resource_type: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    page: int = 1,
+    per_page: int = 50,
+) -> dict:
+    """Paginierte Liste von Audit-Log-Einträgen mit optionalen Filtern."""
+    conditions = audit_filters(
+        user_id=user_id,
+        patient_id=patient_id,
+        action=action,
+        route=route,
+        resource_type=resource_type,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    return await _page(db, sessions, conditions, page, per_page)
 
 
 async def get_audit_entry(db: AsyncSession, log_id: uuid.UUID) -> AuditLog | None:
@@ -65,49 +168,43 @@ async def get_audit_entry(db: AsyncSession, log_id: uuid.UUID) -> AuditLog | Non
 
 async def get_patient_audit_logs(
     db: AsyncSession,
+    sessions: async_sessionmaker[AsyncSession],
     patient_id: uuid.UUID,
     *,
     page: int = 1,
     per_page: int = 50,
 ) -> dict:
-    """Audit-Logs für einen bestimmten Patienten (resource_id filter)."""
-    pid_str = str(patient_id)
-    base_filter = AuditLog.resource_type.ilike(f"%/patients/{pid_str}%")
-
-    query = select(AuditLog).where(base_filter)
-    count_q = select(func.count()).select_from(AuditLog).where(base_filter)
-
-    total = (await db.execute(count_q)).scalar() or 0
-    offset = (page - 1) * per_page
-    rows = (
-        await db.execute(
-            query.order_by(AuditLog.created_at.desc()).offset(offset).limit(per_page)
-        )
-    ).scalars().all()
-
-    return {"items": rows, "total": total, "page": page, "per_page": per_page}
+    """Audit-Logs für einen bestimmten Patienten (Index auf patient_id, created_at)."""
+    return await _page(db, sessions, audit_filters(patient_id=patient_id), page, per_page)
 
 
 async def get_audit_stats(db: AsyncSession) -> dict:
-    """Zusammenfassung der Audit-Logs (Anzahl pro Aktion, Top-Ressourcen)."""
-    total = (await db.execute(select(func.count()).select_from(AuditLog))).scalar() or 0
+    """Zusammenfassung der Audit-Logs (Anzahl pro Aktion, Top-Ressourcen).
+
+    Liest nur Tageszähler aus ``audit_daily_counts`` (Migration 025), nie
+    die Chunks der Hypertable; der jüngste, noch nicht materialisierte
+    Abschnitt wird von TimescaleDB live ergänzt.
+    """
+    # Gesamtzahl aus der Chunk-Statistik der Hypertable statt count(*) über alle Chunks
+    total = (await db.execute(select(func.approximate_row_count("audit_logs")))).scalar() or 0
 
+    entries = func.sum(audit_daily_counts.c.entries)
     action_counts_q = (
-        select(AuditLog.action, func.count().label("count"))
-        .group_by(AuditLog.action)
-        .order_by(func.count().desc())
+        select(audit_daily_counts.c.action, entries.label("count"))
+        .group_by(audit_daily_counts.c.action)
+        .order_by(entries.desc())
     )
     action_rows = (await db.execute(action_counts_q)).all()
-    by_action = {row.action: row.count for row in action_rows}
+    by_action = {row.action: int(row.count) for row in action_rows}
 
     resource_counts_q = (
-        select(AuditLog.resource_type, func.count().label("count"))
-        .group_by(AuditLog.resource_type)
-        .order_by(func.count().desc())
+        select(audit_daily_counts.c.resource_type, entries.label("count"))
+        .group_by(audit_daily_counts.c.resource_type)
+        .order_by(entries.desc())
         .limit(10)
     )
     resource_rows = (await db.execute(resource_counts_q)).all()
-    by_resource = {row.resource_type: row.count for row in resource_rows}
+    by_resource = {row.resource_type: int(row.count) for row in resource_rows}
 
     return {
         "total_entries": total,
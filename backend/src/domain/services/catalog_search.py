@@ -0,0 +1,236 @@
+"""Katalogsuche — Normalisierung, Ranking und In-Process-Präfixindex.
+
+Gemeinsame Bausteine für die ICD-10- und Medikamenten-Autovervollständigung:
+
+- ``fold``: Suchschlüssel ohne Gross-/Kleinschreibung, Diakritika und
+  Umlaut-Schreibweisen (``Müller`` = ``Mueller`` = ``Muller``). Identisch
+  zur SQL-Funktion ``pdms_catalog_fold`` (Migration 022), die die
+  ``search_key``-Spalten mit GIN-Trigramm-Index befüllt.
+- ``PrefixIndex``: sortierte Token-Liste mit binärer Suche — Präfix-Treffer
+  in Mikrosekunden, ohne DB-Roundtrip. Wird beim Start geladen, wenn
+  ``catalog_search_in_memory`` aktiv ist.
+"""
+
+import bisect
+import logging
+import re
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger("pdms.catalog")
+
+# Muss mit pdms_catalog_fold() in Migration 022 übereinstimmen
+FOLD_FROM = "àáâãäåçèéêëìíîïñòóôõöøùúûüýÿ"
+FOLD_TO = "aaaaaaceeeeiiiinoooooouuuuyy"
+_FOLD_TABLE = str.maketrans(FOLD_FROM, FOLD_TO)
+_DIGRAPHS = (("ß", "ss"), ("ae", "a"), ("oe", "o"), ("ue", "u"))
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[a-z0-9]+)?")
+_ICD_CODE = re.compile(r"^([A-Z]\d{2})\.?([0-9A-Z]{0,2})([+*!†]?)$")
+
+# Ranking-Stufen (kleiner = besser), gleich für SQL und PrefixIndex
+RANK_EXACT_CODE = 0
+RANK_CODE_PREFIX = 1
+RANK_TITLE_PREFIX = 2
+RANK_WORD_PREFIX = 3
+
+
+def fold(text: str) -> str:
+    """Suchschlüssel: klein, ohne Diakritika, ß→ss, ae/oe/ue→a/o/u."""
+    folded = text.lower().translate(_FOLD_TABLE)
+    for source, target in _DIGRAPHS:
+        folded = folded.replace(source, target)
+    return folded
+
+
+def tokens(text: str) -> list[str]:
+    """Gefaltete Wort-Tokens (ICD-Codes mit Punkt bleiben ein Token)."""
+    return _TOKEN.findall(fold(text))
+
+
+def normalize_icd_code(query: str) -> str | None:
+    """``e119`` / ``E11.9`` / ``E11`` → kanonischer Code (Grossbuchstaben, Punkt); sonst None."""
+    match = _ICD_CODE.match(query.strip().upper())
+    if not match:
+        return None
+    head, tail, _mark = match.groups()
+    return f"{head}.{tail}" if tail else head
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# ─── In-Process-Präfixindex ─────────────────────────────────────
+
+
+@dataclass
+class _Entry:
+    code: str
+    token_set: frozenset[str]
+    payload: dict[str, Any]
+
+
+def _sorted_pairs(pairs: list[tuple[str, int]]) -> tuple[list[str], list[int]]:
+    pairs.sort()
+    return [key for key, _ in pairs], [position for _, position in pairs]
+
+
+def _prefix_range(keys: list[str], refs: list[int], prefix: str) -> list[int]:
+    start = bisect.bisect_left(keys, prefix)
+    end = bisect.bisect_left(keys, prefix + "\uffff", lo=start)
+    return refs[start:end]
+
+
+@dataclass
+class PrefixIndex:
+    """Präfixindex über Katalogeinträge (sortierte Schlüssel + bisect).
+
+    Drei sortierte Schlüssellisten: Codes, Bezeichnungen und Wort-Tokens.
+    Die Einträge sind nach Spezifität geordnet (kurze Bezeichnung zuerst),
+    die Position ist damit zugleich der Tie-Breaker innerhalb einer
+    Ranking-Stufe. Code- und Bezeichnungs-Präfixe werden direkt per
+    bisect gefunden, Wort-Präfixe über das längste Query-Token; die
+    übrigen Tokens werden gegen die Token-Menge geprüft (UND).
+    """
+
+    entries: list[_Entry] = field(default_factory=list)
+    _codes: list[str] = field(default_factory=list)
+    _code_refs: list[int] = field(default_factory=list)
+    _titles: list[str] = field(default_factory=list)
+    _title_refs: list[int] = field(default_factory=list)
+    _tokens: list[str] = field(default_factory=list)
+    _token_refs: list[int] = field(default_factory=list)
+
+    @classmethod
+    def build(
+        cls,
+        rows: Sequence[dict[str, Any]],
+        *,
+        code: Callable[[dict[str, Any]], str],
+        text: Callable[[dict[str, Any]], str],
+        titles: Callable[[dict[str, Any]], Sequence[str]],
+    ) -> "PrefixIndex":
+        index = cls()
+        prepared = []
+        for row in rows:
+            title_keys = [fold(t) for t in titles(row) if t]
+            prepared.append((len(title_keys[0]) if title_keys else 0, (code(row) or "").upper(), title_keys, row))
+        prepared.sort(key=lambda item: item[:2])
+
+        codes, title_pairs, token_pairs = [], [], []
+        for position, (_length, entry_code, title_keys, row) in enumerate(prepared):
+            entry_tokens = set(tokens(text(row)))
+            if entry_code:
+                entry_tokens.add(fold(entry_code))
+                codes.append((entry_code, position))
+            title_pairs.extend((key, position) for key in title_keys)
+            token_pairs.extend((token, position) for token in entry_tokens)
+            index.entries.append(_Entry(entry_code, frozenset(entry_tokens), row))
+        index._codes, index._code_refs = _sorted_pairs(codes)
+        index._titles, index._title_refs = _sorted_pairs(title_pairs)
+        index._tokens, index._token_refs = _sorted_pairs(token_pairs)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def search(self, query: str, *, limit: int, code_query: str | None = None) -> list[dict[str, Any]]:
+        query_tokens = tokens(query)
+        if not query_tokens:
+            return []
+        hits: list[int] = []
+        seen: set[int] = set()
+
+        def take(positions) -> bool:
+            for position in positions:
+                if position not in seen:
+                    seen.add(position)
+                    hits.append(position)
+                    if len(hits) >= limit:
+                        return True
+            return False
+
+        # 1. Exakter Code, dann Code-Präfix (in Code-Reihenfolge: E11, E11.0, …)
+        if take(_prefix_range(self._codes, self._code_refs, (code_query or query.strip()).upper())):
+            return self._payloads(hits)
+        # 2. Bezeichnung beginnt mit dem Suchbegriff
+        if take(sorted(_prefix_range(self._titles, self._title_refs, fold(query.strip())))):
+            return self._payloads(hits)
+        # 3. Jedes Query-Token ist Präfix eines Wortes; längstes Token zuerst = kleinste Kandidatenmenge
+        query_tokens.sort(key=len, reverse=True)
+        first, rest = query_tokens[0], query_tokens[1:]
+        candidates = sorted(set(_prefix_range(self._tokens, self._token_refs, first)))
+        if rest:
+            candidates = (
+                p for p in candidates
+                if all(any(t.startswith(q) for t in self.entries[p].token_set) for q in rest)
+            )
+        take(candidates)
+        return self._payloads(hits)
+
+    def _payloads(self, positions: list[int]) -> list[dict[str, Any]]:
+        return [self.entries[position].payload for position in positions]
+
+
+def merge_hits(
+    index_hits: list[dict[str, Any]],
+    sql_hits: list[dict[str, Any]],
+    *,
+    key: Callable[[dict[str, Any]], Any],
+    limit: int,
+) -> list[dict[str, Any]]:
+    """Index-Treffer zuerst, danach die Trigramm-Treffer der DB ohne Duplikate."""
+    seen = {key(hit) for hit in index_hits}
+    merged = list(index_hits)
+    for hit in sql_hits:
+        if len(merged) >= limit:
+            break
+        if key(hit) not in seen:
+            seen.add(key(hit))
+            merged.append(hit)
+    return merged
+
+
+# Beim Start geladene Indizes (Name → Index); leer = SQL-Suche
+_indexes: dict[str, PrefixIndex] = {}
+
+
+def get_index(name: str) -> PrefixIndex | None:
+    return _indexes.get(name)
+
+
+async def load_catalog_indexes(session_factory: async_sessionmaker[AsyncSession]) -> None:
+    """ICD-10- und Medikamenten-Katalog in den Speicher laden."""
+    from src.domain.models.icd10 import Icd10Code
+    from src.domain.models.medikament_katalog import MedikamentKatalog
+    from src.domain.services.icd10_service import icd10_payload
+    from src.domain.services.medikament_katalog_service import medikament_payload
+
+    started = time.perf_counter()
+    async with session_factory() as session:
+        icd10 = [icd10_payload(r) for r in (await session.execute(select(Icd10Code))).scalars()]
+        drugs = [medikament_payload(r) for r in (await session.execute(select(MedikamentKatalog))).scalars()]
+
+    _indexes["icd10"] = PrefixIndex.build(
+        icd10, code=lambda r: r["code"], text=lambda r: f"{r['code']} {r['title']}", titles=lambda r: (r["title"],),
+    )
+    _indexes["medikamente"] = PrefixIndex.build(
+        drugs,
+        code=lambda r: r["atc_code"] or "",
+        text=lambda r: f"{r['name']} {r['wirkstoff']}",
+        titles=lambda r: (r["name"], r["wirkstoff"]),
+    )
+    logger.info(
+        "Catalog indexes loaded: icd10=%d, medikamente=%d (%.0f ms)",
+        len(icd10), len(drugs), (time.perf_counter() - started) * 1000,
+    )
+
+
+def clear_catalog_indexes() -> None:
+    _indexes.clear()
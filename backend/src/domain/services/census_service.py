@@ -0,0 +1,126 @@
+"""Census service — Übersicht aller aktiven Aufenthalte einer Station / des Home-Spitals.
+
+Eine feste Anzahl mengenbasierter Abfragen, unabhängig von der Patientenzahl:
+aktive Aufenthalte, letzte Vitalwerte (LATERAL), Alarm- und Medikamenten-
+Zähler (GROUP BY) und der heutige Hausbesuch (DISTINCT ON).
+"""
+
+import uuid
+from datetime import date
+
+from sqlalchemy import and_, func, literal, select, true
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, distinct_on
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.models.clinical import Alarm, Encounter, Medication, VitalSign
+from src.domain.models.home_spital import HomeVisit
+from src.domain.models.patient import Patient
+from src.domain.schemas.census import CensusHomeVisit, CensusPatient, CensusVitals
+
+_VITAL_FIELDS = ("recorded_at", "heart_rate", "systolic_bp", "diastolic_bp", "spo2", "temperature", "respiratory_rate")
+
+
+async def get_census(db: AsyncSession, ward: str | None = None, today: date | None = None) -> list[CensusPatient]:
+    """Alle aktiven Aufenthalte (optional einer Station) mit Kennzahlen."""
+    today = today or date.today()
+
+    # 1) Aktive Aufenthalte — pro Patient der jüngste
+    encounter_query = (
+        select(
+            Encounter.patient_id, Encounter.id.label("encounter_id"), Encounter.encounter_type,
+            Encounter.ward, Encounter.bed, Encounter.admitted_at,
+            Patient.first_name, Patient.last_name, Patient.date_of_birth,
+        )
+        .join(Patient, Patient.id == Encounter.patient_id)
+        .where(Encounter.status == "active", Patient.is_deleted.is_(False))
+        .ext(distinct_on(Encounter.patient_id))
+        .order_by(Encounter.patient_id, Encounter.admitted_at.desc())
+    )
+    if ward:
+        encounter_query = encounter_query.where(Encounter.ward == ward)
+    encounters = (await db.execute(encounter_query)).all()
+    if not encounters:
+        return []
+    patient_ids: list[uuid.UUID] = [e.patient_id for e in encounters]
+
+    # 2) Letzte Vitalwerte — LATERAL LIMIT 1 nutzt den (patient_id, recorded_at)-Index
+    #    statt alle Messungen der Patienten zu sortieren (Hypertable)
+    ids = select(
+        func.unnest(literal(patient_ids, ARRAY(UUID(as_uuid=True)))).label("patient_id")
+    ).subquery("ids")
+    latest = (
+        select(*(getattr(VitalSign, f) for f in _VITAL_FIELDS))
+        .where(VitalSign.patient_id == ids.c.patient_id)
+        .order_by(VitalSign.recorded_at.desc())
+        .limit(1)
+        .lateral("latest")
+    )
+    vitals = {
+        row.patient_id: CensusVitals(**{f: getattr(row, f) for f in _VITAL_FIELDS})
+        for row in (await db.execute(
+            select(ids.c.patient_id, *latest.c).select_from(ids.join(latest, true()))
+        )).all()
+    }
+
+    # 3) Aktive Alarme pro Patient (inkl. kritische)
+    alarm_counts = {
+        row.patient_id: (row.active, row.critical)
+        for row in (await db.execute(
+            select(
+                Alarm.patient_id,
+                func.count().label("active"),
+                func.count().filter(Alarm.severity == "critical").label("critical"),
+            )
+            .where(Alarm.patient_id.in_(patient_ids), Alarm.status == "active")
+            .group_by(Alarm.patient_id)
+        )).all()
+    }
+
+    # 4) Aktive Medikamente pro Patient
+    med_counts = dict((await db.execute(
+        select(Medication.patient_id, func.count())
+        .where(Medication.patient_id.in_(patient_ids), Medication.status == "active")
+        .group_by(Medication.patient_id)
+    )).all())
+
+    # 5) Heutiger Hausbesuch — pro Patient der nächste nicht abgesagte
+    visits = {
+        row.patient_id: CensusHomeVisit(
+            id=row.id, status=row.status, planned_start=row.planned_start,
+            assigned_nurse_name=row.assigned_nurse_name,
+        )
+        for row in (await db.execute(
+            select(HomeVisit.patient_id, HomeVisit.id, HomeVisit.status,
+                   HomeVisit.planned_start, HomeVisit.assigned_nurse_name)
+            .where(and_(
+                HomeVisit.patient_id.in_(patient_ids),
+                HomeVisit.planned_date == today,
+                HomeVisit.status != "cancelled",
+            ))
+            .ext(distinct_on(HomeVisit.patient_id))
+            .order_by(HomeVisit.patient_id, HomeVisit.planned_start)
+        )).all()
+    }
+
+    census = [
+        CensusPatient(
+            patient_id=e.patient_id,
+            first_name=e.first_name,
+            last_name=e.last_name,
+            date_of_birth=e.date_of_birth,
+            encounter_id=e.encounter_id,
+            encounter_type=e.encounter_type,
+            ward=e.ward,
+            bed=e.bed,
+            admitted_at=e.admitted_at,
+            latest_vitals=vitals.get(e.patient_id),
+            active_alarms=alarm_counts.get(e.patient_id, (0, 0))[0],
+            critical_alarms=alarm_counts.get(e.patient_id, (0, 0))[1],
+            active_medications=med_counts.get(e.patient_id, 0),
+            home_visit_today=visits.get(e.patient_id),
+        )
+        for e in encounters
+    ]
+    # Kritische Patienten zuerst, dann nach Station/Bett
+    census.sort(key=lambda p: (-p.critical_alarms, -p.active_alarms, p.ward or "", p.bed or "", p.last_name))
+    return census
@@ -76,7 +76,7 @@ async def create_clinical_note(
         status="draft",
     )
     db.add(note)
-    await db.commit()
+    await db.flush()
     await db.refresh(note)
     logger.info("ClinicalNote created: %s (type=%s, patient=%s)", note.id, note.note_type, note.patient_id)
 
@@ -86,8 +86,9 @@ async def create_clinical_note(
         "note_type": note.note_type,
         "title": note.title,
         "author_id": str(author_id) if author_id else None,
-    })
+    }, session=db)
 
+    await db.commit()
     return note
 
 
@@ -137,7 +138,7 @@ async def finalize_clinical_note(
     if summary:
         note.summary = summary
     note.updated_at = datetime.now(UTC)
-    await db.commit()
+    await db.flush()
     await db.refresh(note)
     logger.info("ClinicalNote finalized: %s", note.id)
 
@@ -145,8 +146,9 @@ async def finalize_clinical_note(
         "note_id": str(note.id),
         "patient_id": str(note.patient_id),
         "finalized_by": str(note.author_id),
-    })
+    }, session=db)
 
+    await db.commit()
     return note
 
 
@@ -172,7 +174,7 @@ async def co_sign_clinical_note(
     note.co_signed_by = co_signer_id
     note.co_signed_at = datetime.now(UTC)
     note.updated_at = datetime.now(UTC)
-    await db.commit()
+    await db.flush()
     await db.refresh(note)
     logger.info("ClinicalNote co-signed: %s by %s", note.id, co_signer_id)
 
@@ -180,8 +182,9 @@ async def co_sign_clinical_note(
         "note_id": str(note.id),
         "patient_id": str(note.patient_id),
         "co_signed_by": str(co_signer_id),
-    })
+    }, session=db)
 
+    await db.commit()
     return note
 
 
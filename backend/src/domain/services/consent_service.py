@@ -49,7 +49,7 @@ async def get_consent(db: AsyncSession, consent_id: uuid.UUID) -> Consent | None
 async def create_consent(db: AsyncSession, data: ConsentCreate) -> Consent:
     consent = Consent(**data.model_dump())
     db.add(consent)
-    await db.commit()
+    await db.flush()
     await db.refresh(consent)
     logger.info("Consent created: %s type=%s patient=%s", consent.id, consent.consent_type, consent.patient_id)
     if consent.status == "granted":
@@ -57,7 +57,8 @@ async def create_consent(db: AsyncSession, data: ConsentCreate) -> Consent:
             "consent_id": str(consent.id),
             "patient_id": str(consent.patient_id),
             "consent_type": consent.consent_type,
-        })
+        }, session=db)
+    await db.commit()
     return consent
 
 
@@ -68,17 +69,18 @@ async def update_consent(db: AsyncSession, consent_id: uuid.UUID, data: ConsentU
     old_status = consent.status
     for field, value in data.model_dump(exclude_unset=True).items():
         setattr(consent, field, value)
-    await db.commit()
+    await db.flush()
     await db.refresh(consent)
     # Emit events on status changes
     if consent.status == "granted" and old_status != "granted":
         await emit_event(RoutingKeys.CONSENT_GRANTED, {
             "consent_id": str(consent.id), "patient_id": str(consent.patient_id), "consent_type": consent.consent_type,
-        })
+        }, session=db)
     elif consent.status == "revoked" and old_status != "revoked":
         await emit_event(RoutingKeys.CONSENT_REVOKED, {
             "consent_id": str(consent.id), "patient_id": str(consent.patient_id), "consent_type": consent.consent_type,
-        })
+        }, session=db)
+    await db.commit()
     return consent
 
 
@@ -89,11 +91,12 @@ async def revoke_consent(db: AsyncSession, consent_id: uuid.UUID, reason: str |
     consent.status = "revoked"
     consent.revoked_at = datetime.now(UTC)
     consent.revoked_reason = reason
-    await db.commit()
+    await db.flush()
     await db.refresh(consent)
     await emit_event(RoutingKeys.CONSENT_REVOKED, {
         "consent_id": str(consent.id), "patient_id": str(consent.patient_id), "consent_type": consent.consent_type,
-    })
+    }, session=db)
+    await db.commit()
     return consent
 
 
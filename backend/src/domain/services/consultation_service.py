@@ -61,7 +61,7 @@ async def create_consultation(
         requested_by=requested_by,
     )
     db.add(consultation)
-    await db.commit()
+    await db.flush()
     await db.refresh(consultation)
     logger.info("Konsil angefragt: %s (%s) — Patient %s", consultation.id, data.specialty, data.patient_id)
 
@@ -71,8 +71,9 @@ async def create_consultation(
         "specialty": consultation.specialty,
         "urgency": consultation.urgency,
         "requested_by": str(requested_by) if requested_by else None,
-    })
+    }, session=db)
 
+    await db.commit()
     return consultation
 
 
@@ -96,7 +97,7 @@ async def respond_to_consultation(
         consultation.status = "completed"
 
     consultation.updated_at = datetime.now(UTC)
-    await db.commit()
+    await db.flush()
     await db.refresh(consultation)
     logger.info("Konsil beantwortet: %s", consultation.id)
 
@@ -105,8 +106,9 @@ async def respond_to_consultation(
             "consultation_id": str(consultation.id),
             "patient_id": str(consultation.patient_id),
             "specialty": consultation.specialty,
-        })
+        }, session=db)
 
+    await db.commit()
     return consultation
 
 
@@ -2,8 +2,10 @@
 
 import logging
 import uuid
+from typing import Any
 
-from sqlalchemy import func, select
+from sqlalchemy import Select, func, select
+from sqlalchemy.dialects.postgresql import JSON, aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.domain.models.clinical import (
@@ -26,131 +28,114 @@ from src.domain.models.therapy import (
 logger = logging.getLogger("pdms.dossier")
 
 
+def _count(model: Any, patient_id: uuid.UUID, *conditions: Any):
+    return (
+        select(func.count()).select_from(model)
+        .where(model.patient_id == patient_id, *conditions)
+        .scalar_subquery()
+    )
+
+
+def _latest(columns: list[Any], patient_id: uuid.UUID, order_by: Any, *conditions: Any, limit: int = 1):
+    """Die neuesten Zeilen als JSON-Array (über den (patient_id, …)-Index)."""
+    model = columns[0].class_
+    rows = (
+        select(*columns)
+        .where(model.patient_id == patient_id, *conditions)
+        .order_by(order_by.desc())
+        .limit(limit)
+        .subquery()
+    )
+    aggregated = rows.table_valued()
+    if limit > 1:
+        aggregated = aggregate_order_by(aggregated, rows.c[order_by.key].desc())
+    return select(func.json_agg(aggregated, type_=JSON)).scalar_subquery()
+
+
+def dossier_query(patient_id: uuid.UUID) -> Select:
+    """Alle Dossier-Bausteine als eine Abfrage (Skalar-Subqueries, ein Roundtrip)."""
+    return select(
+        _latest(
+            [Encounter.id, Encounter.status, Encounter.encounter_type, Encounter.admitted_at],
+            patient_id, Encounter.admitted_at, Encounter.status == "active",
+        ).label("encounter"),
+        _count(Alarm, patient_id, Alarm.status == "active").label("active_alarms"),
+        _count(Medication, patient_id, Medication.status == "active").label("active_medications"),
+        _count(TreatmentPlan, patient_id, TreatmentPlan.status == "active").label("active_treatment_plans"),
+        _count(
+            Consultation, patient_id, Consultation.status.in_(["requested", "accepted"]),
+        ).label("open_consultations"),
+        _count(MedicalLetter, patient_id, MedicalLetter.status == "draft").label("draft_letters"),
+        _count(NursingDiagnosis, patient_id, NursingDiagnosis.status == "active").label("active_nursing_diagnoses"),
+        _latest(
+            [VitalSign.recorded_at, VitalSign.heart_rate, VitalSign.systolic_bp, VitalSign.diastolic_bp,
+             VitalSign.spo2, VitalSign.temperature],
+            patient_id, VitalSign.recorded_at,
+        ).label("latest_vitals"),
+        _latest(
+            [ShiftHandover.id, ShiftHandover.shift_type, ShiftHandover.handover_date,
+             func.left(ShiftHandover.situation, 200).label("situation"), ShiftHandover.acknowledged_at],
+            patient_id, ShiftHandover.created_at,
+        ).label("latest_handover"),
+        _latest(
+            [NutritionOrder.diet_type, NutritionOrder.caloric_target, NutritionOrder.fluid_target],
+            patient_id, NutritionOrder.created_at, NutritionOrder.status == "active",
+        ).label("active_nutrition"),
+        _latest(
+            [ClinicalNote.id, ClinicalNote.title, ClinicalNote.note_type, ClinicalNote.status, ClinicalNote.created_at],
+            patient_id, ClinicalNote.created_at, limit=3,
+        ).label("recent_notes"),
+        _latest(
+            [NursingEntry.id, NursingEntry.title, NursingEntry.category, NursingEntry.priority,
+             NursingEntry.recorded_at],
+            patient_id, NursingEntry.recorded_at, limit=3,
+        ).label("recent_nursing"),
+    )
+
+
+def _first(rows: list[dict] | None) -> dict | None:
+    return rows[0] if rows else None
+
+
 async def get_patient_dossier(db: AsyncSession, patient_id: uuid.UUID) -> dict:
     """Aggregierte Übersicht aller Patientendaten (Dossier-Tab).
 
-    Gibt Zähler und die jeweils letzten Einträge pro Modul zurück.
+    Gibt Zähler und die jeweils letzten Einträge pro Modul zurück —
+    in einem einzigen DB-Roundtrip.
     """
-    # Aktive Encounters
-    active_encounter = (await db.execute(
-        select(Encounter)
-        .where(Encounter.patient_id == patient_id, Encounter.status == "active")
-        .order_by(Encounter.admitted_at.desc()).limit(1)
-    )).scalar_one_or_none()
-
-    # Aktive Alarme
-    active_alarms_count = (await db.execute(
-        select(func.count()).select_from(Alarm)
-        .where(Alarm.patient_id == patient_id, Alarm.status == "active")
-    )).scalar() or 0
-
-    # Letzte Vitalzeichen
-    latest_vitals = (await db.execute(
-        select(VitalSign)
-        .where(VitalSign.patient_id == patient_id)
-        .order_by(VitalSign.recorded_at.desc()).limit(1)
-    )).scalar_one_or_none()
-
-    # Aktive Medikamente
-    active_meds_count = (await db.execute(
-        select(func.count()).select_from(Medication)
-        .where(Medication.patient_id == patient_id, Medication.status == "active")
-    )).scalar() or 0
-
-    # Aktive Therapiepläne
-    active_plans_count = (await db.execute(
-        select(func.count()).select_from(TreatmentPlan)
-        .where(TreatmentPlan.patient_id == patient_id, TreatmentPlan.status == "active")
-    )).scalar() or 0
-
-    # Offene Konsilien
-    open_consultations_count = (await db.execute(
-        select(func.count()).select_from(Consultation)
-        .where(Consultation.patient_id == patient_id, Consultation.status.in_(["requested", "accepted"]))
-    )).scalar() or 0
-
-    # Arztbriefe (Entwürfe)
-    draft_letters_count = (await db.execute(
-        select(func.count()).select_from(MedicalLetter)
-        .where(MedicalLetter.patient_id == patient_id, MedicalLetter.status == "draft")
-    )).scalar() or 0
-
-    # Aktive Pflegediagnosen
-    active_diagnoses_count = (await db.execute(
-        select(func.count()).select_from(NursingDiagnosis)
-        .where(NursingDiagnosis.patient_id == patient_id, NursingDiagnosis.status == "active")
-    )).scalar() or 0
-
-    # Letzte Schichtübergabe
-    latest_handover = (await db.execute(
-        select(ShiftHandover)
-        .where(ShiftHandover.patient_id == patient_id)
-        .order_by(ShiftHandover.created_at.desc()).limit(1)
-    )).scalar_one_or_none()
-
-    # Aktive Ernährungsverordnung
-    active_nutrition = (await db.execute(
-        select(NutritionOrder)
-        .where(NutritionOrder.patient_id == patient_id, NutritionOrder.status == "active")
-        .order_by(NutritionOrder.created_at.desc()).limit(1)
-    )).scalar_one_or_none()
-
-    # Letzte klinische Notizen (Top 3)
-    recent_notes = (await db.execute(
-        select(ClinicalNote)
-        .where(ClinicalNote.patient_id == patient_id)
-        .order_by(ClinicalNote.created_at.desc()).limit(3)
-    )).scalars().all()
-
-    # Letzte Pflegeeinträge (Top 3)
-    recent_nursing = (await db.execute(
-        select(NursingEntry)
-        .where(NursingEntry.patient_id == patient_id)
-        .order_by(NursingEntry.recorded_at.desc()).limit(3)
-    )).scalars().all()
+    row = (await db.execute(dossier_query(patient_id))).first()
+    data = row._mapping if row is not None else {}
+
+    encounter = _first(data.get("encounter"))
+    latest_vitals = _first(data.get("latest_vitals"))
+    latest_handover = _first(data.get("latest_handover"))
+    active_nutrition = _first(data.get("active_nutrition"))
 
     return {
         "patient_id": str(patient_id),
         "encounter": {
-            "id": str(active_encounter.id) if active_encounter else None,
-            "status": active_encounter.status if active_encounter else None,
-            "type": active_encounter.encounter_type if active_encounter else None,
-            "admitted_at": active_encounter.admitted_at.isoformat() if active_encounter else None,
+            "id": encounter["id"] if encounter else None,
+            "status": encounter["status"] if encounter else None,
+            "type": encounter["encounter_type"] if encounter else None,
+            "admitted_at": encounter["admitted_at"] if encounter else None,
         },
         "summary": {
-            "active_alarms": active_alarms_count,
-            "active_medications": active_meds_count,
-            "active_treatment_plans": active_plans_count,
-            "open_consultations": open_consultations_count,
-            "draft_letters": draft_letters_count,
-            "active_nursing_diagnoses": active_diagnoses_count,
+            "active_alarms": data.get("active_alarms") or 0,
+            "active_medications": data.get("active_medications") or 0,
+            "active_treatment_plans": data.get("active_treatment_plans") or 0,
+            "open_consultations": data.get("open_consultations") or 0,
+            "draft_letters": data.get("draft_letters") or 0,
+            "active_nursing_diagnoses": data.get("active_nursing_diagnoses") or 0,
         },
-        "latest_vitals": {
-            "recorded_at": latest_vitals.recorded_at.isoformat() if latest_vitals else None,
-            "heart_rate": latest_vitals.heart_rate if latest_vitals else None,
-            "systolic_bp": latest_vitals.systolic_bp if latest_vitals else None,
-            "diastolic_bp": latest_vitals.diastolic_bp if latest_vitals else None,
-            "spo2": latest_vitals.spo2 if latest_vitals else None,
-            "temperature": latest_vitals.temperature if latest_vitals else None,
-        } if latest_vitals else None,
+        "latest_vitals": latest_vitals,
         "latest_handover": {
-            "id": str(latest_handover.id),
-            "shift_type": latest_handover.shift_type,
-            "handover_date": str(latest_handover.handover_date),
-            "situation": latest_handover.situation[:200],
-            "acknowledged": latest_handover.acknowledged_at is not None,
+            "id": latest_handover["id"],
+            "shift_type": latest_handover["shift_type"],
+            "handover_date": latest_handover["handover_date"],
+            "situation": latest_handover["situation"],
+            "acknowledged": latest_handover["acknowledged_at"] is not None,
         } if latest_handover else None,
-        "active_nutrition": {
-            "diet_type": active_nutrition.diet_type,
-            "caloric_target": active_nutrition.caloric_target,
-            "fluid_target": active_nutrition.fluid_target,
-        } if active_nutrition else None,
-        "recent_notes": [
-            {"id": str(n.id), "title": n.title, "note_type": n.note_type, "status": n.status, "created_at": n.created_at.isoformat()}
-            for n in recent_notes
-        ],
-        "recent_nursing": [
-            {"id": str(n.id), "title": n.title, "category": n.category, "priority": n.priority, "recorded_at": n.recorded_at.isoformat()}
-            for n in recent_nursing
-        ],
+        "active_nutrition": active_nutrition,
+        "recent_notes": data.get("recent_notes") or [],
+        "recent_nursing": data.get("recent_nursing") or [],
     }
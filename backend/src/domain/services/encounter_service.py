@@ -90,7 +90,7 @@ async def admit_patient(
         status="active",
     )
     db.add(encounter)
-    await db.commit()
+    await db.flush()
     await db.refresh(encounter)
     logger.info(
         "Patient admitted: encounter=%s, patient=%s, type=%s, ward=%s",
@@ -103,8 +103,9 @@ async def admit_patient(
         "encounter_type": encounter.encounter_type,
         "ward": encounter.ward,
         "bed": encounter.bed,
-    })
+    }, session=db)
 
+    await db.commit()
     return encounter
 
 
@@ -154,15 +155,16 @@ async def discharge_patient(
     if discharge_reason:
         encounter.reason = (encounter.reason or "") + f"\n\nEntlassgrund: {discharge_reason}"
 
-    await db.commit()
+    await db.flush()
     await db.refresh(encounter)
     logger.info("Patient discharged: encounter=%s, patient=%s", encounter.id, encounter.patient_id)
 
     await emit_event(RoutingKeys.ENCOUNTER_DISCHARGED, {
         "encounter_id": str(encounter.id),
         "patient_id": str(encounter.patient_id),
-    })
+    }, session=db)
 
+    await db.commit()
     return encounter
 
 
@@ -187,7 +189,7 @@ async def transfer_patient(
     encounter.ward = ward
     encounter.bed = bed
 
-    await db.commit()
+    await db.flush()
     await db.refresh(encounter)
     logger.info(
         "Patient transferred: encounter=%s, %s → %s (bed=%s)",
@@ -200,8 +202,9 @@ async def transfer_patient(
         "from_ward": old_ward,
         "ward": ward,
         "bed": bed,
-    })
+    }, session=db)
 
+    await db.commit()
     return encounter
 
 
@@ -223,13 +226,14 @@ async def cancel_encounter(
     encounter.status = "cancelled"
     encounter.discharged_at = datetime.now(UTC)
 
-    await db.commit()
+    await db.flush()
     await db.refresh(encounter)
     logger.info("Encounter cancelled: %s", encounter.id)
 
     await emit_event(RoutingKeys.ENCOUNTER_CANCELLED, {
         "encounter_id": str(encounter.id),
         "patient_id": str(encounter.patient_id),
-    })
+    }, session=db)
 
+    await db.commit()
     return encounter
@@ -0,0 +1,286 @@
+"""FHIR Bulk Data Export ($export) — asynchrone NDJSON-Exporte.
+
+Ein Export läuft als Hintergrund-Task und schreibt pro Ressourcentyp eine
+gzip-komprimierte NDJSON-Datei unter ``<export_dir>/<job_id>/``. Das
+Verzeichnis liegt bewusst ausserhalb von ``media_root``: der Media-Mount
+ist ohne Anmeldung erreichbar, Exportdateien gibt es nur über
+``$export-file`` (Rollenprüfung).
+Die Zeilen werden über serverseitige Cursor (``yield_per``) gelesen und
+partitionsweise geschrieben, der Speicherbedarf ist unabhängig von der
+Exportgrösse.
+
+Der Job-Status liegt als ``status.json`` im Job-Verzeichnis. Damit kann
+jeder Worker den Status beantworten, nicht nur der, der den Job gestartet
+hat. Abbruch (DELETE) setzt eine Marker-Datei, die der laufende Job
+zwischen zwei Partitionen prüft.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import shutil
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import orjson
+from sqlalchemy import Row, Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config import settings
+from src.domain.models.clinical import Encounter, Medication, VitalSign
+from src.domain.models.patient import Patient
+from src.domain.services.fhir_service import (
+    VITAL_ROW_COLUMNS,
+    encode_vital_row,
+    encounter_to_fhir,
+    medication_to_fhir,
+    patient_to_fhir,
+)
+
+logger = logging.getLogger("pdms.fhir.export")
+
+EXPORT_TYPES = ("Patient", "Encounter", "Observation", "MedicationRequest")
+EXPORT_YIELD_PER = 1000
+STATUS_FILE = "status.json"
+CANCEL_FILE = ".cancelled"
+
+# Laufende Export-Tasks dieses Workers (für Shutdown)
+_tasks: set[asyncio.Task] = set()
+
+
+class ExportCancelled(Exception):
+    """Export wurde per DELETE abgebrochen."""
+
+
+@dataclass
+class ExportJob:
+    """Parameter eines Bulk-Exports."""
+
+    level: str  # system, patient, group
+    request_url: str
+    types: tuple[str, ...] = EXPORT_TYPES
+    since: datetime | None = None
+    group: str | None = None  # Station (aktive Encounters)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    transaction_time: datetime = field(default_factory=lambda: datetime.now(UTC))
+
+    @property
+    def directory(self) -> Path:
+        return export_root() / self.id
+
+
+def export_root() -> Path:
+    return Path(settings.export_dir)
+
+
+def export_file_name(resource_type: str) -> str:
+    return f"{resource_type}.ndjson.gz"
+
+
+def _job_dir(job_id: str) -> Path | None:
+    """Job-Verzeichnis zu einer ID — None bei ungültiger ID."""
+    try:
+        return export_root() / uuid.UUID(hex=job_id).hex
+    except ValueError:
+        return None
+
+
+def _write_status(directory: Path, status: dict[str, Any]) -> None:
+    tmp = directory / f".{STATUS_FILE}.tmp"
+    tmp.write_text(json.dumps(status, default=str))
+    tmp.replace(directory / STATUS_FILE)
+
+
+# ─── Abfragen pro Ressourcentyp ──────────────────────────────
+
+
+def _patient_scope(job: ExportJob) -> Select:
+    """Patienten-IDs, die der Export umfasst."""
+    scope = select(Patient.id).where(Patient.is_deleted.is_(False))
+    if job.group is not None:
+        scope = scope.where(
+            Patient.id.in_(
+                select(Encounter.patient_id).where(Encounter.status == "active", Encounter.ward == job.group)
+            )
+        )
+    return scope
+
+
+def _query(resource_type: str, job: ExportJob) -> tuple[Select, Callable[[Row], list[bytes]]]:
+    """Abfrage + Encoder (Row → NDJSON-Zeilen) pro Ressourcentyp."""
+    scope = _patient_scope(job)
+    if resource_type == "Patient":
+        query = select(Patient).where(Patient.id.in_(scope)).order_by(Patient.id)
+        if job.since is not None:
+            query = query.where(Patient.updated_at >= job.since)
+        return query, lambda row: [orjson.dumps(patient_to_fhir(row[0]))]
+    if resource_type == "Encounter":
+        query = select(Encounter).where(Encounter.patient_id.in_(scope)).order_by(Encounter.id)
+        if job.since is not None:
+            query = query.where(func.coalesce(Encounter.discharged_at, Encounter.admitted_at) >= job.since)
+        return query, lambda row: [orjson.dumps(encounter_to_fhir(row[0]))]
+    if resource_type == "MedicationRequest":
+        query = select(Medication).where(Medication.patient_id.in_(scope)).order_by(Medication.id)
+        if job.since is not None:
+            query = query.where(Medication.updated_at >= job.since)
+        return query, lambda row: [orjson.dumps(medication_to_fhir(row[0]))]
+    # Vitalwerte als Row-Tupel → vorkompilierte Observation-Serialisierung
+    query = (
+        select(*VITAL_ROW_COLUMNS)
+        .where(VitalSign.patient_id.in_(scope))
+        .order_by(VitalSign.patient_id, VitalSign.recorded_at)
+    )
+    if job.since is not None:
+        query = query.where(VitalSign.recorded_at >= job.since)
+    return query, lambda row: [obs for _id, obs in encode_vital_row(row)]
+
+
+# ─── Job-Ablauf ──────────────────────────────────────────────
+
+
+async def _export_type(session: AsyncSession, job: ExportJob, resource_type: str) -> int:
+    """Einen Ressourcentyp als gzip-NDJSON schreiben. Liefert die Anzahl Ressourcen."""
+    query, to_fhir = _query(resource_type, job)
+    path = job.directory / export_file_name(resource_type)
+    cancel_marker = job.directory / CANCEL_FILE
+    count = 0
+
+    rows = await session.stream(query.execution_options(yield_per=EXPORT_YIELD_PER))
+    fh = await asyncio.to_thread(gzip.open, path, "wb", 6)
+    try:
+        async for partition in rows.partitions():
+            lines = [line for row in partition for line in to_fhir(row)]
+            if lines:
+                count += len(lines)
+                # Komprimieren + Schreiben blockiert — im Thread-Pool
+                await asyncio.to_thread(fh.write, b"\n".join(lines) + b"\n")
+            if cancel_marker.exists():
+                raise ExportCancelled(job.id)
+    finally:
+        await rows.close()
+        await asyncio.to_thread(fh.close)
+    return count
+
+
+async def run_export(
+    session_factory: async_sessionmaker[AsyncSession],
+    job: ExportJob,
+    file_urls: dict[str, str],
+) -> None:
+    """Export ausführen und das Ergebnis-Manifest in ``status.json`` ablegen."""
+    output: list[dict[str, Any]] = []
+    started = datetime.now(UTC)
+    try:
+        async with session_factory() as session:
+            for index, resource_type in enumerate(job.types):
+                count = await _export_type(session, job, resource_type)
+                output.append({"type": resource_type, "url": file_urls[resource_type], "count": count})
+                _write_status(job.directory, _in_progress(job, f"{index + 1}/{len(job.types)} Ressourcentypen"))
+    except ExportCancelled:
+        logger.info("FHIR export %s cancelled", job.id)
+        await asyncio.to_thread(shutil.rmtree, job.directory, True)
+        return
+    except asyncio.CancelledError:
+        _write_status(job.directory, _failed(job, "Export durch Server-Neustart abgebrochen"))
+        raise
+    except Exception as exc:
+        logger.error("FHIR export %s failed: %s", job.id, exc, exc_info=True)
+        _write_status(job.directory, _failed(job, str(exc)))
+        return
+
+    _write_status(job.directory, {
+        "status": "completed",
+        "transactionTime": job.transaction_time.isoformat(),
+        "request": job.request_url,
+        "requiresAccessToken": True,
+        "output": output,
+        "error": [],
+    })
+    logger.info(
+        "FHIR export %s completed in %.1fs: %s",
+        job.id, (datetime.now(UTC) - started).total_seconds(),
+        ", ".join(f"{o['type']}={o['count']}" for o in output),
+    )
+
+
+def _in_progress(job: ExportJob, progress: str) -> dict[str, Any]:
+    return {
+        "status": "in-progress",
+        "progress": progress,
+        "transactionTime": job.transaction_time.isoformat(),
+        "request": job.request_url,
+    }
+
+
+def _failed(job: ExportJob, message: str) -> dict[str, Any]:
+    return {
+        "status": "failed",
+        "transactionTime": job.transaction_time.isoformat(),
+        "request": job.request_url,
+        "error": [{"resourceType": "OperationOutcome", "issue": [
+            {"severity": "error", "code": "exception", "diagnostics": message},
+        ]}],
+    }
+
+
+def start_export(
+    session_factory: async_sessionmaker[AsyncSession],
+    job: ExportJob,
+    file_urls: dict[str, str],
+) -> str:
+    """Job-Verzeichnis anlegen und den Export im Hintergrund starten."""
+    job.directory.mkdir(parents=True, exist_ok=True)
+    _write_status(job.directory, _in_progress(job, "gestartet"))
+    task = asyncio.create_task(run_export(session_factory, job, file_urls))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    logger.info("FHIR export %s started (level=%s, types=%s)", job.id, job.level, ",".join(job.types))
+    return job.id
+
+
+def get_export_status(job_id: str) -> dict[str, Any] | None:
+    """Status/Manifest eines Exports lesen (None = unbekannter Job)."""
+    directory = _job_dir(job_id)
+    if directory is None or (directory / CANCEL_FILE).exists():
+        return None
+    try:
+        return json.loads((directory / STATUS_FILE).read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def cancel_export(job_id: str) -> bool:
+    """Export abbrechen bzw. abgeschlossenen Export löschen."""
+    status = get_export_status(job_id)
+    if status is None:
+        return False
+    directory = _job_dir(job_id)
+    if status["status"] == "in-progress":
+        # Der laufende Job räumt sein Verzeichnis selbst weg
+        (directory / CANCEL_FILE).touch()
+    else:
+        shutil.rmtree(directory, ignore_errors=True)
+    return True
+
+
+def get_export_file(job_id: str, file_name: str) -> Path | None:
+    """Pfad einer Exportdatei — nur Dateien aus dem Manifest eines fertigen Jobs."""
+    status = get_export_status(job_id)
+    if status is None or status["status"] != "completed":
+        return None
+    if file_name not in {export_file_name(t) for t in EXPORT_TYPES}:
+        return None
+    path = _job_dir(job_id) / file_name
+    return path if path.is_file() else None
+
+
+async def stop_exports() -> None:
+    """Laufende Exporte beim Shutdown abbrechen (Status → failed)."""
+    for task in list(_tasks):
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
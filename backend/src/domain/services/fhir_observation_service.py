@@ -0,0 +1,375 @@
+"""FHIR Observation-Suche über Vitaldaten und Laborwerte.
+
+Quellen:
+- ``vital_signs`` (Hypertable) — ein Datensatz enthält bis zu acht
+  Parameter, Codes über ``VITAL_LOINC_MAP``
+- ``lab_results`` — ein Analyt pro Datensatz, Codes über ``ANALYTES``
+  bzw. die gespeicherte ``loinc_code``-Spalte
+
+Rohwerte werden per Keyset auf ``(Zeitpunkt, id)`` paginiert: beide
+Quellen liefern je höchstens ``_count + 1`` Datensätze ab dem Cursor, die
+in Python zusammengeführt werden. Zeitpunkt ist ``recorded_at`` bzw. bei
+Laborwerten ``resulted_at`` (indexiert; ``effectiveDateTime`` zeigt die
+Entnahmezeit, falls bekannt).
+
+Mit ``_bucket`` (z.B. ``1h``) aggregiert die Datenbank per
+``time_bucket`` zu Mittelwert/Min/Max/Anzahl je Intervall und Code; die
+Seiten laufen dann über die Bucket-Startzeit.
+"""
+
+import heapq
+import re
+import uuid
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import UTC, date, datetime, timedelta
+from typing import Any
+
+import orjson
+from sqlalchemy import func, literal_column, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.models.clinical import VitalSign
+from src.domain.models.lab import LabResult
+from src.domain.schemas.lab import ANALYTES
+from src.domain.services.fhir_service import (
+    VITAL_LOINC_MAP,
+    VITAL_ROW_COLUMNS,
+    decode_cursor_token,
+    encode_cursor_token,
+    encode_vital_row,
+    lab_result_to_fhir,
+)
+
+LOINC_SYSTEM = "http://loinc.org"
+STATISTICS_SYSTEM = "http://terminology.hl7.org/CodeSystem/observation-statistics"
+CATEGORIES = ("vital-signs", "laboratory")
+
+VITAL_BY_LOINC = {loinc["code"]: param for param, loinc in VITAL_LOINC_MAP.items()}
+ANALYTE_BY_LOINC = {entry["loinc"]: analyte for analyte, entry in ANALYTES.items()}
+
+_DATE_PARAM = re.compile(r"^(eq|gt|ge|lt|le)?(\d{4}-\d{2}-\d{2}(?:T.+)?)$")
+_BUCKET_PARAM = re.compile(r"^(\d+)(min|h|d)$")
+_BUCKET_UNITS = {"min": "minutes", "h": "hours", "d": "days"}
+
+
+class SearchParamError(ValueError):
+    """Ungültiger Suchparameter (→ 400)."""
+
+
+@dataclass
+class ObservationQuery:
+    """Geparste Suchparameter einer Observation-Suche."""
+
+    patient_id: uuid.UUID
+    count: int = 100
+    descending: bool = False
+    vital_params: tuple[str, ...] | None = None  # None = alle
+    analytes: tuple[str, ...] | None = None
+    loinc_codes: tuple[str, ...] | None = None
+    include_vitals: bool = True
+    include_labs: bool = True
+    lower: datetime | None = None  # inklusiv
+    upper: datetime | None = None  # exklusiv
+    bucket: timedelta | None = None
+    cursor: tuple[datetime, str] | None = None
+
+
+@dataclass
+class ObservationPage:
+    """Eine Seite serialisierter Observations plus Fortsetzungs-Cursor."""
+
+    resources: list[bytes] = field(default_factory=list)
+    next_cursor: str | None = None
+
+
+# ─── Parameter-Parsing ───────────────────────────────────────
+
+
+def parse_patient(value: str) -> uuid.UUID:
+    """``Patient/<id>`` oder ``<id>``."""
+    try:
+        return uuid.UUID(value.removeprefix("Patient/"))
+    except ValueError:
+        raise SearchParamError(f"Ungültige Patientenreferenz: {value}") from None
+
+
+def parse_codes(values: Iterable[str]) -> tuple[tuple[str, ...], tuple[str, ...], tuple[str, ...]]:
+    """Token-Liste (``system|code`` oder ``code``) → (Vitalparameter, Analyten, LOINC-Codes)."""
+    codes: list[str] = []
+    for value in values:
+        for token in value.split(","):
+            system, _, code = token.rpartition("|")
+            if system and system != LOINC_SYSTEM:
+                continue  # nur LOINC wird unterstützt
+            if code:
+                codes.append(code)
+    vitals = tuple(VITAL_BY_LOINC[c] for c in codes if c in VITAL_BY_LOINC)
+    analytes = tuple(ANALYTE_BY_LOINC[c] for c in codes if c in ANALYTE_BY_LOINC)
+    return vitals, analytes, tuple(c for c in codes if c not in VITAL_BY_LOINC)
+
+
+def parse_date(value: str) -> tuple[datetime | None, datetime | None]:
+    """FHIR-Datumsparameter → (untere Grenze inkl., obere Grenze exkl.)."""
+    match = _DATE_PARAM.match(value)
+    if not match:
+        raise SearchParamError(f"Ungültiger date-Parameter: {value}")
+    prefix, raw = match.group(1) or "eq", match.group(2)
+    try:
+        if "T" in raw:
+            start = datetime.fromisoformat(raw)
+            start = start if start.tzinfo else start.replace(tzinfo=UTC)
+            end = start + timedelta(microseconds=1)
+        else:
+            start = datetime.combine(date.fromisoformat(raw), datetime.min.time(), tzinfo=UTC)
+            end = start + timedelta(days=1)
+    except ValueError:
+        raise SearchParamError(f"Ungültiger date-Parameter: {value}") from None
+    return {
+        "eq": (start, end),
+        "ge": (start, None),
+        "gt": (end, None),
+        "le": (None, end),
+        "lt": (None, start),
+    }[prefix]
+
+
+def parse_bucket(value: str) -> timedelta:
+    match = _BUCKET_PARAM.match(value)
+    if not match or int(match.group(1)) == 0:
+        raise SearchParamError(f"Ungültiges _bucket-Intervall: {value} (z.B. 15min, 1h, 1d)")
+    return timedelta(**{_BUCKET_UNITS[match.group(2)]: int(match.group(1))})
+
+
+def build_query(
+    *,
+    patient: str,
+    codes: list[str],
+    dates: list[str],
+    category: str | None,
+    count: int,
+    sort: str | None,
+    bucket: str | None,
+    cursor: str | None,
+) -> ObservationQuery:
+    """Suchparameter validieren und in eine ``ObservationQuery`` übersetzen."""
+    query = ObservationQuery(patient_id=parse_patient(patient), count=count)
+    if sort not in (None, "date", "-date"):
+        raise SearchParamError("_sort unterstützt nur date bzw. -date")
+    query.descending = sort == "-date"
+
+    if category is not None:
+        if category not in CATEGORIES:
+            raise SearchParamError(f"Unbekannte Kategorie: {category}")
+        query.include_vitals = category == "vital-signs"
+        query.include_labs = category == "laboratory"
+    if codes:
+        vitals, analytes, loinc_codes = parse_codes(codes)
+        query.vital_params = vitals
+        query.analytes, query.loinc_codes = analytes, loinc_codes
+        query.include_vitals = query.include_vitals and bool(vitals)
+        query.include_labs = query.include_labs and bool(loinc_codes)
+
+    for value in dates:
+        lower, upper = parse_date(value)
+        if lower is not None and (query.lower is None or lower > query.lower):
+            query.lower = lower
+        if upper is not None and (query.upper is None or upper < query.upper):
+            query.upper = upper
+
+    if bucket is not None:
+        query.bucket = parse_bucket(bucket)
+    if cursor is not None:
+        try:
+            ts, key = decode_cursor_token(cursor)
+            query.cursor = (datetime.fromisoformat(ts), str(uuid.UUID(key)) if query.bucket is None else "")
+        except (TypeError, ValueError):
+            raise SearchParamError("Ungültiger _cursor") from None
+    return query
+
+
+# ─── Rohwerte (Keyset) ───────────────────────────────────────
+
+
+def _date_range(q: ObservationQuery, column) -> list:
+    conds = []
+    if q.lower is not None:
+        conds.append(column >= q.lower)
+    if q.upper is not None:
+        conds.append(column < q.upper)
+    return conds
+
+
+def _vital_statement(q: ObservationQuery):
+    stmt = select(*VITAL_ROW_COLUMNS).where(
+        VitalSign.patient_id == q.patient_id, *_date_range(q, VitalSign.recorded_at),
+    )
+    if q.vital_params:
+        stmt = stmt.where(or_(*(getattr(VitalSign, p).is_not(None) for p in q.vital_params)))
+    key = tuple_(VitalSign.recorded_at, VitalSign.id)
+    if q.cursor is not None:
+        after = (q.cursor[0], uuid.UUID(q.cursor[1]))
+        stmt = stmt.where(key < after if q.descending else key > after)
+    order = (VitalSign.recorded_at.desc(), VitalSign.id.desc()) if q.descending else (
+        VitalSign.recorded_at, VitalSign.id,
+    )
+    return stmt.order_by(*order).limit(q.count + 1)
+
+
+def _lab_codes(q: ObservationQuery) -> list:
+    if q.loinc_codes is None:
+        return []
+    return [or_(LabResult.analyte.in_(q.analytes or ()), LabResult.loinc_code.in_(q.loinc_codes))]
+
+
+def _lab_statement(q: ObservationQuery):
+    stmt = select(LabResult).where(
+        LabResult.patient_id == q.patient_id, *_lab_codes(q), *_date_range(q, LabResult.resulted_at),
+    )
+    key = tuple_(LabResult.resulted_at, LabResult.id)
+    if q.cursor is not None:
+        after = (q.cursor[0], uuid.UUID(q.cursor[1]))
+        stmt = stmt.where(key < after if q.descending else key > after)
+    order = (LabResult.resulted_at.desc(), LabResult.id.desc()) if q.descending else (
+        LabResult.resulted_at, LabResult.id,
+    )
+    return stmt.order_by(*order).limit(q.count + 1)
+
+
+async def _search_raw(db: AsyncSession, q: ObservationQuery) -> ObservationPage:
+    only = set(q.vital_params) if q.vital_params else None
+    sources: list[list[tuple[datetime, uuid.UUID, list[bytes]]]] = []
+    if q.include_vitals:
+        rows = (await db.execute(_vital_statement(q))).all()
+        sources.append([
+            (r.recorded_at, r.id, [obs for _id, obs in encode_vital_row(r, only)]) for r in rows
+        ])
+    if q.include_labs:
+        labs = (await db.execute(_lab_statement(q))).scalars().all()
+        sources.append([(lab.resulted_at, lab.id, [orjson.dumps(lab_result_to_fhir(lab))]) for lab in labs])
+
+    merged = heapq.merge(*sources, key=lambda rec: (rec[0], rec[1]), reverse=q.descending)
+    page = ObservationPage()
+    last: tuple[datetime, uuid.UUID] | None = None
+    for taken, (ts, row_id, resources) in enumerate(merged):
+        if taken == q.count:
+            page.next_cursor = encode_cursor_token([last[0].isoformat(), str(last[1])])
+            break
+        page.resources.extend(resources)
+        last = (ts, row_id)
+    return page
+
+
+# ─── Aggregiert (time_bucket) ────────────────────────────────
+
+
+def _aggregate_resource(
+    q: ObservationQuery, start: datetime, code: dict[str, Any], category: str, unit: str,
+    avg: float, minimum: float, maximum: float, count: int,
+) -> bytes:
+    def quantity(value: float) -> dict[str, Any]:
+        return {"value": round(value, 3), "unit": unit}
+
+    def statistic(name: str) -> dict[str, Any]:
+        return {"coding": [{"system": STATISTICS_SYSTEM, "code": name}]}
+
+    return orjson.dumps({
+        "resourceType": "Observation",
+        "id": f"{code['code']}-{int(start.timestamp())}",
+        "status": "final",
+        "category": [{"coding": [{
+            "system": "http://terminology.hl7.org/CodeSystem/observation-category", "code": category,
+        }]}],
+        "code": {"coding": [{"system": LOINC_SYSTEM, **code}]},
+        "subject": {"reference": f"Patient/{q.patient_id}"},
+        "effectivePeriod": {"start": start.isoformat(), "end": (start + q.bucket).isoformat()},
+        "valueQuantity": quantity(avg),
+        "component": [
+            {"code": statistic("minimum"), "valueQuantity": quantity(minimum)},
+            {"code": statistic("maximum"), "valueQuantity": quantity(maximum)},
+            {"code": statistic("count"), "valueInteger": count},
+        ],
+    })
+
+
+def _bucket_window(q: ObservationQuery, column) -> list:
+    conds = _date_range(q, column)
+    if q.cursor is not None:
+        # Cursor = Start des letzten ausgelieferten Buckets
+        conds.append(column < q.cursor[0] if q.descending else column >= q.cursor[0] + q.bucket)
+    return conds
+
+
+def _time_bucket(q: ObservationQuery, column):
+    # Intervall als Literal: als Bind-Parameter wäre der Ausdruck in SELECT
+    # und GROUP BY für PostgreSQL nicht identisch
+    interval = literal_column(f"INTERVAL '{int(q.bucket.total_seconds())} seconds'")
+    return func.time_bucket(interval, column).label("bucket")
+
+
+def _ranked(stmt, bucket_col, q: ObservationQuery):
+    """Auf die ersten ``count + 1`` Buckets beschränken (mehrere Codes pro Bucket)."""
+    order = bucket_col.desc() if q.descending else bucket_col
+    ranked = stmt.add_columns(func.dense_rank().over(order_by=order).label("rank")).subquery()
+    return select(ranked).where(ranked.c.rank <= q.count + 1)
+
+
+async def _search_buckets(db: AsyncSession, q: ObservationQuery) -> ObservationPage:
+    buckets: dict[datetime, list[bytes]] = {}
+
+    if q.include_vitals:
+        params = q.vital_params or tuple(VITAL_LOINC_MAP)
+        bucket = _time_bucket(q, VitalSign.recorded_at)
+        columns = []
+        for p in params:
+            col = getattr(VitalSign, p)
+            columns += [func.avg(col).label(f"{p}_avg"), func.min(col).label(f"{p}_min"),
+                        func.max(col).label(f"{p}_max"), func.count(col).label(f"{p}_n")]
+        stmt = (
+            select(bucket, *columns)
+            .where(VitalSign.patient_id == q.patient_id, *_bucket_window(q, VitalSign.recorded_at))
+            .group_by(bucket)
+        )
+        for row in (await db.execute(_ranked(stmt, bucket, q))).mappings():
+            out = buckets.setdefault(row["bucket"], [])
+            for p in params:
+                if row[f"{p}_n"]:
+                    loinc = VITAL_LOINC_MAP[p]
+                    out.append(_aggregate_resource(
+                        q, row["bucket"], {"code": loinc["code"], "display": loinc["display"]}, "vital-signs",
+                        loinc["unit"], row[f"{p}_avg"], row[f"{p}_min"], row[f"{p}_max"], row[f"{p}_n"],
+                    ))
+
+    if q.include_labs:
+        bucket = _time_bucket(q, LabResult.resulted_at)
+        stmt = (
+            select(
+                bucket, LabResult.loinc_code, LabResult.display_name, LabResult.unit,
+                func.avg(LabResult.value).label("avg"), func.min(LabResult.value).label("min"),
+                func.max(LabResult.value).label("max"), func.count().label("n"),
+            )
+            .where(LabResult.patient_id == q.patient_id, *_lab_codes(q), *_bucket_window(q, LabResult.resulted_at))
+            .group_by(bucket, LabResult.loinc_code, LabResult.display_name, LabResult.unit)
+        )
+        for row in (await db.execute(_ranked(stmt, bucket, q))).mappings():
+            buckets.setdefault(row["bucket"], []).append(_aggregate_resource(
+                q, row["bucket"], {"code": row["loinc_code"], "display": row["display_name"]}, "laboratory",
+                row["unit"], row["avg"], row["min"], row["max"], row["n"],
+            ))
+
+    starts = sorted(buckets, reverse=q.descending)
+    page = ObservationPage()
+    for start in starts[: q.count]:
+        page.resources.extend(buckets[start])
+    if len(starts) > q.count:
+        page.next_cursor = encode_cursor_token([starts[q.count - 1].isoformat(), ""])
+    return page
+
+
+async def search_observations(db: AsyncSession, q: ObservationQuery) -> ObservationPage:
+    """Observation-Suche ausführen (Rohwerte oder Buckets)."""
+    if not (q.include_vitals or q.include_labs):
+        return ObservationPage()
+    if q.bucket is not None:
+        return await _search_buckets(db, q)
+    return await _search_raw(db, q)
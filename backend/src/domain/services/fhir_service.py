@@ -7,15 +7,23 @@ Implementiert CH Core Profile Mappings für:
 - MedicationRequest (Verordnungen)
 """
 
+import base64
+import binascii
+import json
 import logging
 import uuid
-from datetime import date
+from collections.abc import AsyncIterator, Callable, Collection
+from contextlib import aclosing
+from dataclasses import dataclass
+from datetime import date, datetime
 from typing import Any
 
-from sqlalchemy import select
+import orjson
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.domain.models.clinical import Encounter, Medication, VitalSign
+from src.domain.models.lab import LabResult
 from src.domain.models.patient import Patient
 
 logger = logging.getLogger("pdms.fhir")
@@ -140,6 +148,120 @@ def vital_sign_to_fhir(vs: VitalSign) -> list[dict[str, Any]]:
     return observations
 
 
+# ─── Vorkompilierte Observation-Serialisierung ────────────────
+#
+# Für Massenpfade ($everything, $export) wird das JSON einer Observation
+# direkt aus vorab kodierten Byte-Fragmenten zusammengesetzt, statt pro
+# Parameter ein verschachteltes Dict zu bauen und zu serialisieren. Die
+# Ausgabe ist byte-identisch zu ``orjson.dumps(vital_sign_to_fhir(vs)[i])``.
+
+# Spalten in der Reihenfolge, die ``encode_vital_row`` erwartet
+VITAL_ROW_COLUMNS = (
+    VitalSign.id,
+    VitalSign.patient_id,
+    VitalSign.encounter_id,
+    VitalSign.recorded_at,
+    *(getattr(VitalSign, param) for param in VITAL_LOINC_MAP),
+)
+
+
+def _compile_vital_templates() -> tuple[tuple[str, str, bytes, bytes], ...]:
+    """Pro LOINC-Parameter: (Parameter, ID-Suffix, Fragment nach der Row-ID, Fragment nach dem Messwert)."""
+    templates = []
+    for param, loinc in VITAL_LOINC_MAP.items():
+        head = orjson.dumps({
+            "meta": {"profile": ["http://fhir.ch/ig/ch-core/StructureDefinition/ch-core-observation-vitalsigns"]},
+            "status": "final",
+            "category": [{"coding": [{
+                "system": "http://terminology.hl7.org/CodeSystem/observation-category",
+                "code": "vital-signs",
+                "display": "Vital Signs",
+            }]}],
+            "code": {"coding": [{"system": "http://loinc.org", "code": loinc["code"], "display": loinc["display"]}]},
+        })[1:-1]
+        unit = orjson.dumps({"unit": loinc["unit"], "system": "http://unitsofmeasure.org", "code": loinc["unit"]})
+        templates.append((
+            param,
+            f"-{param}",
+            f'-{param}",'.encode() + head + b',"subject":{"reference":"Patient/',
+            b"," + unit[1:],
+        ))
+    return tuple(templates)
+
+
+_VITAL_TEMPLATES = _compile_vital_templates()
+_OBS_START = b'{"resourceType":"Observation","id":"'
+_OBS_EFFECTIVE = b'"},"effectiveDateTime":"'
+_OBS_VALUE = b'","valueQuantity":{"value":'
+
+
+def encode_vital_row(row: tuple, only: Collection[str] | None = None) -> list[tuple[str, bytes]]:
+    """Row-Tupel (``VITAL_ROW_COLUMNS``) → (Observation-ID, JSON-Bytes) je Parameter.
+
+    ``only`` beschränkt die Ausgabe auf bestimmte Parameter (Observation-Suche nach ``code``).
+    """
+    row_id, patient_id, encounter_id, recorded_at, *values = row
+    row_id = str(row_id)
+    prefix = _OBS_START + row_id.encode()
+    common = str(patient_id).encode() + _OBS_EFFECTIVE + recorded_at.isoformat().encode() + _OBS_VALUE
+    tail = b',"encounter":{"reference":"Encounter/' + str(encounter_id).encode() + b'"}}' if encounter_id else b"}"
+    return [
+        (row_id + suffix, b"".join((prefix, head, common, orjson.dumps(value), unit, tail)))
+        for (param, suffix, head, unit), value in zip(_VITAL_TEMPLATES, values, strict=True)
+        if value is not None and (only is None or param in only)
+    ]
+
+
+LAB_INTERPRETATION_FLAGS = {"H", "L", "HH", "LL"}
+
+
+def lab_result_to_fhir(lab: LabResult) -> dict[str, Any]:
+    """PDMS-LabResult → FHIR Observation Resource (Kategorie laboratory)."""
+    coding: dict[str, Any] = {"system": "http://loinc.org", "code": lab.loinc_code, "display": lab.display_name}
+    resource: dict[str, Any] = {
+        "resourceType": "Observation",
+        "id": str(lab.id),
+        "status": "final",
+        "category": [
+            {
+                "coding": [
+                    {
+                        "system": "http://terminology.hl7.org/CodeSystem/observation-category",
+                        "code": "laboratory",
+                        "display": "Laboratory",
+                    }
+                ]
+            }
+        ],
+        "code": {"coding": [coding], "text": lab.display_name} if lab.loinc_code else {"text": lab.display_name},
+        "subject": {"reference": f"Patient/{lab.patient_id}"},
+        "effectiveDateTime": (lab.collected_at or lab.resulted_at).isoformat(),
+        "issued": lab.resulted_at.isoformat(),
+        "valueQuantity": {"value": lab.value, "unit": lab.unit},
+    }
+    if lab.ref_min is not None or lab.ref_max is not None:
+        ref: dict[str, Any] = {}
+        if lab.ref_min is not None:
+            ref["low"] = {"value": lab.ref_min, "unit": lab.unit}
+        if lab.ref_max is not None:
+            ref["high"] = {"value": lab.ref_max, "unit": lab.unit}
+        resource["referenceRange"] = [ref]
+    if lab.flag in LAB_INTERPRETATION_FLAGS:
+        resource["interpretation"] = [
+            {
+                "coding": [
+                    {
+                        "system": "http://terminology.hl7.org/CodeSystem/v3-ObservationInterpretation",
+                        "code": lab.flag,
+                    }
+                ]
+            }
+        ]
+    if lab.encounter_id:
+        resource["encounter"] = {"reference": f"Encounter/{lab.encounter_id}"}
+    return resource
+
+
 def encounter_to_fhir(enc: Encounter) -> dict[str, Any]:
     """PDMS-Encounter → FHIR Encounter Resource."""
     resource: dict[str, Any] = {
@@ -219,61 +341,193 @@ async def get_fhir_patient(db: AsyncSession, patient_id: uuid.UUID) -> dict[str,
     return patient_to_fhir(patient)
 
 
-async def get_fhir_patient_everything(
-    db: AsyncSession,
-    patient_id: uuid.UUID,
-) -> dict[str, Any]:
-    """FHIR $everything — Alle Ressourcen eines Patienten als Bundle."""
-    entries: list[dict[str, Any]] = []
-
-    # Patient
-    patient = await db.get(Patient, patient_id)
-    if patient:
-        entries.append({
-            "resource": patient_to_fhir(patient),
-            "request": {"method": "GET", "url": f"Patient/{patient_id}"},
-        })
-
-    # Encounters
-    enc_result = await db.execute(
-        select(Encounter).where(Encounter.patient_id == patient_id)
-    )
-    for enc in enc_result.scalars().all():
-        entries.append({
-            "resource": encounter_to_fhir(enc),
-            "request": {"method": "GET", "url": f"Encounter/{enc.id}"},
-        })
-
-    # Vitals → Observations
-    vs_result = await db.execute(
-        select(VitalSign)
-        .where(VitalSign.patient_id == patient_id)
-        .order_by(VitalSign.recorded_at.desc())
-        .limit(100)
-    )
-    for vs in vs_result.scalars().all():
-        for obs in vital_sign_to_fhir(vs):
-            entries.append({
-                "resource": obs,
-                "request": {"method": "GET", "url": f"Observation/{obs['id']}"},
-            })
-
-    # Medications → MedicationRequest
-    med_result = await db.execute(
-        select(Medication).where(Medication.patient_id == patient_id)
-    )
-    for med in med_result.scalars().all():
-        entries.append({
-            "resource": medication_to_fhir(med),
-            "request": {"method": "GET", "url": f"MedicationRequest/{med.id}"},
-        })
-
-    return {
-        "resourceType": "Bundle",
-        "type": "searchset",
-        "total": len(entries),
-        "entry": entries,
-    }
+# ─── $everything (gestreamt, Keyset-Paging) ──────────────────
+
+# Abschnitte in Auslieferungsreihenfolge; Vital- und Laborwerte werden beide
+# als Observation ausgegeben, aber getrennt gepaged.
+EVERYTHING_SECTIONS = ("Patient", "Encounter", "MedicationRequest", "Observation", "LabResult")
+EVERYTHING_YIELD_PER = 500
+
+
+def encode_cursor_token(payload: Any) -> str:
+    """JSON-Payload → opaker, URL-sicherer Cursor für ``next``-Links."""
+    raw = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor_token(token: str) -> Any:
+    """Gegenstück zu ``encode_cursor_token``. ValueError bei ungültigem Token."""
+    try:
+        return json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, binascii.Error) as exc:
+        raise ValueError("Ungültiger Cursor") from exc
+
+
+# Aufbau des Keyset-Schlüssels je Abschnitt: ein Parser pro Element
+_SECTION_KEY_PARSERS: tuple[tuple[Callable[[str], Any], ...], ...] = (
+    (uuid.UUID,),
+    (uuid.UUID,),
+    (uuid.UUID,),
+    (datetime.fromisoformat, uuid.UUID),
+    (datetime.fromisoformat, uuid.UUID),
+)
+
+
+@dataclass(frozen=True)
+class EverythingCursor:
+    """Position im $everything-Stream: Abschnitt + letzter ausgelieferter Schlüssel."""
+
+    section: int = 0
+    key: tuple[Any, ...] | None = None
+
+    def encode(self) -> str:
+        key = [k.isoformat() if isinstance(k, datetime) else str(k) for k in self.key] if self.key else None
+        return encode_cursor_token([self.section, key])
+
+    @classmethod
+    def decode(cls, token: str) -> "EverythingCursor":
+        """Opaken Cursor aus dem ``next``-Link lesen und den Schlüssel typisieren.
+
+        ValueError bei ungültigem Token — auch bei passender Form mit
+        unbrauchbaren Werten, damit der Fehler vor dem Streaming auffällt.
+        """
+        try:
+            section, key = decode_cursor_token(token)
+        except (TypeError, ValueError) as exc:
+            raise ValueError("Ungültiger Cursor") from exc
+        if not isinstance(section, int) or not 0 <= section < len(EVERYTHING_SECTIONS):
+            raise ValueError("Ungültiger Cursor")
+        if key is None:
+            return cls(section)
+        parsers = _SECTION_KEY_PARSERS[section]
+        if not isinstance(key, list) or len(key) != len(parsers) or not all(isinstance(k, str) for k in key):
+            raise ValueError("Ungültiger Cursor")
+        try:
+            return cls(section, tuple(parse(k) for parse, k in zip(parsers, key, strict=True)))
+        except ValueError as exc:
+            raise ValueError("Ungültiger Cursor") from exc
+
+
+_ENTRY_START = b'{"fullUrl":"'
+_ENTRY_RESOURCE = b'","resource":'
+_ENTRY_END = b',"search":{"mode":"match"}}'
+
+
+def _encode(resource: dict[str, Any]) -> tuple[str, bytes]:
+    return f"{resource['resourceType']}/{resource['id']}", orjson.dumps(resource)
+
+
+class PatientEverything:
+    """Eine Seite von FHIR $everything, als asynchroner Strom serialisierter Bundle-Entries.
+
+    Jeder Abschnitt wird über einen serverseitigen Cursor (``yield_per``)
+    gelesen, der Speicherbedarf ist daher unabhängig von der Anzahl
+    Ressourcen. ``count`` begrenzt die Quelldatensätze pro Seite — eine
+    Vitalmessung liefert ihre Observations immer geschlossen. Nach dem
+    Durchlauf steht in ``next_cursor`` die Fortsetzung (``None`` = Ende).
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        patient: Patient,
+        *,
+        count: int | None = None,
+        since: datetime | None = None,
+        cursor: EverythingCursor | None = None,
+    ) -> None:
+        self.db = db
+        self.patient = patient
+        self.count = count
+        self.since = since
+        self.cursor = cursor or EverythingCursor()
+        self.next_cursor: EverythingCursor | None = None
+
+    async def entries(self) -> AsyncIterator[bytes]:
+        remaining = self.count
+        for section in range(self.cursor.section, len(EVERYTHING_SECTIONS)):
+            if remaining == 0:
+                # Seite voll genau an einer Abschnittsgrenze
+                self.next_cursor = EverythingCursor(section)
+                return
+            after = self.cursor.key if section == self.cursor.section else None
+            last_key: tuple[Any, ...] | None = None
+            async with aclosing(self._section(section, after, remaining)) as records:
+                async for key, resources in records:
+                    if remaining is not None:
+                        if remaining == 0:
+                            self.next_cursor = EverythingCursor(section, last_key)
+                            return
+                        remaining -= 1
+                    last_key = key
+                    for full_url, resource in resources:
+                        yield b"".join((_ENTRY_START, full_url.encode(), _ENTRY_RESOURCE, resource, _ENTRY_END))
+
+    async def _section(
+        self, section: int, after: tuple[Any, ...] | None, remaining: int | None,
+    ) -> AsyncIterator[tuple[tuple[Any, ...], list[tuple[str, bytes]]]]:
+        name = EVERYTHING_SECTIONS[section]
+        if name == "Patient":
+            if after is None and (self.since is None or self.patient.updated_at >= self.since):
+                yield (self.patient.id,), [_encode(patient_to_fhir(self.patient))]
+            return
+
+        if name == "Encounter":
+            query = select(Encounter).where(Encounter.patient_id == self.patient.id).order_by(Encounter.id)
+            if self.since is not None:
+                query = query.where(func.coalesce(Encounter.discharged_at, Encounter.admitted_at) >= self.since)
+            if after:
+                query = query.where(Encounter.id > after[0])
+        elif name == "MedicationRequest":
+            query = select(Medication).where(Medication.patient_id == self.patient.id).order_by(Medication.id)
+            if self.since is not None:
+                query = query.where(Medication.updated_at >= self.since)
+            if after:
+                query = query.where(Medication.id > after[0])
+        elif name == "LabResult":
+            query = (
+                select(LabResult)
+                .where(LabResult.patient_id == self.patient.id)
+                .order_by(LabResult.resulted_at, LabResult.id)
+            )
+            if self.since is not None:
+                query = query.where(LabResult.resulted_at >= self.since)
+            if after:
+                query = query.where(tuple_(LabResult.resulted_at, LabResult.id) > after)
+        else:
+            query = (
+                select(*VITAL_ROW_COLUMNS)
+                .where(VitalSign.patient_id == self.patient.id)
+                .order_by(VitalSign.recorded_at, VitalSign.id)
+            )
+            if self.since is not None:
+                query = query.where(VitalSign.recorded_at >= self.since)
+            if after:
+                query = query.where(tuple_(VitalSign.recorded_at, VitalSign.id) > after)
+
+        if remaining is not None:
+            # Ein Datensatz mehr als nötig → zeigt an, ob eine Folgeseite existiert
+            query = query.limit(remaining + 1)
+        query = query.execution_options(yield_per=EVERYTHING_YIELD_PER)
+        if name == "Observation":
+            rows = await self.db.stream(query)
+        else:
+            rows = await self.db.stream_scalars(query)
+        try:
+            async for row in rows:
+                if name == "Encounter":
+                    yield (row.id,), [_encode(encounter_to_fhir(row))]
+                elif name == "MedicationRequest":
+                    yield (row.id,), [_encode(medication_to_fhir(row))]
+                elif name == "LabResult":
+                    yield (row.resulted_at, row.id), [_encode(lab_result_to_fhir(row))]
+                else:
+                    yield (row.recorded_at, row.id), [
+                        (f"Observation/{obs_id}", obs) for obs_id, obs in encode_vital_row(row)
+                    ]
+        finally:
+            # Serverseitigen Cursor auch bei vorzeitigem Abbruch schliessen
+            await rows.close()
 
 
 async def search_fhir_patients(
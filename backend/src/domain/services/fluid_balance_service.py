@@ -72,7 +72,7 @@ async def create_fluid_entry(
         notes=data.notes,
     )
     db.add(entry)
-    await db.commit()
+    await db.flush()
     await db.refresh(entry)
 
     await emit_event(RoutingKeys.FLUID_RECORDED, {
@@ -80,12 +80,13 @@ async def create_fluid_entry(
         "direction": data.direction,
         "category": data.category,
         "volume_ml": data.volume_ml,
-    })
+    }, session=db)
 
     logger.info(
         "Fluid entry created: %s %s %.0f mL for patient %s",
         data.direction, data.category, data.volume_ml, data.patient_id,
     )
+    await db.commit()
     return entry
 
 
@@ -0,0 +1,389 @@
+"""HL7v2 lab ingestion — ORU^R01 parsing and mapping to the batch lab path.
+
+Only the subset needed for lab results is parsed:
+
+- MSH: encoding characters, message type, control id, sender (for the ACK)
+- PID-3: patient identifiers — a PDMS patient UUID or the AHV number
+- OBR: order number (OBR-3 filler, else OBR-2 placer), OBR-7 collection time,
+  OBR-22 result report time
+- OBX: LOINC code (OBX-3), numeric value (OBX-5, type NM/SN), unit (OBX-6),
+  reference range (OBX-7), abnormal flag (OBX-8), result status (OBX-11),
+  observation time (OBX-14)
+
+Results are stored with ``resulted_at`` = OBX-14, else OBR-22, else the
+receive time, so a backlog replayed after an outage keeps its original
+timestamps (trends and the ``lab_latest`` guard compare ``resulted_at``).
+
+Each OBR group becomes one ``create_lab_results_batch`` call (one INSERT,
+one panel event); all groups of a message share one transaction, so the
+ACK (AA) is only sent for fully committed messages. Retransmits (same
+MSH-10 from the same MSH-3/MSH-4) are recognised via ``hl7_inbound_messages``
+and acknowledged without storing the results again. Analytes are resolved via the LOINC codes in
+``schemas/lab.ANALYTES``; codes outside the catalogue are imported under
+their LOINC code with the unit and range from the message.
+"""
+
+import logging
+import re
+import uuid
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.domain.models.lab import HL7InboundMessage
+from src.domain.models.patient import Patient
+from src.domain.schemas.lab import ANALYTES, LabResultCreate
+from src.domain.services.fhir_observation_service import ANALYTE_BY_LOINC
+from src.domain.services.lab_service import create_lab_results_batch
+
+logger = logging.getLogger("pdms.hl7")
+
+ABNORMAL_FLAGS = {"H", "L", "HH", "LL"}
+SKIPPED_STATUSES = {"X", "D", "W"}  # cannot be obtained / deleted / wrong patient
+NUMERIC_TYPES = {"NM", "SN"}
+
+_RANGE = re.compile(r"^\s*(-?[\d.]+)?\s*-\s*(-?[\d.]+)?\s*$")
+_UPPER = re.compile(r"^\s*<=?\s*(-?[\d.]+)\s*$")
+_LOWER = re.compile(r"^\s*>=?\s*(-?[\d.]+)\s*$")
+
+
+class HL7ParseError(ValueError):
+    """Message is not a well-formed ORU^R01 (→ ACK with AR)."""
+
+
+class HL7ProcessingError(Exception):
+    """Message is valid but cannot be applied (→ ACK with AE)."""
+
+
+@dataclass
+class HL7Panel:
+    """One OBR group with its numeric OBX results."""
+
+    order_number: str | None
+    collected_at: datetime | None
+    resulted_at: datetime | None = None
+    results: list[LabResultCreate] = field(default_factory=list)
+
+
+@dataclass
+class ORUMessage:
+    """Parsed ORU^R01 message."""
+
+    control_id: str
+    sending_application: str
+    sending_facility: str
+    version: str
+    patient_identifiers: list[str]
+    panels: list[HL7Panel]
+    skipped: int = 0
+
+
+# ─── Low-level parsing ─────────────────────────────────────────
+
+def _unescape(value: str, component_sep: str, repetition_sep: str, escape: str, subcomponent_sep: str) -> str:
+    if escape not in value:
+        return value
+    return (
+        value.replace(f"{escape}F{escape}", "|")
+        .replace(f"{escape}S{escape}", component_sep)
+        .replace(f"{escape}R{escape}", repetition_sep)
+        .replace(f"{escape}T{escape}", subcomponent_sep)
+        .replace(f"{escape}E{escape}", escape)
+    )
+
+
+def parse_hl7_datetime(value: str) -> datetime | None:
+    """HL7 TS (``YYYYMMDD[HHMM[SS[.S+]]][+/-ZZZZ]``) → aware datetime (UTC if no offset)."""
+    value = value.strip()
+    if not value:
+        return None
+    match = re.match(r"^(\d{8})(\d{2})?(\d{2})?(\d{2})?(?:\.\d+)?([+-]\d{4})?$", value)
+    if not match:
+        raise HL7ParseError(f"Invalid HL7 timestamp: {value}")
+    date_part, hh, mm, ss, tz = match.groups()
+    fmt_value = date_part + (hh or "00") + (mm or "00") + (ss or "00") + (tz or "+0000")
+    try:
+        return datetime.strptime(fmt_value, "%Y%m%d%H%M%S%z")
+    except ValueError as exc:
+        raise HL7ParseError(f"Invalid HL7 timestamp: {value}") from exc
+
+
+def _parse_range(raw: str) -> tuple[float | None, float | None]:
+    for pattern, pick in ((_RANGE, lambda m: m.groups()), (_UPPER, lambda m: (None, m.group(1))),
+                          (_LOWER, lambda m: (m.group(1), None))):
+        match = pattern.match(raw)
+        if match:
+            low, high = pick(match)
+            try:
+                return (float(low) if low else None, float(high) if high else None)
+            except ValueError:
+                return None, None
+    return None, None
+
+
+def parse_oru_r01(raw: str) -> ORUMessage:
+    """Parse an ORU^R01 message (segments separated by CR, LF tolerated)."""
+    segments = [s for s in re.split(r"\r\n|\r|\n", raw.strip()) if s]
+    if not segments or not segments[0].startswith("MSH") or len(segments[0]) < 8:
+        raise HL7ParseError("Message does not start with MSH")
+
+    msh = segments[0]
+    field_sep = msh[3]
+    encoding = msh.split(field_sep)[1]
+    component_sep, repetition_sep, escape, subcomponent_sep = (encoding + "^~\\&")[:4]
+
+    def components(value: str) -> list[str]:
+        # split first, then unescape: \S\ inside a component is a literal "^"
+        return [
+            _unescape(c, component_sep, repetition_sep, escape, subcomponent_sep)
+            for c in value.split(component_sep)
+        ]
+
+    def get(values: list[str], index: int) -> str:
+        return values[index] if index < len(values) else ""
+
+    # MSH-1 is the field separator itself: MSH-n lives at index n-1
+    header = [msh[:3], field_sep, *msh.split(field_sep)[1:]]
+    message_type = components(get(header, 9))
+    if message_type[:2] != ["ORU", "R01"]:
+        raise HL7ParseError(f"Unsupported message type: {get(header, 9)}")
+    control_id = get(header, 10)
+    if not control_id:
+        raise HL7ParseError("MSH-10 (message control id) missing")
+
+    message = ORUMessage(
+        control_id=control_id,
+        sending_application=get(header, 3),
+        sending_facility=get(header, 4),
+        version=get(header, 12) or "2.5",
+        patient_identifiers=[],
+        panels=[],
+    )
+    panel: HL7Panel | None = None
+    for segment in segments[1:]:
+        values = segment.split(field_sep)
+        kind = values[0]
+        if kind == "PID":
+            for repetition in get(values, 3).split(repetition_sep):
+                identifier = components(repetition)[0].strip()
+                if identifier:
+                    message.patient_identifiers.append(identifier)
+        elif kind == "OBR":
+            order_number = components(get(values, 3))[0] or components(get(values, 2))[0]
+            panel = HL7Panel(
+                order_number=order_number or None,
+                collected_at=parse_hl7_datetime(get(values, 7)),
+                resulted_at=parse_hl7_datetime(get(values, 22)),
+            )
+            message.panels.append(panel)
+        elif kind == "OBX":
+            if panel is None:
+                raise HL7ParseError("OBX before OBR")
+            result = _parse_obx(values, get, components)
+            if result is None:
+                message.skipped += 1
+            else:
+                result.resulted_at = result.resulted_at or panel.resulted_at
+                panel.results.append(result)
+
+    if not message.patient_identifiers:
+        raise HL7ParseError("PID-3 (patient identifier) missing")
+    return message
+
+
+def _parse_obx(values: list[str], get, components) -> LabResultCreate | None:
+    """OBX → LabResultCreate (patient_id is filled in later). None = not importable."""
+    if get(values, 2) not in NUMERIC_TYPES or get(values, 11) in SKIPPED_STATUSES:
+        return None
+    code = components(get(values, 3))
+    loinc = code[0].strip()
+    system = code[2] if len(code) > 2 else "LN"
+    if not loinc or system not in ("LN", ""):
+        return None
+
+    raw_value = get(values, 5)
+    if get(values, 2) == "SN":
+        # Structured numeric: <comparator>^<num1>[^<separator>^<num2>]
+        parts = components(raw_value)
+        raw_value = parts[1] if len(parts) > 1 else parts[0]
+    try:
+        value = float(raw_value)
+    except ValueError:
+        return None
+
+    analyte = ANALYTE_BY_LOINC.get(loinc)
+    ref_min, ref_max = _parse_range(get(values, 7))
+    flag = components(get(values, 8))[0]
+    unit = components(get(values, 6))[0]
+    return LabResultCreate.model_construct(
+        patient_id=None,
+        encounter_id=None,
+        analyte=analyte or loinc,
+        loinc_code=loinc,
+        display_name=None if analyte else (code[1] if len(code) > 1 and code[1] else loinc),
+        value=value,
+        unit=unit or None,
+        ref_min=ref_min,
+        ref_max=ref_max,
+        flag=flag if flag in ABNORMAL_FLAGS else None,
+        category=ANALYTES[analyte]["category"] if analyte else "chemistry",
+        sample_type=None,
+        collected_at=None,
+        resulted_at=parse_hl7_datetime(get(values, 14)),
+        order_number=None,
+        notes=None,
+    )
+
+
+# ─── ACK ───────────────────────────────────────────────────────
+
+def build_ack(
+    control_id: str,
+    code: str,
+    *,
+    text: str = "",
+    receiving_application: str = "",
+    receiving_facility: str = "",
+    version: str = "2.5",
+) -> str:
+    """ACK^R01 with MSA-1 = AA / AE / AR."""
+    now = datetime.now(UTC).strftime("%Y%m%d%H%M%S")
+    text = text.replace("|", " ").replace("\r", " ")[:80]
+    return "\r".join((
+        f"MSH|^~\\&|PDMS|HOME-SPITAL|{receiving_application}|{receiving_facility}|{now}||ACK^R01^ACK|"
+        f"ACK{uuid.uuid4().hex[:16]}|P|{version}",
+        f"MSA|{code}|{control_id}" + (f"|{text}" if text else ""),
+    )) + "\r"
+
+
+# ─── Ingestion ─────────────────────────────────────────────────
+
+async def _resolve_patient(db: AsyncSession, identifiers: list[str]) -> uuid.UUID:
+    uuids = []
+    for identifier in identifiers:
+        try:
+            uuids.append(uuid.UUID(identifier))
+        except ValueError:
+            pass
+    conds = [Patient.ahv_number.in_(identifiers)]
+    if uuids:
+        conds.append(Patient.id.in_(uuids))
+    patient_id = (await db.execute(
+        select(Patient.id).where(or_(*conds), Patient.is_deleted.is_(False)).limit(1)
+    )).scalar_one_or_none()
+    if patient_id is None:
+        raise HL7ProcessingError(f"Unknown patient: {', '.join(identifiers)}")
+    return patient_id
+
+
+async def _claim_message(db: AsyncSession, message: ORUMessage) -> bool:
+    """Record the message id in the current transaction. False = already applied.
+
+    A concurrent retransmit blocks on the uncommitted key until the first
+    transaction ends, then sees the conflict (or claims it after a rollback).
+    """
+    claimed = (await db.execute(
+        pg_insert(HL7InboundMessage)
+        .values(
+            sending_application=message.sending_application,
+            sending_facility=message.sending_facility,
+            control_id=message.control_id,
+            result_count=sum(len(panel.results) for panel in message.panels),
+            received_at=datetime.now(UTC),
+        )
+        .on_conflict_do_nothing()
+        .returning(HL7InboundMessage.control_id)
+    )).scalar_one_or_none()
+    return claimed is not None
+
+
+async def ingest_oru(db: AsyncSession, message: ORUMessage) -> int:
+    """Apply a parsed ORU^R01 via the batch lab path (one commit). Returns the number of results stored.
+
+    A retransmit of an already applied message stores nothing and returns 0.
+    """
+    if not await _claim_message(db, message):
+        await db.rollback()
+        logger.info(
+            "HL7 ORU %s from %s/%s already applied, ignoring retransmit",
+            message.control_id, message.sending_application, message.sending_facility,
+        )
+        return 0
+    patient_id = await _resolve_patient(db, message.patient_identifiers)
+    stored = 0
+    for panel in message.panels:
+        if not panel.results:
+            continue
+        for result in panel.results:
+            result.patient_id = patient_id
+        await create_lab_results_batch(
+            db,
+            patient_id,
+            panel.results,
+            order_number=panel.order_number,
+            collected_at=panel.collected_at,
+            commit=False,
+        )
+        stored += len(panel.results)
+    await db.commit()
+    logger.info(
+        "HL7 ORU %s: %d results stored for patient %s (%d OBX skipped)",
+        message.control_id, stored, patient_id, message.skipped,
+    )
+    return stored
+
+
+def patient_partition_key(raw: str) -> str | None:
+    """First PID-3 identifier of a raw message — MLLP lane key, so one patient's
+    messages are applied one after another (trends compare against the previous value)."""
+    segments = re.split(r"\r\n|\r|\n", raw.strip())
+    if not segments or len(segments[0]) < 8 or not segments[0].startswith("MSH"):
+        return None
+    field_sep = segments[0][3]
+    component_sep, repetition_sep = (segments[0].split(field_sep)[1] + "^~")[:2]
+    for segment in segments[1:]:
+        values = segment.split(field_sep)
+        if values[0] == "PID" and len(values) > 3:
+            identifier = values[3].split(repetition_sep)[0].split(component_sep)[0].strip()
+            return identifier or None
+    return None
+
+
+def _control_id_of(raw: str) -> str:
+    """MSH-10 of an unparseable message (best effort, for the AR)."""
+    header = raw.lstrip().split("\r", 1)[0].split("\n", 1)[0]
+    parts = header.split(header[3]) if len(header) > 3 else []
+    return parts[9] if len(parts) > 9 else ""
+
+
+async def handle_hl7_message(session_factory: async_sessionmaker[AsyncSession], raw: str) -> str:
+    """MLLP handler: parse, ingest in its own session, return the ACK.
+
+    AA only after commit (or for a retransmit of an applied message); AR for
+    malformed messages; AE for valid messages that could not be applied
+    (unknown patient, DB error) — the sender retries those.
+    """
+    try:
+        message = parse_oru_r01(raw)
+    except HL7ParseError as exc:
+        logger.warning("HL7 message rejected: %s", exc)
+        return build_ack(_control_id_of(raw), "AR", text=str(exc))
+
+    ack = {
+        "receiving_application": message.sending_application,
+        "receiving_facility": message.sending_facility,
+        "version": message.version,
+    }
+    try:
+        async with session_factory() as db:
+            await ingest_oru(db, message)
+    except HL7ProcessingError as exc:
+        logger.warning("HL7 ORU %s not applied: %s", message.control_id, exc)
+        return build_ack(message.control_id, "AE", text=str(exc), **ack)
+    except Exception as exc:
+        logger.error("HL7 ORU %s failed: %s", message.control_id, exc, exc_info=True)
+        return build_ack(message.control_id, "AE", text="Processing error", **ack)
+    return build_ack(message.control_id, "AA", **ack)
@@ -71,7 +71,7 @@ async def get_home_visit(db: AsyncSession, visit_id: uuid.UUID) -> HomeVisit | N
 async def create_home_visit(db: AsyncSession, data: HomeVisitCreate) -> HomeVisit:
     visit = HomeVisit(**data.model_dump())
     db.add(visit)
-    await db.commit()
+    await db.flush()
     await db.refresh(visit)
     logger.info("HomeVisit created: %s patient=%s date=%s", visit.id, visit.patient_id, visit.planned_date)
 
@@ -80,7 +80,8 @@ async def create_home_visit(db: AsyncSession, data: HomeVisitCreate) -> HomeVisi
         "patient_id": str(visit.patient_id),
         "planned_date": str(visit.planned_date),
         "assigned_nurse_name": visit.assigned_nurse_name,
-    })
+    }, session=db)
+    await db.commit()
     return visit
 
 
@@ -97,7 +98,7 @@ async def update_home_visit(db: AsyncSession, visit_id: uuid.UUID, data: HomeVis
     if visit.status == "completed" and visit.actual_arrival and visit.actual_departure:
         visit.visit_duration_minutes = int((visit.actual_departure - visit.actual_arrival).total_seconds() / 60)
 
-    await db.commit()
+    await db.flush()
     await db.refresh(visit)
 
     # Emit status change event
@@ -107,9 +108,10 @@ async def update_home_visit(db: AsyncSession, visit_id: uuid.UUID, data: HomeVis
             "patient_id": str(visit.patient_id),
             "old_status": old_status,
             "new_status": visit.status,
-        })
+        }, session=db)
 
     logger.info("HomeVisit updated: %s status=%s", visit.id, visit.status)
+    await db.commit()
     return visit
 
 
@@ -1,15 +1,68 @@
-"""ICD-10 Katalog — Such-Service."""
+"""ICD-10 Katalog — Such-Service.
+
+Ranking: exakter Code, Code-Präfix, Bezeichnung beginnt mit dem Suchbegriff,
+danach Trigramm-Wortähnlichkeit. Gesucht wird auf dem gefalteten
+``search_key`` (Umlaute/Diakritika, siehe ``catalog_search.fold``) über den
+GIN-Trigramm-Index. Ist der In-Process-Index geladen, beantwortet er die
+Präfix-Suche; liefert er weniger als ``limit`` Treffer, ergänzt die
+Trigramm-Abfrage Teilwort- und Tippfehler-Treffer ("betes", "diabtes").
+"""
 
 import logging
 
-from sqlalchemy import or_, select, func
+from sqlalchemy import case, func, literal, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.domain.models.icd10 import Icd10Code
+from src.domain.services.catalog_search import (
+    RANK_CODE_PREFIX,
+    RANK_EXACT_CODE,
+    RANK_TITLE_PREFIX,
+    RANK_WORD_PREFIX,
+    escape_like,
+    fold,
+    get_index,
+    merge_hits,
+    normalize_icd_code,
+)
 
 logger = logging.getLogger("pdms.icd10")
 
 
+def icd10_payload(r: Icd10Code) -> dict:
+    return {
+        "code": r.code,
+        "title": r.title,
+        "chapter": r.chapter,
+        "category": r.category,
+    }
+
+
+def build_icd10_query(query: str, *, limit: int):
+    """SELECT mit Trigramm-Filter und Relevanz-Sortierung."""
+    folded = fold(query.strip())
+    code = normalize_icd_code(query)
+    contains = f"%{escape_like(folded)}%"
+
+    matches = [Icd10Code.search_key.like(contains), Icd10Code.search_key.op("%>")(folded)]
+    ranks = [(func.pdms_catalog_fold(Icd10Code.title).like(f"{escape_like(folded)}%"), RANK_TITLE_PREFIX)]
+    if code:
+        code_prefix = Icd10Code.code.like(f"{escape_like(code)}%")
+        matches.append(code_prefix)
+        ranks[:0] = [(Icd10Code.code == code, RANK_EXACT_CODE), (code_prefix, RANK_CODE_PREFIX)]
+
+    return (
+        select(Icd10Code)
+        .where(or_(*matches))
+        .order_by(
+            case(*ranks, else_=RANK_WORD_PREFIX),
+            func.word_similarity(literal(folded), Icd10Code.search_key).desc(),
+            Icd10Code.code.asc(),
+        )
+        .limit(limit)
+    )
+
+
 async def search_icd10(
     db: AsyncSession,
     query: str,
@@ -21,33 +74,16 @@ async def search_icd10(
     if not q or len(q) < 2:
         return []
 
-    pattern = f"%{q}%"
-
-    stmt = (
-        select(Icd10Code)
-        .where(
-            or_(
-                Icd10Code.code.ilike(pattern),
-                Icd10Code.title.ilike(pattern),
-            )
-        )
-        # Exakte Code-Treffer zuerst, dann alphabetisch
-        .order_by(
-            Icd10Code.code.asc(),
-        )
-        .limit(limit)
-    )
+    index_hits: list[dict] = []
+    index = get_index("icd10")
+    if index is not None:
+        code = normalize_icd_code(q)
+        index_hits = index.search(code or q, limit=limit, code_query=code)
+        if len(index_hits) >= limit:
+            return index_hits
 
-    rows = (await db.execute(stmt)).scalars().all()
-    return [
-        {
-            "code": r.code,
-            "title": r.title,
-            "chapter": r.chapter,
-            "category": r.category,
-        }
-        for r in rows
-    ]
+    rows = (await db.execute(build_icd10_query(q, limit=limit))).scalars().all()
+    return merge_hits(index_hits, [icd10_payload(r) for r in rows], key=lambda hit: hit["code"], limit=limit)
 
 
 async def count_icd10(db: AsyncSession) -> int:
@@ -1,14 +1,21 @@
-"""Lab result service — CRUD, trend calculation, batch import."""
+"""Lab result service — CRUD, trend calculation, batch import.
+
+The latest value per (patient, analyte) is kept in the ``lab_latest``
+projection: upserted with every insert, patched on corrections and
+refilled on delete. Summary and previous-value lookups read it by primary
+key instead of scanning the lab history.
+"""
 
 import logging
 import uuid
 from datetime import UTC, datetime
 
-from sqlalchemy import func, select
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.domain.events.routing_keys import RoutingKeys
-from src.domain.models.lab import LabResult
+from src.domain.models.lab import LabLatest, LabResult
 from src.domain.schemas.lab import (
     ANALYTES,
     LabResultCreate,
@@ -18,6 +25,12 @@ from src.infrastructure.rabbitmq import emit_event
 
 logger = logging.getLogger("pdms.lab")
 
+CRITICAL_FLAGS = ("HH", "LL")
+LATEST_COLUMNS = (
+    "display_name", "value", "unit", "ref_min", "ref_max",
+    "flag", "interpretation", "trend", "category", "resulted_at",
+)
+
 
 # ─── Interpretation helpers ─────────────────────────────────────
 
@@ -92,87 +105,134 @@ async def get_lab_result(db: AsyncSession, result_id: uuid.UUID) -> LabResult |
 
 async def _get_previous_value(db: AsyncSession, patient_id: uuid.UUID, analyte: str) -> float | None:
     """Get the most recent value for this analyte (for trend computation)."""
-    q = (
-        select(LabResult.value)
+    q = select(LabLatest.value).where(LabLatest.patient_id == patient_id, LabLatest.analyte == analyte)
+    return (await db.execute(q)).scalar_one_or_none()
+
+
+# ─── lab_latest projection ──────────────────────────────────────
+
+async def _upsert_latest(db: AsyncSession, results: list[LabResult]) -> None:
+    """Move the projection forward to the given (flushed) results.
+
+    Never moves it backwards: a late-arriving older result leaves a newer
+    entry in place.
+    """
+    latest: dict[tuple[uuid.UUID, str], LabResult] = {}
+    for result in results:
+        current = latest.get((result.patient_id, result.analyte))
+        if current is None or result.resulted_at >= current.resulted_at:
+            latest[(result.patient_id, result.analyte)] = result
+    if not latest:
+        return
+    stmt = pg_insert(LabLatest).values([
+        {"patient_id": r.patient_id, "analyte": r.analyte, "result_id": r.id, **{c: getattr(r, c) for c in LATEST_COLUMNS}}
+        for r in latest.values()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[LabLatest.patient_id, LabLatest.analyte],
+        set_={c: stmt.excluded[c] for c in ("result_id", *LATEST_COLUMNS)},
+        where=LabLatest.resulted_at <= stmt.excluded.resulted_at,
+    )
+    await db.execute(stmt)
+
+
+async def _refill_latest(db: AsyncSession, patient_id: uuid.UUID, analyte: str) -> None:
+    """Re-derive the projection row from the history (after a delete)."""
+    newest = (
+        select(
+            LabResult.patient_id, LabResult.analyte, LabResult.id,
+            *(getattr(LabResult, c) for c in LATEST_COLUMNS),
+        )
         .where(LabResult.patient_id == patient_id, LabResult.analyte == analyte)
-        .order_by(LabResult.resulted_at.desc())
+        .order_by(LabResult.resulted_at.desc(), LabResult.id.desc())
         .limit(1)
     )
-    row = (await db.execute(q)).scalar_one_or_none()
-    return row
+    await db.execute(
+        pg_insert(LabLatest)
+        .from_select(["patient_id", "analyte", "result_id", *LATEST_COLUMNS], newest)
+        .on_conflict_do_nothing()
+    )
 
 
-async def create_lab_result(
-    db: AsyncSession,
-    data: LabResultCreate,
-    ordered_by: uuid.UUID | None = None,
-) -> LabResult:
-    """Create a single lab result with auto-interpretation and trend."""
-    # Look up catalogue defaults
+def _result_values(data: LabResultCreate, previous: float | None, ordered_by: uuid.UUID | None) -> dict:
+    """Column values for a new result: catalogue defaults, interpretation, trend."""
     catalogue = ANALYTES.get(data.analyte, {})
-    display_name = data.display_name or catalogue.get("display", data.analyte)
-    unit = data.unit or catalogue.get("unit", "")
     ref_min = data.ref_min if data.ref_min is not None else catalogue.get("ref_min")
     ref_max = data.ref_max if data.ref_max is not None else catalogue.get("ref_max")
-    loinc = data.loinc_code or catalogue.get("loinc")
 
     # Auto-interpret
     flag, interpretation = _interpret(data.value, ref_min, ref_max)
     if data.flag:
         flag = data.flag  # Explicit override
 
-    # Trend from previous
+    return {
+        "patient_id": data.patient_id,
+        "encounter_id": data.encounter_id,
+        "analyte": data.analyte,
+        "loinc_code": data.loinc_code or catalogue.get("loinc"),
+        "display_name": data.display_name or catalogue.get("display", data.analyte),
+        "value": data.value,
+        "unit": data.unit or catalogue.get("unit", ""),
+        "ref_min": ref_min,
+        "ref_max": ref_max,
+        "flag": flag,
+        "interpretation": interpretation,
+        "trend": _trend_symbol(data.value, previous),
+        "previous_value": previous,
+        "category": data.category or catalogue.get("category", "chemistry"),
+        "sample_type": data.sample_type,
+        "collected_at": data.collected_at,
+        "ordered_by": ordered_by,
+        "order_number": data.order_number,
+        "notes": data.notes,
+    }
+
+
+async def create_lab_result(
+    db: AsyncSession,
+    data: LabResultCreate,
+    ordered_by: uuid.UUID | None = None,
+) -> LabResult:
+    """Create a single lab result with auto-interpretation and trend."""
     prev = await _get_previous_value(db, data.patient_id, data.analyte)
-    trend = _trend_symbol(data.value, prev)
-
-    result = LabResult(
-        patient_id=data.patient_id,
-        encounter_id=data.encounter_id,
-        analyte=data.analyte,
-        loinc_code=loinc,
-        display_name=display_name,
-        value=data.value,
-        unit=unit,
-        ref_min=ref_min,
-        ref_max=ref_max,
-        flag=flag,
-        interpretation=interpretation,
-        trend=trend,
-        previous_value=prev,
-        category=data.category or catalogue.get("category", "chemistry"),
-        sample_type=data.sample_type,
-        collected_at=data.collected_at,
-        ordered_by=ordered_by,
-        order_number=data.order_number,
-        notes=data.notes,
-    )
+    result = LabResult(**_result_values(data, prev, ordered_by), resulted_at=data.resulted_at or datetime.now(UTC))
     db.add(result)
-    await db.commit()
+    await db.flush()
+    await _upsert_latest(db, [result])
     await db.refresh(result)
 
     await emit_event(RoutingKeys.LAB_RESULTED, {
         "patient_id": str(data.patient_id),
         "analyte": data.analyte,
         "value": data.value,
-        "flag": flag,
-        "interpretation": interpretation,
-    })
+        "flag": result.flag,
+        "interpretation": result.interpretation,
+    }, session=db)
 
     # Emit critical alert for HH/LL results
-    if flag in ("HH", "LL"):
+    if result.flag in CRITICAL_FLAGS:
         await emit_event(RoutingKeys.LAB_CRITICAL, {
             "patient_id": str(data.patient_id),
             "analyte": data.analyte,
-            "display_name": display_name,
+            "display_name": result.display_name,
             "value": data.value,
-            "unit": unit,
-            "flag": flag,
-        })
+            "unit": result.unit,
+            "flag": result.flag,
+        }, session=db)
 
-    logger.info("Lab result created: %s=%s %s for patient %s", data.analyte, data.value, unit, data.patient_id)
+    logger.info("Lab result created: %s=%s %s for patient %s", data.analyte, data.value, result.unit, data.patient_id)
+    await db.commit()
     return result
 
 
+async def _get_previous_values(db: AsyncSession, patient_id: uuid.UUID, analytes: set[str]) -> dict[str, float]:
+    """Most recent value per analyte — one primary-key read on ``lab_latest``."""
+    q = select(LabLatest.analyte, LabLatest.value).where(
+        LabLatest.patient_id == patient_id, LabLatest.analyte.in_(analytes)
+    )
+    return {analyte: value for analyte, value in (await db.execute(q)).all()}
+
+
 async def create_lab_results_batch(
     db: AsyncSession,
     patient_id: uuid.UUID,
@@ -183,9 +243,16 @@ async def create_lab_results_batch(
     collected_at: datetime | None = None,
     sample_type: str | None = None,
     ordered_by: uuid.UUID | None = None,
+    commit: bool = True,
 ) -> list[LabResult]:
-    """Create multiple results from one blood draw / order."""
-    created = []
+    """Create multiple results from one blood draw / order.
+
+    Set-based: one query for all previous values, one multi-row INSERT,
+    one commit, one ``lab.resulted`` batch event (plus one ``lab.critical``
+    if the panel contains HH/LL values), independent of the panel size.
+    With ``commit=False`` the caller commits (several panels in one
+    transaction, e.g. an HL7 message with multiple OBR groups).
+    """
     for data in results:
         # Apply batch defaults
         if not data.encounter_id:
@@ -198,9 +265,42 @@ async def create_lab_results_batch(
             data.sample_type = sample_type
         data.patient_id = patient_id
 
-        result = await create_lab_result(db, data, ordered_by=ordered_by)
-        created.append(result)
+    previous = await _get_previous_values(db, patient_id, {data.analyte for data in results})
+    now = datetime.now(UTC)
+    rows = []
+    for data in results:
+        values = _result_values(data, previous.get(data.analyte), ordered_by)
+        # resulted_at from the source (e.g. HL7 OBX-14), else the import time
+        rows.append({**values, "resulted_at": data.resulted_at or now})
+        # Same analyte twice in one panel: the later one trends against the earlier
+        previous[data.analyte] = data.value
+
+    created = list(await db.scalars(insert(LabResult).returning(LabResult, sort_by_parameter_order=True), rows))
+    await _upsert_latest(db, created)
+
+    await emit_event(RoutingKeys.LAB_RESULTED, {
+        "patient_id": str(patient_id),
+        "order_number": order_number,
+        "count": len(rows),
+        "results": [
+            {"analyte": r["analyte"], "value": r["value"], "flag": r["flag"], "interpretation": r["interpretation"]}
+            for r in rows
+        ],
+    }, session=db)
 
+    critical = [r for r in rows if r["flag"] in CRITICAL_FLAGS]
+    if critical:
+        await emit_event(RoutingKeys.LAB_CRITICAL, {
+            "patient_id": str(patient_id),
+            "order_number": order_number,
+            "results": [
+                {k: r[k] for k in ("analyte", "display_name", "value", "unit", "flag")} for r in critical
+            ],
+        }, session=db)
+
+    if commit:
+        await db.commit()
+    logger.info("Lab batch created: %d results (%d critical) for patient %s", len(rows), len(critical), patient_id)
     return created
 
 
@@ -227,18 +327,29 @@ async def update_lab_result(
     if "validated_by" in updates:
         result.validated_by = updates["validated_by"]
 
+    if "value" in updates or "flag" in updates:
+        # Correction of the current value: patch the projection row in place
+        await db.execute(
+            update(LabLatest)
+            .where(LabLatest.result_id == result.id)
+            .values(value=result.value, flag=result.flag, interpretation=result.interpretation)
+        )
     await db.commit()
     await db.refresh(result)
     return result
 
 
-async def delete_lab_result(db: AsyncSession, result_id: uuid.UUID) -> bool:
+async def delete_lab_result(db: AsyncSession, result_id: uuid.UUID) -> LabResult | None:
+    """Delete a result; returns it (for cache invalidation) or None if unknown."""
     result = await get_lab_result(db, result_id)
     if not result:
-        return False
+        return None
     await db.delete(result)
+    # ON DELETE CASCADE dropped the projection row if this was the latest value
+    await db.flush()
+    await _refill_latest(db, result.patient_id, result.analyte)
     await db.commit()
-    return True
+    return result
 
 
 # ─── Trend (for chart) ─────────────────────────────────────────
@@ -283,19 +394,10 @@ async def get_lab_trend(
 
 async def get_lab_summary(db: AsyncSession, patient_id: uuid.UUID) -> list[dict]:
     """Return the latest result per analyte for a patient (for mini-table)."""
-    # Subquery: max resulted_at per analyte
-    sub = (
-        select(LabResult.analyte, func.max(LabResult.resulted_at).label("max_at"))
-        .where(LabResult.patient_id == patient_id)
-        .group_by(LabResult.analyte)
-        .subquery()
-    )
-
     q = (
-        select(LabResult)
-        .join(sub, (LabResult.analyte == sub.c.analyte) & (LabResult.resulted_at == sub.c.max_at))
-        .where(LabResult.patient_id == patient_id)
-        .order_by(LabResult.category, LabResult.display_name)
+        select(LabLatest)
+        .where(LabLatest.patient_id == patient_id)
+        .order_by(LabLatest.category, LabLatest.display_name)
     )
     rows = (await db.execute(q)).scalars().all()
 
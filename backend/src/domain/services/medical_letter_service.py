@@ -56,7 +56,7 @@ async def create_medical_letter(
         author_id=author_id,
     )
     db.add(letter)
-    await db.commit()
+    await db.flush()
     await db.refresh(letter)
     logger.info("Arztbrief erstellt: %s (%s) — Patient %s", letter.id, data.letter_type, data.patient_id)
 
@@ -65,8 +65,9 @@ async def create_medical_letter(
         "patient_id": str(letter.patient_id),
         "letter_type": letter.letter_type,
         "author_id": str(author_id) if author_id else None,
-    })
+    }, session=db)
 
+    await db.commit()
     return letter
 
 
@@ -142,7 +143,7 @@ async def send_medical_letter(
     letter.sent_at = datetime.now(UTC)
     letter.sent_via = send_via
     letter.updated_at = datetime.now(UTC)
-    await db.commit()
+    await db.flush()
     await db.refresh(letter)
     logger.info("Arztbrief versendet: %s via %s", letter.id, send_via)
 
@@ -150,8 +151,9 @@ async def send_medical_letter(
         "letter_id": str(letter.id),
         "patient_id": str(letter.patient_id),
         "sent_via": send_via,
-    })
+    }, session=db)
 
+    await db.commit()
     # TODO: HIN-Mail Integration für send_via == "hin_mail"
     return letter
 
@@ -39,7 +39,7 @@ async def create_medication(
         "medication_name": med.name,
         "dose": med.dose,
         "prescribed_by": str(prescribed_by),
-    })
+    }, session=session)
 
     return med
 
@@ -121,7 +121,7 @@ async def discontinue_medication(
         "patient_id": str(med.patient_id),
         "medication_name": med.name,
         "reason": reason,
-    })
+    }, session=session)
 
     return med
 
@@ -153,7 +153,7 @@ async def record_administration(
         "dose_unit": data.dose_unit,
         "status": data.status,
         "administered_by": str(administered_by),
-    })
+    }, session=session)
 
     return admin
 
@@ -1,15 +1,82 @@
-"""Medikamenten-Katalog — Such-Service."""
+"""Medikamenten-Katalog — Such-Service.
+
+Ranking: exakter ATC-Code, ATC-Präfix, Handelsname/Wirkstoff beginnt mit
+dem Suchbegriff, danach Trigramm-Wortähnlichkeit auf dem gefalteten
+``search_key`` (GIN-Trigramm-Index). Ist der In-Process-Index geladen,
+beantwortet er die Präfix-Suche; liefert er weniger als ``limit`` Treffer,
+ergänzt die Trigramm-Abfrage Teilwort- und Tippfehler-Treffer.
+"""
 
 import logging
 
-from sqlalchemy import or_, select, func
+from sqlalchemy import case, func, literal, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.domain.models.medikament_katalog import MedikamentKatalog
+from src.domain.services.catalog_search import (
+    RANK_CODE_PREFIX,
+    RANK_EXACT_CODE,
+    RANK_TITLE_PREFIX,
+    RANK_WORD_PREFIX,
+    escape_like,
+    fold,
+    get_index,
+    merge_hits,
+)
 
 logger = logging.getLogger("pdms.medikament_katalog")
 
 
+def medikament_payload(r: MedikamentKatalog) -> dict:
+    return {
+        "name": r.name,
+        "wirkstoff": r.wirkstoff,
+        "hersteller": r.hersteller,
+        "dosis": r.dosis,
+        "form": r.form,
+        "route": r.route,
+        "route_label": r.route_label,
+        "atc_code": r.atc_code,
+        "kategorie": r.kategorie,
+    }
+
+
+def build_medikamente_query(query: str, *, limit: int):
+    """SELECT mit Trigramm-Filter und Relevanz-Sortierung."""
+    folded = fold(query.strip())
+    atc = query.strip().upper()
+    atc_prefix = MedikamentKatalog.atc_code.like(f"{escape_like(atc)}%")
+    word_prefix = f"{escape_like(folded)}%"
+
+    return (
+        select(MedikamentKatalog)
+        .where(
+            or_(
+                MedikamentKatalog.search_key.like(f"%{escape_like(folded)}%"),
+                MedikamentKatalog.search_key.op("%>")(folded),
+                atc_prefix,
+            )
+        )
+        .order_by(
+            case(
+                (MedikamentKatalog.atc_code == atc, RANK_EXACT_CODE),
+                (atc_prefix, RANK_CODE_PREFIX),
+                (
+                    or_(
+                        func.pdms_catalog_fold(MedikamentKatalog.name).like(word_prefix),
+                        func.pdms_catalog_fold(MedikamentKatalog.wirkstoff).like(word_prefix),
+                    ),
+                    RANK_TITLE_PREFIX,
+                ),
+                else_=RANK_WORD_PREFIX,
+            ),
+            func.word_similarity(literal(folded), MedikamentKatalog.search_key).desc(),
+            MedikamentKatalog.name.asc(),
+        )
+        .limit(limit)
+    )
+
+
 async def search_medikamente(
     db: AsyncSession,
     query: str,
@@ -21,37 +88,21 @@ async def search_medikamente(
     if not q or len(q) < 2:
         return []
 
-    pattern = f"%{q}%"
+    index_hits: list[dict] = []
+    index = get_index("medikamente")
+    if index is not None:
+        index_hits = index.search(q, limit=limit)
+        if len(index_hits) >= limit:
+            return index_hits
 
-    stmt = (
-        select(MedikamentKatalog)
-        .where(
-            or_(
-                MedikamentKatalog.name.ilike(pattern),
-                MedikamentKatalog.wirkstoff.ilike(pattern),
-                MedikamentKatalog.atc_code.ilike(pattern),
-            )
-        )
-        .order_by(MedikamentKatalog.name.asc())
-        .limit(limit)
+    rows = (await db.execute(build_medikamente_query(q, limit=limit))).scalars().all()
+    return merge_hits(
+        index_hits,
+        [medikament_payload(r) for r in rows],
+        key=lambda hit: tuple(hit.values()),
+        limit=limit,
     )
 
-    rows = (await db.execute(stmt)).scalars().all()
-    return [
-        {
-            "name": r.name,
-            "wirkstoff": r.wirkstoff,
-            "hersteller": r.hersteller,
-            "dosis": r.dosis,
-            "form": r.form,
-            "route": r.route,
-            "route_label": r.route_label,
-            "atc_code": r.atc_code,
-            "kategorie": r.kategorie,
-        }
-        for r in rows
-    ]
-
 
 async def count_medikamente(db: AsyncSession) -> int:
     """Anzahl Einträge im Medikamenten-Katalog."""
@@ -52,7 +52,7 @@ async def create_nursing_diagnosis(
         diagnosed_by=diagnosed_by,
     )
     db.add(diagnosis)
-    await db.commit()
+    await db.flush()
     await db.refresh(diagnosis)
     logger.info("Pflegediagnose erstellt: %s '%s' — Patient %s", diagnosis.id, data.title, data.patient_id)
 
@@ -61,8 +61,9 @@ async def create_nursing_diagnosis(
         "patient_id": str(diagnosis.patient_id),
         "title": diagnosis.title,
         "nanda_code": diagnosis.nanda_code,
-    })
+    }, session=db)
 
+    await db.commit()
     return diagnosis
 
 
@@ -129,7 +129,7 @@ async def create_nursing_entry(
         "category": data.category,
         "title": data.title,
         "recorded_by": str(recorded_by),
-    })
+    }, session=session)
 
     return entry
 
@@ -229,7 +229,7 @@ async def create_assessment(
         "max_score": max_score,
         "risk_level": risk_level,
         "assessed_by": str(assessed_by),
-    })
+    }, session=session)
 
     return assessment
 
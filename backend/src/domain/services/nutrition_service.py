@@ -51,7 +51,7 @@ async def create_nutrition_order(
 ) -> NutritionOrder:
     order = NutritionOrder(**data.model_dump(), ordered_by=ordered_by)
     db.add(order)
-    await db.commit()
+    await db.flush()
     await db.refresh(order)
     logger.info("Ernährungsverordnung erstellt: %s (%s) — Patient %s", order.id, data.diet_type, data.patient_id)
 
@@ -59,8 +59,9 @@ async def create_nutrition_order(
         "order_id": str(order.id),
         "patient_id": str(order.patient_id),
         "diet_type": order.diet_type,
-    })
+    }, session=db)
 
+    await db.commit()
     return order
 
 
@@ -75,7 +75,7 @@ async def report_reading(
     device.last_seen_at = now
     device.is_online = True
 
-    await db.commit()
+    await db.flush()
     await db.refresh(device)
     logger.info("Device reading: %s %s%s", device.device_name, value, unit)
 
@@ -90,7 +90,7 @@ async def report_reading(
                 "value": value,
                 "threshold": device.alert_threshold_high,
                 "direction": "high",
-            })
+            }, session=db)
         elif device.alert_threshold_low and numeric_val < float(device.alert_threshold_low):
             await emit_event(RoutingKeys.DEVICE_ALERT, {
                 "device_id": str(device.id),
@@ -99,10 +99,11 @@ async def report_reading(
                 "value": value,
                 "threshold": device.alert_threshold_low,
                 "direction": "low",
-            })
+            }, session=db)
     except (ValueError, TypeError):
         pass  # Non-numeric reading, skip threshold check
 
+    await db.commit()
     return device
 
 
@@ -112,7 +113,7 @@ async def mark_offline(db: AsyncSession, device_id: uuid.UUID) -> RemoteDevice |
     if not device:
         return None
     device.is_online = False
-    await db.commit()
+    await db.flush()
     await db.refresh(device)
 
     await emit_event(RoutingKeys.DEVICE_OFFLINE, {
@@ -120,5 +121,6 @@ async def mark_offline(db: AsyncSession, device_id: uuid.UUID) -> RemoteDevice |
         "patient_id": str(device.patient_id),
         "device_type": device.device_type,
         "device_name": device.device_name,
-    })
+    }, session=db)
+    await db.commit()
     return device
@@ -64,15 +64,16 @@ async def miss_medication(db: AsyncSession, log_id: uuid.UUID) -> SelfMedication
     if not log:
         return None
     log.status = "missed"
-    await db.commit()
+    await db.flush()
     await db.refresh(log)
 
     await emit_event(RoutingKeys.SELF_MED_MISSED, {
         "log_id": str(log.id),
         "patient_id": str(log.patient_id),
         "medication_id": str(log.medication_id),
-    })
+    }, session=db)
     logger.info("SelfMed missed: %s", log.id)
+    await db.commit()
     return log
 
 
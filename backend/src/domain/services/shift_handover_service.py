@@ -56,7 +56,7 @@ async def create_shift_handover(
         handed_over_by=handed_over_by,
     )
     db.add(handover)
-    await db.commit()
+    await db.flush()
     await db.refresh(handover)
     logger.info("Schichtübergabe erstellt: %s (%s) — Patient %s", handover.id, data.shift_type, data.patient_id)
 
@@ -65,8 +65,9 @@ async def create_shift_handover(
         "patient_id": str(handover.patient_id),
         "shift_type": handover.shift_type,
         "handover_date": str(handover.handover_date),
-    })
+    }, session=db)
 
+    await db.commit()
     return handover
 
 
@@ -110,7 +110,7 @@ async def start_teleconsult(db: AsyncSession, tc_id: uuid.UUID) -> Teleconsult |
         return None
     tc.status = "active"
     tc.actual_start = datetime.now(UTC)
-    await db.commit()
+    await db.flush()
     await db.refresh(tc)
     logger.info("Teleconsult started: %s", tc.id)
 
@@ -118,7 +118,8 @@ async def start_teleconsult(db: AsyncSession, tc_id: uuid.UUID) -> Teleconsult |
         "teleconsult_id": str(tc.id),
         "patient_id": str(tc.patient_id),
         "physician_name": tc.physician_name,
-    })
+    }, session=db)
+    await db.commit()
     return tc
 
 
@@ -131,7 +132,7 @@ async def end_teleconsult(db: AsyncSession, tc_id: uuid.UUID) -> Teleconsult | N
     tc.actual_end = datetime.now(UTC)
     if tc.actual_start:
         tc.duration_minutes = int((tc.actual_end - tc.actual_start).total_seconds() / 60)
-    await db.commit()
+    await db.flush()
     await db.refresh(tc)
     logger.info("Teleconsult ended: %s duration=%d min", tc.id, tc.duration_minutes or 0)
 
@@ -139,5 +140,6 @@ async def end_teleconsult(db: AsyncSession, tc_id: uuid.UUID) -> Teleconsult | N
         "teleconsult_id": str(tc.id),
         "patient_id": str(tc.patient_id),
         "duration_minutes": tc.duration_minutes,
-    })
+    }, session=db)
+    await db.commit()
     return tc
@@ -76,7 +76,7 @@ async def create_treatment_plan(
         )
         db.add(item)
 
-    await db.commit()
+    await db.flush()
     await db.refresh(plan)
     logger.info("Therapieplan erstellt: %s — Patient %s", plan.id, plan.patient_id)
 
@@ -85,8 +85,9 @@ async def create_treatment_plan(
         "patient_id": str(plan.patient_id),
         "title": plan.title,
         "created_by": str(created_by) if created_by else None,
-    })
+    }, session=db)
 
+    await db.commit()
     return await get_treatment_plan(db, plan.id)  # type: ignore
 
 
@@ -1,17 +1,23 @@
 """VitalSign business logic — recording, alarm checking, aggregation."""
 
+import asyncio
 import logging
 import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass, field
 from datetime import UTC, datetime, timedelta
+from operator import attrgetter
+from typing import NamedTuple
 
-from sqlalchemy import select
+from sqlalchemy import event, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.domain.events.routing_keys import RoutingKeys
-from src.domain.models.clinical import VitalSign
+from src.domain.models.clinical import Alarm, VitalSign
 from src.domain.schemas.vital import VitalSignCreate, VitalSignUpdate
-from src.domain.services.alarm_service import alarm_to_event, check_thresholds
+from src.domain.services.alarm_service import alarm_to_event, check_thresholds, check_thresholds_batch
 from src.infrastructure.rabbitmq import emit_event
+from src.infrastructure.timescale import copy_records
 
 logger = logging.getLogger("pdms.vitals")
 
@@ -32,26 +38,182 @@ async def record_vital(session: AsyncSession, data: VitalSignCreate, recorded_by
         "spo2": vital.spo2,
         "temperature": vital.temperature,
         "respiratory_rate": vital.respiratory_rate,
-    })
+    }, session=session)
 
     # Alarm-Schwellenwerte prüfen
     new_alarms = await check_thresholds(session, vital)
     if new_alarms:
         logger.info(f"🚨 {len(new_alarms)} Alarm(e) ausgelöst für Patient {vital.patient_id}")
+        await _publish_alarms(session, new_alarms)
 
-        # WebSocket-Broadcast an verbundene Clients
-        from src.api.websocket.alarms_ws import broadcast_alarm
-        for alarm in new_alarms:
-            await broadcast_alarm(alarm_to_event(alarm))
+    return vital
 
-        # RabbitMQ Event publizieren
-        for alarm in new_alarms:
-            await emit_event(
-                f"alarm.{alarm.severity}",
-                alarm_to_event(alarm),
-            )
 
-    return vital
+async def _publish_alarms(session: AsyncSession, alarms: list[Alarm]) -> None:
+    """Neue Alarme per RabbitMQ (Outbox) und nach dem Commit per WebSocket verteilen."""
+    events = [alarm_to_event(alarm) for alarm in alarms]
+    for alarm, payload in zip(alarms, events, strict=True):
+        await emit_event(f"alarm.{alarm.severity}", payload, session=session)
+    await _broadcast_after_commit(session, events)
+
+
+# Laufende Post-Commit-Broadcasts (Referenz halten, sonst räumt der GC die Tasks ab)
+_broadcasts: set[asyncio.Task] = set()
+
+
+async def _broadcast_after_commit(session: AsyncSession, events: list[dict]) -> None:
+    """WebSocket-Broadcast erst nach erfolgreichem Commit.
+
+    Ein Upload kann nach bereits geprüften Chunks noch scheitern (422 →
+    Rollback); Pflegekräfte dürfen dann keine Alarme zu Messwerten sehen,
+    die nie gespeichert wurden. Mehrere Aufrufe in derselben Transaktion
+    sammeln ihre Events in ``session.info``.
+    """
+    from src.api.websocket.alarms_ws import broadcast_alarm
+
+    if not isinstance(session, AsyncSession):
+        for payload in events:
+            await broadcast_alarm(payload)
+        return
+
+    sync_session = session.sync_session
+    pending = sync_session.info.get("alarm_broadcasts")
+    if pending is not None:
+        pending.extend(events)
+        return
+    sync_session.info["alarm_broadcasts"] = list(events)
+
+    async def _send(payloads: list[dict]) -> None:
+        for payload in payloads:
+            try:
+                await broadcast_alarm(payload)
+            except Exception as exc:
+                logger.warning("Alarm-Broadcast fehlgeschlagen: %s", exc)
+
+    def _on_commit(sync_session) -> None:
+        payloads = sync_session.info.pop("alarm_broadcasts", [])
+        if not payloads:
+            return
+        task = asyncio.get_running_loop().create_task(_send(payloads))
+        _broadcasts.add(task)
+        task.add_done_callback(_broadcasts.discard)
+
+    def _on_rollback(sync_session) -> None:
+        sync_session.info.pop("alarm_broadcasts", None)
+
+    event.listen(sync_session, "after_commit", _on_commit, once=True)
+    event.listen(sync_session, "after_rollback", _on_rollback, once=True)
+
+
+# ─── Bulk Ingestion ────────────────────────────────────────────
+
+
+class VitalRecord(NamedTuple):
+    """Eine vital_signs-Zeile in COPY-Spaltenreihenfolge."""
+
+    id: uuid.UUID
+    patient_id: uuid.UUID
+    encounter_id: uuid.UUID | None
+    recorded_at: datetime
+    recorded_by: uuid.UUID
+    source: str
+    heart_rate: float | None
+    systolic_bp: float | None
+    diastolic_bp: float | None
+    spo2: float | None
+    temperature: float | None
+    respiratory_rate: float | None
+    gcs: int | None
+    pain_score: int | None
+
+
+@dataclass
+class VitalBatchResult:
+    """Aggregat über einen (ggf. in Chunks geschriebenen) Vital-Upload."""
+
+    inserted: int = 0
+    patient_counts: dict[uuid.UUID, int] = field(default_factory=dict)
+    alarms: list[Alarm] = field(default_factory=list)
+    earliest: datetime | None = None
+    latest: datetime | None = None
+
+
+def _to_record(data: VitalSignCreate, recorded_by: uuid.UUID, now: datetime) -> VitalRecord:
+    recorded_at = data.recorded_at or now
+    if recorded_at.tzinfo is None:
+        recorded_at = recorded_at.replace(tzinfo=UTC)
+    return VitalRecord(
+        uuid.uuid4(),
+        data.patient_id,
+        data.encounter_id,
+        recorded_at,
+        recorded_by,
+        data.source,
+        data.heart_rate,
+        data.systolic_bp,
+        data.diastolic_bp,
+        data.spo2,
+        data.temperature,
+        data.respiratory_rate,
+        data.gcs,
+        data.pain_score,
+    )
+
+
+async def ingest_vitals_batch(
+    session: AsyncSession,
+    readings: Sequence[VitalSignCreate],
+    recorded_by: uuid.UUID,
+    result: VitalBatchResult | None = None,
+) -> VitalBatchResult:
+    """Viele Messwerte per COPY schreiben und in einem Durchgang auf Alarme prüfen.
+
+    Mehrfach mit demselben ``result`` aufrufbar (Chunks eines Streams);
+    Alarm-Events werden in der Transaktion gestaged und erst nach dem Commit
+    per WebSocket verteilt, das aggregierte ``vital.recorded``-Event über
+    ``publish_vitals_batch``.
+    """
+    result = result or VitalBatchResult()
+    if not readings:
+        return result
+
+    now = datetime.now(UTC)
+    records = [_to_record(r, recorded_by, now) for r in readings]
+    await copy_records(session, VitalSign.__table__, VitalRecord._fields, records)
+
+    # Alarmprüfung in Messreihenfolge (Gateways liefern nicht zwingend sortiert)
+    records.sort(key=attrgetter("recorded_at"))
+    new_alarms = await check_thresholds_batch(session, records)
+
+    result.inserted += len(records)
+    for record in records:
+        result.patient_counts[record.patient_id] = result.patient_counts.get(record.patient_id, 0) + 1
+    if result.earliest is None or records[0].recorded_at < result.earliest:
+        result.earliest = records[0].recorded_at
+    if result.latest is None or records[-1].recorded_at > result.latest:
+        result.latest = records[-1].recorded_at
+
+    if new_alarms:
+        logger.info(f"🚨 {len(new_alarms)} Alarm(e) ausgelöst in Vital-Batch ({len(records)} Messwerte)")
+        result.alarms.extend(new_alarms)
+        await _publish_alarms(session, new_alarms)
+
+    return result
+
+
+async def publish_vitals_batch(session: AsyncSession, result: VitalBatchResult, recorded_by: uuid.UUID) -> None:
+    """Ein aggregiertes vital.recorded-Event für den gesamten Upload."""
+    if not result.inserted:
+        return
+    await emit_event(RoutingKeys.VITAL_RECORDED, {
+        "type": "vital.batch",
+        "recorded_by": str(recorded_by),
+        "count": result.inserted,
+        "patients": {str(pid): n for pid, n in result.patient_counts.items()},
+        "earliest": result.earliest.isoformat() if result.earliest else None,
+        "latest": result.latest.isoformat() if result.latest else None,
+        "alarms": len(result.alarms),
+    }, session=session)
 
 
 async def get_vitals(
@@ -82,8 +244,8 @@ async def update_vital(
         return None
 
     update_data = data.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(vital, field, value)
+    for attr, value in update_data.items():
+        setattr(vital, attr, value)
 
     await session.flush()
 
@@ -100,6 +262,6 @@ async def update_vital(
         "respiratory_rate": vital.respiratory_rate,
         "gcs": vital.gcs,
         "pain_score": vital.pain_score,
-    })
+    }, session=session)
 
     return vital
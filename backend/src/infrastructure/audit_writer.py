@@ -0,0 +1,315 @@
+"""Asynchronous batched audit writer.
+
+Request handling only enqueues an audit entry (no DB session, no commit).
+A background task collects entries from a bounded queue and writes them
+with one multi-row INSERT per batch — every ``flush_interval`` or as soon
+as ``batch_size`` entries are waiting.
+
+Completeness (nDSG): entries that cannot be written are never dropped.
+If the queue is full, the writer is not running or a batch insert fails,
+the entries are appended (fsync'ed) to a per-process NDJSON spill file.
+Spill files are replayed on start and after the next successful flush.
+Inserts are idempotent (ON CONFLICT DO NOTHING on the entry id), so an
+entry replayed twice — e.g. after a crash between INSERT and unlinking
+the spill file — is stored once.
+On shutdown the queue is drained; whatever cannot reach the database
+ends up in the spill file.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.domain.models.system import AuditLog
+
+logger = logging.getLogger("pdms.audit")
+
+SPILL_SUFFIX = ".ndjson"
+CLAIM_SUFFIX = ".replaying"
+# A claimed spill file whose mtime is older than this is considered abandoned
+# (the replaying worker touches it after every batch)
+CLAIM_LEASE_SECONDS = 300.0
+
+
+def _to_json(entry: dict[str, Any]) -> str:
+    return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+def _from_json(line: str) -> dict[str, Any]:
+    entry = json.loads(line)
+    entry["id"] = uuid.UUID(entry["id"])
+    entry["user_id"] = uuid.UUID(entry["user_id"])
+    entry["created_at"] = datetime.fromisoformat(entry["created_at"])
+    # Spill files written before patient_id/route existed (migration 023)
+    patient_id = entry.get("patient_id")
+    entry["patient_id"] = uuid.UUID(patient_id) if patient_id else None
+    entry.setdefault("route", None)
+    return entry
+
+
+class AuditWriter:
+    """Bounded queue + batch flusher + spill-to-disk for ``audit_logs``."""
+
+    def __init__(self) -> None:
+        self._queue: asyncio.Queue[dict[str, Any]] | None = None
+        self._task: asyncio.Task | None = None
+        self._inflight: asyncio.Future | None = None
+        self._collecting: list[dict[str, Any]] = []
+        self._session_factory: async_sessionmaker[AsyncSession] | None = None
+        self._spill_dir: Path | None = None
+        self._batch_size = 500
+        self._flush_interval = 0.2
+        self._spill_pending = False
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.spilled = 0
+        self.replayed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+        }
+
+    def configure_spill(self, spill_dir: Path) -> None:
+        spill_dir.mkdir(parents=True, exist_ok=True)
+        self._spill_dir = spill_dir
+
+    async def start(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        spill_dir: Path,
+        queue_size: int,
+        batch_size: int,
+        flush_interval: float,
+    ) -> None:
+        if self.running:
+            return
+        self.configure_spill(spill_dir)
+        self._session_factory = session_factory
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._release_orphaned_claims()
+        self._spill_pending = any(self._spill_files())
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            "Audit writer started (queue=%d, batch=%d, interval=%.0fms)", queue_size, batch_size, flush_interval * 1000
+        )
+
+    async def stop(self) -> None:
+        """Drain the queue (flush or spill everything), then stop."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._inflight is not None:
+            await self._inflight
+        remaining = self._collecting + self._take(self._queue.qsize())
+        self._collecting = []
+        while remaining:
+            await self._flush(remaining[: self._batch_size])
+            remaining = remaining[self._batch_size:]
+        self._queue = None
+        logger.info("Audit writer stopped (written=%d, spilled=%d)", self.written, self.spilled)
+
+    # ─── Producer side ─────────────────────────────────────────
+
+    def enqueue(
+        self,
+        *,
+        user_id: uuid.UUID,
+        user_role: str,
+        action: str,
+        resource_type: str,
+        resource_id: str | None = None,
+        details: dict | None = None,
+        ip_address: str | None = None,
+        patient_id: uuid.UUID | None = None,
+        route: str | None = None,
+    ) -> None:
+        """Queue one audit entry; never blocks the request."""
+        entry = {
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "user_role": user_role,
+            "action": action,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "details": details or {},
+            "ip_address": ip_address,
+            "patient_id": patient_id,
+            "route": route,
+            "created_at": datetime.now(UTC),
+        }
+        self.enqueued += 1
+        if self._queue is None or not self.running:
+            self._spill([entry])
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self._spill([entry])
+
+    # ─── Consumer side ─────────────────────────────────────────
+
+    def _take(self, limit: int) -> list[dict[str, Any]]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        if self._spill_pending:
+            await self.replay_spill()
+        while True:
+            # Entries taken off the queue stay visible to stop() until they are handed to _flush
+            self._collecting = batch = [await self._queue.get()]
+            deadline = time.monotonic() + self._flush_interval
+            while len(batch) < self._batch_size:
+                batch.extend(self._take(self._batch_size - len(batch)))
+                timeout = deadline - time.monotonic()
+                if len(batch) >= self._batch_size or timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except TimeoutError:
+                    break
+            # Shielded: a shutdown during the INSERT must not lose the batch (stop() awaits it)
+            self._inflight = asyncio.ensure_future(self._flush(batch))
+            self._collecting = []
+            flushed = await asyncio.shield(self._inflight)
+            self._inflight = None
+            if flushed and self._spill_pending:
+                await self.replay_spill()
+
+    async def _write(self, rows: list[dict[str, Any]]) -> None:
+        async with self._session_factory() as session:
+            await session.execute(insert(AuditLog).on_conflict_do_nothing(), rows)
+            await session.commit()
+
+    async def _flush(self, batch: list[dict[str, Any]]) -> bool:
+        if not batch:
+            return True
+        if self._session_factory is None:
+            self._spill(batch)
+            return False
+        try:
+            await self._write(batch)
+        except Exception as exc:
+            logger.warning("Audit batch insert failed (%d entries spilled to disk): %s", len(batch), exc)
+            self._spill(batch)
+            return False
+        self.written += len(batch)
+        self.batches += 1
+        return True
+
+    # ─── Spill file ────────────────────────────────────────────
+
+    def _spill_path(self) -> Path:
+        from src.config import settings
+
+        if self._spill_dir is None:
+            self.configure_spill(Path(settings.audit_spill_dir))
+        return self._spill_dir / f"audit-{os.getpid()}{SPILL_SUFFIX}"
+
+    def _spill(self, entries: list[dict[str, Any]], *, count: bool = True) -> None:
+        payload = "".join(_to_json(e) + "\n" for e in entries)
+        with open(self._spill_path(), "a", encoding="utf-8") as fh:
+            fh.write(payload)
+            fh.flush()
+            os.fsync(fh.fileno())
+        if count:
+            self.spilled += len(entries)
+        self._spill_pending = True
+
+    def _spill_files(self) -> list[Path]:
+        if self._spill_dir is None:
+            return []
+        return sorted(self._spill_dir.glob(f"audit-*{SPILL_SUFFIX}"))
+
+    def _release_orphaned_claims(self) -> None:
+        """Hand claims whose lease expired (owner crashed or hung) back to the replay queue.
+
+        Time-based rather than PID-based: PIDs are reused across container
+        restarts and are meaningless for a spill dir shared between hosts.
+        Should the owner still be alive, the second replay is harmless
+        because the INSERT is idempotent.
+        """
+        if self._spill_dir is None:
+            return
+        expired = time.time() - CLAIM_LEASE_SECONDS
+        for claimed in self._spill_dir.glob(f"audit-*{CLAIM_SUFFIX}"):
+            try:
+                if claimed.stat().st_mtime > expired:
+                    continue
+                claimed.rename(self._spill_dir / f"audit-orphan-{uuid.uuid4().hex}{SPILL_SUFFIX}")
+            except FileNotFoundError:
+                continue  # finished or released by another worker meanwhile
+            self._spill_pending = True
+
+    async def replay_spill(self) -> int:
+        """Write spilled entries back to the database; returns the number replayed."""
+        self._release_orphaned_claims()
+        self._spill_pending = False
+        replayed = 0
+        for path in self._spill_files():
+            # Atomic claim: only one worker replays a given file (until its lease expires)
+            claimed = path.with_suffix(f".{uuid.uuid4().hex}{CLAIM_SUFFIX}")
+            try:
+                path.rename(claimed)
+            except FileNotFoundError:
+                continue
+            os.utime(claimed)  # rename keeps the old mtime: start the lease now
+            entries = [_from_json(line) for line in claimed.read_text(encoding="utf-8").splitlines() if line]
+            done = 0
+            try:
+                for start in range(0, len(entries), self._batch_size):
+                    await self._write(entries[start:start + self._batch_size])
+                    done += min(self._batch_size, len(entries) - start)
+                    os.utime(claimed)  # renew the lease
+            except Exception as exc:
+                # Unwritten tail goes back to the spill file for the next attempt
+                logger.warning("Audit spill replay failed, %d entries kept: %s", len(entries) - done, exc)
+                self._spill(entries[done:], count=False)
+                claimed.unlink(missing_ok=True)
+                replayed += done
+                break
+            claimed.unlink(missing_ok=True)
+            replayed += done
+        if replayed:
+            self.replayed += replayed
+            self.written += replayed
+            logger.info("Audit spill replayed: %d entries", replayed)
+        return replayed
+
+
+audit_writer = AuditWriter()
@@ -1,20 +1,59 @@
 """Database engine and session factory."""
 
+import time
+
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from src.config import settings
+from src.infrastructure import query_stats
+from src.infrastructure.metrics import DB_POOL_CHECKOUT, DB_POOL_CONNECTIONS
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long a checkout waits (incl. opening a new connection)."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT.observe(time.perf_counter() - start)
+
 
 engine = create_async_engine(
     settings.database_url,
     echo=settings.log_level == "DEBUG",
+    poolclass=InstrumentedPool,
     pool_size=10,
     max_overflow=20,
 )
 
+
+def _pool_connections() -> dict[tuple[str, ...], float]:
+    pool = engine.sync_engine.pool
+    return {("checked_out",): pool.checkedout(), ("idle",): pool.checkedin()}
+
+
+DB_POOL_CONNECTIONS.callback = _pool_connections
+
+if settings.db_query_stats_enabled:
+    query_stats.install(engine)
+
 AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Dependency: session factory for work detached from the request session.
+
+    Cache loaders (``get_or_load``) may run concurrently with the request's
+    own queries or after ``get_db`` closed its session, so they open a
+    short-lived session of their own.
+    """
+    return AsyncSessionLocal
+
+
 class Base(DeclarativeBase):
     """Base class for all SQLAlchemy models."""
     pass
@@ -80,7 +80,7 @@ async def get_current_user(
             audience=settings.keycloak_client_id,
             issuer=f"{settings.keycloak_url}/realms/{settings.keycloak_realm}",
         )
-        # Store user info in request state for AuditMiddleware
+        # Store user info in request state for ObservabilityMiddleware (audit capture)
         request.state.user_id = payload.get("sub")
         request.state.user_role = (
             payload.get("realm_access", {}).get("roles", ["user"])[0]
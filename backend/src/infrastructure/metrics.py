@@ -0,0 +1,376 @@
+"""Prometheus-compatible instrumentation (counters, gauges, fixed-bucket histograms).
+
+Each worker process keeps plain in-memory series: one dict entry per label
+tuple, histograms as a list of per-bucket counts plus a sum. All updates
+happen on the worker's event loop thread, so no locks are taken on the
+hot path — an ``observe`` is a ``bisect`` and two additions.
+
+Label values must come from a bounded set (route *templates*, HTTP
+methods, status codes, channel names) — never raw paths or IDs.
+
+Multi-worker aggregation (``uvicorn --workers N``): if
+``metrics_multiproc_dir`` is set, every worker writes a snapshot of its
+series to ``<dir>/metrics-<pid>-<start>.json`` every
+``metrics_export_interval_seconds`` (and right before answering a scrape).
+``<start>`` is the process start time, so a later process that reuses a
+PID (worker respawn, container restart with a surviving directory) never
+overwrites an old snapshot and the summed counters cannot decrease.
+A scrape on any worker merges all snapshot files: counters and histograms
+are summed over all files, including those of workers that have exited
+(totals stay monotonic across worker restarts); gauges only over live
+workers (same PID *and* start time).
+"""
+
+import asyncio
+import bisect
+import json
+import logging
+import math
+import os
+import uuid
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger("pdms.metrics")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request / query latencies in seconds (5 ms … 10 s)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Sub-millisecond operations: pool checkout, broker publish (0.1 ms … 2.5 s)
+FAST_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 2.5)
+
+Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values, strict=True)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"kind": self.kind, "help": self.documentation, "labels": list(self.labelnames)}
+
+
+class Counter(_Metric):
+    """Monotonic counter; ``inc(*labelvalues, amount=1)``."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self.values.get(labels, 0.0)
+
+    def samples(self) -> list[list[Any]]:
+        return [[list(labels), value] for labels, value in self.values.items()]
+
+    def snapshot(self) -> dict[str, Any]:
+        return {**super().snapshot(), "samples": self.samples()}
+
+
+class Gauge(Counter):
+    """Current value; ``set``/``inc``/``dec``, or a ``callback`` read at scrape time.
+
+    The callback returns ``{label tuple: value}`` and replaces the stored
+    values — for state that already lives elsewhere (pool size, queue depth).
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        *,
+        callback: Callable[[], dict[Labels, float]] | None = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def set(self, value: float, *labels: str) -> None:
+        self.values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) - amount
+
+    def samples(self) -> list[list[Any]]:
+        if self.callback is not None:
+            try:
+                self.values = dict(self.callback())
+            except Exception as exc:
+                logger.debug("Gauge callback %s failed: %s", self.name, exc)
+        return super().samples()
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; ``observe(value, *labelvalues)``."""
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Iterable[str] = (), *, buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(sorted(buckets))
+        # label tuple → [count per bucket (non-cumulative, last = +Inf)..., sum]
+        self.values: dict[Labels, list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.bounds) + 1) + [0.0]
+        series[bisect.bisect_left(self.bounds, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self.values.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def total(self, *labels: str) -> float:
+        series = self.values.get(labels)
+        return series[-1] if series else 0.0
+
+    def samples(self) -> list[list[Any]]:
+        return [[list(labels), list(series)] for labels, series in self.values.items()]
+
+    def snapshot(self) -> dict[str, Any]:
+        return {**super().snapshot(), "buckets": list(self.bounds), "samples": self.samples()}
+
+
+class Registry:
+    """All metrics of this process, rendered or snapshotted together."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = (), **kwargs: Any) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, **kwargs))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), **kwargs: Any) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, **kwargs))
+
+    def get(self, name: str) -> _Metric | None:
+        return self._metrics.get(name)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def render(self) -> str:
+        return render_snapshot(self.snapshot())
+
+
+def render_snapshot(snapshot: dict[str, dict[str, Any]]) -> str:
+    """Prometheus text exposition format (0.0.4) of a (merged) snapshot."""
+    lines: list[str] = []
+    for name, metric in snapshot.items():
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        labelnames = metric["labels"]
+        if metric["kind"] != "histogram":
+            for labels, value in metric["samples"]:
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+            continue
+        bounds = [*metric["buckets"], math.inf]
+        for labels, series in metric["samples"]:
+            cumulative = 0
+            for bound, count in zip(bounds, series[:-1], strict=True):
+                cumulative += count
+                le = _format_labels([*labelnames, "le"], [*labels, _format_value(bound)])
+                lines.append(f"{name}_bucket{le} {_format_value(cumulative)}")
+            base = _format_labels(labelnames, labels)
+            lines.append(f"{name}_sum{base} {_format_value(series[-1])}")
+            lines.append(f"{name}_count{base} {_format_value(cumulative)}")
+    return "\n".join(lines) + "\n"
+
+
+def merge_snapshots(snapshots: Iterable[tuple[dict[str, Any], bool]]) -> dict[str, Any]:
+    """Sum per-worker snapshots; ``(snapshot, alive)`` — gauges only from live workers."""
+    merged: dict[str, dict[str, Any]] = {}
+    for snapshot, alive in snapshots:
+        for name, metric in snapshot.items():
+            if metric["kind"] == "gauge" and not alive:
+                continue
+            target = merged.setdefault(name, {**metric, "samples": {}})
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                if metric["kind"] == "histogram":
+                    current = target["samples"].get(key)
+                    target["samples"][key] = value if current is None else [a + b for a, b in zip(current, value)]
+                else:
+                    target["samples"][key] = target["samples"].get(key, 0.0) + value
+    for metric in merged.values():
+        metric["samples"] = [[list(labels), value] for labels, value in sorted(metric["samples"].items())]
+    return merged
+
+
+# ─── Multi-worker export ──────────────────────────────────────
+
+
+def _process_start(pid: int) -> str | None:
+    """Start time of ``pid`` in clock ticks since boot (``/proc``); None if not running."""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text(encoding="ascii")
+    except OSError:
+        return None
+    # Field 22 (starttime), counted after the parenthesised command name
+    return stat.rsplit(")", 1)[1].split()[19]
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_alive(pid: int, start: str) -> bool:
+    """Same process that wrote the snapshot: PID running with the recorded start time."""
+    if not Path("/proc/self/stat").exists():  # no procfs (e.g. macOS dev): PID only
+        return _pid_alive(pid)
+    return _process_start(pid) == start
+
+
+class MetricsExporter:
+    """Writes this worker's snapshot to the shared directory; merges all on scrape."""
+
+    def __init__(self, registry: Registry) -> None:
+        self.registry = registry
+        self.directory: Path | None = None
+        self._task: asyncio.Task | None = None
+        self._start = ""
+
+    def configure(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # In the worker itself (not at import time, which may predate a fork)
+        self._start = _process_start(os.getpid()) or uuid.uuid4().hex
+
+    def _path(self) -> Path:
+        return self.directory / f"metrics-{os.getpid()}-{self._start}.json"
+
+    def write(self) -> None:
+        if self.directory is None:
+            return
+        path = self._path()
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.registry.snapshot(), separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def collect(self) -> dict[str, Any]:
+        """Merged snapshot over all workers (or just this one without a directory)."""
+        if self.directory is None:
+            return self.registry.snapshot()
+        self.write()
+        snapshots = []
+        for path in self.directory.glob("metrics-*.json"):
+            try:
+                _prefix, pid, *start = path.stem.split("-", 2)
+                alive = bool(start) and _process_alive(int(pid), start[0])  # pre-start-time files: exited
+                snapshots.append((json.loads(path.read_text(encoding="utf-8")), alive))
+            except (ValueError, OSError) as exc:
+                logger.debug("Skipping metrics snapshot %s: %s", path, exc)
+        return merge_snapshots(snapshots)
+
+    def render(self) -> str:
+        return render_snapshot(self.collect())
+
+    async def start(self, directory: str | Path, interval: float) -> None:
+        self.configure(directory)
+        self.write()
+        self._task = asyncio.create_task(self._run(interval))
+        logger.info("Metrics export to %s every %.0fs", self.directory, interval)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Final counters stay on disk for the aggregate
+        self.write()
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.write()
+            except OSError as exc:
+                logger.warning("Metrics snapshot write failed: %s", exc)
+
+
+# ─── Metrics ──────────────────────────────────────────────────
+
+REGISTRY = Registry()
+exporter = MetricsExporter(REGISTRY)
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "pdms_http_requests_total", "HTTP requests by route template and status code.", ("method", "route", "status")
+)
+HTTP_DURATION = REGISTRY.histogram(
+    "pdms_http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route")
+)
+DB_POOL_CHECKOUT = REGISTRY.histogram(
+    "pdms_db_pool_checkout_seconds", "Time to obtain a connection from the SQLAlchemy pool.", buckets=FAST_BUCKETS
+)
+DB_POOL_CONNECTIONS = REGISTRY.gauge(
+    "pdms_db_pool_connections", "Pooled database connections by state.", ("state",)
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "pdms_cache_requests_total", "Cache lookups by tier (local, valkey) and result (hit, miss, error).", ("tier", "result")
+)
+RABBITMQ_PUBLISH = REGISTRY.histogram(
+    "pdms_rabbitmq_publish_seconds",
+    "Event publish latency (direct: send only, confirm: until broker ack).",
+    ("mode",),
+    buckets=FAST_BUCKETS,
+)
+RABBITMQ_PUBLISH_FAILURES = REGISTRY.counter(
+    "pdms_rabbitmq_publish_failures_total", "Publishes that failed or were nacked.", ("mode",)
+)
+WS_CONNECTIONS = REGISTRY.gauge(
+    "pdms_websocket_connections", "Open WebSocket connections by channel.", ("channel",)
+)
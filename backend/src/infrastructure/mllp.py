@@ -0,0 +1,208 @@
+"""MLLP listener — asyncio TCP server for HL7v2 messages.
+
+Framing (HL7 MLLP release 1): ``<VT> message <FS><CR>``. Every connection
+reads frames and hands them to bounded queues served by a fixed pool of
+worker tasks, so a burst from the lab system is absorbed by the queues and
+then pushes back on the TCP connection instead of spawning unbounded
+tasks or DB sessions.
+
+Each worker owns one queue (lane) and handles its messages one at a time.
+A message goes to the lane chosen by ``partition(message)`` (e.g. the
+patient identifier), so two messages of the same patient are never
+processed concurrently and commit in arrival order; messages without a
+partition key stay on their connection's lane.
+
+ACKs are written per connection in message order, each one as soon as the
+handler returned it. The handler decides the ACK content and is expected
+to return only after its transaction committed; if it raises, no ACK is
+sent and the connection is closed so the sender retransmits.
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+logger = logging.getLogger("pdms.mllp")
+
+START_BLOCK = b"\x0b"
+END_BLOCK = b"\x1c\x0d"
+
+MessageHandler = Callable[[str], Awaitable[str]]
+PartitionKey = Callable[[str], str | None]
+
+
+def frame(message: str) -> bytes:
+    """Wrap a message in MLLP start/end block characters."""
+    return START_BLOCK + message.encode("utf-8") + END_BLOCK
+
+
+def _decode(payload: bytes) -> str:
+    try:
+        return payload.decode("utf-8")
+    except UnicodeDecodeError:
+        # Older lab systems still send ISO-8859-1
+        return payload.decode("latin-1")
+
+
+@dataclass
+class _Job:
+    message: str
+    ack: asyncio.Future
+
+
+class MLLPListener:
+    """MLLP server with N processing workers, each serving its own bounded lane."""
+
+    def __init__(self) -> None:
+        self._server: asyncio.Server | None = None
+        self._lanes: list[asyncio.Queue[_Job]] = []
+        self._partition: PartitionKey | None = None
+        self._next_lane = 0
+        self._workers: list[asyncio.Task] = []
+        self._connections: set[asyncio.Task] = set()
+        self.received = 0
+        self.acked = 0
+        self.failed = 0
+        self.rejected_frames = 0
+
+    @property
+    def port(self) -> int | None:
+        """Bound port (useful with ``port=0``)."""
+        if self._server is None or not self._server.sockets:
+            return None
+        return self._server.sockets[0].getsockname()[1]
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "running": self._server is not None,
+            "connections": len(self._connections),
+            "queue_depth": sum(lane.qsize() for lane in self._lanes),
+            "received": self.received,
+            "acked": self.acked,
+            "failed": self.failed,
+            "rejected_frames": self.rejected_frames,
+        }
+
+    async def start(
+        self,
+        handler: MessageHandler,
+        *,
+        host: str,
+        port: int,
+        workers: int,
+        queue_size: int,
+        max_message_bytes: int,
+        partition: PartitionKey | None = None,
+    ) -> None:
+        if self._server is not None:
+            return
+        workers = max(workers, 1)
+        self._lanes = [asyncio.Queue(maxsize=max(queue_size // workers, 1)) for _ in range(workers)]
+        self._partition = partition
+        self._workers = [asyncio.create_task(self._work(handler, lane)) for lane in self._lanes]
+        self._server = await asyncio.start_server(
+            self._on_connect, host, port, limit=max_message_bytes + len(START_BLOCK) + len(END_BLOCK)
+        )
+        logger.info("MLLP listener on %s:%s (workers=%d, queue=%d)", host, self.port, workers, queue_size)
+
+    async def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.close()
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._server = None
+        self._lanes = []
+        self._workers = []
+
+    def _lane_for(self, message: str, default: int) -> asyncio.Queue[_Job]:
+        key = None
+        if self._partition is not None:
+            try:
+                key = self._partition(message)
+            except Exception:
+                key = None  # malformed message: the handler rejects it
+        return self._lanes[hash(key) % len(self._lanes) if key else default]
+
+    async def _work(self, handler: MessageHandler, lane: asyncio.Queue[_Job]) -> None:
+        while True:
+            job = await lane.get()
+            try:
+                ack = await handler(job.message)
+            except asyncio.CancelledError:
+                job.ack.cancel()
+                raise
+            except Exception as exc:
+                self.failed += 1
+                logger.error("MLLP handler failed: %s", exc, exc_info=True)
+                if not job.ack.done():
+                    job.ack.set_exception(exc)
+            else:
+                if not job.ack.done():
+                    job.ack.set_result(ack)
+            finally:
+                lane.task_done()
+
+    async def _on_connect(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections.add(asyncio.current_task())
+        peer = writer.get_extra_info("peername")
+        own_lane = self._next_lane % len(self._lanes)
+        self._next_lane += 1
+        # Pending ACKs in arrival order, written by a separate task
+        pending: asyncio.Queue[asyncio.Future | None] = asyncio.Queue()
+        ack_writer = asyncio.create_task(self._write_acks(pending, writer))
+        try:
+            while not ack_writer.done():
+                try:
+                    payload = await reader.readuntil(END_BLOCK)
+                except asyncio.IncompleteReadError:
+                    break  # peer closed the connection
+                except asyncio.LimitOverrunError:
+                    self.rejected_frames += 1
+                    logger.warning("MLLP frame from %s exceeds size limit, closing", peer)
+                    break
+                start = payload.find(START_BLOCK)
+                if start < 0:
+                    self.rejected_frames += 1
+                    continue
+                self.received += 1
+                ack = asyncio.get_running_loop().create_future()
+                await pending.put(ack)
+                message = _decode(payload[start + 1:-len(END_BLOCK)])
+                # Blocks when the lane is full → backpressure on this connection
+                await self._lane_for(message, own_lane).put(_Job(message, ack))
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            await pending.put(None)
+            try:
+                await asyncio.wait_for(ack_writer, timeout=30)
+            except (TimeoutError, asyncio.CancelledError):
+                ack_writer.cancel()
+            writer.close()
+            self._connections.discard(asyncio.current_task())
+
+    async def _write_acks(self, pending: asyncio.Queue, writer: asyncio.StreamWriter) -> None:
+        while (ack := await pending.get()) is not None:
+            try:
+                message = await ack
+            except (Exception, asyncio.CancelledError):
+                # No ACK without commit: drop the connection, the sender retransmits
+                writer.close()
+                return
+            writer.write(frame(message))
+            try:
+                await writer.drain()
+            except ConnectionError:
+                return
+            self.acked += 1
+
+
+mllp_listener = MLLPListener()
@@ -0,0 +1,155 @@
+"""Transactional outbox for domain events.
+
+``emit_event(..., session=db)`` stages the event as an ``event_outbox`` row
+in the caller's transaction: it is committed together with the domain
+change and disappears with a rollback. A background relay drains the table
+in ID order to RabbitMQ and deletes rows only after the broker confirmed
+them, giving at-least-once delivery without a broker round-trip on the
+request path. Consumers may see an event twice after a relay crash and
+can dedupe via the AMQP ``message_id`` (= outbox id).
+
+Ordering: rows are published one at a time, in ID order, on a single
+confirm channel, and a batch stops at the first unconfirmed row. Only one
+relay runs at a time across all workers (transaction-scoped advisory
+lock); the others skip the round. Parallel relays would let a later
+event of a patient overtake an earlier one.
+"""
+
+import asyncio
+import logging
+
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.domain.models.system import EventOutbox
+
+logger = logging.getLogger("pdms.outbox")
+
+# pg advisory lock key serialising the relay across workers ("OUTBOX" in ASCII)
+RELAY_LOCK_KEY = 0x4F5554424F58
+
+
+def stage_event(session: AsyncSession, routing_key: str, body: str) -> EventOutbox:
+    """Add an outbox row to the session; it is written with the next flush/commit."""
+    row = EventOutbox(routing_key=routing_key, body=body)
+    session.add(row)
+    if isinstance(session, AsyncSession):
+        # Relay sofort wecken, sobald die Transaktion committed ist
+        sync_session = session.sync_session
+        if not sync_session.info.get("outbox_pending"):
+            sync_session.info["outbox_pending"] = True
+            event.listen(sync_session, "after_commit", _wake_relay, once=True)
+            event.listen(sync_session, "after_rollback", _reset_pending, once=True)
+    return row
+
+
+def _wake_relay(sync_session) -> None:
+    sync_session.info.pop("outbox_pending", None)
+    outbox_relay.wake()
+
+
+def _reset_pending(sync_session) -> None:
+    sync_session.info.pop("outbox_pending", None)
+
+
+class OutboxRelay:
+    """Background task publishing committed outbox rows in batches."""
+
+    def __init__(self) -> None:
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self.relayed = 0
+        self.failed = 0
+
+    def wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        batch_size: int,
+        interval: float,
+    ) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(session_factory, batch_size, interval))
+        logger.info("Outbox relay started (batch=%d, interval=%.1fs)", batch_size, interval)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._wakeup = None
+
+    async def relay_once(self, session_factory: async_sessionmaker[AsyncSession], batch_size: int) -> int:
+        """Publish one batch; returns the number of rows delivered and deleted."""
+        from src.infrastructure.rabbitmq import get_publisher, start_publisher
+
+        publisher = get_publisher()
+        if not publisher.started:
+            await start_publisher()
+
+        async with session_factory() as session:
+            if not (await session.execute(select(func.pg_try_advisory_xact_lock(RELAY_LOCK_KEY)))).scalar():
+                return 0  # another worker is relaying
+            rows = (await session.execute(
+                select(EventOutbox).order_by(EventOutbox.id).limit(batch_size)
+            )).scalars().all()
+            if not rows:
+                return 0
+
+            delivered: list[int] = []
+            error: Exception | None = None
+            for row in rows:
+                try:
+                    await publisher.publish_confirmed(row.routing_key, row.body.encode(), message_id=str(row.id))
+                except Exception as exc:
+                    # Stop here: later rows must not overtake the unconfirmed one
+                    error = exc
+                    break
+                delivered.append(row.id)
+
+            if delivered:
+                await session.execute(delete(EventOutbox).where(EventOutbox.id.in_(delivered)))
+            if error is not None:
+                failed_id = rows[len(delivered)].id
+                await session.execute(
+                    update(EventOutbox).where(EventOutbox.id == failed_id).values(attempts=EventOutbox.attempts + 1)
+                )
+            await session.commit()
+
+        self.relayed += len(delivered)
+        if error is not None:
+            self.failed += 1
+            raise ConnectionError(f"outbox event {failed_id} not confirmed: {error}")
+        return len(delivered)
+
+    async def _run(self, session_factory: async_sessionmaker[AsyncSession], batch_size: int, interval: float) -> None:
+        backoff = interval
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=backoff)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                # Volle Batches direkt nacheinander abarbeiten
+                while await self.relay_once(session_factory, batch_size) >= batch_size:
+                    pass
+                backoff = interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                backoff = min(backoff * 2, 30.0)
+                logger.warning("Outbox relay failed, retry in %.0fs: %s", backoff, exc)
+
+
+outbox_relay = OutboxRelay()
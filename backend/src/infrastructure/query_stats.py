@@ -0,0 +1,250 @@
+"""Per-statement query statistics, N+1 detection and slow-query log.
+
+Hooked into the engine via ``before/after_cursor_execute`` (see
+``database.py``). Every executed statement is reduced to a fingerprint —
+literals and bind parameters become ``?``, ``IN`` lists collapse to
+``(?, ...)`` — and aggregated per fingerprint: count, total/mean/max,
+p99 (from a bounded sample window) and rows.
+
+Per HTTP request (``ObservabilityMiddleware`` opens a request scope) the
+statements are counted as well:
+
+- the same fingerprint ``db_n_plus_one_threshold`` times or more → N+1
+  suspect (a query inside a loop), logged and counted per route;
+- ``db_queries_per_request_warn`` statements or more → chatty request.
+
+Statements slower than ``db_slow_query_ms`` are written as one JSON line
+to the ``pdms.db.slow`` logger and kept in a short in-memory list. Only
+the fingerprint is recorded, never the statement text or bind parameter
+values: statements with inlined literals (e.g. ``literal_binds`` EXPLAIN)
+contain patient identifiers.
+
+All bookkeeping runs on the worker's event loop thread, no locks.
+"""
+
+import json
+import logging
+import re
+import time
+from collections import deque
+from collections.abc import Callable
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.config import settings
+
+logger = logging.getLogger("pdms.db")
+slow_logger = logging.getLogger("pdms.db.slow")
+
+SAMPLE_WINDOW = 1000
+SLOW_LOG_SIZE = 100
+OTHER = "<other>"
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAM = re.compile(r"\$\d+|%\(\w+\)s")
+_NUMBER = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_fingerprints: dict[str, str] = {}
+
+
+def fingerprint(statement: str) -> str:
+    """Normalized statement: literals/parameters → ``?``, IN lists → ``(?, ...)``."""
+    cached = _fingerprints.get(statement)
+    if cached is not None:
+        return cached
+    normalized = _STRING.sub("?", statement)
+    normalized = _PARAM.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _IN_LIST.sub("(?, ...)", normalized)
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    if len(_fingerprints) >= 4096:
+        _fingerprints.clear()
+    _fingerprints[statement] = normalized
+    return normalized
+
+
+@dataclass(slots=True)
+class _StatementStats:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    rows: int = 0
+    samples: deque[float] = field(default_factory=lambda: deque(maxlen=SAMPLE_WINDOW))
+
+    def as_dict(self) -> dict[str, Any]:
+        ordered = sorted(self.samples)
+        p99 = ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))] if ordered else 0.0
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 2),
+            "mean_ms": round(self.total / max(self.count, 1) * 1000, 3),
+            "p99_ms": round(p99 * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "rows": self.rows,
+            "rows_per_call": round(self.rows / max(self.count, 1), 1),
+        }
+
+
+@dataclass(slots=True)
+class _RouteStats:
+    requests: int = 0
+    queries: int = 0
+    max_queries: int = 0
+    chatty: int = 0
+    # fingerprint → [requests flagged, highest repeat count]
+    n_plus_one: dict[str, list[int]] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class _RequestScope:
+    label: Callable[[], str | None]
+    counts: dict[str, int] = field(default_factory=dict)
+    total: int = 0
+
+
+_request: ContextVar[_RequestScope | None] = ContextVar("db_query_request", default=None)
+
+
+class QueryStats:
+    """Aggregated statement statistics of this worker."""
+
+    def __init__(self) -> None:
+        self.statements: dict[str, _StatementStats] = {}
+        self.routes: dict[str, _RouteStats] = {}
+        self.slow: deque[dict[str, Any]] = deque(maxlen=SLOW_LOG_SIZE)
+        self.since = datetime.now(UTC)
+
+    def reset(self) -> None:
+        self.statements.clear()
+        self.routes.clear()
+        self.slow.clear()
+        self.since = datetime.now(UTC)
+
+    # ─── Recording ─────────────────────────────────────────────
+
+    def record(self, statement: str, duration: float, rows: int) -> None:
+        key = fingerprint(statement)
+        stats = self.statements.get(key)
+        if stats is None:
+            if len(self.statements) >= settings.db_query_stats_max_fingerprints:
+                key = OTHER
+                stats = self.statements.setdefault(OTHER, _StatementStats())
+            else:
+                stats = self.statements[key] = _StatementStats()
+        stats.count += 1
+        stats.total += duration
+        stats.rows += max(rows, 0)
+        stats.samples.append(duration)
+        if duration > stats.max:
+            stats.max = duration
+
+        scope = _request.get()
+        if scope is not None:
+            scope.counts[key] = scope.counts.get(key, 0) + 1
+            scope.total += 1
+        if duration * 1000 >= settings.db_slow_query_ms:
+            self._log_slow(key, duration, rows, scope)
+
+    def _log_slow(self, key: str, duration: float, rows: int, scope: _RequestScope | None) -> None:
+        entry = {
+            "at": datetime.now(UTC).isoformat(),
+            "duration_ms": round(duration * 1000, 2),
+            "rows": rows,
+            "route": scope.label() if scope is not None else None,
+            "fingerprint": key,
+        }
+        self.slow.append(entry)
+        slow_logger.warning(json.dumps(entry, separators=(",", ":")))
+
+    # ─── Per-request scope ─────────────────────────────────────
+
+    def begin_request(self, label: Callable[[], str | None]) -> Token:
+        return _request.set(_RequestScope(label))
+
+    def end_request(self, token: Token) -> None:
+        scope = _request.get()
+        _request.reset(token)
+        if scope is None or scope.total == 0:
+            return
+        route = scope.label() or "unmatched"
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = _RouteStats()
+        stats.requests += 1
+        stats.queries += scope.total
+        stats.max_queries = max(stats.max_queries, scope.total)
+        if scope.total >= settings.db_queries_per_request_warn:
+            stats.chatty += 1
+            logger.warning("Chatty request: %s ran %d statements", route, scope.total)
+        for key, count in scope.counts.items():
+            if count < settings.db_n_plus_one_threshold:
+                continue
+            flagged = stats.n_plus_one.setdefault(key, [0, 0])
+            flagged[0] += 1
+            flagged[1] = max(flagged[1], count)
+            logger.warning("N+1 suspect: %s ran %d× %s", route, count, key[:200])
+
+    # ─── Reporting ─────────────────────────────────────────────
+
+    def report(self, *, sort: str = "total_ms", limit: int = 50) -> dict[str, Any]:
+        statements = [{"fingerprint": key, **stats.as_dict()} for key, stats in self.statements.items()]
+        statements.sort(key=lambda s: s[sort], reverse=True)
+        routes = [
+            {
+                "route": route,
+                "requests": stats.requests,
+                "queries_per_request": round(stats.queries / max(stats.requests, 1), 1),
+                "max_queries": stats.max_queries,
+                "chatty_requests": stats.chatty,
+                "n_plus_one": [
+                    {"fingerprint": key, "requests": flagged, "max_repeats": repeats}
+                    for key, (flagged, repeats) in sorted(stats.n_plus_one.items(), key=lambda i: -i[1][1])
+                ],
+            }
+            for route, stats in self.routes.items()
+        ]
+        routes.sort(key=lambda r: (bool(r["n_plus_one"]), r["queries_per_request"]), reverse=True)
+        return {
+            "since": self.since.isoformat(),
+            "fingerprints": len(self.statements),
+            "slow_query_ms": settings.db_slow_query_ms,
+            "statements": statements[:limit],
+            "routes": routes[:limit],
+            "slow": list(reversed(self.slow))[:limit],
+        }
+
+
+query_stats = QueryStats()
+
+
+# ─── Engine hook ──────────────────────────────────────────────
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    context._pdms_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = getattr(context, "_pdms_started", None)
+    if started is None:
+        return
+    try:
+        rows = cursor.rowcount
+    except Exception:
+        rows = -1
+    query_stats.record(statement, time.perf_counter() - started, rows)
+
+
+def install(engine: AsyncEngine) -> None:
+    """Attach the profiling hook to the engine (idempotent)."""
+    sync_engine = engine.sync_engine
+    if not event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
@@ -13,19 +13,26 @@ Routing keys follow the pattern: <domain>.<action>
 import asyncio
 import json
 import logging
+import time
+import uuid
+from collections import deque
 from datetime import UTC, datetime
 from typing import Any, Callable, Coroutine
 
 import aio_pika
+from aio_pika.abc import AbstractChannel, AbstractExchange
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.config import settings
+from src.infrastructure.metrics import RABBITMQ_PUBLISH, RABBITMQ_PUBLISH_FAILURES
 
 logger = logging.getLogger("pdms.rabbitmq")
 
 EXCHANGE_NAME = "pdms.events"
 
 _connection: aio_pika.RobustConnection | None = None
-_consumer_task: asyncio.Task | None = None
+_consumer: "EventConsumer | None" = None
+_subscribers: list["WorkerSubscription"] = []
 
 
 # ─── Connection ────────────────────────────────────────────────
@@ -42,14 +49,14 @@ async def get_rabbitmq_connection() -> aio_pika.RobustConnection:
 
 async def close_rabbitmq_connection() -> None:
     """Gracefully close the RabbitMQ connection."""
-    global _connection, _consumer_task
-    if _consumer_task and not _consumer_task.done():
-        _consumer_task.cancel()
-        try:
-            await _consumer_task
-        except asyncio.CancelledError:
-            pass
-        _consumer_task = None
+    global _connection, _consumer
+    await _publisher.stop()
+    if _consumer is not None:
+        await _consumer.stop()
+        _consumer = None
+    for subscription in _subscribers:
+        await subscription.stop()
+    _subscribers.clear()
     if _connection and not _connection.is_closed:
         await _connection.close()
         _connection = None
@@ -59,8 +66,233 @@ async def close_rabbitmq_connection() -> None:
 # ─── Publish ───────────────────────────────────────────────────
 
 
+class EventPublisher:
+    """Long-lived publisher for the pdms.events exchange.
+
+    - a small pool of channels, each with its exchange object declared once
+    - optional publisher confirms, awaited in background tasks so the
+      request path never waits for the broker round-trip
+    - a bounded in-memory outbox that buffers events while RabbitMQ is
+      unreachable (or nacks) and is drained once channels are usable again;
+      when full the oldest event is dropped and counted
+    """
+
+    def __init__(self, *, pool_size: int, confirms: bool, outbox_max: int, max_inflight: int = 1000) -> None:
+        self.pool_size = max(pool_size, 1)
+        self.confirms = confirms
+        self.outbox_max = outbox_max
+        self.max_inflight = max_inflight
+        self._channels: list[AbstractChannel] = []
+        self._exchanges: list[AbstractExchange] = []
+        self._next = 0
+        self._outbox: deque[tuple[str, bytes]] = deque()
+        self._outbox_ready: asyncio.Event | None = None
+        self._pending: set[asyncio.Task] = set()
+        self._drain_task: asyncio.Task | None = None
+        self.stats: dict[str, int] = {
+            "published": 0, "confirmed": 0, "nacked": 0, "buffered": 0, "dropped": 0,
+        }
+
+    @property
+    def started(self) -> bool:
+        return bool(self._exchanges)
+
+    @property
+    def outbox_depth(self) -> int:
+        return len(self._outbox)
+
+    async def start(self, connection: aio_pika.abc.AbstractRobustConnection) -> None:
+        """Open the channel pool and declare the exchange once per channel."""
+        if self.started:
+            return
+        for _ in range(self.pool_size):
+            channel = await connection.channel(publisher_confirms=self.confirms)
+            exchange = await channel.declare_exchange(EXCHANGE_NAME, aio_pika.ExchangeType.TOPIC, durable=True)
+            self._channels.append(channel)
+            self._exchanges.append(exchange)
+        self._outbox_ready = asyncio.Event()
+        if self._outbox:
+            self._outbox_ready.set()
+        self._drain_task = asyncio.create_task(self._drain())
+        logger.info("Event publisher started (channels=%d, confirms=%s)", self.pool_size, self.confirms)
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Wait for outstanding confirms, then close the pool."""
+        if self._pending:
+            await asyncio.wait(self._pending, timeout=timeout)
+        if self._drain_task is not None:
+            self._drain_task.cancel()
+            try:
+                await self._drain_task
+            except asyncio.CancelledError:
+                pass
+            self._drain_task = None
+        for channel in self._channels:
+            try:
+                await channel.close()
+            except Exception:
+                pass
+        self._channels.clear()
+        self._exchanges.clear()
+        if self._outbox:
+            logger.warning("Event publisher stopped with %d undelivered event(s) in outbox", len(self._outbox))
+
+    def _exchange(self) -> AbstractExchange | None:
+        """Round-robin over channels that are currently open."""
+        for _ in range(len(self._exchanges)):
+            idx = self._next % len(self._exchanges)
+            self._next += 1
+            if not self._channels[idx].is_closed:
+                return self._exchanges[idx]
+        return None
+
+    def _ordered_exchange(self) -> AbstractExchange | None:
+        """First open channel of the pool: one channel preserves publish order."""
+        for channel, exchange in zip(self._channels, self._exchanges, strict=True):
+            if not channel.is_closed:
+                return exchange
+        return None
+
+    @staticmethod
+    def _message(body: bytes) -> aio_pika.Message:
+        return aio_pika.Message(
+            body=body,
+            content_type="application/json",
+            timestamp=datetime.now(UTC),
+        )
+
+    async def publish(self, routing_key: str, body: bytes) -> None:
+        """Publish without waiting for the broker; buffers on failure."""
+        exchange = self._exchange()
+        if exchange is None:
+            self._buffer(routing_key, body)
+            return
+
+        if not self.confirms:
+            start = time.perf_counter()
+            try:
+                await exchange.publish(self._message(body), routing_key=routing_key)
+                self.stats["published"] += 1
+                RABBITMQ_PUBLISH.observe(time.perf_counter() - start, "direct")
+            except Exception as exc:
+                RABBITMQ_PUBLISH_FAILURES.inc("direct")
+                logger.warning("RabbitMQ publish failed (%s), buffering: %s", routing_key, exc)
+                self._buffer(routing_key, body)
+            return
+
+        # Backpressure: bound the number of unconfirmed publishes
+        if len(self._pending) >= self.max_inflight:
+            await asyncio.wait(self._pending, return_when=asyncio.FIRST_COMPLETED)
+
+        task = asyncio.create_task(exchange.publish(self._message(body), routing_key=routing_key))
+        self._pending.add(task)
+        self.stats["published"] += 1
+        start = time.perf_counter()
+        task.add_done_callback(lambda t: self._on_confirm(t, routing_key, body, start))
+
+    async def publish_confirmed(self, routing_key: str, body: bytes, *, message_id: str | None = None) -> None:
+        """Publish and wait for the broker confirm; raises instead of buffering.
+
+        Used by the outbox relay, which keeps undelivered events in the
+        database rather than in memory. Always uses the first open channel
+        (no round-robin), so sequential calls reach the broker in call order.
+        """
+        exchange = self._ordered_exchange()
+        if exchange is None:
+            raise ConnectionError("no open RabbitMQ channel")
+        message = self._message(body)
+        message.message_id = message_id
+        mode = "confirm" if self.confirms else "direct"
+        start = time.perf_counter()
+        try:
+            await exchange.publish(message, routing_key=routing_key)
+        except Exception:
+            RABBITMQ_PUBLISH_FAILURES.inc(mode)
+            raise
+        RABBITMQ_PUBLISH.observe(time.perf_counter() - start, mode)
+        self.stats["published"] += 1
+        if self.confirms:
+            self.stats["confirmed"] += 1
+
+    def _on_confirm(self, task: asyncio.Task, routing_key: str, body: bytes, start: float) -> None:
+        self._pending.discard(task)
+        if task.cancelled():
+            self._buffer(routing_key, body)
+            return
+        exc = task.exception()
+        if exc is None:
+            self.stats["confirmed"] += 1
+            RABBITMQ_PUBLISH.observe(time.perf_counter() - start, "confirm")
+            return
+        self.stats["nacked"] += 1
+        RABBITMQ_PUBLISH_FAILURES.inc("confirm")
+        logger.warning("RabbitMQ publish not confirmed (%s), buffering: %s", routing_key, exc)
+        self._buffer(routing_key, body)
+
+    def _buffer(self, routing_key: str, body: bytes) -> None:
+        if len(self._outbox) >= self.outbox_max:
+            dropped_key, _ = self._outbox.popleft()
+            self.stats["dropped"] += 1
+            logger.error("Event outbox full (%d) — dropped oldest event %s", self.outbox_max, dropped_key)
+        self._outbox.append((routing_key, body))
+        self.stats["buffered"] += 1
+        if self._outbox_ready is not None:
+            self._outbox_ready.set()
+
+    async def _drain(self) -> None:
+        """Re-publish buffered events once a channel is usable again (in order)."""
+        backoff = 0.5
+        while True:
+            await self._outbox_ready.wait()
+            while self._outbox:
+                exchange = self._exchange()
+                if exchange is None:
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 10.0)
+                    continue
+                routing_key, body = self._outbox[0]
+                try:
+                    await exchange.publish(self._message(body), routing_key=routing_key)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:
+                    logger.debug("Outbox drain failed (%s), retry in %.1fs: %s", routing_key, backoff, exc)
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 10.0)
+                    continue
+                self._outbox.popleft()
+                self.stats["published"] += 1
+                backoff = 0.5
+            self._outbox_ready.clear()
+
+
+_publisher = EventPublisher(
+    pool_size=settings.rabbitmq_channel_pool_size,
+    confirms=settings.rabbitmq_publisher_confirms,
+    outbox_max=settings.rabbitmq_outbox_max,
+)
+
+
+def get_publisher() -> EventPublisher:
+    return _publisher
+
+
+async def start_publisher() -> None:
+    """Start the long-lived event publisher on the shared connection."""
+    connection = await get_rabbitmq_connection()
+    await _publisher.start(connection)
+
+
 async def publish_event(exchange_name: str, routing_key: str, body: bytes) -> None:
-    """Publish an event to the topic exchange."""
+    """Publish an event to the topic exchange.
+
+    Uses the pooled publisher once started (lifespan); before that, e.g. in
+    CLI scripts, falls back to a short-lived channel per event.
+    """
+    if exchange_name == EXCHANGE_NAME and _publisher.started:
+        await _publisher.publish(routing_key, body)
+        return
+
     connection = await get_rabbitmq_connection()
     async with connection.channel() as channel:
         exchange = await channel.declare_exchange(
@@ -76,15 +308,22 @@ async def publish_event(exchange_name: str, routing_key: str, body: bytes) -> No
         )
 
 
-async def emit_event(routing_key: str, payload: dict[str, Any]) -> None:
+async def emit_event(routing_key: str, payload: dict[str, Any], *, session: AsyncSession | None = None) -> None:
     """High-level helper: serialize payload and publish to pdms.events.
 
-    Silently catches errors so that a RabbitMQ outage never breaks the
-    core request/response flow.
+    With ``session`` the event goes to the transactional outbox and is
+    published by the relay after the caller's transaction commits (nothing
+    is sent for a rollback). Without a session it is published directly;
+    errors are swallowed so that a RabbitMQ outage never breaks the core
+    request/response flow.
     """
+    body = json.dumps(payload, default=str)
+    if session is not None:
+        from src.infrastructure.outbox import stage_event
+        stage_event(session, routing_key, body)
+        return
     try:
-        body = json.dumps(payload, default=str).encode()
-        await publish_event(EXCHANGE_NAME, routing_key, body)
+        await publish_event(EXCHANGE_NAME, routing_key, body.encode())
         logger.debug("Event published: %s → %s", routing_key, payload.get("type", ""))
     except Exception as exc:
         logger.warning("RabbitMQ publish failed (%s): %s", routing_key, exc)
@@ -92,56 +331,459 @@ async def emit_event(routing_key: str, payload: dict[str, Any]) -> None:
 
 # ─── Consumer Framework ───────────────────────────────────────
 
-# Handler registry: routing_key_pattern → async callback
-_handlers: dict[str, Callable[[dict], Coroutine]] = {}
+EventHandler = Callable[[dict], Coroutine]
+
+
+class EventHandlerError(Exception):
+    """At least one handler failed for a message."""
+
+
+class _TrieNode:
+    __slots__ = ("children", "handlers")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.handlers: list[tuple[int, EventHandler]] = []
+
+
+class TopicDispatcher:
+    """Routing-key → handlers lookup over a compiled topic trie.
+
+    Patterns use AMQP topic syntax ('*' = exactly one word, '#' = zero or
+    more words). Any number of handlers may share a pattern. Matches are
+    cached per concrete routing key (the key space is small and fixed), so
+    steady-state dispatch is one dict lookup. Handlers for a message run
+    concurrently; a failing handler does not affect the others.
+    """
+
+    CACHE_MAX = 1024
+
+    def __init__(self) -> None:
+        self._root = _TrieNode()
+        self._seq = 0
+        self._cache: dict[str, tuple[EventHandler, ...]] = {}
+        self._timings: dict[str, dict[str, float]] = {}
+
+    @property
+    def handler_count(self) -> int:
+        return self._seq
+
+    def register(self, pattern: str, handler: EventHandler) -> None:
+        node = self._root
+        for word in pattern.split("."):
+            node = node.children.setdefault(word, _TrieNode())
+        node.handlers.append((self._seq, handler))
+        self._seq += 1
+        self._cache.clear()
+
+    def match(self, routing_key: str) -> tuple[EventHandler, ...]:
+        """All handlers whose pattern matches, in registration order."""
+        handlers = self._cache.get(routing_key)
+        if handlers is None:
+            found: dict[int, EventHandler] = {}
+            self._collect(self._root, routing_key.split("."), 0, found)
+            handlers = tuple(found[seq] for seq in sorted(found))
+            if len(self._cache) >= self.CACHE_MAX:
+                self._cache.clear()
+            self._cache[routing_key] = handlers
+        return handlers
+
+    def _collect(self, node: _TrieNode, words: list[str], i: int, found: dict[int, EventHandler]) -> None:
+        if i == len(words):
+            found.update(node.handlers)
+            # '#' also matches zero trailing words
+            hash_node = node.children.get("#")
+            if hash_node is not None:
+                self._collect(hash_node, words, i, found)
+            return
+        child = node.children.get(words[i])
+        if child is not None:
+            self._collect(child, words, i + 1, found)
+        star = node.children.get("*")
+        if star is not None:
+            self._collect(star, words, i + 1, found)
+        hash_node = node.children.get("#")
+        if hash_node is not None:
+            for j in range(i, len(words) + 1):
+                self._collect(hash_node, words, j, found)
+
+    async def dispatch(self, routing_key: str, payload: dict) -> int:
+        """Run all matching handlers concurrently. Returns the number of handlers run.
+
+        Raises ``EventHandlerError`` after all handlers finished if any failed.
+        """
+        handlers = self.match(routing_key)
+        if len(handlers) == 1:
+            ok = [await self._run(handlers[0], routing_key, payload)]
+        elif handlers:
+            ok = await asyncio.gather(*(self._run(h, routing_key, payload) for h in handlers))
+        else:
+            ok = []
+        failed = ok.count(False)
+        if failed:
+            raise EventHandlerError(f"{failed}/{len(handlers)} handler(s) failed for {routing_key}")
+        return len(handlers)
+
+    async def _run(self, handler: EventHandler, routing_key: str, payload: dict) -> bool:
+        start = time.perf_counter()
+        failed = False
+        try:
+            await handler(payload)
+        except Exception as exc:
+            failed = True
+            logger.error("Handler %s failed for %s: %s", handler.__qualname__, routing_key, exc, exc_info=True)
+        finally:
+            self._record(handler, time.perf_counter() - start, failed)
+        return not failed
+
+    def _record(self, handler: EventHandler, elapsed: float, failed: bool) -> None:
+        name = f"{handler.__module__}.{handler.__qualname__}"
+        stats = self._timings.get(name)
+        if stats is None:
+            stats = self._timings[name] = {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+        elapsed_ms = elapsed * 1000
+        stats["calls"] += 1
+        stats["errors"] += failed
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Per-handler call counts and timings (ms)."""
+        return {
+            name: {
+                "calls": s["calls"],
+                "errors": s["errors"],
+                "avg_ms": round(s["total_ms"] / max(s["calls"], 1), 3),
+                "max_ms": round(s["max_ms"], 3),
+            }
+            for name, s in self._timings.items()
+        }
+
+
+_dispatcher = TopicDispatcher()
+
+
+def get_dispatcher() -> TopicDispatcher:
+    return _dispatcher
 
 
 def on_event(routing_key: str):
-    """Decorator to register an event handler.
+    """Decorator to register an event handler (several per pattern allowed).
 
     Usage:
         @on_event("alarm.critical")
         async def handle_critical_alarm(payload: dict):
             ...
     """
-    def decorator(func: Callable[[dict], Coroutine]):
-        _handlers[routing_key] = func
+    def decorator(func: EventHandler):
+        _dispatcher.register(routing_key, func)
         return func
     return decorator
 
 
-async def _process_message(message: aio_pika.IncomingMessage) -> None:
-    """Process a single incoming message."""
-    async with message.process():
+class EventConsumer:
+    """Concurrent consumer for one queue with per-partition ordering.
+
+    Messages are spread over ``workers`` asyncio workers by partition key
+    (``patient_id`` from the payload, else the routing key), so events of
+    one patient are handled in publish order while a slow handler only
+    holds up its own partition. Alarm events run on a separate lane and
+    never wait behind bulk traffic such as lab imports. ``prefetch`` bounds
+    the number of unacked messages in flight.
+
+    Failure handling: a failed message is republished to ``<queue>.retry``,
+    a delay queue whose TTL dead-letters it back into the main queue, with
+    its attempt count in the ``x-attempts`` header (broker redeliveries
+    after a crash do not count). After ``max_attempts`` failures, or if
+    the body is not valid JSON, it is moved to ``<queue>.dlq`` with the
+    error in its headers and acked.
+
+    While a partition has a message in the delay queue it is *parked*:
+    later messages of that partition are sent through the delay queue
+    behind it, and returning messages are only handled once they are at
+    the head of the partition's parked sequence (``x-park-id``), so a
+    retry never lets later events of the same patient overtake it.
+
+    The park state is process-local, so the main queue is declared with
+    ``x-single-active-consumer``: all uvicorn workers subscribe, but the
+    broker delivers to one of them at a time and fails over to the next
+    when it disconnects. Returnees therefore reach the process that parked
+    them, and per-patient order holds across workers. After a failover the
+    new consumer knows no parked state; it adopts returnees with an unknown
+    ``x-park-id`` in arrival order. A head that does not return within
+    ``park_lease_ms`` (e.g. purged from the delay queue) releases the
+    partition, so it can never stay parked forever.
+    """
+
+    PRIORITY_PREFIXES = ("alarm.",)
+
+    def __init__(
+        self,
+        dispatcher: TopicDispatcher,
+        *,
+        queue_name: str,
+        binding_keys: list[str],
+        workers: int,
+        priority_workers: int,
+        prefetch: int,
+        max_attempts: int = 5,
+        retry_delay_ms: int = 5000,
+        park_lease_ms: int = 60000,
+    ) -> None:
+        self.dispatcher = dispatcher
+        self.queue_name = queue_name
+        self.dlq_name = f"{queue_name}.dlq"
+        self.retry_name = f"{queue_name}.retry"
+        self.binding_keys = binding_keys
+        self.prefetch = prefetch
+        self.max_attempts = max(max_attempts, 1)
+        self.retry_delay_ms = retry_delay_ms
+        self.park_lease = park_lease_ms / 1000
+        # partition → park ids of its messages in the delay queue, in order
+        self._parked: dict[str, deque[str]] = {}
+        # partition → monotonic deadline by which the current head must return
+        self._park_deadline: dict[str, float] = {}
+        self._lanes: dict[str, list[asyncio.Queue]] = {
+            "priority": [asyncio.Queue() for _ in range(max(priority_workers, 1))],
+            "default": [asyncio.Queue() for _ in range(max(workers, 1))],
+        }
+        self._channel: aio_pika.abc.AbstractChannel | None = None
+        self._task: asyncio.Task | None = None
+        self._workers: list[asyncio.Task] = []
+        self._lag_total_ms = 0.0
+        self.stats: dict[str, float] = {
+            "received": 0, "processed": 0, "failed": 0, "retried": 0, "parked": 0, "park_expired": 0,
+            "dead_lettered": 0,
+            "lag_last_ms": 0.0, "lag_max_ms": 0.0,
+        }
+
+    # ─── Lifecycle ────────────────────────────────────────────
+
+    def start(self) -> None:
+        for lane in self._lanes.values():
+            for queue in lane:
+                self._workers.append(asyncio.create_task(self._work(queue)))
+        self._task = asyncio.create_task(self._consume())
+
+    async def stop(self) -> None:
+        tasks = ([self._task] if self._task else []) + self._workers
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._workers.clear()
+
+    async def set_prefetch(self, prefetch: int) -> None:
+        """Change the unacked-message window at runtime."""
+        self.prefetch = prefetch
+        if self._channel is not None and not self._channel.is_closed:
+            await self._channel.set_qos(prefetch_count=prefetch)
+
+    # ─── Consuming ────────────────────────────────────────────
+
+    async def _consume(self) -> None:
+        while True:
+            try:
+                connection = await get_rabbitmq_connection()
+                channel = await connection.channel()
+                await channel.set_qos(prefetch_count=self.prefetch)
+
+                exchange = await channel.declare_exchange(
+                    EXCHANGE_NAME, aio_pika.ExchangeType.TOPIC, durable=True
+                )
+                # One active consumer at a time: the park state lives in its process
+                queue = await channel.declare_queue(
+                    self.queue_name, durable=True, arguments={"x-single-active-consumer": True},
+                )
+                await channel.declare_queue(self.dlq_name, durable=True)
+                await channel.declare_queue(self.retry_name, durable=True, arguments={
+                    "x-message-ttl": self.retry_delay_ms,
+                    "x-dead-letter-exchange": "",
+                    "x-dead-letter-routing-key": self.queue_name,
+                })
+                for key in self.binding_keys:
+                    await queue.bind(exchange, routing_key=key)
+                self._channel = channel
+
+                logger.info(
+                    "Consumer started: queue=%s, bindings=%s, handlers=%d, workers=%d+%d, prefetch=%d",
+                    self.queue_name, self.binding_keys, self.dispatcher.handler_count,
+                    len(self._lanes["default"]), len(self._lanes["priority"]), self.prefetch,
+                )
+
+                async with queue.iterator() as queue_iter:
+                    async for message in queue_iter:
+                        await self.submit(message)
+
+            except asyncio.CancelledError:
+                logger.info("Consumer task cancelled")
+                return
+            except aio_pika.exceptions.ChannelPreconditionFailed as exc:
+                self._channel = None
+                logger.error(
+                    "Queue %s exists with different arguments (x-single-active-consumer required); "
+                    "delete it once so it can be redeclared. Retrying in 5s: %s", self.queue_name, exc,
+                )
+                await asyncio.sleep(5)
+            except Exception as exc:
+                self._channel = None
+                logger.error("Consumer error, reconnecting in 5s: %s", exc)
+                await asyncio.sleep(5)
+
+    @staticmethod
+    def _routing_key(message: aio_pika.abc.AbstractIncomingMessage) -> str:
+        """Original routing key (dead-lettering from the delay queue rewrites it)."""
+        headers = message.headers or {}
+        return str(headers.get("x-original-routing-key") or message.routing_key or "")
+
+    async def submit(self, message: aio_pika.abc.AbstractIncomingMessage) -> None:
+        """Route a delivery to the worker owning its partition."""
+        self.stats["received"] += 1
         try:
             payload = json.loads(message.body)
-            routing_key = message.routing_key
-            logger.debug("Event received: %s", routing_key)
-
-            for pattern, handler in _handlers.items():
-                if _match_routing_key(pattern, routing_key):
-                    await handler(payload)
+        except ValueError as exc:
+            await self._dead_letter(message, f"invalid JSON: {exc}")
+            return
+        key = self._routing_key(message)
+        lane = self._lanes["priority" if key.startswith(self.PRIORITY_PREFIXES) else "default"]
+        partition = str(payload.get("patient_id") or key) if isinstance(payload, dict) else key
+        lane[hash(partition) % len(lane)].put_nowait((message, payload, partition))
+
+    async def _work(self, queue: asyncio.Queue) -> None:
+        while True:
+            message, payload, partition = await queue.get()
+            try:
+                await self._handle(message, payload, partition)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error("Consumer worker error (%s): %s", message.routing_key, exc, exc_info=True)
+
+    async def _handle(self, message: aio_pika.abc.AbstractIncomingMessage, payload: Any, partition: str) -> None:
+        headers = message.headers or {}
+        park_id = headers.get("x-park-id")
+        attempts = int(headers.get("x-attempts") or 0)
+        parked = self._live_parked(partition)
+        if parked and park_id != parked[0]:
+            # Partition waits for an earlier failed message: queue up behind it.
+            # Unknown park ids (parked before a failover / after a lease expiry) are adopted.
+            if park_id is None or park_id not in parked:
+                park_id = park_id or uuid.uuid4().hex
+                parked.append(park_id)
+                self.stats["parked"] += 1
+            await self._retry(message, park_id, attempts)
+            return
+
+        self._record_lag(message)
+        try:
+            await self.dispatcher.dispatch(self._routing_key(message), payload)
         except Exception as exc:
-            logger.error("Error processing event %s: %s", message.routing_key, exc, exc_info=True)
-
-
-def _match_routing_key(pattern: str, key: str) -> bool:
-    """Simple topic matching: '#' = multi-word wildcard, '*' = single-word wildcard."""
-    if pattern == "#":
-        return True
-    p_parts = pattern.split(".")
-    k_parts = key.split(".")
-
-    pi = ki = 0
-    while pi < len(p_parts) and ki < len(k_parts):
-        if p_parts[pi] == "#":
-            return True
-        if p_parts[pi] == "*" or p_parts[pi] == k_parts[ki]:
-            pi += 1
-            ki += 1
+            self.stats["failed"] += 1
+            attempts += 1
+            if attempts >= self.max_attempts:
+                await self._dead_letter(message, str(exc))
+                self._unpark(partition, park_id)
+                return
+            if park_id is None or not parked:
+                # first failure (or a returnee whose parked state was lost in a restart)
+                park_id = park_id or uuid.uuid4().hex
+                self._parked[partition] = deque([park_id])
+            self._park_deadline[partition] = time.monotonic() + self.park_lease
+            self.stats["retried"] += 1
+            await self._retry(message, park_id, attempts)
+            return
+        self._unpark(partition, park_id)
+        self.stats["processed"] += 1
+        await message.ack()
+
+    def _live_parked(self, partition: str) -> deque[str] | None:
+        """Parked sequence of a partition; releases heads whose lease expired."""
+        parked = self._parked.get(partition)
+        while parked and time.monotonic() > self._park_deadline.get(partition, 0.0):
+            logger.warning("Parked event %s of partition %s did not return, releasing it", parked[0], partition)
+            self.stats["park_expired"] += 1
+            self._unpark(partition, parked[0])
+            parked = self._parked.get(partition)
+        return parked
+
+    def _unpark(self, partition: str, park_id: str | None) -> None:
+        parked = self._parked.get(partition)
+        if park_id is None or not parked or parked[0] != park_id:
+            return
+        parked.popleft()
+        if parked:
+            # next head is already in the delay queue; it gets a fresh lease
+            self._park_deadline[partition] = time.monotonic() + self.park_lease
         else:
-            return False
-    return pi == len(p_parts) and ki == len(k_parts)
+            del self._parked[partition]
+            self._park_deadline.pop(partition, None)
+
+    async def _retry(self, message: aio_pika.abc.AbstractIncomingMessage, park_id: str, attempts: int) -> None:
+        """Send the message through the delay queue (back into the main queue after the TTL)."""
+        if self._channel is None:
+            raise ConnectionError("consumer channel closed")
+        await self._channel.default_exchange.publish(
+            aio_pika.Message(
+                body=message.body,
+                content_type=message.content_type,
+                timestamp=message.timestamp,
+                message_id=message.message_id,
+                headers={
+                    "x-original-routing-key": self._routing_key(message),
+                    "x-park-id": park_id,
+                    "x-attempts": attempts,
+                },
+            ),
+            routing_key=self.retry_name,
+        )
+        await message.ack()
+
+    async def _dead_letter(self, message: aio_pika.abc.AbstractIncomingMessage, error: str) -> None:
+        routing_key = self._routing_key(message)
+        logger.error("Dead-lettering event %s: %s", routing_key, error)
+        if self._channel is None:
+            await message.reject(requeue=False)
+            return
+        await self._channel.default_exchange.publish(
+            aio_pika.Message(
+                body=message.body,
+                content_type=message.content_type,
+                timestamp=message.timestamp,
+                message_id=message.message_id,
+                headers={"x-original-routing-key": routing_key, "x-error": error[:500]},
+            ),
+            routing_key=self.dlq_name,
+        )
+        self.stats["dead_lettered"] += 1
+        await message.ack()
+
+    # ─── Metrics ──────────────────────────────────────────────
+
+    def _record_lag(self, message: aio_pika.abc.AbstractIncomingMessage) -> None:
+        """Publish → handler start latency (needs the publisher's timestamp)."""
+        published = message.timestamp
+        if published is None:
+            return
+        if published.tzinfo is None:
+            published = published.replace(tzinfo=UTC)
+        lag_ms = max((datetime.now(UTC) - published).total_seconds() * 1000, 0.0)
+        self._lag_total_ms += lag_ms
+        self.stats["lag_last_ms"] = round(lag_ms, 1)
+        self.stats["lag_max_ms"] = round(max(self.stats["lag_max_ms"], lag_ms), 1)
+
+    def metrics(self) -> dict[str, Any]:
+        handled = self.stats["processed"] + self.stats["failed"]
+        return {
+            **self.stats,
+            "lag_avg_ms": round(self._lag_total_ms / max(handled, 1), 1),
+            "prefetch": self.prefetch,
+            "backlog": {name: sum(q.qsize() for q in lane) for name, lane in self._lanes.items()},
+            "backlog_max_partition": max(q.qsize() for lane in self._lanes.values() for q in lane),
+        }
+
+
+def get_consumer() -> EventConsumer | None:
+    return _consumer
 
 
 async def start_consumer(queue_name: str = "pdms.notifications", binding_keys: list[str] | None = None) -> None:
@@ -151,41 +793,103 @@ async def start_consumer(queue_name: str = "pdms.notifications", binding_keys: l
         queue_name: Name of the durable queue.
         binding_keys: Routing key patterns to bind (default: all events '#').
     """
-    global _consumer_task
+    global _consumer
 
     if binding_keys is None:
         binding_keys = ["#"]
 
-    async def _consume():
+    _consumer = EventConsumer(
+        _dispatcher,
+        queue_name=queue_name,
+        binding_keys=binding_keys,
+        workers=settings.rabbitmq_consumer_workers,
+        priority_workers=settings.rabbitmq_priority_workers,
+        prefetch=settings.rabbitmq_prefetch,
+        max_attempts=settings.rabbitmq_max_attempts,
+        retry_delay_ms=settings.rabbitmq_retry_delay_ms,
+        park_lease_ms=settings.rabbitmq_park_lease_ms,
+    )
+    _consumer.start()
+
+
+class WorkerSubscription:
+    """Per-worker fan-out subscription on an exclusive, server-named queue.
+
+    The shared consumer queue distributes each event to ONE worker
+    (competing consumers). Process-local state such as the active-alarm
+    index must see EVERY event, so each worker binds its own auto-delete
+    queue and applies the events to its state in publish order.
+
+    Deliveries are auto-acked: the queue disappears with the worker, and
+    events missed while disconnected are healed by ``on_ready``, which
+    runs after every (re-)bind so a state reload cannot race the gap.
+    """
+
+    def __init__(
+        self,
+        binding_keys: list[str],
+        callback: Callable[[str, Any], None],
+        *,
+        on_ready: Callable[[], Coroutine[Any, Any, Any]] | None = None,
+    ) -> None:
+        self.binding_keys = binding_keys
+        self.callback = callback
+        self.on_ready = on_ready
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._consume())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _consume(self) -> None:
         while True:
             try:
                 connection = await get_rabbitmq_connection()
                 channel = await connection.channel()
-                await channel.set_qos(prefetch_count=10)
-
                 exchange = await channel.declare_exchange(
                     EXCHANGE_NAME, aio_pika.ExchangeType.TOPIC, durable=True
                 )
-                queue = await channel.declare_queue(queue_name, durable=True)
-
-                for key in binding_keys:
+                queue = await channel.declare_queue(exclusive=True, auto_delete=True)
+                for key in self.binding_keys:
                     await queue.bind(exchange, routing_key=key)
-
-                logger.info(
-                    "Consumer started: queue=%s, bindings=%s, handlers=%d",
-                    queue_name, binding_keys, len(_handlers),
-                )
-
-                async with queue.iterator() as queue_iter:
+                if self.on_ready is not None:
+                    try:
+                        await self.on_ready()
+                    except Exception as exc:
+                        logger.warning("Worker subscription on_ready failed: %s", exc)
+                logger.info("Worker subscription started: queue=%s, bindings=%s", queue.name, self.binding_keys)
+
+                async with queue.iterator(no_ack=True) as queue_iter:
                     async for message in queue_iter:
-                        await _process_message(message)
+                        self.deliver(message)
 
             except asyncio.CancelledError:
-                logger.info("Consumer task cancelled")
                 return
             except Exception as exc:
-                logger.error("Consumer error, reconnecting in 5s: %s", exc)
+                logger.error("Worker subscription error, reconnecting in 5s: %s", exc)
                 await asyncio.sleep(5)
 
-    _consumer_task = asyncio.create_task(_consume())
-
+    def deliver(self, message: aio_pika.abc.AbstractIncomingMessage) -> None:
+        try:
+            self.callback(message.routing_key or "", json.loads(message.body))
+        except Exception as exc:
+            logger.error("Worker subscription callback failed (%s): %s", message.routing_key, exc)
+
+
+async def subscribe_worker(
+    binding_keys: list[str],
+    callback: Callable[[str, Any], None],
+    *,
+    on_ready: Callable[[], Coroutine[Any, Any, Any]] | None = None,
+) -> WorkerSubscription:
+    """Start a per-worker fan-out subscription (see ``WorkerSubscription``)."""
+    subscription = WorkerSubscription(binding_keys, callback, on_ready=on_ready)
+    subscription.start()
+    _subscribers.append(subscription)
+    return subscription
@@ -1,6 +1,9 @@
 """TimescaleDB helpers for hypertable setup and time-series queries."""
 
-from sqlalchemy import text
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import Table, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
@@ -8,3 +11,35 @@ async def create_hypertable(session: AsyncSession, table: str, time_column: str
     """Convert a regular table to a TimescaleDB hypertable."""
     await session.execute(text(f"SELECT create_hypertable('{table}', '{time_column}', if_not_exists => TRUE)"))
     await session.commit()
+
+
+async def copy_records(
+    session: AsyncSession,
+    table: Table,
+    columns: Sequence[str],
+    records: Sequence[tuple[Any, ...]],
+) -> int:
+    """Bulk-write rows via PostgreSQL COPY on the session's own connection.
+
+    Runs inside the session's current transaction, so the rows commit or
+    roll back together with everything else in the request. Drivers
+    without COPY support (e.g. SQLite in tooling) fall back to an
+    executemany INSERT. Returns the number of rows written.
+    """
+    if not records:
+        return 0
+
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    driver = getattr(raw, "driver_connection", None)
+
+    if hasattr(driver, "copy_records_to_table"):
+        await driver.copy_records_to_table(
+            table.name,
+            records=records,
+            columns=list(columns),
+            schema_name=table.schema,
+        )
+    else:
+        await session.execute(table.insert(), [dict(zip(columns, row, strict=True)) for row in records])
+    return len(records)
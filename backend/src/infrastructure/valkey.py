@@ -5,15 +5,28 @@ Provides:
 - Generic cache helpers: get_cached(), set_cached(), invalidate()
 - Domain-specific helpers: cached_patient(), cached_alarm_counts()
 - Cache key patterns for consistent invalidation
+- Generation-based (O(1)) invalidation for list/dashboard namespaces
+- Two-tier cache (per-worker LRU + Valkey) with single-flight loading,
+  probabilistic early refresh and tracking-based local invalidation
 """
 
+import asyncio
+import fnmatch
 import json
 import logging
+import math
+import random
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from dataclasses import dataclass
 from typing import Any
 
 import redis.asyncio as redis
 
 from src.config import settings
+from src.infrastructure.metrics import CACHE_REQUESTS
 
 logger = logging.getLogger("pdms.valkey")
 
@@ -26,6 +39,9 @@ TTL_PATIENT = 300          # 5 min — individual patient
 TTL_PATIENT_LIST = 60      # 1 min — patient list (changes often)
 TTL_ALARM_COUNTS = 15      # 15 sec — alarm dashboard badge
 TTL_ALARM_LIST = 30        # 30 sec — alarm list
+TTL_DOSSIER = 60           # 1 min — dossier summary (event-invalidated)
+TTL_LAB_SUMMARY = 300      # 5 min — lab mini-table (invalidated on write + event)
+TTL_AUDIT_COUNT = 60       # 1 min — audit paging totals (capped/estimated)
 TTL_SESSION = 3600         # 1h — JWT session state
 
 
@@ -43,6 +59,18 @@ class CacheKeys:
         s = search or ""
         return f"patients:list:{page}:{per_page}:{s}"
 
+    @staticmethod
+    def dossier(patient_id: str) -> str:
+        return f"dossier:{patient_id}"
+
+    @staticmethod
+    def lab_summary(patient_id: str) -> str:
+        return f"lab:summary:{patient_id}"
+
+    @staticmethod
+    def audit_count(filter_hash: str) -> str:
+        return f"audit:count:{filter_hash}"
+
     @staticmethod
     def alarm_counts() -> str:
         return "alarms:counts"
@@ -51,12 +79,59 @@ class CacheKeys:
     def alarm_list(status: str | None, patient_id: str | None, page: int) -> str:
         return f"alarms:list:{status or 'all'}:{patient_id or 'all'}:{page}"
 
-    # Patterns for bulk invalidation (used with SCAN + DELETE)
+    # Patterns for bulk invalidation. Versioned namespaces (see below) are
+    # invalidated by a generation bump, anything else via SCAN + UNLINK.
     PATIENT_ALL = "patient:*"
     PATIENT_LIST_ALL = "patients:list:*"
     ALARM_ALL = "alarms:*"
 
 
+# ─── Versioned Namespaces ──────────────────────────────────────
+#
+# Keys below these prefixes are stored as "<ns>:g<generation>:<rest>".
+# invalidate("<ns>:*") just INCRs the generation counter — one command,
+# independent of how many list pages are cached; orphaned generations
+# expire via their (short) TTL.
+
+VERSIONED_NAMESPACES = ("patients:list", "alarms")
+
+# Generation each namespace had when this request last read it; set_cached
+# skips the write if the namespace was invalidated in between, so a value
+# computed from pre-invalidation data is never stored under the new one.
+_observed_generation: ContextVar[dict[str, str] | None] = ContextVar("valkey_observed_generation", default=None)
+
+_GET_VERSIONED = """
+local gen = redis.call('GET', KEYS[1]) or '0'
+return {gen, redis.call('GET', ARGV[1] .. ':g' .. gen .. ':' .. ARGV[2])}
+"""
+
+_SET_VERSIONED = """
+local gen = redis.call('GET', KEYS[1]) or '0'
+if ARGV[5] ~= '' and ARGV[5] ~= gen then return 0 end
+redis.call('SET', ARGV[1] .. ':g' .. gen .. ':' .. ARGV[2], ARGV[3], 'EX', ARGV[4])
+return 1
+"""
+
+
+def _generation_key(namespace: str) -> str:
+    return f"cache:gen:{namespace}"
+
+
+def _split_namespace(key: str) -> tuple[str, str] | None:
+    """(namespace, rest) if the key lives in a versioned namespace."""
+    for namespace in VERSIONED_NAMESPACES:
+        if key.startswith(namespace) and key[len(namespace):len(namespace) + 1] == ":":
+            return namespace, key[len(namespace) + 1:]
+    return None
+
+
+def _namespace_of_pattern(pattern: str) -> str | None:
+    """Namespace for an invalidation pattern like "alarms:*"."""
+    if pattern.endswith(":*") and pattern[:-2] in VERSIONED_NAMESPACES:
+        return pattern[:-2]
+    return None
+
+
 # ─── Connection Lifecycle ──────────────────────────────────────
 
 
@@ -117,14 +192,27 @@ async def get_cached(key: str) -> Any | None:
     """Get a value from cache. Returns None on miss or error."""
     try:
         client = await get_valkey()
-        raw = await client.get(key)
+        versioned = _split_namespace(key)
+        if versioned is None:
+            raw = await client.get(key)
+        else:
+            namespace, rest = versioned
+            # [generation, value] — Lua drops a trailing nil, so a miss has length 1
+            reply = await client.eval(_GET_VERSIONED, 1, _generation_key(namespace), namespace, rest)
+            observed = dict(_observed_generation.get() or {})
+            observed[namespace] = reply[0]
+            _observed_generation.set(observed)
+            raw = reply[1] if len(reply) > 1 else None
         if raw is not None:
             logger.debug("Cache HIT: %s", key)
+            CACHE_REQUESTS.inc("valkey", "hit")
             return json.loads(raw)
         logger.debug("Cache MISS: %s", key)
+        CACHE_REQUESTS.inc("valkey", "miss")
         return None
     except Exception as exc:
         logger.warning("Valkey get failed (%s): %s", key, exc)
+        CACHE_REQUESTS.inc("valkey", "error")
         return None
 
 
@@ -132,31 +220,337 @@ async def set_cached(key: str, value: Any, ttl: int = 300) -> None:
     """Store a value in cache with TTL."""
     try:
         client = await get_valkey()
-        await client.set(key, json.dumps(value, default=str), ex=ttl)
+        payload = json.dumps(value, default=str)
+        versioned = _split_namespace(key)
+        if versioned is None:
+            await client.set(key, payload, ex=ttl)
+        else:
+            namespace, rest = versioned
+            expected = (_observed_generation.get() or {}).get(namespace, "")
+            stored = await client.eval(
+                _SET_VERSIONED, 1, _generation_key(namespace), namespace, rest, payload, ttl, expected,
+            )
+            if not stored:
+                logger.debug("Cache SET skipped (namespace %s invalidated meanwhile): %s", namespace, key)
+                return
         logger.debug("Cache SET: %s (ttl=%ds)", key, ttl)
     except Exception as exc:
         logger.warning("Valkey set failed (%s): %s", key, exc)
 
 
+_UNLINK_BATCH = 500
+
+
 async def invalidate(*patterns: str) -> int:
-    """Delete cache keys matching patterns (supports wildcards via SCAN).
+    """Invalidate cache keys / patterns.
 
-    Returns number of keys deleted.
+    - versioned namespace patterns ("alarms:*", "patients:list:*"): bump
+      the generation counter — O(1)
+    - exact keys: UNLINK in the same pipeline
+    - other wildcard patterns: SCAN, UNLINK in batches of 500
+
+    Returns number of keys unlinked plus namespaces bumped.
     """
-    deleted = 0
+    namespaces = [ns for p in patterns if (ns := _namespace_of_pattern(p))]
+    exact = [p for p in patterns if "*" not in p]
+    wildcards = [p for p in patterns if "*" in p and not _namespace_of_pattern(p)]
+    invalidated = 0
+    _local_invalidate(namespaces, exact, wildcards)
     try:
         client = await get_valkey()
-        for pattern in patterns:
-            if "*" in pattern:
-                # Use SCAN for wildcard patterns
-                async for key in client.scan_iter(match=pattern, count=100):
-                    await client.delete(key)
-                    deleted += 1
-            else:
-                result = await client.delete(pattern)
-                deleted += result
-        if deleted:
-            logger.debug("Cache INVALIDATED: %d keys for %s", deleted, patterns)
+        if namespaces or exact:
+            async with client.pipeline(transaction=False) as pipe:
+                for namespace in namespaces:
+                    pipe.incr(_generation_key(namespace))
+                if exact:
+                    pipe.unlink(*exact)
+                results = await pipe.execute()
+            invalidated += len(namespaces) + (results[-1] if exact else 0)
+
+        for pattern in wildcards:
+            batch: list[str] = []
+            async for key in client.scan_iter(match=pattern, count=_UNLINK_BATCH):
+                batch.append(key)
+                if len(batch) >= _UNLINK_BATCH:
+                    invalidated += await client.unlink(*batch)
+                    batch = []
+            if batch:
+                invalidated += await client.unlink(*batch)
+
+        if invalidated:
+            logger.debug("Cache INVALIDATED: %d keys/namespaces for %s", invalidated, patterns)
     except Exception as exc:
         logger.warning("Valkey invalidate failed (%s): %s", patterns, exc)
-    return deleted
+    return invalidated
+
+
+# ─── Two-Tier Cache ────────────────────────────────────────────
+#
+# get_or_load() puts a small per-worker LRU in front of Valkey:
+#   local hit   → no network, no JSON decode
+#   local miss  → one Valkey read; concurrent misses for the same key in
+#                 this worker share a single load (single-flight)
+#   Valkey miss → loader() runs once per worker, result written to both tiers
+# Entries are refreshed probabilistically shortly before they expire
+# (XFetch: the longer a value takes to compute, the earlier), so hot keys
+# are recomputed in the background instead of stampeding the DB on expiry.
+#
+# Other workers' writes evict local entries via Valkey client tracking
+# (BCAST on TRACKED_PREFIXES, redirected to a pub/sub listener). Keys
+# outside those prefixes (and every key while tracking is down) live at
+# most UNTRACKED_LOCAL_TTL seconds locally.
+#
+# Loaders may run detached from the calling request — a single-flight load
+# outlives a cancelled caller, an early refresh starts after the response —
+# so they must open their own session (``get_session_factory``), never
+# close over the request's ``AsyncSession``.
+
+TRACKED_PREFIXES = ("patient:", "dossier:", "lab:summary:", "cache:gen:")
+UNTRACKED_LOCAL_TTL = 1.0
+_INVALIDATE_CHANNEL = "__redis__:invalidate"
+
+
+@dataclass(slots=True)
+class _Entry:
+    value: Any
+    expires: float        # Valkey expiry (epoch seconds) — for early refresh
+    delta: float          # seconds the loader took
+    local_expires: float  # epoch seconds
+
+
+class LocalCache:
+    """Per-worker LRU with TTL. Values are shared — treat them as read-only."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, _Entry] = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str, now: float) -> _Entry | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry.local_expires <= now:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: _Entry) -> None:
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def discard_prefix(self, prefix: str) -> None:
+        for key in [k for k in self._data if k.startswith(prefix)]:
+            del self._data[key]
+
+    def discard_matching(self, pattern: str) -> None:
+        for key in [k for k in self._data if fnmatch.fnmatchcase(k, pattern)]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+_local = LocalCache(settings.cache_local_max_entries)
+_inflight: dict[str, asyncio.Task] = {}
+_refreshing: set[asyncio.Task] = set()
+_tracking_task: asyncio.Task | None = None
+_tracking_active = False
+
+cache_stats: dict[str, int] = {
+    "local_hits": 0, "local_misses": 0, "valkey_hits": 0, "loads": 0, "coalesced": 0, "early_refreshes": 0,
+}
+
+
+def _is_tracked(key: str) -> bool:
+    """Writes to this key (or its namespace generation) reach us via client tracking."""
+    return key.startswith(TRACKED_PREFIXES) or _split_namespace(key) is not None
+
+
+def _local_ttl(key: str, ttl: int) -> float:
+    if _tracking_active and _is_tracked(key):
+        return min(ttl, settings.cache_local_ttl_seconds)
+    return min(ttl, UNTRACKED_LOCAL_TTL)
+
+
+def _should_refresh(entry: _Entry, now: float) -> bool:
+    """XFetch: refresh with rising probability as expiry approaches."""
+    beta = settings.cache_early_refresh_beta
+    if beta <= 0 or entry.delta <= 0:
+        return False
+    return now - entry.delta * beta * math.log(random.random() or 1e-12) >= entry.expires
+
+
+async def get_or_load(key: str, loader: Callable[[], Awaitable[Any]], ttl: int = 300) -> Any:
+    """Two-tier read-through cache for JSON-serializable values.
+
+    ``loader`` runs on a miss in both tiers (once per worker, however many
+    requests miss concurrently). Exceptions from the loader propagate to
+    all waiters and nothing is cached. The loader may run after the caller
+    returned or was cancelled: it has to open its own DB session.
+    """
+    now = time.time()
+    entry = _local.get(key, now)
+    if entry is not None:
+        cache_stats["local_hits"] += 1
+        CACHE_REQUESTS.inc("local", "hit")
+        if _should_refresh(entry, now):
+            _refresh_in_background(key, loader, ttl)
+        return entry.value
+    cache_stats["local_misses"] += 1
+    CACHE_REQUESTS.inc("local", "miss")
+    return await _single_flight(key, lambda: _load_through(key, loader, ttl))
+
+
+async def _single_flight(key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _inflight[key] = task
+        task.add_done_callback(lambda _t: _inflight.pop(key, None))
+    else:
+        cache_stats["coalesced"] += 1
+    # shield: a cancelled request must not cancel the load for the others
+    return await asyncio.shield(task)
+
+
+async def _load_through(key: str, loader: Callable[[], Awaitable[Any]], ttl: int) -> Any:
+    envelope = await get_cached(key)
+    if isinstance(envelope, dict) and "v" in envelope:
+        cache_stats["valkey_hits"] += 1
+        now = time.time()
+        entry = _Entry(envelope["v"], envelope.get("x", now + ttl), envelope.get("d", 0.0), now + _local_ttl(key, ttl))
+        _local.put(key, entry)
+        if _should_refresh(entry, now):
+            _refresh_in_background(key, loader, ttl)
+        return entry.value
+    return await _recompute(key, loader, ttl)
+
+
+async def _recompute(key: str, loader: Callable[[], Awaitable[Any]], ttl: int) -> Any:
+    cache_stats["loads"] += 1
+    started = time.time()
+    value = await loader()
+    now = time.time()
+    entry = _Entry(value, now + ttl, now - started, now + _local_ttl(key, ttl))
+    await set_cached(key, {"v": value, "d": round(entry.delta, 4), "x": entry.expires}, ttl=ttl)
+    _local.put(key, entry)
+    return value
+
+
+def _refresh_in_background(key: str, loader: Callable[[], Awaitable[Any]], ttl: int) -> None:
+    if key in _inflight:
+        return
+    cache_stats["early_refreshes"] += 1
+
+    async def _refresh() -> None:
+        try:
+            await _single_flight(key, lambda: _recompute(key, loader, ttl))
+        except Exception as exc:
+            logger.warning("Early cache refresh failed (%s): %s", key, exc)
+
+    task = asyncio.create_task(_refresh())
+    _refreshing.add(task)
+    task.add_done_callback(_refreshing.discard)
+
+
+def _local_invalidate(namespaces: list[str], exact: list[str], wildcards: list[str]) -> None:
+    """Apply an invalidation to this worker's tier immediately."""
+    for namespace in namespaces:
+        _local.discard_prefix(f"{namespace}:")
+    for key in exact:
+        _local.discard(key)
+    for pattern in wildcards:
+        _local.discard_matching(pattern)
+
+
+def handle_tracking_invalidation(keys: list[str] | None) -> None:
+    """Evict local entries for keys another client modified (None = flush)."""
+    if keys is None:
+        _local.clear()
+        return
+    for key in keys:
+        if key.startswith("cache:gen:"):
+            _local.discard_prefix(f"{key[len('cache:gen:'):]}:")
+        else:
+            _local.discard(key)
+
+
+def local_cache_stats() -> dict[str, Any]:
+    return {**cache_stats, "local_entries": len(_local), "evictions": _local.evictions, "tracking": _tracking_active}
+
+
+async def start_cache_tracking() -> None:
+    """Start the client-tracking listener that keeps the local tier coherent."""
+    global _tracking_task
+    if _tracking_task is None or _tracking_task.done():
+        _tracking_task = asyncio.create_task(_track_invalidations())
+
+
+async def stop_cache_tracking() -> None:
+    global _tracking_task, _tracking_active
+    if _tracking_task is not None:
+        _tracking_task.cancel()
+        try:
+            await _tracking_task
+        except asyncio.CancelledError:
+            pass
+        _tracking_task = None
+    _tracking_active = False
+    _local.clear()
+
+
+async def _track_invalidations() -> None:
+    """CLIENT TRACKING … BCAST REDIRECT <listener> with reconnect/backoff.
+
+    The tracking state belongs to a dedicated connection that must stay
+    open; invalidation messages arrive on the listener's pub/sub channel.
+    """
+    global _tracking_active
+    backoff = 1.0
+    while True:
+        tracker = pubsub = None
+        try:
+            client = await get_valkey()
+            pubsub = client.pubsub()
+            await pubsub.connect()
+            await pubsub.connection.send_command("CLIENT", "ID")
+            listener_id = await pubsub.connection.read_response()
+            await pubsub.subscribe(_INVALIDATE_CHANNEL)
+
+            tracker = redis.Redis.from_url(settings.valkey_url, decode_responses=True, single_connection_client=True)
+            prefixes = [arg for prefix in TRACKED_PREFIXES for arg in ("PREFIX", prefix)]
+            await tracker.execute_command("CLIENT", "TRACKING", "ON", "REDIRECT", listener_id, "BCAST", *prefixes)
+
+            # Anything cached before tracking started may already be stale
+            _local.clear()
+            _tracking_active = True
+            backoff = 1.0
+            logger.info("Valkey client tracking active (prefixes=%s)", TRACKED_PREFIXES)
+            async for msg in pubsub.listen():
+                if msg.get("type") == "message" and msg.get("channel") == _INVALIDATE_CHANNEL:
+                    handle_tracking_invalidation(msg.get("data"))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Valkey client tracking unavailable, retry in %.0fs: %s", backoff, exc)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+        finally:
+            _tracking_active = False
+            for conn in (pubsub, tracker):
+                if conn is not None:
+                    try:
+                        await conn.aclose()
+                    except Exception:
+                        pass
@@ -3,14 +3,13 @@
 import logging
 import time
 import uuid
-from collections import defaultdict
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from src.api.middleware import AuditMiddleware
+from src.api.middleware import ObservabilityMiddleware, http_summary
 from src.api.v1.alarms import router as alarms_router
 from src.api.v1.appointments import router as appointments_router
 from src.api.v1.audit import router as audit_router
@@ -44,7 +43,9 @@ from src.api.v1.diagnoses import router as diagnoses_router
 from src.api.v1.icd10 import router as icd10_router
 from src.api.v1.medikament_katalog import router as medikament_katalog_router
 from src.api.v1.dossier import router as dossier_router
+from src.api.v1.census import router as census_router
 from src.api.v1.rbac import router as rbac_router
+from src.api.v1.query_stats import router as query_stats_router
 from src.api.v1.ai import router as ai_router
 from src.api.v1.fhir import router as fhir_router
 from src.api.websocket.alarms_ws import router as alarms_ws_router
@@ -59,8 +60,20 @@ logger = logging.getLogger("pdms")
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events."""
-    from src.infrastructure.rabbitmq import close_rabbitmq_connection, get_rabbitmq_connection, start_consumer
-    from src.infrastructure.valkey import close_valkey, connect_valkey, valkey_health
+    from src.infrastructure.rabbitmq import (
+        close_rabbitmq_connection,
+        get_rabbitmq_connection,
+        start_consumer,
+        start_publisher,
+        subscribe_worker,
+    )
+    from src.infrastructure.valkey import (
+        close_valkey,
+        connect_valkey,
+        start_cache_tracking,
+        stop_cache_tracking,
+        valkey_health,
+    )
 
     logger.info(f"🏥 PDMS API starting ({settings.environment})")
 
@@ -72,9 +85,29 @@ async def lifespan(app: FastAPI):
     except Exception as exc:
         logger.warning("🔑 Valkey startup failed (non-fatal): %s", exc)
 
+    # Local cache tier: evictions via Valkey client tracking (reconnects in background)
+    await start_cache_tracking()
+
+    # WebSocket fan-out across workers (Valkey pub/sub, reconnects in background)
+    from src.api.websocket.broker import ws_broker
+    await ws_broker.start()
+
+    # Alarm engine: warm in-memory index of active alarms
+    try:
+        from src.domain.services.alarm_service import active_alarms
+        from src.infrastructure.database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as session:
+            count = await active_alarms.warm(session)
+        active_alarms.start_refresh(AsyncSessionLocal, settings.alarm_index_refresh_seconds)
+        logger.info("🚨 Alarm index warmed (%d active)", count)
+    except Exception as exc:
+        logger.warning("🚨 Alarm index warm-up failed (non-fatal, DB fallback): %s", exc)
+
     # RabbitMQ: establish connection + start consumer
     try:
         await get_rabbitmq_connection()
+        await start_publisher()
         # Import handlers to register them via @on_event decorators
         import src.domain.events.handlers  # noqa: F401
         await start_consumer(
@@ -82,13 +115,87 @@ async def lifespan(app: FastAPI):
             binding_keys=["alarm.#", "medication.#", "encounter.#", "note.#", "nursing.#", "vital.#", "appointment.#", "consent.#", "home_visit.#", "teleconsult.#", "device.#", "self_medication.#", "lab.#", "fluid.#", "treatment_plan.#", "consultation.#", "letter.#", "shift_handover.#", "nutrition.#"],
         )
         logger.info("🐇 RabbitMQ consumer started")
+
+        # Alarm index: every worker needs every alarm.* event (fan-out, not
+        # the shared queue); re-warm after each bind to close reconnect gaps
+        from src.domain.services.alarm_service import active_alarms
+        from src.infrastructure.database import AsyncSessionLocal
+
+        async def _rewarm_alarm_index() -> None:
+            async with AsyncSessionLocal() as session:
+                await active_alarms.warm(session)
+
+        await subscribe_worker(["alarm.#"], active_alarms.apply_event, on_ready=_rewarm_alarm_index)
     except Exception as exc:
         logger.warning("🐇 RabbitMQ startup failed (non-fatal): %s", exc)
 
+    # Transactional outbox: relay committed events (retries until RabbitMQ is up)
+    from src.infrastructure.database import AsyncSessionLocal
+    from src.infrastructure.outbox import outbox_relay
+    await outbox_relay.start(
+        AsyncSessionLocal,
+        batch_size=settings.outbox_relay_batch_size,
+        interval=settings.outbox_relay_interval_seconds,
+    )
+
+    # Audit trail: batched writer (replays spilled entries from earlier runs)
+    from pathlib import Path
+
+    from src.infrastructure.audit_writer import audit_writer
+    await audit_writer.start(
+        AsyncSessionLocal,
+        spill_dir=Path(settings.audit_spill_dir),
+        queue_size=settings.audit_queue_size,
+        batch_size=settings.audit_batch_size,
+        flush_interval=settings.audit_flush_interval_ms / 1000,
+    )
+
+    # Catalog autocomplete: ICD-10 + drugs as in-process prefix index
+    if settings.catalog_search_in_memory:
+        from src.domain.services.catalog_search import load_catalog_indexes
+        try:
+            await load_catalog_indexes(AsyncSessionLocal)
+        except Exception as exc:
+            logger.warning("📚 Catalog index load failed, using SQL search (non-fatal): %s", exc)
+
+    # HL7v2 lab interface: MLLP listener → batch lab import
+    from src.infrastructure.mllp import mllp_listener
+    if settings.hl7_mllp_enabled:
+        from functools import partial
+
+        from src.domain.services.hl7_service import handle_hl7_message, patient_partition_key
+        try:
+            await mllp_listener.start(
+                partial(handle_hl7_message, AsyncSessionLocal),
+                host=settings.hl7_mllp_host,
+                port=settings.hl7_mllp_port,
+                workers=settings.hl7_mllp_workers,
+                queue_size=settings.hl7_mllp_queue_size,
+                max_message_bytes=settings.hl7_mllp_max_message_bytes,
+                partition=patient_partition_key,
+            )
+        except OSError as exc:
+            logger.warning("🧪 MLLP listener startup failed (non-fatal): %s", exc)
+
+    # Prometheus metrics: per-worker snapshots for multi-worker aggregation
+    from src.infrastructure.metrics import exporter as metrics_exporter
+    if settings.metrics_multiproc_dir:
+        await metrics_exporter.start(settings.metrics_multiproc_dir, settings.metrics_export_interval_seconds)
+
     yield
 
     # Shutdown
+    await metrics_exporter.stop()
+    from src.domain.services.alarm_service import active_alarms
+    await active_alarms.stop_refresh()
+    await ws_broker.stop()
+    await mllp_listener.stop()
+    await audit_writer.stop()
+    await outbox_relay.stop()
+    from src.domain.services.fhir_export_service import stop_exports
+    await stop_exports()
     await close_rabbitmq_connection()
+    await stop_cache_tracking()
     await close_valkey()
     logger.info("🏥 PDMS API shutting down")
 
@@ -107,7 +214,6 @@ media_root = get_media_root_path()
 app.mount(settings.media_url_prefix, StaticFiles(directory=str(media_root)), name="media")
 
 # Middleware (order matters: last added = first executed)
-app.add_middleware(AuditMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins,
@@ -115,26 +221,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost: timing, metrics and audit capture for every HTTP request
+app.add_middleware(ObservabilityMiddleware)
 
-# ─── Metrics Collection ──────────────────────────────────────────
 _start_time = time.time()
-_request_count: dict[str, int] = defaultdict(int)
-_request_errors: dict[str, int] = defaultdict(int)
-_request_duration: dict[str, float] = defaultdict(float)
-
-
-@app.middleware("http")
-async def metrics_middleware(request: Request, call_next) -> Response:
-    """Sammelt Request-Metriken (Anzahl, Fehler, Dauer)."""
-    start = time.perf_counter()
-    response = await call_next(request)
-    duration = time.perf_counter() - start
-    method_path = f"{request.method} {request.url.path}"
-    _request_count[method_path] += 1
-    _request_duration[method_path] += duration
-    if response.status_code >= 400:
-        _request_errors[method_path] += 1
-    return response
 
 
 # ─── Health Check (erweiterter System-Status) ────────────────────
@@ -224,29 +314,39 @@ async def health():
 @app.get("/metrics", tags=["system"])
 async def metrics():
     """Gibt API-Metriken im JSON-Format zurück."""
-    total_requests = sum(_request_count.values())
-    total_errors = sum(_request_errors.values())
-
-    # Top-10 Endpoints nach Anzahl Requests
-    top_endpoints = sorted(_request_count.items(), key=lambda x: x[1], reverse=True)[:10]
+    from src.api.websocket.alarms_ws import alarm_ws_stats
+    from src.api.websocket.vitals_ws import vitals_ws_stats
+    from src.infrastructure.audit_writer import audit_writer
+    from src.infrastructure.mllp import mllp_listener
+    from src.infrastructure.outbox import outbox_relay
+    from src.infrastructure.rabbitmq import get_consumer, get_dispatcher, get_publisher
+    from src.infrastructure.valkey import local_cache_stats
 
     return {
         "uptime_seconds": round(time.time() - _start_time, 1),
-        "total_requests": total_requests,
-        "total_errors": total_errors,
-        "error_rate": round(total_errors / max(total_requests, 1) * 100, 2),
-        "top_endpoints": [
-            {
-                "endpoint": ep,
-                "requests": cnt,
-                "errors": _request_errors.get(ep, 0),
-                "avg_duration_ms": round(_request_duration.get(ep, 0) / max(cnt, 1) * 1000, 2),
-            }
-            for ep, cnt in top_endpoints
-        ],
+        **http_summary(),
+        "websocket": {
+            "alarms": alarm_ws_stats(),
+            "vitals": vitals_ws_stats(),
+        },
+        "rabbitmq": {**get_publisher().stats, "outbox_depth": get_publisher().outbox_depth},
+        "event_outbox": {"relayed": outbox_relay.relayed, "failed": outbox_relay.failed},
+        "event_handlers": get_dispatcher().stats(),
+        "event_consumer": get_consumer().metrics() if get_consumer() else None,
+        "cache": local_cache_stats(),
+        "hl7_mllp": mllp_listener.stats,
+        "audit": audit_writer.stats,
     }
 
 
+@app.get("/metrics/prometheus", tags=["system"], include_in_schema=False)
+async def prometheus_metrics() -> Response:
+    """Metriken im Prometheus-Textformat (über alle Worker aggregiert)."""
+    from src.infrastructure.metrics import CONTENT_TYPE, exporter
+
+    return Response(exporter.render(), media_type=CONTENT_TYPE)
+
+
 app.include_router(patients_router, prefix="/api/v1", tags=["patients"], dependencies=[require_rbac("Patientenstammdaten")])
 app.include_router(vitals_router, prefix="/api/v1", tags=["vitals"], dependencies=[require_rbac("Vitalparameter")])
 app.include_router(alarms_router, prefix="/api/v1", tags=["alarms"], dependencies=[require_rbac("Alarme")])
@@ -280,7 +380,9 @@ app.include_router(diagnoses_router, prefix="/api/v1", tags=["diagnoses"], depen
 app.include_router(icd10_router, prefix="/api/v1", tags=["icd10"])
 app.include_router(medikament_katalog_router, prefix="/api/v1", tags=["medikament-katalog"])
 app.include_router(dossier_router, prefix="/api/v1", tags=["dossier"])
+app.include_router(census_router, prefix="/api/v1", tags=["census"], dependencies=[require_rbac("Patientenstammdaten")])
 app.include_router(rbac_router, prefix="/api/v1", tags=["rbac"])
+app.include_router(query_stats_router, prefix="/api/v1", tags=["admin"])
 
 # FHIR R4 (CH Core Profile)
 app.include_router(fhir_router, prefix="/api/v1", tags=["fhir"])
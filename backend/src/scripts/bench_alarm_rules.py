@@ -0,0 +1,152 @@
+"""Micro-Benchmark: Alarm-Schwellenwertprüfung alt (Loop + DB) vs. Rule-Engine.
+
+Vergleicht
+  1. reine CPU-Kosten der Bewertung (``_evaluate_severity`` je Parameter
+     vs. kompilierte Intervall-Tabellen), und
+  2. den kompletten Duplikat-Check pro Vital-Push: bisher ein SELECT pro
+     auffälligem Parameter, jetzt Lookup im In-Memory-Index. Die DB-Latenz
+     wird über ``--db-latency-ms`` simuliert (Default: 0.4 ms, LAN/Pi).
+
+Ausführung:
+    cd backend
+    python -m src.scripts.bench_alarm_rules --patients 200 --pushes 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from dataclasses import dataclass
+
+from src.domain.services.alarm_rules import ActiveAlarmIndex, compile_rules, evaluate_vital
+from src.domain.services.alarm_service import THRESHOLDS, _evaluate_severity
+
+
+@dataclass
+class FakeVital:
+    """Minimaler Ersatz für eine VitalSign-Zeile."""
+
+    patient_id: uuid.UUID
+    heart_rate: float | None
+    systolic_bp: float | None
+    diastolic_bp: float | None
+    spo2: float | None
+    temperature: float | None
+    respiratory_rate: float | None
+
+
+def _random_vital(rng: random.Random, patient_id: uuid.UUID) -> FakeVital:
+    return FakeVital(
+        patient_id=patient_id,
+        heart_rate=rng.uniform(35, 150),
+        systolic_bp=rng.uniform(75, 210),
+        diastolic_bp=rng.uniform(40, 115),
+        spo2=rng.uniform(84, 100),
+        temperature=rng.uniform(34.5, 40.0),
+        respiratory_rate=rng.uniform(6, 32),
+    )
+
+
+def _legacy_evaluate(vital: FakeVital) -> list[tuple[str, float, str]]:
+    hits = []
+    for param, levels in THRESHOLDS.items():
+        value = getattr(vital, param, None)
+        if value is None:
+            continue
+        severity = _evaluate_severity(value, levels)
+        if severity is not None:
+            hits.append((param, value, severity))
+    return hits
+
+
+async def _legacy_check(vital: FakeVital, active: set[tuple[uuid.UUID, str]], latency: float) -> int:
+    """Bisheriger Ablauf: ein simulierter SELECT pro auffälligem Parameter."""
+    created = 0
+    for param, _value, _severity in _legacy_evaluate(vital):
+        await asyncio.sleep(latency)
+        key = (vital.patient_id, param)
+        if key in active:
+            continue
+        active.add(key)
+        created += 1
+    return created
+
+
+async def _engine_check(vital: FakeVital, rules, index: ActiveAlarmIndex) -> int:
+    created = 0
+    already = index.active_parameters(vital.patient_id)
+    for rule, _value, _severity in evaluate_vital(rules, vital):
+        if rule.parameter in already:
+            continue
+        index.add(vital.patient_id, rule.parameter)
+        created += 1
+    return created
+
+
+def _bench_cpu(vitals: list[FakeVital], rules) -> tuple[float, float]:
+    start = time.perf_counter()
+    for v in vitals:
+        _legacy_evaluate(v)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for v in vitals:
+        evaluate_vital(rules, v)
+    engine = time.perf_counter() - start
+    return legacy, engine
+
+
+async def _bench_end_to_end(vitals: list[FakeVital], rules, latency: float) -> tuple[float, float, int, int]:
+    active: set[tuple[uuid.UUID, str]] = set()
+    start = time.perf_counter()
+    legacy_created = 0
+    for v in vitals:
+        legacy_created += await _legacy_check(v, active, latency)
+    legacy = time.perf_counter() - start
+
+    index = ActiveAlarmIndex()
+    start = time.perf_counter()
+    engine_created = 0
+    for v in vitals:
+        engine_created += await _engine_check(v, rules, index)
+    engine = time.perf_counter() - start
+    return legacy, engine, legacy_created, engine_created
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--pushes", type=int, default=5000)
+    parser.add_argument("--db-latency-ms", type=float, default=0.4)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    patients = [uuid.uuid4() for _ in range(args.patients)]
+    vitals = [_random_vital(rng, rng.choice(patients)) for _ in range(args.pushes)]
+    rules = compile_rules(THRESHOLDS)
+
+    # Sicherstellen, dass beide Varianten identisch bewerten
+    for v in vitals:
+        legacy = [(p, s) for p, _, s in _legacy_evaluate(v)]
+        engine = [(r.parameter, s) for r, _, s in evaluate_vital(rules, v)]
+        assert legacy == engine, (legacy, engine)
+
+    cpu_legacy, cpu_engine = _bench_cpu(vitals, rules)
+    e2e_legacy, e2e_engine, n_legacy, n_engine = asyncio.run(
+        _bench_end_to_end(vitals, rules, args.db_latency_ms / 1000)
+    )
+    assert n_legacy == n_engine
+
+    n = len(vitals)
+    print(f"Vital-Pushes: {n}  Patienten: {args.patients}  simulierte DB-Latenz: {args.db_latency_ms} ms")
+    print(f"CPU-Bewertung   alt: {cpu_legacy / n * 1e6:8.2f} µs/push   neu: {cpu_engine / n * 1e6:8.2f} µs/push")
+    print(f"Inkl. Dedupe    alt: {e2e_legacy / n * 1e3:8.3f} ms/push   neu: {e2e_engine / n * 1e3:8.3f} ms/push")
+    print(f"Speedup (inkl. Dedupe): {e2e_legacy / max(e2e_engine, 1e-9):.0f}x   erzeugte Alarme: {n_engine}")
+
+
+if __name__ == "__main__":
+    main()
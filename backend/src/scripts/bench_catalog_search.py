@@ -0,0 +1,149 @@
+"""Latenz-Benchmark: ICD-10-Autovervollständigung (In-Process-Index und SQL).
+
+Ohne ``--catalog`` wird ein synthetischer Katalog in der Grösse der
+ICD-10-GM (~16 000 Kodes, deutsche Bezeichnungen mit Umlauten) erzeugt.
+Mit ``--catalog`` wird eine Semikolon-getrennte Datei geladen, z.B. die
+BfArM-Kodedatei ``icd10gm20xx_syst_kodes.txt`` (``--code-col 6 --title-col 8``).
+
+Gemessen wird pro Tastendruck-Präfix der Abfragen (``"di"``, ``"dia"``, …):
+  1. ``PrefixIndex.search`` (In-Process),
+  2. optional (``--db``) ``search_icd10`` gegen die konfigurierte Datenbank
+     (Trigramm-Suche, Katalog muss importiert sein).
+
+Ausführung:
+    cd backend
+    python -m src.scripts.bench_catalog_search
+    python -m src.scripts.bench_catalog_search --catalog icd10gm2026_syst_kodes.txt --code-col 6 --title-col 8 --db
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import random
+import time
+
+from src.domain.services.catalog_search import PrefixIndex, normalize_icd_code
+
+QUERIES = (
+    "E11.9", "e119", "I50", "J18", "Diabetes mellitus Typ 2", "Herzinsuffizienz", "Hyperkaliämie",
+    "Hyperkaliaemie", "Pneumonie", "Niereninsuffizienz chronisch", "Störung", "Stoerung", "Sepsis",
+)
+
+_ORGANS = (
+    "Herz", "Lunge", "Leber", "Niere", "Magen", "Darm", "Gehirn", "Haut", "Knochen", "Gelenk",
+    "Schilddrüse", "Bauchspeicheldrüse", "Harnblase", "Gefäss", "Muskel", "Nerven", "Auge", "Ohr",
+)
+_CONDITIONS = (
+    "Insuffizienz", "Entzündung", "Blutung", "Verletzung", "Neubildung, bösartig", "Neubildung, gutartig",
+    "Störung", "Fehlbildung", "Infektion", "Zyste", "Stenose", "Thrombose", "Embolie", "Ödem", "Abszess",
+)
+_QUALIFIERS = (
+    "akut", "chronisch", "nicht näher bezeichnet", "sonstige", "mit Komplikationen", "ohne Komplikationen",
+    "primär", "sekundär", "beidseitig", "rezidivierend", "im Wochenbett", "durch Arzneimittel",
+)
+_FIXED = (
+    ("E11.9", "Diabetes mellitus, Typ 2 ohne Komplikationen"),
+    ("I50.9", "Herzinsuffizienz, nicht näher bezeichnet"),
+    ("E87.5", "Hyperkaliämie"),
+    ("J18.9", "Pneumonie, nicht näher bezeichnet"),
+    ("N18.4", "Chronische Nierenkrankheit, Stadium 4"),
+    ("A41.9", "Sepsis, nicht näher bezeichnet"),
+)
+
+
+def synthetic_catalog(size: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    rows = [{"code": c, "title": t, "chapter": None, "category": None} for c, t in _FIXED]
+    seen = {c for c, _ in _FIXED}
+    while len(rows) < size:
+        code = f"{rng.choice('ABCDEFGHIJKLMNOPQRSTZ')}{rng.randint(0, 99):02d}.{rng.randint(0, 99)}"
+        if code in seen:
+            continue
+        seen.add(code)
+        title = f"{rng.choice(_ORGANS)}{rng.choice(_CONDITIONS).lower()}, {rng.choice(_QUALIFIERS)}"
+        rows.append({"code": code, "title": title, "chapter": None, "category": None})
+    return rows
+
+
+def load_catalog(path: str, code_col: int, title_col: int) -> list[dict]:
+    with open(path, encoding="utf-8", errors="replace", newline="") as fh:
+        return [
+            {"code": row[code_col], "title": row[title_col], "chapter": None, "category": None}
+            for row in csv.reader(fh, delimiter=";")
+            if len(row) > max(code_col, title_col) and row[code_col]
+        ]
+
+
+def keystrokes(queries: tuple[str, ...]) -> list[str]:
+    """Alle Präfixe ab 2 Zeichen, wie sie die Autovervollständigung sendet."""
+    return [q[:n] for q in queries for n in range(2, len(q) + 1)]
+
+
+def _percentiles(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p = lambda f: samples[min(len(samples) - 1, int(f * len(samples)))] * 1e6  # noqa: E731
+    return f"p50 {p(0.50):8.1f} µs   p95 {p(0.95):8.1f} µs   p99 {p(0.99):8.1f} µs   max {samples[-1] * 1e6:8.1f} µs"
+
+
+def bench_index(index: PrefixIndex, inputs: list[str], rounds: int) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        for q in inputs:
+            start = time.perf_counter()
+            code = normalize_icd_code(q)
+            index.search(code or q, limit=15, code_query=code)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def bench_db(inputs: list[str], rounds: int) -> list[float]:
+    from src.domain.services.icd10_service import search_icd10
+    from src.infrastructure.database import AsyncSessionLocal
+
+    samples = []
+    async with AsyncSessionLocal() as session:
+        await search_icd10(session, "warmup")
+        for _ in range(rounds):
+            for q in inputs:
+                start = time.perf_counter()
+                await search_icd10(session, q, limit=15)
+                samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--catalog", help="Semikolon-getrennte Kodedatei")
+    parser.add_argument("--code-col", type=int, default=0)
+    parser.add_argument("--title-col", type=int, default=1)
+    parser.add_argument("--size", type=int, default=16000, help="Grösse des synthetischen Katalogs")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--db", action="store_true", help="zusätzlich die SQL-Suche messen")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = (
+        load_catalog(args.catalog, args.code_col, args.title_col) if args.catalog
+        else synthetic_catalog(args.size, args.seed)
+    )
+    start = time.perf_counter()
+    index = PrefixIndex.build(
+        rows, code=lambda r: r["code"], text=lambda r: f"{r['code']} {r['title']}", titles=lambda r: (r["title"],),
+    )
+    build = time.perf_counter() - start
+
+    # Plausibilität: Umlaut-Schreibweisen liefern dieselben Treffer
+    assert index.search("Hyperkaliämie", limit=5) == index.search("Hyperkaliaemie", limit=5)
+    assert index.search("E11.9", limit=1, code_query="E11.9")[0]["code"] == "E11.9" or args.catalog
+
+    inputs = keystrokes(QUERIES)
+    print(f"Katalog: {len(index)} Kodes   Indexaufbau: {build * 1000:.0f} ms   Abfragen: {len(inputs)} × {args.rounds}")
+    print(f"In-Process : {_percentiles(bench_index(index, inputs, args.rounds))}")
+    if args.db:
+        print(f"SQL (trgm) : {_percentiles(asyncio.run(bench_db(inputs, max(1, args.rounds // 10))))}")
+
+
+if __name__ == "__main__":
+    main()
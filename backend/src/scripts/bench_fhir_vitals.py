@@ -0,0 +1,97 @@
+"""Micro-Benchmark: FHIR-Observation-Serialisierung alt (Dict + json) vs. vorkompiliert.
+
+Vergleicht pro Vitalmessung
+  1. ``vital_sign_to_fhir`` + ``json.dumps`` (bisheriger Pfad),
+  2. ``vital_sign_to_fhir`` + ``orjson.dumps`` (nur schnellerer Encoder),
+  3. ``encode_vital_row`` (vorkompilierte Fragmente aus Row-Tupeln).
+
+Alle drei Varianten werden vorab auf identischen Inhalt geprüft.
+
+Ausführung:
+    cd backend
+    python -m src.scripts.bench_fhir_vitals --rows 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+import uuid
+from collections import namedtuple
+from datetime import UTC, datetime, timedelta
+
+import orjson
+
+from src.domain.services.fhir_service import VITAL_LOINC_MAP, encode_vital_row, vital_sign_to_fhir
+
+VitalRow = namedtuple("VitalRow", ["id", "patient_id", "encounter_id", "recorded_at", *VITAL_LOINC_MAP])
+
+
+def _random_row(rng: random.Random, patient_id: uuid.UUID, recorded_at: datetime) -> VitalRow:
+    """Typische Messung: Monitor-Werte immer, GCS/Schmerz selten."""
+    return VitalRow(
+        id=uuid.uuid4(),
+        patient_id=patient_id,
+        encounter_id=uuid.uuid4() if rng.random() < 0.8 else None,
+        recorded_at=recorded_at,
+        heart_rate=round(rng.uniform(45, 130), 1),
+        systolic_bp=round(rng.uniform(90, 180)),
+        diastolic_bp=round(rng.uniform(50, 100)),
+        spo2=round(rng.uniform(88, 100), 1),
+        temperature=round(rng.uniform(35.5, 39.5), 1),
+        respiratory_rate=round(rng.uniform(10, 28)),
+        gcs=15 if rng.random() < 0.1 else None,
+        pain_score=rng.randint(0, 10) if rng.random() < 0.2 else None,
+    )
+
+
+def _bench(rows: list[VitalRow]) -> tuple[float, float, float, int]:
+    start = time.perf_counter()
+    for row in rows:
+        for obs in vital_sign_to_fhir(row):
+            json.dumps(obs)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for row in rows:
+        for obs in vital_sign_to_fhir(row):
+            orjson.dumps(obs)
+    dict_orjson = time.perf_counter() - start
+
+    start = time.perf_counter()
+    observations = 0
+    for row in rows:
+        observations += len(encode_vital_row(row))
+    compiled = time.perf_counter() - start
+    return legacy, dict_orjson, compiled, observations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    patient_id = uuid.uuid4()
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    rows = [_random_row(rng, patient_id, start + timedelta(minutes=5 * i)) for i in range(args.rows)]
+
+    # Sicherstellen, dass alle Varianten dasselbe JSON liefern
+    for row in rows[:1000]:
+        expected = [json.loads(json.dumps(o)) for o in vital_sign_to_fhir(row)]
+        assert [json.loads(obs) for _id, obs in encode_vital_row(row)] == expected
+
+    legacy, dict_orjson, compiled, observations = _bench(rows)
+    n = len(rows)
+    print(f"Vitalmessungen: {n}  Observations: {observations}")
+    print(f"Dict + json      : {legacy / n * 1e6:8.2f} µs/Messung")
+    print(f"Dict + orjson    : {dict_orjson / n * 1e6:8.2f} µs/Messung")
+    print(f"Vorkompiliert    : {compiled / n * 1e6:8.2f} µs/Messung")
+    print(f"Speedup vs. alt  : {legacy / max(compiled, 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
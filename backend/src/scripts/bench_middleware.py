@@ -0,0 +1,211 @@
+"""Last-Test: Overhead der Request-Middleware, BaseHTTPMiddleware-Stack vs. reine ASGI.
+
+Vergleicht drei Varianten derselben Mini-App (JSON-GET, auditierter POST,
+gestreamte Antwort wie bei ``/media``):
+  1. ohne Middleware (Basislinie),
+  2. bisheriger Stack: ``AuditMiddleware`` (``BaseHTTPMiddleware``) +
+     ``@app.middleware("http")``-Metriken — hier nachgebaut,
+  3. ``ObservabilityMiddleware`` (reine ASGI, eine Schicht).
+
+Die Requests laufen direkt über die ASGI-Schnittstelle (kein Netzwerk,
+kein HTTP-Client), ``--concurrency`` gleichzeitig. Ausgewiesen werden die
+Kosten pro Request (Wandzeit / Anzahl, beste Runde), der Overhead
+gegenüber der Basislinie sowie p50/p99 der Latenz unter Last.
+``audit_writer.enqueue`` wird durch eine Liste ersetzt, damit beide
+Varianten gleich viel (nichts) in die Datenbank schreiben.
+
+Ausführung:
+    cd backend
+    python -m src.scripts.bench_middleware --requests 20000 --concurrency 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import uuid
+from collections import defaultdict
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from src.api.middleware import ObservabilityMiddleware, _patient_id, _route_template
+from src.infrastructure.audit_writer import audit_writer
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+PATIENT_ID = str(uuid.uuid4())
+
+
+def _routes(app: FastAPI) -> FastAPI:
+    @app.get("/api/v1/patients/{patient_id}")
+    async def get_patient(patient_id: uuid.UUID):
+        return {"id": str(patient_id), "last_name": "Muster", "first_name": "Anna"}
+
+    @app.post("/api/v1/patients/{patient_id}/notes", status_code=201)
+    async def create_note(patient_id: uuid.UUID, request: Request):
+        request.state.user_id = USER_ID
+        request.state.user_role = "arzt"
+        return {"ok": True}
+
+    @app.get("/media/photo.jpg")
+    async def media():
+        async def chunks():
+            for _ in range(16):
+                yield b"\0" * 4096
+
+        return StreamingResponse(chunks(), media_type="image/jpeg")
+
+    return app
+
+
+# ─── Bisheriger Stack (Nachbau von AuditMiddleware + metrics_middleware) ──
+
+
+class LegacyAuditMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        start = time.time()
+        response = await call_next(request)
+        duration_ms = round((time.time() - start) * 1000)
+        if request.url.path.startswith("/api/") and request.method in ("POST", "PATCH", "PUT", "DELETE"):
+            user_id = getattr(request.state, "user_id", None)
+            if user_id:
+                audit_writer.enqueue(
+                    user_id=uuid.UUID(user_id),
+                    user_role=getattr(request.state, "user_role", "anonymous"),
+                    action=request.method,
+                    resource_type=request.url.path[:50],
+                    details={"status": response.status_code, "duration_ms": duration_ms, "path": request.url.path},
+                    ip_address=request.client.host if request.client else None,
+                    patient_id=_patient_id(request.scope),
+                    route=_route_template(request.scope),
+                )
+        return response
+
+
+def legacy_app() -> FastAPI:
+    app = _routes(FastAPI())
+    app.add_middleware(LegacyAuditMiddleware)
+    count: dict[str, int] = defaultdict(int)
+    errors: dict[str, int] = defaultdict(int)
+    duration: dict[str, float] = defaultdict(float)
+
+    @app.middleware("http")
+    async def metrics_middleware(request: Request, call_next) -> Response:
+        start = time.perf_counter()
+        response = await call_next(request)
+        method_path = f"{request.method} {request.url.path}"
+        count[method_path] += 1
+        duration[method_path] += time.perf_counter() - start
+        if response.status_code >= 400:
+            errors[method_path] += 1
+        return response
+
+    return app
+
+
+def asgi_app() -> FastAPI:
+    app = _routes(FastAPI())
+    app.add_middleware(ObservabilityMiddleware)
+    return app
+
+
+# ─── Lastgenerator ─────────────────────────────────────────────
+
+REQUESTS = (
+    ("GET", f"/api/v1/patients/{PATIENT_ID}"),
+    ("POST", f"/api/v1/patients/{PATIENT_ID}/notes"),
+    ("GET", "/media/photo.jpg"),
+)
+
+
+async def call(app, method: str, path: str) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method, "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench"), (b"content-length", b"0")],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80), "state": {},
+    }
+    received = False
+    status = 0
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.Event().wait()  # kein Disconnect während der Antwort
+        received = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def run(app, total: int, concurrency: int) -> tuple[float, list[float]]:
+    """Führt ``total`` Requests aus; liefert (Wandzeit gesamt, Latenzen)."""
+    samples: list[float] = []
+    queue = list(range(total))
+
+    async def worker():
+        while queue:
+            method, path = REQUESTS[queue.pop() % len(REQUESTS)]
+            start = time.perf_counter()
+            status = await call(app, method, path)
+            samples.append(time.perf_counter() - start)
+            assert status < 400, (method, path, status)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started, samples
+
+
+def _percentile(samples: list[float], f: float) -> float:
+    return samples[min(len(samples) - 1, int(f * len(samples)))] * 1e6
+
+
+async def main_async(args) -> None:
+    queued: list[dict] = []
+    audit_writer.enqueue = lambda **kw: queued.append(kw)  # type: ignore[method-assign]
+
+    variants = {"ohne Middleware": _routes(FastAPI()), "BaseHTTPMiddleware": legacy_app(), "reine ASGI": asgi_app()}
+    for app in variants.values():
+        await run(app, 500, args.concurrency)  # Aufwärmen
+
+    print(f"{args.requests} Requests × {args.rounds} Runden, {args.concurrency} gleichzeitig (GET / POST / Stream)")
+    # Pro Variante die beste Runde (Wandzeit / Request = Kosten pro Request auf dem Event-Loop)
+    cost: dict[str, float] = {}
+    latencies: dict[str, list[float]] = {name: [] for name in variants}
+    for _ in range(args.rounds):
+        for name, app in variants.items():  # abwechselnd, damit Drift alle Varianten gleich trifft
+            elapsed, samples = await run(app, args.requests, args.concurrency)
+            cost[name] = min(cost.get(name, float("inf")), elapsed / args.requests * 1e6)
+            latencies[name].extend(samples)
+
+    baseline = cost["ohne Middleware"]
+    for name in variants:
+        samples = sorted(latencies[name])
+        overhead = "" if name == "ohne Middleware" else f"   Overhead {cost[name] - baseline:+6.1f} µs"
+        print(
+            f"{name:<20}: {cost[name]:6.1f} µs/Request ({1e6 / cost[name]:7.0f} req/s)"
+            f"   Latenz p50 {_percentile(samples, 0.5) / 1000:6.2f} ms   p99 {_percentile(samples, 0.99) / 1000:6.2f} ms"
+            f"{overhead}"
+        )
+    print(f"Audit-Einträge: {len(queued)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=6000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 
 import uuid
 from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
 from typing import Any
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -10,7 +11,7 @@ from httpx import ASGITransport, AsyncClient
 
 from src.main import app
 from src.infrastructure.keycloak import get_current_user
-from src.infrastructure.database import get_db
+from src.infrastructure.database import get_db, get_session_factory
 
 
 # ── User Fixtures ───────────────────────────────────────────────────
@@ -117,6 +118,16 @@ async def readonly_client(mock_readonly_user) -> AsyncGenerator[AsyncClient, Non
     app.dependency_overrides.pop(get_current_user, None)
 
 
+# ── Audit ───────────────────────────────────────────────────────────
+
+@pytest.fixture(autouse=True, scope="session")
+def audit_spill_dir(tmp_path_factory):
+    """Ohne Lifespan läuft kein AuditWriter — Einträge landen in der Spill-Datei, nicht im Repo."""
+    from src.infrastructure.audit_writer import audit_writer
+
+    audit_writer.configure_spill(tmp_path_factory.mktemp("audit-spill"))
+
+
 # ── DB Mock Fixtures ────────────────────────────────────────────────
 
 @pytest.fixture
@@ -130,50 +141,62 @@ def mock_db_session():
     return session
 
 
+def _mock_request_session() -> AsyncMock:
+    """Mock-Session mit leeren Resultaten für get_db und die Session-Factory."""
+    # Mock Result für execute()-Aufrufe
+    mock_result = MagicMock()
+    mock_result.scalar.return_value = 0
+    mock_result.scalar_one_or_none.return_value = None
+    mock_result.scalars.return_value = MagicMock(
+        all=MagicMock(return_value=[]),
+        first=MagicMock(return_value=None),
+    )
+    mock_result.fetchall.return_value = []
+    mock_result.fetchone.return_value = None
+    mock_result.first.return_value = None
+    mock_result.all.return_value = []
+    mock_result.unique.return_value = mock_result
+
+    session = AsyncMock()
+    session.execute = AsyncMock(return_value=mock_result)
+    session.get = AsyncMock(return_value=None)
+    session.scalar = AsyncMock(return_value=0)
+    session.scalars = AsyncMock(return_value=MagicMock(
+        all=MagicMock(return_value=[]),
+        first=MagicMock(return_value=None),
+    ))
+    session.commit = AsyncMock()
+    session.rollback = AsyncMock()
+    session.flush = AsyncMock()
+    session.close = AsyncMock()
+    session.add = MagicMock()
+    session.delete = MagicMock()
+    session.refresh = AsyncMock()
+    session.begin = MagicMock()
+    session.begin_nested = MagicMock()
+    return session
+
+
 @pytest.fixture(autouse=True)
 async def override_db_dependency():
     """Override get_db um asyncpg-Verbindungsprobleme in Tests zu vermeiden.
 
     Mock-DB gibt leere Resultate zurück, damit Services mehr Code durchlaufen.
     List-Endpoints → leere Listen (200), Get-by-ID → None (404).
+    Cache-Loader öffnen ihre Session über get_session_factory — gleicher Mock.
     """
     async def _mock_get_db():
-        # Mock Result für execute()-Aufrufe
-        mock_result = MagicMock()
-        mock_result.scalar.return_value = 0
-        mock_result.scalar_one_or_none.return_value = None
-        mock_result.scalars.return_value = MagicMock(
-            all=MagicMock(return_value=[]),
-            first=MagicMock(return_value=None),
-        )
-        mock_result.fetchall.return_value = []
-        mock_result.fetchone.return_value = None
-        mock_result.first.return_value = None
-        mock_result.all.return_value = []
-        mock_result.unique.return_value = mock_result
-
-        session = AsyncMock()
-        session.execute = AsyncMock(return_value=mock_result)
-        session.get = AsyncMock(return_value=None)
-        session.scalar = AsyncMock(return_value=0)
-        session.scalars = AsyncMock(return_value=MagicMock(
-            all=MagicMock(return_value=[]),
-            first=MagicMock(return_value=None),
-        ))
-        session.commit = AsyncMock()
-        session.rollback = AsyncMock()
-        session.flush = AsyncMock()
-        session.close = AsyncMock()
-        session.add = MagicMock()
-        session.delete = MagicMock()
-        session.refresh = AsyncMock()
-        session.begin = MagicMock()
-        session.begin_nested = MagicMock()
-        yield session
+        yield _mock_request_session()
+
+    @asynccontextmanager
+    async def _mock_sessions():
+        yield _mock_request_session()
 
     app.dependency_overrides[get_db] = _mock_get_db
+    app.dependency_overrides[get_session_factory] = lambda: _mock_sessions
     yield
     app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_session_factory, None)
 
 
 # ── Sample Data ─────────────────────────────────────────────────────
@@ -1,11 +1,14 @@
 """Alarm-Tests — Schema, Endpoints, Caching."""
 
 import uuid
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from httpx import AsyncClient
 
-from src.domain.services.alarm_service import THRESHOLDS, _evaluate_severity
+from src.domain.services.alarm_rules import ActiveAlarmIndex, compile_rules
+from src.domain.services.alarm_service import THRESHOLDS, _evaluate_severity, check_thresholds
 
 
 class TestAlarmEndpoints:
@@ -110,3 +113,124 @@ class TestAlarmThresholds:
         """SpO2-Warnung muss bei Werten unter 90% greifen."""
         assert THRESHOLDS["spo2"]["warning"][0] == 90
         assert _evaluate_severity(89, THRESHOLDS["spo2"]) == "warning"
+
+
+class TestAlarmRuleEngine:
+    """Kompilierte Intervall-Tabellen + In-Memory-Index aktiver Alarme."""
+
+    def test_compiled_rules_match_reference(self):
+        """Kompilierte Regeln bewerten identisch zu _evaluate_severity (inkl. Grenzwerte)."""
+        rules = compile_rules(THRESHOLDS)
+        for rule in rules:
+            levels = THRESHOLDS[rule.parameter]
+            edges = [b for pair in levels.values() for b in pair if b is not None]
+            samples = {x / 10 for x in range(0, 3001)} | {e + d for e in edges for d in (-0.001, 0, 0.001)}
+            for value in samples:
+                assert rule.evaluate(value) == _evaluate_severity(value, levels), (rule.parameter, value)
+
+    def test_index_apply_events(self):
+        """alarm.* Events halten den Index aktuell."""
+        index = ActiveAlarmIndex()
+        pid = uuid.uuid4()
+        index.apply_event("alarm.critical", {"patient_id": str(pid), "parameter": "spo2"})
+        assert index.contains(pid, "spo2")
+        index.apply_event("alarm.acknowledged", {"patient_id": str(pid), "parameter": "spo2"})
+        assert not index.contains(pid, "spo2")
+        assert len(index) == 0
+
+    @staticmethod
+    def _warm_index(monkeypatch) -> ActiveAlarmIndex:
+        from src.domain.services import alarm_service
+
+        index = ActiveAlarmIndex()
+        index._warm = True
+        monkeypatch.setattr(alarm_service, "active_alarms", index)
+        return index
+
+    @staticmethod
+    def _vital(pid: uuid.UUID) -> SimpleNamespace:
+        return SimpleNamespace(
+            id=uuid.uuid4(), patient_id=pid, heart_rate=180, systolic_bp=120,
+            diastolic_bp=80, spo2=85.0, temperature=36.6, respiratory_rate=16,
+        )
+
+    @pytest.mark.asyncio
+    async def test_check_thresholds_warm_index_skips_db(self, monkeypatch):
+        """Kennt der Index keinen aktiven Alarm, entfällt die DB-Abfrage."""
+        index = self._warm_index(monkeypatch)
+        pid = uuid.uuid4()
+        session = MagicMock()
+        session.execute = AsyncMock()
+        session.flush = AsyncMock()
+
+        alarms = await check_thresholds(session, self._vital(pid))
+
+        session.execute.assert_not_called()
+        assert sorted(a.parameter for a in alarms) == ["heart_rate", "spo2"]
+        assert index.contains(pid, "spo2")
+
+    @pytest.mark.asyncio
+    async def test_triggered_at_is_measurement_time(self, monkeypatch):
+        """Batch-Import: triggered_at = recorded_at der Messung, nicht der Importzeitpunkt."""
+        from datetime import UTC, datetime
+
+        from src.domain.services.alarm_service import check_thresholds_batch
+
+        self._warm_index(monkeypatch)
+        session = MagicMock()
+        session.flush = AsyncMock()
+        early, late = uuid.uuid4(), uuid.uuid4()
+        vitals = [self._vital(early), self._vital(late)]
+        vitals[0].recorded_at = datetime(2026, 3, 1, 8, 0, tzinfo=UTC)
+        vitals[1].recorded_at = datetime(2026, 3, 1, 9, 30)  # naiv → UTC
+
+        alarms = await check_thresholds_batch(session, vitals)
+
+        assert {(a.patient_id, a.triggered_at) for a in alarms} == {
+            (early, datetime(2026, 3, 1, 8, 0, tzinfo=UTC)),
+            (late, datetime(2026, 3, 1, 9, 30, tzinfo=UTC)),
+        }
+
+    @pytest.mark.asyncio
+    async def test_stale_index_entry_does_not_suppress_alarm(self, monkeypatch):
+        """Ein vom Index gemeldeter Alarm unterdrückt nur, wenn die DB ihn bestätigt."""
+        index = self._warm_index(monkeypatch)
+        pid = uuid.uuid4()
+        index.add(pid, "heart_rate")  # auf anderem Worker bereits quittiert
+        index.add(pid, "spo2")
+        result = MagicMock()
+        result.all.return_value = [(pid, "spo2")]
+        session = MagicMock()
+        session.execute = AsyncMock(return_value=result)
+        session.flush = AsyncMock()
+
+        alarms = await check_thresholds(session, self._vital(pid))
+
+        session.execute.assert_awaited_once()
+        assert [a.parameter for a in alarms] == ["heart_rate"]
+
+    @pytest.mark.asyncio
+    async def test_acknowledge_discards_index_only_after_commit(self, monkeypatch):
+        """Scheitert der Commit, bleibt der quittierte Alarm im Index aktiv."""
+        from sqlalchemy.ext.asyncio import AsyncSession
+
+        from src.domain.services import alarm_service
+
+        index = self._warm_index(monkeypatch)
+        pid = uuid.uuid4()
+        index.add(pid, "spo2")
+        alarm = SimpleNamespace(id=uuid.uuid4(), patient_id=pid, parameter="spo2", status="active")
+        monkeypatch.setattr(alarm_service, "get_alarm", AsyncMock(return_value=alarm))
+        monkeypatch.setattr(alarm_service, "emit_event", AsyncMock())
+        session = AsyncSession()
+        monkeypatch.setattr(session, "flush", AsyncMock())
+        sync_session = session.sync_session
+
+        await alarm_service.acknowledge_alarm(session, alarm.id, uuid.uuid4())
+        assert index.contains(pid, "spo2")
+        sync_session.dispatch.after_rollback(sync_session)
+        assert index.contains(pid, "spo2")
+
+        await alarm_service.resolve_alarm(session, alarm.id)
+        sync_session.dispatch.after_commit(sync_session)
+        assert not index.contains(pid, "spo2")
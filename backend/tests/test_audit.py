@@ -102,3 +102,336 @@ class TestAuditRBAC:
         """Admin darf Audit-Log lesen."""
         response = await admin_client.get("/api/v1/audit")
         assert response.status_code != 403
+
+
+class _FakeSessionFactory:
+    """Session-Factory für den AuditWriter: zählt Batches, kann DB-Ausfall simulieren."""
+
+    def __init__(self):
+        self.batches: list[list[dict]] = []
+        self.statements: list = []
+        self.fail = False
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, rows):
+        if self.fail:
+            raise ConnectionError("database unavailable")
+        self.statements.append(stmt)
+        self.batches.append(list(rows))
+
+    async def commit(self):
+        pass
+
+
+def _entry(writer, n: int = 1) -> None:
+    for _ in range(n):
+        writer.enqueue(user_id=uuid.uuid4(), user_role="arzt", action="POST", resource_type="/api/v1/vitals")
+
+
+class TestAuditWriter:
+    """Gebündeltes Schreiben: Batch-INSERT, Spill-Datei bei DB-Ausfall, Drain beim Shutdown."""
+
+    @pytest.mark.asyncio
+    async def test_batches_by_size_and_interval(self, tmp_path):
+        import asyncio
+
+        from src.infrastructure.audit_writer import AuditWriter
+
+        db = _FakeSessionFactory()
+        writer = AuditWriter()
+        await writer.start(db, spill_dir=tmp_path, queue_size=100, batch_size=4, flush_interval=0.05)
+        _entry(writer, 10)
+        await asyncio.sleep(0.2)
+
+        assert [len(b) for b in db.batches] == [4, 4, 2]
+        await writer.stop()
+        assert writer.stats["written"] == 10 and writer.stats["spilled"] == 0
+
+    @pytest.mark.asyncio
+    async def test_db_outage_spills_and_replays(self, tmp_path):
+        import asyncio
+
+        from src.infrastructure.audit_writer import AuditWriter
+
+        db = _FakeSessionFactory()
+        db.fail = True
+        writer = AuditWriter()
+        await writer.start(db, spill_dir=tmp_path, queue_size=100, batch_size=10, flush_interval=0.01)
+        _entry(writer, 3)
+        await asyncio.sleep(0.05)
+        assert writer.stats["spilled"] == 3
+        assert len(list(tmp_path.glob("audit-*.ndjson"))) == 1
+
+        # DB wieder da: nächster erfolgreicher Flush spielt die Spill-Datei nach
+        db.fail = False
+        _entry(writer, 1)
+        await asyncio.sleep(0.05)
+        await writer.stop()
+
+        assert sum(len(b) for b in db.batches) == 4
+        assert all(isinstance(row["user_id"], uuid.UUID) for b in db.batches for row in b)
+        assert writer.stats["replayed"] == 3
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_full_queue_and_shutdown_lose_nothing(self, tmp_path):
+        from src.infrastructure.audit_writer import AuditWriter
+
+        db = _FakeSessionFactory()
+        writer = AuditWriter()
+        await writer.start(db, spill_dir=tmp_path, queue_size=2, batch_size=100, flush_interval=10)
+        _entry(writer, 5)  # 2 in der Queue (+1 beim Writer), Rest auf Disk
+        await writer.stop()  # Drain vor Ablauf des Intervalls
+
+        written = sum(len(b) for b in db.batches)
+        assert written + writer.stats["spilled"] == 5
+        assert writer.stats["spilled"] >= 2
+        # Nach dem Stopp landet alles direkt in der Spill-Datei
+        _entry(writer, 1)
+        lines = sum(len(p.read_text().splitlines()) for p in tmp_path.glob("audit-*.ndjson"))
+        assert lines == writer.stats["spilled"]
+
+    @pytest.mark.asyncio
+    async def test_insert_is_idempotent(self, tmp_path):
+        """Doppelt nachgespielte Einträge (gleiche ID) werden nur einmal gespeichert."""
+        from sqlalchemy.dialects import postgresql
+
+        from src.infrastructure.audit_writer import AuditWriter
+
+        db = _FakeSessionFactory()
+        writer = AuditWriter()
+        await writer.start(db, spill_dir=tmp_path, queue_size=10, batch_size=10, flush_interval=0.01)
+        _entry(writer, 1)
+        await writer.stop()
+
+        sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT DO NOTHING" in sql
+
+    @pytest.mark.asyncio
+    async def test_expired_claims_are_replayed(self, tmp_path):
+        """Verwaiste Claims (Lease abgelaufen) werden nachgespielt, aktive bleiben liegen."""
+        import asyncio
+        import json
+        import os
+        import time
+
+        from src.infrastructure import audit_writer as aw
+
+        def claim(name: str, age: float) -> None:
+            path = tmp_path / name
+            row = {"id": str(uuid.uuid4()), "user_id": str(uuid.uuid4()), "created_at": "2026-03-01T08:00:00+00:00"}
+            path.write_text(json.dumps(row) + "\n")
+            mtime = time.time() - age
+            os.utime(path, (mtime, mtime))
+
+        claim("audit-1.deadbeef.replaying", aw.CLAIM_LEASE_SECONDS + 60)
+        claim("audit-2.cafebabe.replaying", 5)
+
+        db = _FakeSessionFactory()
+        writer = aw.AuditWriter()
+        await writer.start(db, spill_dir=tmp_path, queue_size=10, batch_size=10, flush_interval=0.01)
+        await asyncio.sleep(0.05)
+        await writer.stop()
+
+        assert writer.stats["replayed"] == 1
+        assert [p.name for p in tmp_path.iterdir()] == ["audit-2.cafebabe.replaying"]
+
+
+class TestAuditQueries:
+    """Patienten-/Routen-Spalten statt ILIKE, gedeckelte bzw. geschätzte Gesamtzahl."""
+
+    def test_request_extracts_patient_and_route(self):
+        from fastapi import FastAPI
+
+        from src.api.middleware import _patient_id, _route_template
+
+        app = FastAPI()
+
+        @app.post("/api/v1/patients/{patient_id}/vitals")
+        async def _vitals(patient_id: uuid.UUID):
+            return {}
+
+        pid = uuid.uuid4()
+        route = next(r for r in app.routes if getattr(r, "path", "").endswith("/vitals"))
+        scope = {"path": f"/api/v1/patients/{pid}/vitals", "route": route, "path_params": {"patient_id": str(pid)}}
+        assert _patient_id(scope) == pid
+        assert _route_template(scope) == "/api/v1/patients/{patient_id}/vitals"
+
+        # Ohne Routing-Infos: Patient aus dem Pfad
+        unrouted = {"path": f"/api/v1/patients/{pid}"}
+        assert _patient_id(unrouted) == pid
+        assert _route_template(unrouted) is None
+
+    def test_patient_filter_uses_indexed_column(self):
+        from sqlalchemy import select
+        from sqlalchemy.dialects import postgresql
+
+        from src.domain.models.system import AuditLog
+        from src.domain.services.audit_service import audit_filters
+
+        sql = str(
+            select(AuditLog).where(*audit_filters(patient_id=uuid.uuid4(), route="/api/v1/patients/{patient_id}"))
+            .compile(dialect=postgresql.dialect())
+        )
+        assert "audit_logs.patient_id = " in sql and "audit_logs.route = " in sql
+        assert "ILIKE" not in sql
+
+    @pytest.mark.asyncio
+    async def test_count_is_capped_then_estimated(self, monkeypatch):
+        from unittest.mock import AsyncMock, MagicMock
+
+        from src.config import settings
+        from src.domain.services import audit_service
+
+        monkeypatch.setattr(settings, "audit_count_exact_limit", 100)
+        counted = MagicMock()
+        counted.scalar.return_value = 42
+        db = AsyncMock()
+        db.execute.return_value = counted
+        assert await audit_service.count_audit_logs(db, []) == {"total": 42, "estimated": False}
+        # Gezählt wird höchstens limit + 1 Zeilen
+        assert "LIMIT" in str(db.execute.call_args.args[0])
+
+        counted.scalar.return_value = 101
+        monkeypatch.setattr(audit_service, "_planner_estimate", AsyncMock(return_value=1_250_000))
+        assert await audit_service.count_audit_logs(db, []) == {"total": 1_250_000, "estimated": True}
+
+    @pytest.mark.asyncio
+    async def test_count_runs_on_own_session(self):
+        """Die (gecachte) Zählung teilt sich die Session nicht mit der Seitenabfrage."""
+        from contextlib import asynccontextmanager
+        from unittest.mock import AsyncMock, MagicMock
+
+        from src.domain.services import audit_service
+
+        page_db, count_db = AsyncMock(), AsyncMock()
+        page_result, count_result = MagicMock(), MagicMock()
+        page_result.scalars.return_value.all.return_value = []
+        count_result.scalar.return_value = 3
+        page_db.execute.return_value = page_result
+        count_db.execute.return_value = count_result
+
+        @asynccontextmanager
+        async def sessions():
+            yield count_db
+
+        conditions = audit_service.audit_filters(patient_id=uuid.uuid4())
+        page = await audit_service._page(page_db, sessions, conditions, 1, 50)
+
+        assert page["total"] == 3
+        count_db.execute.assert_awaited_once()
+        page_db.execute.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_stats_read_continuous_aggregate_only(self):
+        """Aufschlüsselung nach Aktion/Ressource aus audit_daily_counts, kein GROUP BY über die Hypertable."""
+        from types import SimpleNamespace
+        from unittest.mock import AsyncMock, MagicMock
+
+        from sqlalchemy.dialects import postgresql
+
+        from src.domain.services import audit_service
+
+        total, actions, resources = MagicMock(), MagicMock(), MagicMock()
+        total.scalar.return_value = 1_000_000
+        actions.all.return_value = [SimpleNamespace(action="read", count=900_000)]
+        resources.all.return_value = [SimpleNamespace(resource_type="patient", count=700_000)]
+        db = AsyncMock()
+        db.execute.side_effect = [total, actions, resources]
+
+        stats = await audit_service.get_audit_stats(db)
+
+        assert stats == {
+            "total_entries": 1_000_000, "by_action": {"read": 900_000}, "by_resource": {"patient": 700_000},
+        }
+        for call in db.execute.call_args_list[1:]:
+            sql = str(call.args[0].compile(dialect=postgresql.dialect()))
+            assert "FROM audit_daily_counts" in sql and "audit_logs" not in sql
+
+    @pytest.mark.asyncio
+    async def test_patient_audit_endpoint(self, admin_client: AsyncClient):
+        pid = uuid.uuid4()
+        response = await admin_client.get(f"/api/v1/audit/patients/{pid}")
+        assert response.status_code == 200
+        assert response.json()["total_estimated"] is False
+
+
+class TestObservabilityMiddleware:
+    """Reine ASGI-Middleware: Metriken pro Routen-Template, Audit-Erfassung, WebSocket unverändert."""
+
+    @staticmethod
+    def _app():
+        from fastapi import FastAPI, Request
+
+        from src.api.middleware import ObservabilityMiddleware
+
+        app = FastAPI()
+
+        @app.post("/api/v1/patients/{patient_id}/notes", status_code=201)
+        async def _create(patient_id: uuid.UUID, request: Request):
+            # wie get_current_user: User im Request-State
+            request.state.user_id = "00000000-0000-0000-0000-000000000001"
+            request.state.user_role = "arzt"
+            return {"ok": True}
+
+        @app.get("/api/v1/fail")
+        async def _fail():
+            raise RuntimeError("boom")
+
+        app.add_middleware(ObservabilityMiddleware)
+        return app
+
+    @pytest.mark.asyncio
+    async def test_metrics_and_audit(self, monkeypatch):
+        from httpx import ASGITransport
+
+        from src.infrastructure.audit_writer import audit_writer
+        from src.infrastructure.metrics import HTTP_DURATION, HTTP_REQUESTS
+
+        notes = ("POST", "/api/v1/patients/{patient_id}/notes")
+        before = (HTTP_DURATION.count(*notes), HTTP_REQUESTS.get("GET", "/api/v1/fail", "500"))
+        queued = []
+        monkeypatch.setattr(audit_writer, "enqueue", lambda **kw: queued.append(kw))
+        transport = ASGITransport(app=self._app(), raise_app_exceptions=False)
+        pid = uuid.uuid4()
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            for _ in range(2):
+                assert (await ac.post(f"/api/v1/patients/{pid}/notes")).status_code == 201
+            assert (await ac.get("/api/v1/fail")).status_code == 500
+
+        # Eine Serie pro Routen-Template, nicht pro Patient
+        assert HTTP_DURATION.count(*notes) - before[0] == 2
+        assert HTTP_REQUESTS.get("GET", "/api/v1/fail", "500") - before[1] == 1
+        assert not any(str(pid) in route for _method, route, _status in HTTP_REQUESTS.values)
+
+        assert len(queued) == 2
+        assert queued[0]["patient_id"] == pid
+        assert queued[0]["route"] == "/api/v1/patients/{patient_id}/notes"
+        assert queued[0]["user_role"] == "arzt"
+        assert queued[0]["details"]["status"] == 201
+
+    @pytest.mark.asyncio
+    async def test_websocket_scope_passes_through(self):
+        from src.api.middleware import ObservabilityMiddleware
+        from src.infrastructure.metrics import HTTP_REQUESTS
+
+        seen = []
+
+        async def inner(scope, receive, send):
+            seen.append((scope["type"], send))
+
+        async def send(message):
+            pass
+
+        before = dict(HTTP_REQUESTS.values)
+        await ObservabilityMiddleware(inner)({"type": "websocket", "path": "/ws"}, None, send)
+        assert seen == [("websocket", send)]  # originales send, keine Hülle
+        assert HTTP_REQUESTS.values == before
@@ -0,0 +1,141 @@
+"""Katalogsuche Tests — Faltung, Ranking, In-Process-Index und SQL-Abfrage."""
+
+import re
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.dialects import postgresql
+
+from src.domain.services import catalog_search
+from src.domain.services.catalog_search import PrefixIndex, fold, normalize_icd_code
+
+ICD10 = [
+    {"code": code, "title": title, "chapter": None, "category": None}
+    for code, title in (
+        ("E87.5", "Hyperkaliämie"),
+        ("E87.6", "Hypokaliämie"),
+        ("E11.9", "Diabetes mellitus Typ 2 ohne Komplikationen"),
+        ("E11", "Diabetes mellitus, Typ 2"),
+        ("E10.9", "Diabetes mellitus Typ 1 ohne Komplikationen"),
+        ("O24.4", "Diabetes mellitus, während der Schwangerschaft auftretend"),
+        ("F05.0", "Delir ohne Demenz"),
+        ("F03", "Demenz, nicht näher bezeichnet"),
+        ("R41.0", "Orientierungsstörung, nicht näher bezeichnet"),
+    )
+]
+
+
+@pytest.fixture
+def icd_index():
+    return PrefixIndex.build(
+        ICD10, code=lambda r: r["code"], text=lambda r: f"{r['code']} {r['title']}", titles=lambda r: (r["title"],),
+    )
+
+
+def _search(index: PrefixIndex, q: str, limit: int = 10) -> list[str]:
+    code = normalize_icd_code(q)
+    return [r["code"] for r in index.search(code or q, limit=limit, code_query=code)]
+
+
+class TestFolding:
+    def test_umlaut_spellings_fold_together(self):
+        assert fold("Müller") == fold("Mueller") == fold("MULLER")
+        assert fold("Störung") == fold("Stoerung") == "storung"
+        assert fold("Fußpilz") == "fusspilz"
+        assert fold("Pleuraerguß") == fold("Pleuraerguss")
+
+    def test_matches_sql_fold_function(self):
+        """Python-Faltung und pdms_catalog_fold() nutzen dieselbe Tabelle."""
+        from pathlib import Path
+
+        migration = (Path(__file__).parents[1] / "alembic/versions/022_catalog_search.py").read_text()
+        source, target = re.search(r"translate\(lower\(value\),\s*'([^']+)',\s*'([^']+)'\)", migration).groups()
+        assert source == catalog_search.FOLD_FROM + catalog_search.FOLD_FROM.upper()
+        assert target == catalog_search.FOLD_TO * 2
+
+    @pytest.mark.parametrize("raw,code", [("e119", "E11.9"), ("E11.9", "E11.9"), ("i50", "I50"), ("Diab", None)])
+    def test_icd_code_normalization(self, raw, code):
+        assert normalize_icd_code(raw) == code
+
+
+class TestPrefixIndex:
+    def test_exact_and_prefix_code_first(self, icd_index):
+        assert _search(icd_index, "e11") == ["E11", "E11.9"]
+        assert _search(icd_index, "E119") == ["E11.9"]
+
+    def test_title_prefix_before_word_prefix(self, icd_index):
+        # Alle beginnen mit "Diab…": kürzere (spezifischere) Bezeichnung zuerst
+        assert _search(icd_index, "diab") == ["E11", "E10.9", "E11.9", "O24.4"]
+        # "Delir ohne Demenz" ist kürzer, aber nur Wort-Präfix → nach dem Bezeichnungs-Präfix
+        assert _search(icd_index, "demenz") == ["F03", "F05.0"]
+        assert _search(icd_index, "diabetes typ 1") == ["E10.9"]
+
+    def test_umlaut_insensitive(self, icd_index):
+        assert _search(icd_index, "Hyperkaliaemie") == _search(icd_index, "hyperkaliämie") == ["E87.5"]
+        assert _search(icd_index, "orientierungsstoerung") == ["R41.0"]
+
+    def test_limit(self, icd_index):
+        assert len(_search(icd_index, "di", limit=2)) == 2
+
+
+class TestSqlSearch:
+    def test_icd10_query_uses_folded_trigram_match(self):
+        from src.domain.services.icd10_service import build_icd10_query
+
+        sql = str(build_icd10_query("E11.9", limit=5).compile(dialect=postgresql.dialect()))
+        assert "icd10_catalog.search_key LIKE" in sql
+        assert "icd10_catalog.search_key %%> " in sql
+        assert "word_similarity" in sql
+        assert sql.index("CASE") < sql.index("word_similarity") < sql.index("icd10_catalog.code ASC")
+
+    def test_drug_query_ranks_atc_then_name(self):
+        from src.domain.services.medikament_katalog_service import build_medikamente_query
+
+        compiled = build_medikamente_query("Paracetamöl", limit=5).compile(dialect=postgresql.dialect())
+        assert "pdms_catalog_fold(medikament_katalog.name)" in str(compiled)
+        assert "paracetamol" in compiled.params.values()
+
+
+class TestCatalogEndpoints:
+    @pytest.mark.asyncio
+    async def test_uses_loaded_index_without_db(self, arzt_client: AsyncClient, icd_index, monkeypatch):
+        """Volle Trefferseite aus dem Index → keine DB-Abfrage."""
+        monkeypatch.setitem(catalog_search._indexes, "icd10", icd_index)
+        r = await arzt_client.get("/api/v1/icd10/search", params={"q": "diab", "limit": 2})
+        assert r.status_code == 200
+        assert [x["code"] for x in r.json()["results"]] == ["E11", "E10.9"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("q", ["betes", "diabtes"])
+    async def test_substring_and_typo_fall_back_to_trigram(self, icd_index, monkeypatch, q):
+        """Teilwort/Tippfehler findet der Präfixindex nicht — die Trigramm-Abfrage ergänzt."""
+        from types import SimpleNamespace
+        from unittest.mock import AsyncMock, MagicMock
+
+        from src.domain.services.icd10_service import search_icd10
+
+        monkeypatch.setitem(catalog_search._indexes, "icd10", icd_index)
+        assert _search(icd_index, q) == []
+        rows = [SimpleNamespace(**r) for r in ICD10 if r["code"] in ("E11", "E11.9")]
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = rows
+        db = MagicMock()
+        db.execute = AsyncMock(return_value=result)
+
+        hits = await search_icd10(db, q, limit=10)
+
+        db.execute.assert_awaited_once()
+        assert [h["code"] for h in hits] == ["E11.9", "E11"]
+
+    def test_index_hits_first_then_sql_without_duplicates(self):
+        merged = catalog_search.merge_hits(
+            [{"code": "E11"}], [{"code": "E11"}, {"code": "E10.9"}, {"code": "O24.4"}],
+            key=lambda hit: hit["code"], limit=2,
+        )
+        assert merged == [{"code": "E11"}, {"code": "E10.9"}]
+
+    @pytest.mark.asyncio
+    async def test_sql_fallback(self, arzt_client: AsyncClient):
+        r = await arzt_client.get("/api/v1/medikamente-katalog/search", params={"q": "dafalgan"})
+        assert r.status_code == 200
+        assert r.json()["results"] == []
@@ -0,0 +1,85 @@
+"""Census-Tests — Übersicht aller aktiven Patienten, feste Anzahl Abfragen, ETag."""
+
+import uuid
+import warnings
+from datetime import UTC, date, datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import SADeprecationWarning
+
+from src.domain.services.census_service import get_census
+
+
+def _result(rows: list) -> MagicMock:
+    result = MagicMock()
+    result.all.return_value = rows
+    return result
+
+
+def _encounter(pid: uuid.UUID, last_name: str, ward: str = "HS-1") -> SimpleNamespace:
+    return SimpleNamespace(
+        patient_id=pid, encounter_id=uuid.uuid4(), encounter_type="home-care", ward=ward, bed=None,
+        admitted_at=datetime(2026, 1, 1, tzinfo=UTC), first_name="Test", last_name=last_name,
+        date_of_birth=date(1950, 1, 1),
+    )
+
+
+class TestCensus:
+    """Census-Endpoint und -Service."""
+
+    @pytest.mark.asyncio
+    async def test_census_endpoint_empty(self, arzt_client: AsyncClient):
+        response = await arzt_client.get("/api/v1/census")
+        assert response.status_code == 200
+        assert response.json() == {"ward": None, "total": 0, "patients": []}
+        assert response.headers["etag"].startswith('W/"')
+
+    @pytest.mark.asyncio
+    async def test_census_etag_not_modified(self, arzt_client: AsyncClient):
+        first = await arzt_client.get("/api/v1/census", params={"ward": "HS-1"})
+        etag = first.headers["etag"]
+        second = await arzt_client.get("/api/v1/census", params={"ward": "HS-1"}, headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+
+    @pytest.mark.asyncio
+    async def test_query_count_independent_of_census_size(self, mock_db_session):
+        """40 Patienten → weiterhin genau 5 Abfragen, Kennzahlen korrekt zugeordnet."""
+        pids = [uuid.uuid4() for _ in range(40)]
+        critical, calm = pids[7], pids[0]
+        mock_db_session.execute = AsyncMock(side_effect=[
+            _result([_encounter(pid, f"P{i:02d}") for i, pid in enumerate(pids)]),
+            _result([SimpleNamespace(patient_id=calm, recorded_at=datetime(2026, 1, 2, tzinfo=UTC),
+                                     heart_rate=70.0, systolic_bp=120.0, diastolic_bp=80.0, spo2=97.0,
+                                     temperature=36.8, respiratory_rate=14.0)]),
+            _result([SimpleNamespace(patient_id=critical, active=3, critical=1)]),
+            _result([(calm, 4)]),
+            _result([SimpleNamespace(patient_id=calm, id=uuid.uuid4(), status="planned",
+                                     planned_start=datetime(2026, 1, 2, 9, tzinfo=UTC),
+                                     assigned_nurse_name="Pflege A")]),
+        ])
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", SADeprecationWarning)
+            census = await get_census(mock_db_session, ward="HS-1")
+
+        assert mock_db_session.execute.await_count == 5
+        statements = [c.args[0] for c in mock_db_session.execute.await_args_list]
+        assert "DISTINCT ON (encounters.patient_id)" in str(statements[0].compile(dialect=postgresql.dialect()))
+        assert "DISTINCT ON (home_visits.patient_id)" in str(statements[-1].compile(dialect=postgresql.dialect()))
+        assert len(census) == 40
+        assert census[0].patient_id == critical and census[0].critical_alarms == 1
+        calm_row = next(p for p in census if p.patient_id == calm)
+        assert calm_row.latest_vitals.heart_rate == 70.0
+        assert calm_row.active_medications == 4
+        assert calm_row.home_visit_today.assigned_nurse_name == "Pflege A"
+
+    @pytest.mark.asyncio
+    async def test_no_active_encounters_single_query(self, mock_db_session):
+        mock_db_session.execute = AsyncMock(return_value=_result([]))
+        assert await get_census(mock_db_session) == []
+        assert mock_db_session.execute.await_count == 1
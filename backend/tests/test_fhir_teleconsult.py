@@ -1,5 +1,7 @@
 """Tests für FHIR R4 Endpoints und Teleconsult-Today."""
 
+from collections import namedtuple
+
 import pytest
 from httpx import AsyncClient
 
@@ -119,6 +121,425 @@ class TestFHIRPatientEverything:
         )
         assert resp.status_code == 404
 
+    @pytest.mark.anyio
+    async def test_everything_streams_all_resources(self, arzt_client: AsyncClient, everything_db):
+        """Ohne _count: alle Vitalmessungen (kein 100er-Limit), kein next-Link."""
+        resp = await arzt_client.get(f"/api/v1/fhir/Patient/{everything_db.patient.id}/$everything")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "application/fhir+json"
+        bundle = resp.json()
+        types = [e["resource"]["resourceType"] for e in bundle["entry"]]
+        assert types.count("Patient") == 1 and types.count("Encounter") == 1
+        assert types.count("Observation") == 2 * 150 + 1
+        assert bundle["entry"][-1]["resource"]["category"][0]["coding"][0]["code"] == "laboratory"
+        assert [link["relation"] for link in bundle["link"]] == ["self"]
+
+    @pytest.mark.anyio
+    async def test_everything_count_adds_next_link(self, arzt_client: AsyncClient, everything_db):
+        """_count begrenzt die Seite und liefert einen fortsetzbaren next-Link."""
+        from src.domain.services.fhir_service import EverythingCursor
+
+        resp = await arzt_client.get(
+            f"/api/v1/fhir/Patient/{everything_db.patient.id}/$everything", params={"_count": 12},
+        )
+        bundle = resp.json()
+        assert len([e for e in bundle["entry"] if e["resource"]["resourceType"] == "Observation"]) == 2 * 10
+        next_url = next(link["url"] for link in bundle["link"] if link["relation"] == "next")
+        token = next_url.split("_cursor=")[1]
+        cursor = EverythingCursor.decode(token)
+        tenth = everything_db.vitals[9]
+        assert cursor.section == 3
+        assert cursor.key == (tenth.recorded_at, tenth.id)
+
+    @pytest.mark.anyio
+    async def test_everything_invalid_cursor(self, arzt_client: AsyncClient):
+        """Manipulierter _cursor gibt 400 zurück."""
+        resp = await arzt_client.get(
+            "/api/v1/fhir/Patient/00000000-0000-0000-0000-000000000001/$everything",
+            params={"_cursor": "kaputt"},
+        )
+        assert resp.status_code == 400
+
+    @pytest.mark.parametrize("payload", [
+        [3, ["kein-datum", "00000000-0000-0000-0000-000000000001"]],
+        [3, ["2026-03-01T08:00:00+00:00", "keine-uuid"]],
+        [1, ["2026-03-01T08:00:00+00:00", "00000000-0000-0000-0000-000000000001"]],
+        [2, [42]],
+        [1, "00000000-0000-0000-0000-000000000001"],
+    ])
+    def test_everything_cursor_rejects_bad_key_values(self, payload):
+        """Formal gültiges Token mit unbrauchbarem Schlüssel → ValueError (400), nicht erst beim Streamen."""
+        from src.domain.services.fhir_service import EverythingCursor, encode_cursor_token
+
+        with pytest.raises(ValueError):
+            EverythingCursor.decode(encode_cursor_token(payload))
+
+    def test_everything_cursor_roundtrip(self):
+        """encode/decode erhält typisierte Schlüssel."""
+        import uuid
+        from datetime import UTC, datetime
+
+        from src.domain.services.fhir_service import EverythingCursor
+
+        cursor = EverythingCursor(4, (datetime(2026, 3, 1, 8, tzinfo=UTC), uuid.uuid4()))
+        assert EverythingCursor.decode(cursor.encode()) == cursor
+
+
+VitalRow = namedtuple(
+    "VitalRow",
+    "id patient_id encounter_id recorded_at heart_rate systolic_bp diastolic_bp spo2 temperature "
+    "respiratory_rate gcs pain_score",
+)
+
+
+class _FakeStream:
+    """Async-Iterator wie AsyncScalarResult aus ``stream_scalars``."""
+
+    def __init__(self, rows: list) -> None:
+        self._rows = iter(rows)
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._rows)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def everything_db():
+    """Session-Ersatz mit 1 Patient, 1 Encounter und 150 Vitalmessungen."""
+    import uuid
+    from datetime import UTC, datetime, timedelta
+    from types import SimpleNamespace
+    from unittest.mock import AsyncMock
+
+    from src.api.dependencies import get_db
+    from src.domain.models.clinical import Encounter, VitalSign
+    from src.domain.models.lab import LabResult
+    from src.main import app
+
+    pid = uuid.uuid4()
+    start = datetime(2026, 3, 1, tzinfo=UTC)
+    patient = SimpleNamespace(
+        id=pid, first_name="Anna", last_name="Muster", gender="female", date_of_birth=None, updated_at=start,
+    )
+    encounter = SimpleNamespace(
+        id=uuid.uuid4(), patient_id=pid, status="active", admitted_at=start, discharged_at=None, reason=None,
+    )
+    vitals = [
+        VitalRow(
+            id=uuid.uuid4(), patient_id=pid, encounter_id=None, recorded_at=start + timedelta(minutes=i),
+            heart_rate=70.0 + i % 5, systolic_bp=None, diastolic_bp=None, spo2=96.0, temperature=None,
+            respiratory_rate=None, gcs=None, pain_score=None,
+        )
+        for i in range(150)
+    ]
+    lab = SimpleNamespace(
+        id=uuid.uuid4(), patient_id=pid, loinc_code="1988-5", display_name="CRP", value=12.0, unit="mg/L",
+        ref_min=None, ref_max=5.0, flag="H", collected_at=None, resulted_at=start, encounter_id=None,
+    )
+    by_entity = {Encounter: [encounter], VitalSign: vitals, LabResult: [lab]}
+
+    async def stream(query):
+        rows = by_entity.get(query.column_descriptions[0]["entity"], [])
+        return _FakeStream(rows[: query._limit] if query._limit else rows)
+
+    session = AsyncMock()
+    session.get = AsyncMock(return_value=patient)
+    session.stream_scalars = stream
+    session.stream = stream
+
+    async def _db():
+        yield session
+
+    app.dependency_overrides[get_db] = _db
+    return SimpleNamespace(patient=patient, vitals=vitals)
+
+
+class _FakePartitionedStream(_FakeStream):
+    """Wie ``_FakeStream``, zusätzlich ``partitions()`` für den Export."""
+
+    def __init__(self, rows: list, size: int = 2) -> None:
+        super().__init__(rows)
+        self._all, self._size = rows, size
+
+    async def partitions(self):
+        for i in range(0, len(self._all), self._size):
+            yield self._all[i:i + self._size]
+
+
+@pytest.fixture
+def export_dir(tmp_path, monkeypatch):
+    from src.domain.services import fhir_export_service
+
+    monkeypatch.setattr(fhir_export_service, "export_root", lambda: tmp_path)
+    return tmp_path
+
+
+class TestFHIRBulkExport:
+    """Tests für $export — Hintergrund-Job, gzip-NDJSON, Status-Polling."""
+
+    def test_export_dir_not_publicly_served(self):
+        """Exportdateien (PHI) liegen nicht unter dem ohne Anmeldung erreichbaren Media-Mount."""
+        from src.config import get_media_root_path
+        from src.domain.services.fhir_export_service import export_root
+
+        media = get_media_root_path().resolve()
+        assert not export_root().resolve().is_relative_to(media)
+
+    @pytest.mark.anyio
+    async def test_run_export_writes_gzip_ndjson(self, export_dir, everything_db):
+        """Pro Ressourcentyp eine gzip-NDJSON-Datei, Manifest mit Anzahl."""
+        import gzip
+        import json
+        from unittest.mock import AsyncMock
+
+        from src.domain.models.clinical import VitalSign
+        from src.domain.models.patient import Patient
+        from src.domain.services.fhir_export_service import ExportJob, get_export_status, run_export
+
+        rows = {Patient: [(everything_db.patient,)], VitalSign: everything_db.vitals}
+        session = AsyncMock()
+        session.stream = AsyncMock(
+            side_effect=lambda q: _FakePartitionedStream(rows.get(q.column_descriptions[0]["entity"], []))
+        )
+
+        class _Factory:
+            async def __aenter__(self):
+                return session
+
+            async def __aexit__(self, *exc):
+                return False
+
+        job = ExportJob(level="system", request_url="http://test/$export", types=("Patient", "Observation"))
+        job.directory.mkdir()
+        urls = {t: f"http://test/files/{t}" for t in job.types}
+        await run_export(lambda: _Factory(), job, urls)
+
+        manifest = get_export_status(job.id)
+        assert manifest["status"] == "completed"
+        assert [(o["type"], o["count"]) for o in manifest["output"]] == [("Patient", 1), ("Observation", 300)]
+        with gzip.open(job.directory / "Observation.ndjson.gz", "rt") as fh:
+            lines = fh.read().splitlines()
+        assert len(lines) == 300
+        assert json.loads(lines[0])["resourceType"] == "Observation"
+
+    @pytest.mark.anyio
+    async def test_kick_off_returns_content_location(self, arzt_client: AsyncClient, export_dir, monkeypatch):
+        """Kick-off: 202 mit Content-Location auf den Status-Endpoint."""
+        from src.api.v1 import fhir
+
+        started = []
+        monkeypatch.setattr(fhir, "start_export", lambda factory, job, urls: started.append((job, urls)))
+        resp = await arzt_client.get("/api/v1/fhir/Group/HS-1/$export", params={"_type": "Patient,Observation"})
+        assert resp.status_code == 202
+        job, urls = started[0]
+        assert job.group == "HS-1" and job.types == ("Patient", "Observation")
+        assert resp.headers["content-location"].endswith(f"/api/v1/fhir/$export-status/{job.id}")
+        assert urls["Observation"].endswith(f"/$export-file/{job.id}/Observation.ndjson.gz")
+
+    @pytest.mark.anyio
+    async def test_kick_off_rejects_unknown_type(self, arzt_client: AsyncClient):
+        """Unbekannter _type gibt 400 zurück."""
+        resp = await arzt_client.get("/api/v1/fhir/$export", params={"_type": "Condition"})
+        assert resp.status_code == 400
+
+    @pytest.mark.anyio
+    async def test_kick_off_requires_role(self, pflege_client: AsyncClient):
+        """Bulk-Export nur für Arzt/Admin."""
+        resp = await pflege_client.get("/api/v1/fhir/$export")
+        assert resp.status_code == 403
+
+    @pytest.mark.anyio
+    async def test_status_polling_and_delete(self, arzt_client: AsyncClient, export_dir):
+        """202 + X-Progress während der Laufzeit, 200 mit Manifest danach, DELETE räumt auf."""
+        import json
+        import uuid
+
+        job_id = uuid.uuid4().hex
+        job_dir = export_dir / job_id
+        job_dir.mkdir()
+        (job_dir / "status.json").write_text(json.dumps({"status": "in-progress", "progress": "1/4 Ressourcentypen"}))
+
+        resp = await arzt_client.get(f"/api/v1/fhir/$export-status/{job_id}")
+        assert resp.status_code == 202
+        assert resp.headers["x-progress"] == "1/4 Ressourcentypen"
+
+        (job_dir / "status.json").write_text(json.dumps({"status": "completed", "output": [], "error": []}))
+        resp = await arzt_client.get(f"/api/v1/fhir/$export-status/{job_id}")
+        assert resp.status_code == 200 and resp.json() == {"output": [], "error": []}
+
+        assert (await arzt_client.delete(f"/api/v1/fhir/$export-status/{job_id}")).status_code == 202
+        assert not job_dir.exists()
+        assert (await arzt_client.get(f"/api/v1/fhir/$export-status/{job_id}")).status_code == 404
+
+
+class TestFHIRObservationSearch:
+    """Tests für /api/v1/fhir/Observation — Vitaldaten + Labor, Keyset, Buckets."""
+
+    PID = "00000000-0000-0000-0000-0000000000aa"
+
+    @staticmethod
+    def _lab(minutes: int, analyte: str = "crp", loinc: str = "1988-5"):
+        import uuid
+        from datetime import UTC, datetime, timedelta
+        from types import SimpleNamespace
+
+        at = datetime(2026, 3, 1, tzinfo=UTC) + timedelta(minutes=minutes)
+        return SimpleNamespace(
+            id=uuid.uuid4(), patient_id=uuid.UUID(TestFHIRObservationSearch.PID), encounter_id=None,
+            analyte=analyte, loinc_code=loinc, display_name="CRP", value=12.0, unit="mg/L", ref_min=0, ref_max=5,
+            flag="H", collected_at=None, resulted_at=at,
+        )
+
+    @staticmethod
+    def _vital(minutes: int, **values):
+        import uuid
+        from datetime import UTC, datetime, timedelta
+
+        fields = dict.fromkeys(VitalRow._fields[4:]) | values
+        return VitalRow(
+            id=uuid.uuid4(), patient_id=uuid.UUID(TestFHIRObservationSearch.PID), encounter_id=None,
+            recorded_at=datetime(2026, 3, 1, tzinfo=UTC) + timedelta(minutes=minutes), **fields,
+        )
+
+    @staticmethod
+    def _session(vitals: list, labs: list):
+        from unittest.mock import AsyncMock, MagicMock
+
+        def execute(stmt):
+            result = MagicMock()
+            entity = stmt.column_descriptions[0]["entity"].__name__
+            rows = (vitals if entity == "VitalSign" else labs)[: stmt._limit]
+            result.all.return_value = rows
+            result.scalars.return_value.all.return_value = rows
+            return result
+
+        return AsyncMock(execute=AsyncMock(side_effect=execute))
+
+    @pytest.mark.anyio
+    async def test_search_empty(self, arzt_client: AsyncClient):
+        """Ohne Daten: leeres searchset mit self-Link."""
+        resp = await arzt_client.get("/api/v1/fhir/Observation", params={"patient": f"Patient/{self.PID}"})
+        assert resp.status_code == 200
+        bundle = resp.json()
+        assert bundle["type"] == "searchset" and bundle["entry"] == []
+        assert [link["relation"] for link in bundle["link"]] == ["self"]
+
+    @pytest.mark.anyio
+    @pytest.mark.parametrize("params", [
+        {"patient": "nicht-uuid"},
+        {"patient": PID, "date": "gestern"},
+        {"patient": PID, "_bucket": "5s"},
+        {"patient": PID, "_sort": "value"},
+        {"patient": PID, "_cursor": "kaputt"},
+    ])
+    async def test_search_invalid_params(self, arzt_client: AsyncClient, params):
+        """Ungültige Suchparameter geben 400 zurück."""
+        resp = await arzt_client.get("/api/v1/fhir/Observation", params=params)
+        assert resp.status_code == 400
+
+    @pytest.mark.parametrize(("value", "lower", "upper"), [
+        ("ge2026-03-01", "2026-03-01T00:00:00+00:00", None),
+        ("lt2026-03-01", None, "2026-03-01T00:00:00+00:00"),
+        ("le2026-03-01", None, "2026-03-02T00:00:00+00:00"),
+        ("2026-03-01", "2026-03-01T00:00:00+00:00", "2026-03-02T00:00:00+00:00"),
+        ("gt2026-03-01T08:00:00+01:00", "2026-03-01T08:00:00.000001+01:00", None),
+    ])
+    def test_parse_date(self, value, lower, upper):
+        from src.domain.services.fhir_observation_service import parse_date
+
+        lo, hi = parse_date(value)
+        assert (lo.isoformat() if lo else None, hi.isoformat() if hi else None) == (lower, upper)
+
+    @pytest.mark.anyio
+    async def test_keyset_merges_vitals_and_labs(self):
+        """Beide Quellen werden nach Zeit gemischt; next-Cursor setzt nach dem letzten Datensatz an."""
+        import orjson
+
+        from src.domain.services.fhir_observation_service import build_query, search_observations
+        from src.domain.services.fhir_service import decode_cursor_token
+
+        vitals = [self._vital(0, heart_rate=70.0, spo2=97.0), self._vital(20, heart_rate=72.0)]
+        labs = [self._lab(10), self._lab(30)]
+        q = build_query(patient=self.PID, codes=[], dates=[], category=None, count=3, sort=None, bucket=None,
+                        cursor=None)
+        page = await search_observations(self._session(vitals, labs), q)
+
+        resources = [orjson.loads(r) for r in page.resources]
+        assert [r["id"] for r in resources] == [
+            f"{vitals[0].id}-heart_rate", f"{vitals[0].id}-spo2", str(labs[0].id), f"{vitals[1].id}-heart_rate",
+        ]
+        assert resources[2]["interpretation"][0]["coding"][0]["code"] == "H"
+        assert decode_cursor_token(page.next_cursor) == [vitals[1].recorded_at.isoformat(), str(vitals[1].id)]
+
+    @pytest.mark.anyio
+    async def test_code_filter_selects_single_series(self):
+        """code=LOINC Herzfrequenz → nur HR-Observations, keine Laborabfrage."""
+        import orjson
+
+        from src.domain.services.fhir_observation_service import build_query, search_observations
+
+        session = self._session([self._vital(0, heart_rate=70.0, spo2=97.0)], [self._lab(5)])
+        q = build_query(patient=self.PID, codes=["http://loinc.org|8867-4"], dates=["ge2026-03-01"],
+                        category=None, count=10, sort="-date", bucket=None, cursor=None)
+        page = await search_observations(session, q)
+
+        assert [orjson.loads(r)["code"]["coding"][0]["code"] for r in page.resources] == ["8867-4"]
+        assert session.execute.await_count == 1
+        assert page.next_cursor is None
+
+    @pytest.mark.anyio
+    async def test_bucket_aggregates_with_statistics(self):
+        """_bucket liefert je Intervall Mittelwert + Min/Max/Anzahl als Komponenten."""
+        from datetime import UTC, datetime, timedelta
+        from unittest.mock import AsyncMock, MagicMock
+
+        import orjson
+
+        from src.domain.services.fhir_observation_service import build_query, search_observations
+
+        start = datetime(2026, 3, 1, tzinfo=UTC)
+        rows = [
+            {"bucket": start + timedelta(hours=h), "heart_rate_avg": 70.0 + h, "heart_rate_min": 60.0,
+             "heart_rate_max": 90.0, "heart_rate_n": 12}
+            for h in range(3)
+        ]
+        result = MagicMock()
+        result.mappings.return_value = rows
+        session = AsyncMock(execute=AsyncMock(return_value=result))
+        q = build_query(patient=self.PID, codes=["8867-4"], dates=[], category="vital-signs", count=2, sort=None,
+                        bucket="1h", cursor=None)
+        page = await search_observations(session, q)
+
+        first = orjson.loads(page.resources[0])
+        assert len(page.resources) == 2
+        assert first["effectivePeriod"] == {"start": "2026-03-01T00:00:00+00:00", "end": "2026-03-01T01:00:00+00:00"}
+        assert first["valueQuantity"]["value"] == 70.0
+        assert [c["code"]["coding"][0]["code"] for c in first["component"]] == ["minimum", "maximum", "count"]
+        assert page.next_cursor is not None
+
+    def test_bucket_interval_identical_in_select_and_group_by(self):
+        """time_bucket-Intervall ist ein Literal — sonst lehnt PostgreSQL das GROUP BY ab."""
+        from sqlalchemy import select
+        from sqlalchemy.dialects import postgresql
+
+        from src.domain.models.clinical import VitalSign
+        from src.domain.services.fhir_observation_service import _time_bucket, build_query
+
+        q = build_query(patient=self.PID, codes=[], dates=[], category=None, count=10, sort=None, bucket="1h",
+                        cursor=None)
+        bucket = _time_bucket(q, VitalSign.recorded_at)
+        sql = str(select(bucket).group_by(bucket).compile(dialect=postgresql.dialect()))
+        assert sql.count("INTERVAL '3600 seconds'") == 2
+
 
 # ═══════════════════════════════════════════════════════════════
 # FHIR Service Unit Tests
@@ -142,6 +563,26 @@ class TestFHIRMappings:
             assert "display" in VITAL_LOINC_MAP[param]
             assert "unit" in VITAL_LOINC_MAP[param]
 
+    @pytest.mark.parametrize("with_encounter", [False, True])
+    def test_precompiled_vital_encoder_matches_mapper(self, with_encounter):
+        """Vorkompilierte Serialisierung ist byte-identisch zu vital_sign_to_fhir."""
+        import uuid
+        from datetime import UTC, datetime
+
+        import orjson
+
+        from src.domain.services.fhir_service import encode_vital_row, vital_sign_to_fhir
+
+        vs = VitalRow(
+            id=uuid.uuid4(), patient_id=uuid.uuid4(), encounter_id=uuid.uuid4() if with_encounter else None,
+            recorded_at=datetime(2026, 3, 1, 8, 15, 30, 123456, tzinfo=UTC), heart_rate=71.5, systolic_bp=128.0,
+            diastolic_bp=None, spo2=0.1 + 0.2, temperature=36.6, respiratory_rate=None, gcs=15, pain_score=0,
+        )
+        encoded = encode_vital_row(vs)
+        expected = vital_sign_to_fhir(vs)
+        assert [obs for _id, obs in encoded] == [orjson.dumps(o) for o in expected]
+        assert [obs_id for obs_id, _obs in encoded] == [o["id"] for o in expected]
+
     def test_gender_mapping(self):
         """Gender-Mapping konvertiert korrekt."""
         from src.domain.services.fhir_service import _map_gender
@@ -0,0 +1,283 @@
+"""HL7v2 Tests — ORU^R01-Parser, Ingestion über den Batch-Pfad, MLLP-Listener."""
+
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.domain.models.lab import HL7InboundMessage
+from src.domain.services import hl7_service
+from src.infrastructure.mllp import END_BLOCK, MLLPListener, frame
+
+
+PATIENT_ID = uuid.uuid4()
+
+ORU = "\r".join([
+    "MSH|^~\\&|LIS|LABOR-AG|PDMS|HOME-SPITAL|20260301083000||ORU^R01|MSG0001|P|2.5",
+    "PID|1||756.1234.5678.97^^^AHV~" + str(PATIENT_ID) + "^^^PDMS||Muster^Hans",
+    "OBR|1|P-17|L-4711|LAB^Panel|||20260301071500+0100" + "|" * 15 + "20260301082000+0100",
+    "OBX|1|NM|1988-5^CRP^LN||45.2|mg/L|0-5|H|||F|||20260301081000",
+    "OBX|2|NM|2823-3^Kalium^LN||2.4|mmol/L|3.5-5.1|LL|||F",
+    "OBX|3|ST|8251-1^Kommentar^LN||h\\E\\molysiert||||||F",
+    "OBX|4|NM|1988-5^CRP^LN||40.0|mg/L|0-5|H|||D",
+    "OBR|2|P-18|L-4712|LAB^Troponin|||20260301074500",
+    "OBX|1|SN|99999-9^Exotisch^LN||<^0.5|ng/L|<14||||F",
+])
+
+
+def _factory(session):
+    """Session-Factory-Ersatz, der immer dieselbe Mock-Session liefert."""
+
+    class Factory:
+        def __call__(self):
+            return self
+
+        async def __aenter__(self):
+            return session
+
+        async def __aexit__(self, *exc):
+            return False
+
+    return Factory()
+
+
+# ── Parser ───────────────────────────────────────────────────────
+
+class TestORUParser:
+    def test_parses_panels_and_obx(self):
+        message = hl7_service.parse_oru_r01(ORU)
+
+        assert message.control_id == "MSG0001"
+        assert message.sending_application == "LIS"
+        assert message.patient_identifiers == ["756.1234.5678.97", str(PATIENT_ID)]
+        assert [p.order_number for p in message.panels] == ["L-4711", "L-4712"]
+        assert message.panels[0].collected_at.isoformat() == "2026-03-01T07:15:00+01:00"
+        # resulted_at: OBX-14, sonst OBR-22 (sonst Empfangszeit beim Speichern)
+        assert message.panels[0].results[0].resulted_at.isoformat() == "2026-03-01T08:10:00+00:00"
+        assert message.panels[0].results[1].resulted_at.isoformat() == "2026-03-01T08:20:00+01:00"
+        assert message.panels[1].results[0].resulted_at is None
+        # Textresultat und gelöschtes OBX werden übersprungen
+        assert message.skipped == 2
+
+        crp, potassium = message.panels[0].results
+        assert (crp.analyte, crp.value, crp.ref_min, crp.ref_max, crp.flag) == ("crp", 45.2, 0.0, 5.0, "H")
+        assert (potassium.analyte, potassium.flag, potassium.category) == ("potassium", "LL", "chemistry")
+
+        # Unbekannter LOINC-Code: Import unter dem Code, Anzeige aus OBX-3.2
+        (exotic,) = message.panels[1].results
+        assert (exotic.analyte, exotic.display_name, exotic.value, exotic.ref_max) == (
+            "99999-9", "Exotisch", 0.5, 14.0,
+        )
+
+    @pytest.mark.parametrize("raw", [
+        "PID|1||123",
+        "MSH|^~\\&|LIS|LAB|PDMS|HS|20260301||ADT^A01|X1|P|2.5",
+        "MSH|^~\\&|LIS|LAB|PDMS|HS|20260301||ORU^R01|X1|P|2.5\rPID|1||\rOBR|1",
+    ])
+    def test_rejects_invalid_messages(self, raw):
+        with pytest.raises(hl7_service.HL7ParseError):
+            hl7_service.parse_oru_r01(raw)
+
+    def test_escapes_resolved_per_component(self):
+        """\\S\\ ist ein literales "^" in der Komponente und trennt keine Komponenten."""
+        raw = "\r".join([
+            "MSH|^~\\&|LIS|LABOR-AG|PDMS|HOME-SPITAL|20260301083000||ORU^R01|MSG0002|P|2.5",
+            f"PID|1||{PATIENT_ID}^^^PDMS",
+            "OBR|1||L-1\\S\\A|LAB^Panel|||20260301071500",
+            "OBX|1|NM|99999-9^Na\\S\\K Quotient^LN||1.5|1|||||F",
+        ])
+        message = hl7_service.parse_oru_r01(raw)
+
+        (panel,) = message.panels
+        assert panel.order_number == "L-1^A"
+        (result,) = panel.results
+        assert (result.loinc_code, result.display_name) == ("99999-9", "Na^K Quotient")
+
+    def test_ack_contains_control_id(self):
+        ack = hl7_service.build_ack("MSG0001", "AE", text="Unknown patient", receiving_application="LIS")
+        msh, msa = ack.strip("\r").split("\r")
+        assert msh.split("|")[4] == "LIS" and "ACK^R01^ACK" in msh
+        assert msa == "MSA|AE|MSG0001|Unknown patient"
+
+
+# ── Ingestion ────────────────────────────────────────────────────
+
+class TestORUIngestion:
+    @pytest.mark.asyncio
+    async def test_all_panels_in_one_transaction(self, mock_db_session, monkeypatch):
+        calls = []
+
+        async def fake_batch(db, patient_id, results, **kwargs):
+            calls.append((patient_id, [r.analyte for r in results], kwargs))
+            return []
+
+        monkeypatch.setattr(hl7_service, "create_lab_results_batch", fake_batch)
+        lookup = MagicMock()
+        lookup.scalar_one_or_none.side_effect = ["MSG0001", PATIENT_ID]
+        mock_db_session.execute.return_value = lookup
+
+        stored = await hl7_service.ingest_oru(mock_db_session, hl7_service.parse_oru_r01(ORU))
+
+        assert stored == 3
+        assert mock_db_session.execute.await_count == 2  # Control-ID vermerken + Patientensuche
+        assert mock_db_session.commit.await_count == 1
+        assert [(c[1], c[2]["order_number"], c[2]["commit"]) for c in calls] == [
+            (["crp", "potassium"], "L-4711", False),
+            (["99999-9"], "L-4712", False),
+        ]
+        assert all(c[0] == PATIENT_ID for c in calls)
+
+    @pytest.mark.asyncio
+    async def test_claim_is_unique_per_sender_and_control_id(self, mock_db_session):
+        lookup = MagicMock()
+        lookup.scalar_one_or_none.return_value = "MSG0001"
+        mock_db_session.execute.return_value = lookup
+
+        await hl7_service._claim_message(mock_db_session, hl7_service.parse_oru_r01(ORU))
+
+        stmt = mock_db_session.execute.await_args.args[0]
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "INSERT INTO hl7_inbound_messages" in sql and "ON CONFLICT DO NOTHING" in sql
+        assert {c.name for c in HL7InboundMessage.__table__.primary_key} == {
+            "sending_application", "sending_facility", "control_id",
+        }
+
+    @pytest.mark.asyncio
+    async def test_retransmit_is_acked_without_reinsert(self, mock_db_session, monkeypatch):
+        """Bereits verarbeitete MSH-10 desselben Absenders → AA, keine neuen Resultate."""
+        batch = AsyncMock()
+        monkeypatch.setattr(hl7_service, "create_lab_results_batch", batch)
+        conflict = MagicMock()
+        conflict.scalar_one_or_none.return_value = None  # ON CONFLICT DO NOTHING → keine Zeile
+        mock_db_session.execute.return_value = conflict
+
+        ack = await hl7_service.handle_hl7_message(_factory(mock_db_session), ORU)
+
+        assert "MSA|AA|MSG0001" in ack
+        batch.assert_not_called()
+        assert mock_db_session.execute.await_count == 1
+        assert mock_db_session.commit.await_count == 0
+
+    @pytest.mark.asyncio
+    async def test_unknown_patient_is_nacked(self, mock_db_session):
+        lookup = MagicMock()
+        lookup.scalar_one_or_none.side_effect = ["MSG0001", None]
+        mock_db_session.execute.return_value = lookup
+
+        ack = await hl7_service.handle_hl7_message(_factory(mock_db_session), ORU)
+        assert "MSA|AE|MSG0001|Unknown patient" in ack
+        assert mock_db_session.commit.await_count == 0
+
+        ack = await hl7_service.handle_hl7_message(_factory(mock_db_session), "MSH|^~\\&|A|B|C|D|20260301||ADT^A01|Z9|P|2.5")
+        assert "MSA|AR|Z9|" in ack
+
+
+# ── MLLP-Listener ────────────────────────────────────────────────
+
+class TestMLLPListener:
+    @staticmethod
+    def _oru(control_id: str, patient: str) -> str:
+        return f"MSH|^~\\&|LIS|LAB|PDMS|HS|20260301||ORU^R01|{control_id}|P|2.5\rPID|1||{patient}^^^AHV"
+
+    @pytest.mark.asyncio
+    async def test_acks_in_order_after_commit(self):
+        committed: list[str] = []
+        release = asyncio.Event()
+
+        async def handler(message: str) -> str:
+            control_id = message.split("|")[9]
+            if control_id == "A":
+                await release.wait()  # erste Nachricht "committet" zuletzt
+            committed.append(control_id)
+            return hl7_service.build_ack(control_id, "AA")
+
+        # A und B auf verschiedene Lanes legen (str-hash() ist pro Prozess zufällig)
+        keys = {"A": "A", "B": next(k for k in map(str, range(64)) if hash(k) % 2 != hash("A") % 2)}
+        listener = MLLPListener()
+        await listener.start(
+            handler, host="127.0.0.1", port=0, workers=2, queue_size=4, max_message_bytes=4096,
+            partition=lambda message: keys[message.split("|")[9]],
+        )
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", listener.port)
+            for control_id in ("A", "B"):
+                writer.write(frame(f"MSH|^~\\&|LIS|LAB|PDMS|HS|20260301||ORU^R01|{control_id}|P|2.5"))
+            await writer.drain()
+
+            # B ist verarbeitet, aber kein ACK vor dem von A (Reihenfolge pro Verbindung)
+            await asyncio.sleep(0.05)
+            assert committed == ["B"]
+            with pytest.raises(TimeoutError):
+                await asyncio.wait_for(reader.readuntil(END_BLOCK), timeout=0.05)
+
+            release.set()
+            acks = [await asyncio.wait_for(reader.readuntil(END_BLOCK), timeout=2) for _ in range(2)]
+            assert [a.decode().split("MSA|AA|")[1][0] for a in acks] == ["A", "B"]
+            assert committed == ["B", "A"]
+            writer.close()
+        finally:
+            await listener.stop()
+        assert listener.stats["acked"] == 2 and listener.stats["running"] is False
+
+    @pytest.mark.asyncio
+    async def test_same_patient_is_applied_in_order(self):
+        """Zwei ORUs desselben Patienten laufen nacheinander, auch über zwei Verbindungen."""
+        running: list[str] = []
+        committed: list[str] = []
+        release = asyncio.Event()
+
+        async def handler(message: str) -> str:
+            control_id = message.split("|")[9]
+            running.append(control_id)
+            if control_id == "A":
+                await release.wait()
+            committed.append(control_id)
+            return hl7_service.build_ack(control_id, "AA")
+
+        listener = MLLPListener()
+        await listener.start(
+            handler, host="127.0.0.1", port=0, workers=4, queue_size=8, max_message_bytes=4096,
+            partition=hl7_service.patient_partition_key,
+        )
+        try:
+            first = await asyncio.open_connection("127.0.0.1", listener.port)
+            second = await asyncio.open_connection("127.0.0.1", listener.port)
+            first[1].write(frame(self._oru("A", "756.1111")))
+            await first[1].drain()
+            await asyncio.sleep(0.02)
+            second[1].write(frame(self._oru("B", "756.1111")))
+            await second[1].drain()
+
+            await asyncio.sleep(0.05)
+            assert running == ["A"]  # B wartet auf A
+
+            release.set()
+            for reader, writer in (first, second):
+                await asyncio.wait_for(reader.readuntil(END_BLOCK), timeout=2)
+                writer.close()
+            assert committed == ["A", "B"]
+        finally:
+            await listener.stop()
+
+    def test_partition_key_is_first_patient_identifier(self):
+        assert hl7_service.patient_partition_key(ORU) == "756.1234.5678.97"
+        assert hl7_service.patient_partition_key("garbage") is None
+
+    @pytest.mark.asyncio
+    async def test_handler_failure_drops_connection_without_ack(self):
+        async def handler(message: str) -> str:
+            raise ConnectionError("database unavailable")
+
+        listener = MLLPListener()
+        await listener.start(handler, host="127.0.0.1", port=0, workers=1, queue_size=1, max_message_bytes=4096)
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", listener.port)
+            writer.write(frame("MSH|^~\\&|LIS|LAB|PDMS|HS|20260301||ORU^R01|A|P|2.5"))
+            await writer.drain()
+            assert await asyncio.wait_for(reader.read(), timeout=2) == b""
+            writer.close()
+        finally:
+            await listener.stop()
+        assert listener.stats["failed"] == 1 and listener.stats["acked"] == 0
@@ -1,6 +1,7 @@
 """Lab & Fluid Balance Tests — Laborwerte und Flüssigkeitsbilanz."""
 
 import uuid
+from datetime import UTC, datetime
 
 import pytest
 from httpx import AsyncClient
@@ -158,6 +159,141 @@ class TestLabResultValidation:
         assert r.status_code == 422
 
 
+class TestLabBatchImport:
+    """Set-basierter Batch-Import: feste Anzahl Roundtrips, ein Commit, Panel-Events."""
+
+    @pytest.mark.asyncio
+    async def test_batch_is_set_based(self, mock_db_session, monkeypatch):
+        from unittest.mock import MagicMock
+
+        from src.domain.schemas.lab import LabResultCreate
+        from src.domain.services import lab_service
+
+        events = []
+
+        async def fake_emit(key, payload, *, session=None):
+            events.append((key, payload))
+
+        monkeypatch.setattr(lab_service, "emit_event", fake_emit)
+        previous = MagicMock()
+        previous.all.return_value = [("crp", 10.0), ("potassium", 4.0)]
+        mock_db_session.execute.return_value = previous
+        mock_db_session.scalars.return_value = iter([])
+
+        pid = uuid.uuid4()
+        measured = datetime(2026, 3, 1, 8, 10, tzinfo=UTC)
+        panel = [
+            LabResultCreate(patient_id=pid, analyte="crp", value=30.0, resulted_at=measured),
+            LabResultCreate(patient_id=pid, analyte="potassium", value=1.5),
+            LabResultCreate(patient_id=pid, analyte="sodium", value=140.0),
+            LabResultCreate(patient_id=pid, analyte="crp", value=31.0),
+        ]
+        await lab_service.create_lab_results_batch(mock_db_session, pid, panel, order_number="A-1")
+
+        assert mock_db_session.execute.await_count == 1
+        assert mock_db_session.commit.await_count == 1
+        stmt, rows = mock_db_session.scalars.await_args.args
+        assert [(r["analyte"], r["previous_value"], r["trend"]) for r in rows] == [
+            ("crp", 10.0, "↑↑"), ("potassium", 4.0, "↓↓"), ("sodium", None, None), ("crp", 30.0, "↑"),
+        ]
+        assert rows[0]["loinc_code"] == "1988-5" and rows[1]["flag"] == "LL"
+        # Zeitstempel aus der Quelle bleibt erhalten, sonst Importzeitpunkt
+        assert rows[0]["resulted_at"] == measured and rows[1]["resulted_at"] > measured
+        assert [key for key, _ in events] == ["lab.resulted", "lab.critical"]
+        assert events[0][1]["count"] == 4
+        assert [r["analyte"] for r in events[1][1]["results"]] == ["crp", "potassium", "crp"]
+
+
+class TestLabLatestProjection:
+    """lab_latest: Upsert beim Import, Summary als Primärschlüssel-Read mit Cache."""
+
+    @pytest.mark.asyncio
+    async def test_batch_upserts_latest_once_per_analyte(self, mock_db_session, monkeypatch):
+        from datetime import UTC, datetime
+        from unittest.mock import MagicMock
+
+        from sqlalchemy.dialects import postgresql
+
+        from src.domain.models.lab import LabResult
+        from src.domain.schemas.lab import LabResultCreate
+        from src.domain.services import lab_service
+
+        async def fake_emit(key, payload, *, session=None):
+            pass
+
+        monkeypatch.setattr(lab_service, "emit_event", fake_emit)
+        previous = MagicMock()
+        previous.all.return_value = []
+        mock_db_session.execute.return_value = previous
+
+        pid = uuid.uuid4()
+        now = datetime.now(UTC)
+        created = [
+            LabResult(id=uuid.uuid4(), patient_id=pid, analyte=a, value=v, display_name=a, unit="",
+                      category="chemistry", resulted_at=now)
+            for a, v in (("crp", 30.0), ("sodium", 140.0), ("crp", 31.0))
+        ]
+        mock_db_session.scalars.return_value = iter(created)
+        panel = [LabResultCreate(patient_id=pid, analyte=r.analyte, value=r.value) for r in created]
+        await lab_service.create_lab_results_batch(mock_db_session, pid, panel)
+
+        # 1× Vorwerte aus lab_latest, 1× Upsert
+        assert mock_db_session.execute.await_count == 2
+        lookup, upsert = (c.args[0] for c in mock_db_session.execute.await_args_list)
+        assert "FROM lab_latest" in str(lookup)
+        compiled = upsert.compile(dialect=postgresql.dialect())
+        assert "ON CONFLICT (patient_id, analyte) DO UPDATE" in str(compiled)
+        assert "WHERE lab_latest.resulted_at <= excluded.resulted_at" in str(compiled)
+        # Doppelter Analyt im Panel: nur der spätere Wert landet in der Projektion
+        assert sorted(v for k, v in compiled.params.items() if k.startswith("value")) == [31.0, 140.0]
+
+    @pytest.mark.asyncio
+    async def test_summary_reads_projection_and_is_cached(self, arzt_client: AsyncClient):
+        from contextlib import asynccontextmanager
+        from datetime import UTC, datetime
+        from unittest.mock import AsyncMock, MagicMock
+
+        from src.api.dependencies import get_session_factory
+        from src.domain.models.lab import LabLatest
+        from src.main import app
+
+        pid = uuid.uuid4()
+        latest = LabLatest(
+            patient_id=pid, analyte="crp", result_id=uuid.uuid4(), display_name="CRP", value=12.0,
+            unit="mg/L", ref_min=0, ref_max=5, flag="H", interpretation="pathological", trend="↑",
+            category="chemistry", resulted_at=datetime.now(UTC),
+        )
+        summary_queries = []
+
+        async def execute(stmt, *args, **kwargs):
+            result = MagicMock()
+            rows = []
+            if "FROM lab_latest" in str(stmt):
+                summary_queries.append(stmt)
+                rows = [latest]
+            result.scalars.return_value.all.return_value = rows
+            return result
+
+        session = AsyncMock()
+        session.execute = AsyncMock(side_effect=execute)
+
+        @asynccontextmanager
+        async def _sessions():
+            yield session
+
+        app.dependency_overrides[get_session_factory] = lambda: _sessions
+        try:
+            first = await arzt_client.get(f"/api/v1/patients/{pid}/lab-results/summary")
+            second = await arzt_client.get(f"/api/v1/patients/{pid}/lab-results/summary")
+        finally:
+            app.dependency_overrides.pop(get_session_factory, None)
+
+        assert first.status_code == 200
+        assert first.json()["items"][0]["analyte"] == "crp"
+        assert second.json() == first.json()
+        assert len(summary_queries) == 1
+
+
 class TestLabResultRBAC:
     """RBAC für Laborwerte — nur Arzt/Admin dürfen schreiben."""
 
@@ -0,0 +1,138 @@
+"""Prometheus-Metriken — Histogramme, Textformat, Aggregation über Worker."""
+
+import json
+import os
+
+import pytest
+from httpx import AsyncClient
+
+from src.infrastructure.metrics import MetricsExporter, Registry, merge_snapshots, render_snapshot
+
+
+@pytest.fixture
+def registry():
+    reg = Registry()
+    reg.counter("t_requests_total", "Requests.", ("route",))
+    reg.histogram("t_duration_seconds", "Latency.", ("route",), buckets=(0.01, 0.1, 1.0))
+    reg.gauge("t_connections", "Open connections.", ("channel",))
+    return reg
+
+
+class TestRegistry:
+    def test_histogram_text_format(self, registry):
+        hist = registry.get("t_duration_seconds")
+        for value in (0.005, 0.05, 0.05, 5.0):
+            hist.observe(value, "/api/v1/patients/{patient_id}")
+
+        text = registry.render()
+        route = 'route="/api/v1/patients/{patient_id}"'
+        assert "# TYPE t_duration_seconds histogram" in text
+        # kumulative Buckets, +Inf = count
+        assert f't_duration_seconds_bucket{{{route},le="0.01"}} 1' in text
+        assert f't_duration_seconds_bucket{{{route},le="0.1"}} 3' in text
+        assert f't_duration_seconds_bucket{{{route},le="1"}} 3' in text
+        assert f't_duration_seconds_bucket{{{route},le="+Inf"}} 4' in text
+        assert f"t_duration_seconds_count{{{route}}} 4" in text
+        assert f"t_duration_seconds_sum{{{route}}} 5.105" in text
+
+    def test_label_values_are_escaped(self, registry):
+        registry.get("t_requests_total").inc('a"b\\c')
+        assert 't_requests_total{route="a\\"b\\\\c"} 1' in registry.render()
+
+    def test_duplicate_name_rejected(self, registry):
+        with pytest.raises(ValueError):
+            registry.counter("t_requests_total", "again")
+
+
+class TestMultiWorker:
+    def test_merge_sums_counters_and_live_gauges(self, registry):
+        registry.get("t_requests_total").inc("/a", amount=3)
+        registry.get("t_duration_seconds").observe(0.05, "/a")
+        registry.get("t_connections").set(2, "alarms")
+        worker = registry.snapshot()
+
+        merged = merge_snapshots([(worker, True), (worker, False)])
+        assert merged["t_requests_total"]["samples"] == [[["/a"], 6.0]]
+        assert merged["t_duration_seconds"]["samples"][0][1][:4] == [0, 2, 0, 0]
+        # Gauges beendeter Worker zählen nicht mehr
+        assert merged["t_connections"]["samples"] == [[["alarms"], 2]]
+        assert "t_requests_total{route=\"/a\"} 6" in render_snapshot(merged)
+
+    def test_exporter_aggregates_snapshot_files(self, registry, tmp_path):
+        registry.get("t_requests_total").inc("/a")
+        exporter = MetricsExporter(registry)
+        exporter.configure(tmp_path)
+
+        # Snapshot eines beendeten Workers (PID existiert nicht)
+        other = registry.snapshot()
+        other["t_connections"]["samples"] = [[["vitals"], 5]]
+        (tmp_path / "metrics-999999999-1.json").write_text(json.dumps(other))
+
+        text = exporter.render()
+        assert 't_requests_total{route="/a"} 2' in text
+        assert "vitals" not in text
+        assert len(list(tmp_path.glob(f"metrics-{os.getpid()}-*.json"))) == 1
+
+    def test_reused_pid_does_not_overwrite_old_snapshot(self, registry, tmp_path):
+        """Gleiche PID nach Neustart: alter Snapshot bleibt erhalten, Zähler sinken nicht."""
+        registry.get("t_requests_total").inc("/a", amount=5)
+        old = registry.snapshot()
+        old["t_connections"]["samples"] = [[["vitals"], 5]]
+        # Früherer Prozess mit derselben PID, aber anderer Startzeit
+        (tmp_path / f"metrics-{os.getpid()}-0.json").write_text(json.dumps(old))
+
+        fresh = Registry()
+        fresh.counter("t_requests_total", "Requests.", ("route",)).inc("/a")
+        exporter = MetricsExporter(fresh)
+        exporter.configure(tmp_path)
+
+        text = exporter.render()
+        assert 't_requests_total{route="/a"} 6' in text
+        assert "vitals" not in text  # Gauge des alten Prozesses zählt nicht mehr
+        assert len(list(tmp_path.glob("metrics-*.json"))) == 2
+
+
+class TestPrometheusEndpoint:
+    @pytest.mark.asyncio
+    async def test_route_template_labels(self, arzt_client: AsyncClient):
+        import uuid
+
+        await arzt_client.get(f"/api/v1/patients/{uuid.uuid4()}")
+        response = await arzt_client.get("/metrics/prometheus")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        assert 'pdms_http_request_duration_seconds_bucket{method="GET",route="/api/v1/patients/{patient_id}"' in text
+        assert "# TYPE pdms_db_pool_checkout_seconds histogram" in text
+        assert "# TYPE pdms_websocket_connections gauge" in text
+
+    @pytest.mark.asyncio
+    async def test_route_labels_from_template_and_mounts(self, tmp_path):
+        """Label aus path_format inkl. Router-Präfix; Mounts werden zu <mount>/{path}."""
+        from fastapi import APIRouter, FastAPI
+        from fastapi.staticfiles import StaticFiles
+        from httpx import ASGITransport
+
+        from src.api.middleware import ObservabilityMiddleware
+        from src.infrastructure.metrics import HTTP_REQUESTS
+
+        router = APIRouter()
+
+        @router.get("/tags/{tag}")
+        async def tag(tag: str):
+            return {}
+
+        (tmp_path / "photo.jpg").write_bytes(b"x")
+        app = FastAPI()
+        app.include_router(router, prefix="/api/v1")
+        app.mount("/media", StaticFiles(directory=str(tmp_path)), name="media")
+        app.add_middleware(ObservabilityMiddleware)
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            assert (await client.get("/api/v1/tags/tags")).status_code == 200
+            assert (await client.get("/media/photo.jpg")).status_code == 200
+
+        routes = {labels[1] for labels in HTTP_REQUESTS.values}
+        assert "/api/v1/tags/{tag}" in routes
+        assert "/media/{path}" in routes
+        assert "/api/v1/{tag}/{tag}" not in routes
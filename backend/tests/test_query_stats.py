@@ -0,0 +1,140 @@
+"""SQL-Profiling — Fingerprints, Statistik, N+1-Erkennung, Slow-Query-Log."""
+
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, text
+
+from src.api.middleware import ObservabilityMiddleware
+from src.config import settings
+from src.infrastructure import query_stats as qs
+from src.infrastructure.query_stats import QueryStats, fingerprint
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    fresh = QueryStats()
+    monkeypatch.setattr(qs, "query_stats", fresh)
+    monkeypatch.setattr("src.api.middleware.query_stats", fresh)
+    monkeypatch.setattr("src.api.v1.query_stats.query_stats", fresh)
+    return fresh
+
+
+class TestFingerprint:
+    def test_literals_and_parameters_normalized(self):
+        a = fingerprint("SELECT * FROM patients WHERE id = $1 AND name = 'Muster' LIMIT 20")
+        b = fingerprint("SELECT *  FROM patients\n WHERE id = $2 AND name = 'O''Brien' LIMIT 50")
+        assert a == b == "SELECT * FROM patients WHERE id = ? AND name = ? LIMIT ?"
+
+    def test_in_lists_collapse(self):
+        assert fingerprint("SELECT 1 FROM t WHERE id IN ($1, $2, $3)") == fingerprint(
+            "SELECT 1 FROM t WHERE id IN ($1, $2)"
+        )
+        assert "IN (?, ...)" in fingerprint("SELECT 1 FROM t WHERE id IN ($1, $2)")
+
+    def test_identifiers_with_digits_kept(self):
+        assert fingerprint("SELECT icd10_code FROM t1") == "SELECT icd10_code FROM t1"
+
+
+class TestQueryStats:
+    def test_aggregates_per_fingerprint(self, stats):
+        for i in range(100):
+            stats.record(f"SELECT * FROM vital_signs WHERE patient_id = $1 LIMIT {i}", (i + 1) / 1000, 3)
+
+        [entry] = stats.report()["statements"]
+        assert entry["count"] == 100
+        assert entry["rows"] == 300
+        assert entry["mean_ms"] == pytest.approx(50.5)
+        assert entry["p99_ms"] == pytest.approx(100.0)
+        assert entry["max_ms"] == pytest.approx(100.0)
+
+    def test_fingerprint_cap(self, stats, monkeypatch):
+        monkeypatch.setattr(settings, "db_query_stats_max_fingerprints", 2)
+        for table in ("a", "b", "c", "d"):
+            stats.record(f"SELECT 1 FROM {table}", 0.001, 1)
+        assert set(stats.statements) == {"SELECT ? FROM a", "SELECT ? FROM b", qs.OTHER}
+        assert stats.statements[qs.OTHER].count == 2
+
+    def test_slow_query_logs_fingerprint_only(self, stats, monkeypatch, caplog):
+        monkeypatch.setattr(settings, "db_slow_query_ms", 100)
+        with caplog.at_level(logging.WARNING, logger="pdms.db.slow"):
+            stats.record("SELECT * FROM patients WHERE id = 'c0ffee00-0000-4000-8000-000000000001'", 0.25, 1)
+            stats.record("SELECT 1", 0.01, 1)
+
+        [record] = caplog.records
+        entry = json.loads(record.getMessage())
+        assert entry["duration_ms"] == 250.0
+        assert entry["fingerprint"] == "SELECT * FROM patients WHERE id = ?"
+        # Inline-Literale (z.B. EXPLAIN mit literal_binds) landen nie im Log
+        assert "c0ffee00" not in record.getMessage() and "statement" not in entry
+        assert stats.report()["slow"][0]["duration_ms"] == 250.0
+
+    def test_engine_hook_records_statements(self, stats):
+        engine = create_engine("sqlite://")
+        qs.install(SimpleNamespace(sync_engine=engine))
+        qs.install(SimpleNamespace(sync_engine=engine))  # idempotent
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+
+        assert stats.statements["SELECT ?"].count == 2
+
+
+class TestRequestScope:
+    @pytest.fixture
+    def app(self, stats):
+        app = FastAPI()
+
+        @app.get("/api/v1/patients/{patient_id}/dossier")
+        async def dossier(patient_id: str, loop: bool = False):
+            stats.record("SELECT * FROM patients WHERE id = $1", 0.001, 1)
+            for _ in range(6 if loop else 1):
+                stats.record("SELECT * FROM medications WHERE patient_id = $1", 0.001, 2)
+            return {}
+
+        app.add_middleware(ObservabilityMiddleware)
+        return app
+
+    @pytest.mark.asyncio
+    async def test_n_plus_one_detected_per_route(self, app, stats, caplog):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            await client.get("/api/v1/patients/p1/dossier")
+            with caplog.at_level(logging.WARNING, logger="pdms.db"):
+                await client.get("/api/v1/patients/p2/dossier", params={"loop": True})
+
+        [route] = stats.report()["routes"]
+        assert route["route"] == "/api/v1/patients/{patient_id}/dossier"
+        assert route["requests"] == 2
+        assert route["max_queries"] == 7
+        assert route["n_plus_one"] == [
+            {"fingerprint": "SELECT * FROM medications WHERE patient_id = ?", "requests": 1, "max_repeats": 6}
+        ]
+        assert any("N+1 suspect" in r.getMessage() for r in caplog.records)
+
+    @pytest.mark.asyncio
+    async def test_chatty_request_flagged(self, app, stats, monkeypatch):
+        monkeypatch.setattr(settings, "db_queries_per_request_warn", 5)
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            await client.get("/api/v1/patients/p1/dossier", params={"loop": True})
+        assert stats.report()["routes"][0]["chatty_requests"] == 1
+
+
+class TestAdminEndpoint:
+    @pytest.mark.asyncio
+    async def test_report_and_reset(self, admin_client: AsyncClient, stats):
+        stats.record("SELECT 1", 0.001, 1)
+        response = await admin_client.get("/api/v1/admin/query-stats", params={"sort": "p99_ms"})
+        assert response.status_code == 200
+        assert {"statements", "routes", "slow", "slow_query_ms"} <= response.json().keys()
+
+        assert (await admin_client.delete("/api/v1/admin/query-stats")).status_code == 204
+        assert stats.statements == {}
+
+    @pytest.mark.asyncio
+    async def test_admin_only(self, arzt_client: AsyncClient):
+        response = await arzt_client.get("/api/v1/admin/query-stats")
+        assert response.status_code == 403
@@ -0,0 +1,721 @@
+"""RabbitMQ-Tests — Publisher, transaktionale Outbox, Topic-Dispatcher, paralleler Consumer."""
+
+import asyncio
+import json
+import uuid
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.domain.models.system import EventOutbox
+from src.infrastructure import rabbitmq
+from src.infrastructure.outbox import OutboxRelay
+from src.infrastructure.rabbitmq import EventConsumer, EventHandlerError, EventPublisher, TopicDispatcher
+
+
+class FakeExchange:
+    """Exchange-Ersatz: sammelt Routing Keys, kann Nacks simulieren."""
+
+    def __init__(self) -> None:
+        self.published: list[str] = []
+        self.fail = False
+
+    async def publish(self, message, routing_key: str) -> None:
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("nack")
+        self.published.append(routing_key)
+
+
+class FakeChannel:
+    def __init__(self) -> None:
+        self.is_closed = False
+        self.exchange = FakeExchange()
+        self.declared = 0
+
+    async def declare_exchange(self, *_args, **_kwargs) -> FakeExchange:
+        self.declared += 1
+        return self.exchange
+
+    async def close(self) -> None:
+        self.is_closed = True
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.channels: list[FakeChannel] = []
+
+    async def channel(self, publisher_confirms: bool = True) -> FakeChannel:
+        ch = FakeChannel()
+        self.channels.append(ch)
+        return ch
+
+
+async def _drain() -> None:
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+async def publisher():
+    conn = FakeConnection()
+    pub = EventPublisher(pool_size=2, confirms=True, outbox_max=3)
+    await pub.start(conn)
+    yield pub, conn
+    await pub.stop(timeout=0.1)
+
+
+class TestEventPublisher:
+    """Kanal-Pool, Confirms im Hintergrund, Puffer bei Ausfall."""
+
+    @pytest.mark.asyncio
+    async def test_exchange_declared_once_per_channel(self, publisher):
+        """Exchange wird beim Start deklariert, nicht pro Event."""
+        pub, conn = publisher
+        for i in range(10):
+            await pub.publish(f"vital.recorded.{i}", b"{}")
+        await _drain()
+
+        assert [ch.declared for ch in conn.channels] == [1, 1]
+        assert sum(len(ch.exchange.published) for ch in conn.channels) == 10
+        assert pub.stats["confirmed"] == 10
+
+    @pytest.mark.asyncio
+    async def test_closed_channels_buffer_and_drain(self, publisher):
+        """Ohne offenen Kanal wird gepuffert und nach Reconnect nachgeliefert."""
+        pub, conn = publisher
+        for ch in conn.channels:
+            ch.is_closed = True
+        await pub.publish("alarm.critical", b"{}")
+        assert pub.outbox_depth == 1
+
+        conn.channels[0].is_closed = False
+        await asyncio.sleep(0.6)
+        assert pub.outbox_depth == 0
+        assert conn.channels[0].exchange.published == ["alarm.critical"]
+
+    @pytest.mark.asyncio
+    async def test_nack_is_buffered(self, publisher):
+        """Nicht bestätigte Events landen in der Outbox."""
+        pub, conn = publisher
+        for ch in conn.channels:
+            ch.exchange.fail = True
+        await pub.publish("alarm.warning", b"{}")
+        await _drain()
+        assert pub.stats["nacked"] == 1
+        assert pub.stats["buffered"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_outbox_drops_oldest_when_full(self, publisher):
+        """Volle Outbox verwirft das älteste Event und zählt es."""
+        pub, conn = publisher
+        for ch in conn.channels:
+            ch.is_closed = True
+        for i in range(5):
+            await pub.publish(f"vital.recorded.{i}", b"{}")
+        assert pub.outbox_depth == 3
+        assert pub.stats["dropped"] == 2
+        assert [key for key, _ in pub._outbox][0] == "vital.recorded.2"
+
+    @pytest.mark.asyncio
+    async def test_publish_event_uses_pool_when_started(self, publisher, monkeypatch):
+        """publish_event nutzt den gestarteten Publisher statt eines neuen Kanals."""
+        pub, conn = publisher
+        monkeypatch.setattr(rabbitmq, "_publisher", pub)
+        await rabbitmq.publish_event(rabbitmq.EXCHANGE_NAME, "note.created", b"{}")
+        await _drain()
+        assert sum(len(ch.exchange.published) for ch in conn.channels) == 1
+
+
+class TestTransactionalOutbox:
+    """emit_event mit Session schreibt in die Outbox, der Relay publiziert."""
+
+    @pytest.mark.asyncio
+    async def test_emit_with_session_stages_row(self, monkeypatch):
+        """Mit Session wird nichts direkt publiziert, sondern eine Outbox-Zeile angelegt."""
+        direct = AsyncMock()
+        monkeypatch.setattr(rabbitmq, "publish_event", direct)
+        session = MagicMock()
+
+        await rabbitmq.emit_event("vital.recorded", {"patient_id": "p1"}, session=session)
+
+        row = session.add.call_args.args[0]
+        assert isinstance(row, EventOutbox)
+        assert row.routing_key == "vital.recorded" and row.body == '{"patient_id": "p1"}'
+        direct.assert_not_awaited()
+
+    @staticmethod
+    def _recording_session() -> tuple[AsyncMock, list[str]]:
+        """Session-Mock, der add/flush/commit in Aufrufreihenfolge protokolliert."""
+        calls: list[str] = []
+        session = AsyncMock()
+        session.add = MagicMock(side_effect=lambda obj: calls.append(f"add:{type(obj).__name__}"))
+        session.flush = AsyncMock(side_effect=lambda: calls.append("flush"))
+        session.commit = AsyncMock(side_effect=lambda: calls.append("commit"))
+        result = MagicMock()
+        result.scalar_one_or_none.return_value = None
+        session.execute = AsyncMock(return_value=result)
+        return session, calls
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("create", ["encounter", "appointment"])
+    async def test_domain_row_and_event_commit_together(self, create):
+        """Domain-Änderung und Outbox-Zeile landen in derselben Transaktion (ein Commit, danach)."""
+        import uuid
+        from datetime import date
+
+        from src.domain.schemas.appointment import AppointmentCreate
+        from src.domain.schemas.encounter import EncounterCreate
+        from src.domain.services import appointment_service, encounter_service
+
+        session, calls = self._recording_session()
+        patient_id = uuid.uuid4()
+        if create == "encounter":
+            await encounter_service.admit_patient(
+                session, EncounterCreate(patient_id=patient_id, encounter_type="hospitalization"),
+            )
+        else:
+            await appointment_service.create_appointment(session, AppointmentCreate(
+                patient_id=patient_id, appointment_type="labor", title="Blutentnahme",
+                scheduled_date=date.today(), start_time=datetime.now(UTC),
+            ))
+
+        assert calls.count("commit") == 1
+        assert calls.index("add:EventOutbox") < calls.index("commit")
+        assert calls[-1] == "commit"
+
+    @staticmethod
+    def _session_factory(rows, *, locked: bool = True):
+        result = MagicMock()
+        result.scalar.return_value = locked  # pg_try_advisory_xact_lock
+        result.scalars.return_value.all.return_value = rows
+        session = AsyncMock()
+        session.execute = AsyncMock(return_value=result)
+        factory = MagicMock()
+        factory.return_value.__aenter__ = AsyncMock(return_value=session)
+        factory.return_value.__aexit__ = AsyncMock(return_value=False)
+        return factory, session
+
+    @pytest.mark.asyncio
+    async def test_relay_deletes_confirmed_rows(self, publisher, monkeypatch):
+        """Bestätigte Events werden gelöscht, nacheinander auf einem Kanal in ID-Reihenfolge publiziert."""
+        pub, conn = publisher
+        monkeypatch.setattr(rabbitmq, "_publisher", pub)
+        rows = [EventOutbox(id=i, routing_key=f"note.created.{i}", body="{}") for i in (1, 2, 3)]
+        factory, session = self._session_factory(rows)
+
+        relay = OutboxRelay()
+        assert await relay.relay_once(factory, batch_size=10) == 3
+
+        first, *others = conn.channels
+        assert first.exchange.published == ["note.created.1", "note.created.2", "note.created.3"]
+        assert all(ch.exchange.published == [] for ch in others)
+        assert session.execute.await_count == 3  # Advisory Lock + SELECT + DELETE
+        session.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_relay_keeps_unconfirmed_rows(self, publisher, monkeypatch):
+        """Ohne Confirm bleiben die Zeilen stehen (attempts + 1) und der Relay meldet den Fehler."""
+        pub, conn = publisher
+        monkeypatch.setattr(rabbitmq, "_publisher", pub)
+        for ch in conn.channels:
+            ch.exchange.fail = True
+        factory, session = self._session_factory([EventOutbox(id=7, routing_key="alarm.critical", body="{}")])
+
+        relay = OutboxRelay()
+        with pytest.raises(ConnectionError):
+            await relay.relay_once(factory, batch_size=10)
+
+        statement = session.execute.await_args_list[-1].args[0]
+        assert statement.is_update
+        assert relay.failed == 1 and relay.relayed == 0
+
+    @pytest.mark.asyncio
+    async def test_relay_stops_at_first_unconfirmed_row(self, publisher, monkeypatch):
+        """Spätere Events überholen ein unbestätigtes nicht: Batch bricht dort ab."""
+        pub, _conn = publisher
+        monkeypatch.setattr(rabbitmq, "_publisher", pub)
+        pub.publish_confirmed = AsyncMock(side_effect=[None, RuntimeError("nack"), None])
+        rows = [EventOutbox(id=i, routing_key="vital.recorded", body="{}") for i in (1, 2, 3)]
+        factory, session = self._session_factory(rows)
+
+        relay = OutboxRelay()
+        with pytest.raises(ConnectionError):
+            await relay.relay_once(factory, batch_size=10)
+
+        assert pub.publish_confirmed.await_count == 2
+        delete_stmt, update_stmt = (c.args[0] for c in session.execute.await_args_list[2:])
+        assert delete_stmt.compile().params == {"id_1": [1]}
+        assert update_stmt.is_update and update_stmt.compile().params["id_1"] == 2
+        assert relay.relayed == 1 and relay.failed == 1
+
+    @pytest.mark.asyncio
+    async def test_relay_skips_while_other_worker_holds_lock(self, publisher, monkeypatch):
+        pub, conn = publisher
+        monkeypatch.setattr(rabbitmq, "_publisher", pub)
+        factory, session = self._session_factory(
+            [EventOutbox(id=1, routing_key="vital.recorded", body="{}")], locked=False,
+        )
+        assert await OutboxRelay().relay_once(factory, batch_size=10) == 0
+        assert session.execute.await_count == 1
+        assert all(ch.exchange.published == [] for ch in conn.channels)
+
+    @pytest.mark.asyncio
+    async def test_relay_noop_on_empty_outbox(self, publisher, monkeypatch):
+        pub, _conn = publisher
+        monkeypatch.setattr(rabbitmq, "_publisher", pub)
+        factory, session = self._session_factory([])
+        assert await OutboxRelay().relay_once(factory, batch_size=10) == 0
+        session.commit.assert_not_awaited()
+
+
+class TestTopicDispatcher:
+    """Trie-Matching mit AMQP-Semantik, mehrere Handler pro Pattern, parallele Ausführung."""
+
+    @staticmethod
+    def _handler(calls: list, name: str):
+        async def handler(payload: dict) -> None:
+            calls.append(name)
+        handler.__qualname__ = name
+        return handler
+
+    @pytest.mark.parametrize("pattern,key,expected", [
+        ("alarm.critical", "alarm.critical", True),
+        ("alarm.critical", "alarm.warning", False),
+        ("alarm.*", "alarm.critical", True),
+        ("alarm.*", "alarm", False),
+        ("alarm.*", "alarm.critical.extra", False),
+        ("alarm.#", "alarm", True),
+        ("alarm.#", "alarm.critical.extra", True),
+        ("#", "vital.recorded", True),
+        ("*.created", "note.created", True),
+        ("#.created", "lab.batch.created", True),
+        ("lab.#.critical", "lab.critical", True),
+        ("lab.#.critical", "lab.a.b.critical", True),
+        ("lab.#.critical", "lab.a.b", False),
+    ])
+    def test_topic_semantics(self, pattern, key, expected):
+        dispatcher = TopicDispatcher()
+        dispatcher.register(pattern, self._handler([], "h"))
+        assert bool(dispatcher.match(key)) is expected
+
+    @pytest.mark.asyncio
+    async def test_multiple_handlers_per_pattern(self):
+        """Alle Handler eines Patterns und überlappender Patterns laufen, in Registrierungsreihenfolge."""
+        calls: list[str] = []
+        dispatcher = TopicDispatcher()
+        dispatcher.register("alarm.critical", self._handler(calls, "cache"))
+        dispatcher.register("alarm.critical", self._handler(calls, "notify"))
+        dispatcher.register("alarm.#", self._handler(calls, "audit"))
+
+        assert await dispatcher.dispatch("alarm.critical", {}) == 3
+        assert calls == ["cache", "notify", "audit"]
+
+    def test_match_cache_invalidated_on_register(self):
+        dispatcher = TopicDispatcher()
+        dispatcher.register("vital.*", self._handler([], "a"))
+        assert len(dispatcher.match("vital.recorded")) == 1
+        dispatcher.register("#", self._handler([], "b"))
+        assert len(dispatcher.match("vital.recorded")) == 2
+
+    @pytest.mark.asyncio
+    async def test_handlers_run_concurrently_and_isolated(self):
+        """Handler warten nicht aufeinander; ein Fehler stoppt die anderen nicht."""
+        both_started = asyncio.Event()
+        started = 0
+
+        async def slow(payload: dict) -> None:
+            nonlocal started
+            started += 1
+            if started == 2:
+                both_started.set()
+            await asyncio.wait_for(both_started.wait(), timeout=1)
+
+        async def broken(payload: dict) -> None:
+            raise RuntimeError("boom")
+
+        dispatcher = TopicDispatcher()
+        dispatcher.register("lab.resulted", slow)
+        dispatcher.register("lab.resulted", slow)
+        dispatcher.register("lab.#", broken)
+
+        with pytest.raises(EventHandlerError):
+            await dispatcher.dispatch("lab.resulted", {})
+
+        stats = dispatcher.stats()
+        slow_stats = next(v for k, v in stats.items() if k.endswith("slow"))
+        broken_stats = next(v for k, v in stats.items() if k.endswith("broken"))
+        assert slow_stats["calls"] == 2 and slow_stats["errors"] == 0
+        assert broken_stats["errors"] == 1
+
+
+class FakeIncoming:
+    """Eingehende Nachricht mit ack/nack-Protokoll."""
+
+    def __init__(self, routing_key: str, payload, redelivered: bool = False, headers: dict | None = None) -> None:
+        self.routing_key = routing_key
+        self.headers = headers or {}
+        self.body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.redelivered = redelivered
+        self.timestamp = datetime.now(UTC) - timedelta(milliseconds=50)
+        self.content_type = "application/json"
+        self.message_id = None
+        self.ack = AsyncMock()
+        self.nack = AsyncMock()
+        self.reject = AsyncMock()
+
+
+class TestEventConsumer:
+    """Worker-Pool: Ordnung pro Patient, Alarm-Lane, Requeue/DLQ, Lag-Metriken."""
+
+    @pytest.fixture
+    async def consumer_with(self):
+        consumers: list[EventConsumer] = []
+
+        def make(dispatcher: TopicDispatcher, **kwargs) -> EventConsumer:
+            consumer = EventConsumer(
+                dispatcher, queue_name="q", binding_keys=["#"], workers=4, priority_workers=1, prefetch=16,
+                **kwargs,
+            )
+            consumer._channel = MagicMock()
+            consumer._channel.default_exchange.publish = AsyncMock()
+            for lane in consumer._lanes.values():
+                for queue in lane:
+                    consumer._workers.append(asyncio.create_task(consumer._work(queue)))
+            consumers.append(consumer)
+            return consumer
+
+        yield make
+        for consumer in consumers:
+            await consumer.stop()
+
+    @pytest.mark.asyncio
+    async def test_order_per_patient_and_slow_partition_isolated(self, consumer_with):
+        """Events eines Patienten bleiben geordnet; ein hängender Patient blockiert andere nicht."""
+        gate = asyncio.Event()
+        seen: list[tuple[str, int]] = []
+
+        async def handler(payload: dict) -> None:
+            if payload["patient_id"] == "slow":
+                await gate.wait()
+            seen.append((payload["patient_id"], payload["n"]))
+
+        dispatcher = TopicDispatcher()
+        dispatcher.register("lab.#", handler)
+        consumer = consumer_with(dispatcher)
+        # Partition "slow" darf keine andere Partition teilen
+        fast_ids = [p for p in (f"p{i}" for i in range(50)) if hash(p) % 4 != hash("slow") % 4][:2]
+
+        await consumer.submit(FakeIncoming("lab.resulted", {"patient_id": "slow", "n": 0}))
+        for n in range(3):
+            for pid in fast_ids:
+                await consumer.submit(FakeIncoming("lab.resulted", {"patient_id": pid, "n": n}))
+        await _drain()
+
+        for pid in fast_ids:
+            assert [n for p, n in seen if p == pid] == [0, 1, 2]
+        assert ("slow", 0) not in seen
+        gate.set()
+        await _drain()
+        assert ("slow", 0) in seen
+        assert consumer.stats["processed"] == 7
+
+    @pytest.mark.asyncio
+    async def test_alarm_lane_not_blocked_by_bulk(self, consumer_with):
+        """Alarm-Events laufen auf eigener Lane, auch wenn alle Default-Worker hängen."""
+        gate = asyncio.Event()
+        handled: list[str] = []
+
+        async def bulk(payload: dict) -> None:
+            await gate.wait()
+
+        async def alarm(payload: dict) -> None:
+            handled.append("alarm")
+
+        dispatcher = TopicDispatcher()
+        dispatcher.register("lab.#", bulk)
+        dispatcher.register("alarm.#", alarm)
+        consumer = consumer_with(dispatcher)
+
+        for i in range(20):
+            await consumer.submit(FakeIncoming("lab.batch_imported", {"patient_id": f"p{i}"}))
+        msg = FakeIncoming("alarm.critical", {"patient_id": "p1"})
+        await consumer.submit(msg)
+        await _drain()
+
+        assert handled == ["alarm"]
+        msg.ack.assert_awaited_once()
+        gate.set()
+
+    @staticmethod
+    def _returned(published) -> FakeIncoming:
+        """Nachricht, wie sie nach Ablauf der TTL aus der Delay-Queue zurückkommt."""
+        message = published.args[0]
+        return FakeIncoming("q", json.loads(message.body), headers=dict(message.headers))
+
+    @pytest.mark.asyncio
+    async def test_failure_retried_via_delay_queue_then_dead_lettered(self, consumer_with):
+        """Fehler → Delay-Queue mit x-attempts; nach max_attempts → DLQ. Redelivery zählt nicht."""
+        async def broken(payload: dict) -> None:
+            raise RuntimeError("boom")
+
+        dispatcher = TopicDispatcher()
+        dispatcher.register("note.created", broken)
+        consumer = consumer_with(dispatcher)
+        publish = consumer._channel.default_exchange.publish
+
+        # Redelivery nach Absturz: erster echter Fehler → Retry, nicht DLQ
+        first = FakeIncoming("note.created", {"patient_id": "p1"}, redelivered=True)
+        await consumer.submit(first)
+        await _drain()
+        first.ack.assert_awaited_once()
+        first.nack.assert_not_awaited()
+        assert publish.await_args.kwargs["routing_key"] == "q.retry"
+        assert publish.await_args.args[0].headers["x-attempts"] == 1
+        assert publish.await_args.args[0].headers["x-original-routing-key"] == "note.created"
+
+        for _ in range(2, consumer.max_attempts + 1):
+            returned = self._returned(publish.await_args)
+            await consumer.submit(returned)
+            await _drain()
+            returned.ack.assert_awaited_once()
+
+        assert publish.await_args.kwargs["routing_key"] == "q.dlq"
+        assert publish.await_args.args[0].headers["x-original-routing-key"] == "note.created"
+        assert consumer.stats["retried"] == consumer.max_attempts - 1
+        assert consumer.stats["dead_lettered"] == 1
+        assert consumer._parked == {}
+
+    @pytest.mark.asyncio
+    async def test_retry_keeps_partition_order(self, consumer_with):
+        """Spätere Events des Patienten warten in der Delay-Queue hinter dem fehlgeschlagenen."""
+        seen: list[int] = []
+        fail_once = {0}
+
+        async def handler(payload: dict) -> None:
+            if payload["n"] in fail_once:
+                fail_once.discard(payload["n"])
+                raise RuntimeError("transient")
+            seen.append(payload["n"])
+
+        dispatcher = TopicDispatcher()
+        dispatcher.register("lab.#", handler)
+        consumer = consumer_with(dispatcher)
+        publish = consumer._channel.default_exchange.publish
+
+        for n in range(2):
+            await consumer.submit(FakeIncoming("lab.resulted", {"patient_id": "p1", "n": n}))
+            await _drain()
+        retry0, park1 = publish.await_args_list
+        assert seen == [] and consumer.stats["parked"] == 1
+
+        # Geparkte Nachricht kommt vor dem Kopf zurück → erneut geparkt
+        await consumer.submit(self._returned(park1))
+        await _drain()
+        assert seen == []
+        await consumer.submit(self._returned(retry0))
+        await _drain()
+        await consumer.submit(self._returned(publish.await_args_list[-1]))
+        await _drain()
+
+        assert seen == [0, 1]
+        assert consumer._parked == {}
+
+    @pytest.mark.asyncio
+    async def test_handoff_between_consumers_never_parks_forever(self, consumer_with):
+        """Kopf von A wird von B verarbeitet (Failover) → A gibt die Partition nach Ablauf des Leases frei."""
+        seen: list[tuple[str, int]] = []
+        fail_once = {0}
+
+        def handler_for(name: str):
+            async def handler(payload: dict) -> None:
+                if payload["n"] in fail_once:
+                    fail_once.discard(payload["n"])
+                    raise RuntimeError("transient")
+                seen.append((name, payload["n"]))
+            return handler
+
+        consumers = {}
+        for name in ("a", "b"):
+            dispatcher = TopicDispatcher()
+            dispatcher.register("lab.#", handler_for(name))
+            consumers[name] = consumer_with(dispatcher, park_lease_ms=50)
+        a, b = consumers["a"], consumers["b"]
+        publish_a = a._channel.default_exchange.publish
+
+        # A: n=0 scheitert (Kopf), n=1 wird dahinter geparkt
+        for n in range(2):
+            await a.submit(FakeIncoming("lab.resulted", {"patient_id": "p1", "n": n}))
+            await _drain()
+        retry0, park1 = publish_a.await_args_list
+
+        # Rückkehrer n=0 landet bei B: B kennt keinen Park-Zustand und verarbeitet direkt
+        returned0 = self._returned(retry0)
+        await b.submit(returned0)
+        await _drain()
+        returned0.ack.assert_awaited_once()
+        assert seen == [("b", 0)] and b._parked == {}
+
+        # A wartet nicht endlos auf den Kopf: nach dem Lease ist n=1 an der Reihe
+        await asyncio.sleep(0.06)
+        await a.submit(FakeIncoming("lab.resulted", {"patient_id": "p1", "n": 2}))
+        await _drain()
+        park2 = publish_a.await_args_list[-1]
+        assert a.stats["park_expired"] == 1
+        for published in (park1, park2):
+            await a.submit(self._returned(published))
+            await _drain()
+
+        assert seen == [("b", 0), ("a", 1), ("a", 2)]
+        assert a._parked == {} and publish_a.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_unknown_park_id_is_adopted_not_looped(self, consumer_with):
+        """Rückkehrer mit fremder x-park-id bei geparkter Partition reiht sich ein statt endlos zu kreisen."""
+        seen: list[int] = []
+        fail_once = {0}
+
+        async def handler(payload: dict) -> None:
+            if payload["n"] in fail_once:
+                fail_once.discard(payload["n"])
+                raise RuntimeError("transient")
+            seen.append(payload["n"])
+
+        dispatcher = TopicDispatcher()
+        dispatcher.register("lab.#", handler)
+        consumer = consumer_with(dispatcher)
+        publish = consumer._channel.default_exchange.publish
+
+        await consumer.submit(FakeIncoming("lab.resulted", {"patient_id": "p1", "n": 0}))
+        await _drain()
+        foreign = FakeIncoming("lab.resulted", {"patient_id": "p1", "n": 1}, headers={"x-park-id": "fremd"})
+        await consumer.submit(foreign)
+        await _drain()
+        assert list(consumer._parked["p1"]) == [publish.await_args_list[0].args[0].headers["x-park-id"], "fremd"]
+
+        for published in list(publish.await_args_list):
+            await consumer.submit(self._returned(published))
+            await _drain()
+        assert seen == [0, 1] and consumer._parked == {}
+
+    @pytest.mark.asyncio
+    async def test_main_queue_is_single_active_consumer(self, monkeypatch):
+        """Park-Zustand ist prozesslokal → nur ein Worker konsumiert die Hauptqueue gleichzeitig."""
+        channel = MagicMock()
+        channel.set_qos = AsyncMock()
+        channel.declare_exchange = AsyncMock()
+        queue = MagicMock()
+        queue.bind = AsyncMock()
+        queue.iterator.side_effect = asyncio.CancelledError
+        channel.declare_queue = AsyncMock(return_value=queue)
+        connection = MagicMock()
+        connection.channel = AsyncMock(return_value=channel)
+        monkeypatch.setattr(rabbitmq, "get_rabbitmq_connection", AsyncMock(return_value=connection))
+
+        consumer = EventConsumer(
+            TopicDispatcher(), queue_name="q", binding_keys=["#"], workers=1, priority_workers=1, prefetch=1,
+        )
+        await consumer._consume()
+
+        declared = {call.args[0]: call.kwargs for call in channel.declare_queue.await_args_list}
+        assert declared["q"]["arguments"] == {"x-single-active-consumer": True}
+        assert declared["q.retry"]["arguments"]["x-dead-letter-routing-key"] == "q"
+
+    @pytest.mark.asyncio
+    async def test_invalid_json_goes_to_dlq(self, consumer_with):
+        consumer = consumer_with(TopicDispatcher())
+        msg = FakeIncoming("vital.recorded", b"{not json")
+        await consumer.submit(msg)
+        msg.ack.assert_awaited_once()
+        assert consumer.stats["dead_lettered"] == 1
+
+    @pytest.mark.asyncio
+    async def test_lag_metrics(self, consumer_with):
+        dispatcher = TopicDispatcher()
+        dispatcher.register("#", AsyncMock())
+        consumer = consumer_with(dispatcher)
+        await consumer.submit(FakeIncoming("vital.recorded", {"patient_id": "p1"}))
+        await _drain()
+        metrics = consumer.metrics()
+        assert metrics["lag_last_ms"] >= 50
+        assert metrics["backlog"] == {"priority": 0, "default": 0}
+
+
+class FakeFanoutQueue:
+    """Exklusive Worker-Queue: liefert vorgegebene Nachrichten, merkt Bindings."""
+
+    def __init__(self, messages: list[FakeIncoming], log: list[str]) -> None:
+        self.name = "amq.gen-test"
+        self.messages = messages
+        self.log = log
+
+    async def bind(self, exchange, routing_key: str) -> None:
+        self.log.append(f"bind:{routing_key}")
+
+    def iterator(self, no_ack: bool = False):
+        messages = self.messages
+
+        class _Iter:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc) -> None:
+                return None
+
+            def __aiter__(self):
+                return self
+
+            async def __anext__(self):
+                if messages:
+                    return messages.pop(0)
+                await asyncio.Event().wait()
+
+        return _Iter()
+
+
+class TestWorkerSubscription:
+    """Fan-out pro Worker: jeder Prozess sieht jedes alarm.* Event."""
+
+    @pytest.mark.asyncio
+    async def test_every_worker_receives_every_event(self, monkeypatch):
+        from src.domain.services.alarm_rules import ActiveAlarmIndex
+
+        log: list[str] = []
+        channels: list[MagicMock] = []
+        pid = uuid.uuid4()
+
+        async def connect():
+            channel = MagicMock()
+            channel.declare_exchange = AsyncMock()
+            events = [
+                FakeIncoming("alarm.critical", {"patient_id": str(pid), "parameter": "spo2"}),
+                FakeIncoming("alarm.resolved", {"patient_id": str(pid), "parameter": "heart_rate"}),
+            ]
+            channel.declare_queue = AsyncMock(return_value=FakeFanoutQueue(events, log))
+            channels.append(channel)
+            connection = MagicMock()
+            connection.channel = AsyncMock(return_value=channel)
+            return connection
+
+        monkeypatch.setattr(rabbitmq, "get_rabbitmq_connection", connect)
+        workers = [ActiveAlarmIndex(), ActiveAlarmIndex()]
+        for index in workers:
+            index.add(pid, "heart_rate")
+
+        async def ready() -> None:
+            log.append("ready")
+
+        subscriptions = [
+            await rabbitmq.subscribe_worker(["alarm.#"], index.apply_event, on_ready=ready) for index in workers
+        ]
+        await _drain()
+        for subscription in subscriptions:
+            await subscription.stop()
+        rabbitmq._subscribers.clear()
+
+        for index in workers:
+            assert index.active_parameters(pid) == frozenset({"spo2"})
+        assert log == ["bind:alarm.#", "ready"] * 2
+        for channel in channels:
+            assert channel.declare_queue.await_args.kwargs == {"exclusive": True, "auto_delete": True}
@@ -3,6 +3,7 @@ Pflegediagnosen, Schichtübergaben, Ernährung, Verbrauchsmaterial, Dossier."""
 
 import uuid
 from datetime import date
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from httpx import AsyncClient
@@ -385,3 +386,42 @@ class TestDossier:
     async def test_dossier_invalid_uuid(self, arzt_client: AsyncClient):
         response = await arzt_client.get("/api/v1/patients/not-a-uuid/dossier")
         assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_dossier_single_roundtrip(self, mock_db_session):
+        """Das ganze Dossier kommt aus genau einer Abfrage."""
+        from src.domain.services.dossier_service import get_patient_dossier
+
+        row = MagicMock()
+        row._mapping = {
+            "encounter": [{"id": "e1", "status": "active", "encounter_type": "home-care",
+                           "admitted_at": "2026-01-01T08:00:00+00:00"}],
+            "active_alarms": 2,
+            "active_medications": 5,
+            "latest_vitals": [{"recorded_at": "2026-01-02T08:00:00+00:00", "heart_rate": 72}],
+            "latest_handover": [{"id": "h1", "shift_type": "early", "handover_date": "2026-01-02",
+                                 "situation": "stabil", "acknowledged_at": None}],
+            "recent_notes": [{"id": "n1", "title": "Verlauf"}],
+        }
+        mock_db_session.execute = AsyncMock(return_value=MagicMock(first=MagicMock(return_value=row)))
+
+        dossier = await get_patient_dossier(mock_db_session, uuid.uuid4())
+
+        assert mock_db_session.execute.await_count == 1
+        assert dossier["encounter"]["type"] == "home-care"
+        assert dossier["summary"]["active_alarms"] == 2 and dossier["summary"]["draft_letters"] == 0
+        assert dossier["latest_vitals"]["heart_rate"] == 72
+        assert dossier["latest_handover"]["acknowledged"] is False
+        assert dossier["active_nutrition"] is None and dossier["recent_nursing"] == []
+
+    @pytest.mark.asyncio
+    async def test_dossier_invalidated_by_domain_events(self):
+        """Domain-Events mit patient_id (oder vital.batch) invalidieren den Dossier-Cache."""
+        from src.domain.events import handlers
+        from src.infrastructure.rabbitmq import get_dispatcher
+
+        assert handlers.invalidate_dossier in get_dispatcher().match("medication.created")
+        assert handlers.invalidate_dossier not in get_dispatcher().match("appointment.created")
+        with patch.object(handlers, "invalidate", AsyncMock()) as inv:
+            await handlers.invalidate_dossier({"type": "vital.batch", "patients": {"p1": 3, "p2": 1}})
+        inv.assert_awaited_once_with("dossier:p1", "dossier:p2")
@@ -0,0 +1,248 @@
+"""Valkey-Tests — generationsbasierte Invalidierung, Two-Tier-Cache mit Single-Flight."""
+
+import asyncio
+import fnmatch
+
+import pytest
+
+from src.infrastructure import valkey
+from src.infrastructure.valkey import CacheKeys, get_cached, get_or_load, invalidate, set_cached
+
+
+class FakePipeline:
+    def __init__(self, client: "FakeValkey") -> None:
+        self.client = client
+        self.ops: list[tuple] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc) -> bool:
+        return False
+
+    def incr(self, key: str) -> None:
+        self.ops.append(("incr", key))
+
+    def unlink(self, *keys: str) -> None:
+        self.ops.append(("unlink", *keys))
+
+    async def execute(self) -> list:
+        self.client.round_trips += 1
+        results = []
+        for op, *args in self.ops:
+            results.append(self.client._incr(*args) if op == "incr" else self.client._unlink(*args))
+        return results
+
+
+class FakeValkey:
+    """In-Memory-Ersatz inkl. Emulation der beiden Lua-Skripte."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, str] = {}
+        self.round_trips = 0
+        self.scans = 0
+
+    async def get(self, key: str):
+        self.round_trips += 1
+        return self.data.get(key)
+
+    async def set(self, key: str, value: str, ex: int | None = None) -> None:
+        self.round_trips += 1
+        self.data[key] = value
+
+    async def eval(self, script: str, numkeys: int, gen_key: str, namespace: str, rest: str, *args):
+        self.round_trips += 1
+        gen = self.data.get(gen_key, "0")
+        physical = f"{namespace}:g{gen}:{rest}"
+        if script == valkey._GET_VERSIONED:
+            value = self.data.get(physical)
+            return [gen] if value is None else [gen, value]
+        payload, _ttl, expected = args
+        if expected and expected != gen:
+            return 0
+        self.data[physical] = payload
+        return 1
+
+    def _incr(self, key: str) -> int:
+        self.data[key] = str(int(self.data.get(key, "0")) + 1)
+        return int(self.data[key])
+
+    def _unlink(self, *keys: str) -> int:
+        return sum(self.data.pop(k, None) is not None for k in keys)
+
+    async def unlink(self, *keys: str) -> int:
+        self.round_trips += 1
+        return self._unlink(*keys)
+
+    async def scan_iter(self, match: str, count: int = 10):
+        self.scans += 1
+        for key in list(self.data):
+            if fnmatch.fnmatchcase(key, match):
+                yield key
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+
+@pytest.fixture
+def fake_valkey(monkeypatch):
+    client = FakeValkey()
+
+    async def _get_valkey():
+        return client
+
+    monkeypatch.setattr(valkey, "get_valkey", _get_valkey)
+    valkey._observed_generation.set(None)
+    valkey._local.clear()
+    yield client
+    valkey._local.clear()
+
+
+class TestGenerationInvalidation:
+    """Listen-Namespaces werden per Generationszähler invalidiert."""
+
+    @pytest.mark.asyncio
+    async def test_namespace_bump_is_constant_time(self, fake_valkey):
+        """Viele gecachte Listen-Seiten → ein Pipeline-Roundtrip, kein SCAN."""
+        for page in range(1, 200):
+            await set_cached(CacheKeys.patient_list(page, 20), {"page": page})
+        fake_valkey.round_trips = 0
+
+        await invalidate(CacheKeys.patient("p1"), CacheKeys.PATIENT_LIST_ALL)
+
+        assert fake_valkey.round_trips == 1
+        assert fake_valkey.scans == 0
+        assert await get_cached(CacheKeys.patient_list(1, 20)) is None
+
+    @pytest.mark.asyncio
+    async def test_versioned_roundtrip(self, fake_valkey):
+        await set_cached(CacheKeys.alarm_counts(), {"critical": 2})
+        assert await get_cached(CacheKeys.alarm_counts()) == {"critical": 2}
+        assert "alarms:g0:counts" in fake_valkey.data
+
+        await invalidate(CacheKeys.ALARM_ALL)
+        assert await get_cached(CacheKeys.alarm_counts()) is None
+
+    @pytest.mark.asyncio
+    async def test_stale_write_after_invalidation_skipped(self, fake_valkey):
+        """Wert aus der alten Generation wird nach Invalidierung nicht gespeichert."""
+        assert await get_cached(CacheKeys.alarm_counts()) is None  # liest Generation 0
+        await invalidate(CacheKeys.ALARM_ALL)  # parallel: Alarm ausgelöst
+        await set_cached(CacheKeys.alarm_counts(), {"critical": 0})
+
+        assert await get_cached(CacheKeys.alarm_counts()) is None
+
+    @pytest.mark.asyncio
+    async def test_unversioned_keys_and_wildcards(self, fake_valkey):
+        """Einzelschlüssel via UNLINK, sonstige Wildcards via SCAN + UNLINK."""
+        await set_cached(CacheKeys.patient("p1"), {"id": "p1"})
+        await set_cached(CacheKeys.patient("p2"), {"id": "p2"})
+        assert fake_valkey.data["patient:p1"]
+
+        assert await invalidate(CacheKeys.patient("p1")) == 1
+        assert await get_cached(CacheKeys.patient("p1")) is None
+
+        assert await invalidate(CacheKeys.PATIENT_ALL) == 1
+        assert fake_valkey.scans == 1
+        assert await get_cached(CacheKeys.patient("p2")) is None
+
+
+class TestTwoTierCache:
+    """Lokaler LRU vor Valkey, Single-Flight, Early Refresh, Tracking-Invalidierung."""
+
+    @staticmethod
+    def _loader(calls: list, value, delay: float = 0.0):
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(delay)
+            return value
+        return load
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_load_once(self, fake_valkey):
+        """Stampede auf einen kalten Schlüssel → genau ein Loader-Aufruf."""
+        calls: list = []
+        load = self._loader(calls, {"items": [], "total": 0}, delay=0.01)
+        key = CacheKeys.patient_list(1, 20)
+
+        results = await asyncio.gather(*(get_or_load(key, load, ttl=60) for _ in range(25)))
+
+        assert len(calls) == 1
+        assert all(r == {"items": [], "total": 0} for r in results)
+
+    @pytest.mark.asyncio
+    async def test_local_hit_skips_valkey(self, fake_valkey):
+        calls: list = []
+        await get_or_load(CacheKeys.patient("p1"), self._loader(calls, {"id": "p1"}), ttl=300)
+        fake_valkey.round_trips = 0
+
+        assert await get_or_load(CacheKeys.patient("p1"), self._loader(calls, {"id": "x"}), ttl=300) == {"id": "p1"}
+        assert fake_valkey.round_trips == 0 and len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_valkey_tier_serves_other_workers(self, fake_valkey):
+        """Lokaler Miss, Valkey-Treffer → kein Loader-Aufruf."""
+        calls: list = []
+        await get_or_load(CacheKeys.patient("p1"), self._loader(calls, {"id": "p1"}), ttl=300)
+        valkey._local.clear()  # anderer Worker
+
+        assert await get_or_load(CacheKeys.patient("p1"), self._loader(calls, {"id": "x"}), ttl=300) == {"id": "p1"}
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_loader_error_not_cached(self, fake_valkey):
+        async def broken():
+            raise LookupError("nicht gefunden")
+
+        with pytest.raises(LookupError):
+            await get_or_load(CacheKeys.patient("missing"), broken, ttl=300)
+        assert CacheKeys.patient("missing") not in fake_valkey.data
+        assert not valkey._inflight
+
+    @pytest.mark.asyncio
+    async def test_invalidation_evicts_local_tier(self, fake_valkey):
+        """Eigene Invalidierung sofort, fremde via Tracking-Nachricht."""
+        calls: list = []
+        list_key = CacheKeys.patient_list(1, 20)
+        await get_or_load(list_key, self._loader(calls, {"v": 1}), ttl=60)
+        await get_or_load(CacheKeys.patient("p1"), self._loader(calls, {"id": "p1"}), ttl=300)
+        assert len(valkey._local) == 2
+
+        await invalidate(CacheKeys.PATIENT_LIST_ALL)
+        assert valkey._local.get(list_key, 0) is None
+
+        valkey.handle_tracking_invalidation(["patient:p1"])
+        assert len(valkey._local) == 0
+
+        await get_or_load(list_key, self._loader(calls, {"v": 1}), ttl=60)
+        valkey.handle_tracking_invalidation(["cache:gen:patients:list"])
+        assert len(valkey._local) == 0
+
+    @pytest.mark.asyncio
+    async def test_early_refresh_near_expiry(self, fake_valkey, monkeypatch):
+        """Kurz vor Ablauf wird im Hintergrund neu geladen, der alte Wert sofort geliefert."""
+        calls: list = []
+        key = CacheKeys.patient("p1")
+        await get_or_load(key, self._loader(calls, {"v": 1}), ttl=300)
+        entry = valkey._local.get(key, 0)
+        entry.delta = 1.0
+        entry.expires = valkey.time.time() + 0.5  # Ablauf näher als Rechenzeit
+        monkeypatch.setattr(valkey.random, "random", lambda: 0.5)
+
+        assert await get_or_load(key, self._loader(calls, {"v": 2}), ttl=300) == {"v": 1}
+        await asyncio.sleep(0.01)
+        assert await get_or_load(key, self._loader(calls, {"v": 3}), ttl=300) == {"v": 2}
+        assert valkey.cache_stats["early_refreshes"] >= 1
+
+    def test_untracked_keys_get_short_local_ttl(self, monkeypatch):
+        """Nur Schlüssel, deren Änderungen per Tracking ankommen, leben lange im lokalen Tier."""
+        monkeypatch.setattr(valkey, "_tracking_active", True)
+        long_ttl = valkey.settings.cache_local_ttl_seconds
+
+        assert valkey._local_ttl(CacheKeys.patient("p1"), 300) == min(300, long_ttl)
+        assert valkey._local_ttl(CacheKeys.patient_list(1, 20), 300) == min(300, long_ttl)
+        assert valkey._local_ttl(CacheKeys.lab_summary("p1"), 300) == min(300, long_ttl)
+        assert valkey._local_ttl(CacheKeys.audit_count("abc"), 300) == valkey.UNTRACKED_LOCAL_TTL
+
+        monkeypatch.setattr(valkey, "_tracking_active", False)
+        assert valkey._local_ttl(CacheKeys.patient("p1"), 300) == valkey.UNTRACKED_LOCAL_TTL
@@ -1,5 +1,6 @@
 """Vitalparameter-Tests — Schema-Validierung, Grenzwerte, Endpoints."""
 
+import json
 import uuid
 
 import pytest
@@ -115,3 +116,103 @@ class TestVitalUpdate:
         vital_id = str(uuid.uuid4())
         response = await arzt_client.patch(f"/api/v1/vitals/{vital_id}", json={"temperature": 60})
         assert response.status_code == 422
+
+
+class TestVitalBatch:
+    """Bulk-Ingestion gepufferter Gerätedaten (JSON + NDJSON)."""
+
+    @pytest.mark.asyncio
+    async def test_batch_json(self, arzt_client: AsyncClient, sample_vital_data, sample_vital_data_critical):
+        """POST /vitals/batch schreibt alle Messwerte und meldet Alarme."""
+        sample_vital_data["recorded_at"] = "2026-03-01T08:00:00Z"
+        sample_vital_data_critical["recorded_at"] = "2026-03-01T08:05:00Z"
+        response = await arzt_client.post(
+            "/api/v1/vitals/batch",
+            json={"readings": [sample_vital_data, sample_vital_data_critical]},
+        )
+        assert response.status_code == 201
+        body = response.json()
+        assert body["inserted"] == 2
+        assert body["patients"] == 2
+        assert body["alarms_triggered"] == 6
+
+    @pytest.mark.asyncio
+    async def test_batch_json_empty(self, arzt_client: AsyncClient):
+        """Leerer Batch → 422."""
+        response = await arzt_client.post("/api/v1/vitals/batch", json={"readings": []})
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_batch_ndjson(self, arzt_client: AsyncClient, sample_vital_data):
+        """NDJSON-Stream: eine Messung pro Zeile, Leerzeilen werden ignoriert."""
+        line = json.dumps(sample_vital_data)
+        body = "\n".join([line, "", line, line]) + "\n"
+        response = await arzt_client.post(
+            "/api/v1/vitals/batch/ndjson",
+            content=body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 201
+        assert response.json()["inserted"] == 3
+
+    @pytest.mark.asyncio
+    async def test_batch_ndjson_invalid_line(self, arzt_client: AsyncClient, sample_vital_data):
+        """Ungültige Zeile → 422 mit Zeilennummer."""
+        body = json.dumps(sample_vital_data) + "\n" + json.dumps({"heart_rate": 70}) + "\n"
+        response = await arzt_client.post(
+            "/api/v1/vitals/batch/ndjson",
+            content=body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == 422
+        assert response.json()["detail"]["line"] == 2
+
+    @pytest.mark.asyncio
+    async def test_batch_dedupes_alarms_within_batch(self, mock_db_session):
+        """Pro Patient+Parameter löst nur die erste Überschreitung im Batch einen Alarm aus."""
+        from src.domain.schemas.vital import VitalSignCreate
+        from src.domain.services.vital_service import ingest_vitals_batch
+
+        patient_id = uuid.uuid4()
+        readings = [VitalSignCreate(patient_id=patient_id, heart_rate=hr) for hr in (150, 160, 72)]
+        mock_db_session.add = lambda obj: None
+        mock_db_session.execute.return_value.all = lambda: []
+
+        result = await ingest_vitals_batch(mock_db_session, readings, uuid.uuid4())
+
+        assert result.inserted == 3
+        assert [a.parameter for a in result.alarms] == ["heart_rate"]
+
+    @pytest.mark.asyncio
+    async def test_alarm_broadcast_waits_for_commit(self, monkeypatch):
+        """WebSocket-Alarme erst nach dem Commit; ein Rollback verwirft sie."""
+        import asyncio
+
+        from sqlalchemy.ext.asyncio import AsyncSession
+
+        from src.api.websocket import alarms_ws
+        from src.domain.services.vital_service import _broadcast_after_commit
+
+        sent: list[dict] = []
+
+        async def fake_broadcast(event: dict) -> None:
+            sent.append(event)
+
+        monkeypatch.setattr(alarms_ws, "broadcast_alarm", fake_broadcast)
+        session = AsyncSession()
+        sync_session = session.sync_session
+
+        await _broadcast_after_commit(session, [{"n": 1}])
+        await _broadcast_after_commit(session, [{"n": 2}])
+        await asyncio.sleep(0)
+        assert sent == []
+
+        sync_session.dispatch.after_rollback(sync_session)
+        sync_session.dispatch.after_commit(sync_session)
+        await asyncio.sleep(0)
+        assert sent == []
+
+        await _broadcast_after_commit(session, [{"n": 3}, {"n": 4}])
+        sync_session.dispatch.after_commit(sync_session)
+        await asyncio.sleep(0)
+        assert sent == [{"n": 3}, {"n": 4}]
@@ -0,0 +1,174 @@
+"""WebSocket-Tests — Fan-out über Worker-Grenzen (Valkey PubSub), Sende-Queues, Backpressure."""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.api.websocket import alarms_ws, broker, vitals_ws
+from src.api.websocket.broker import CHANNEL_ALARMS, CHANNEL_VITALS, WORKER_ID, ws_broker
+from src.api.websocket.connections import WS_CLOSE_TRY_AGAIN_LATER, ClientConnection, ConnectionGroup
+
+
+class FakeWebSocket:
+    """Minimaler WebSocket-Ersatz, der gesendete Nachrichten sammelt."""
+
+    client = ("127.0.0.1", 50000)
+
+    def __init__(self, blocked: bool = False) -> None:
+        self.sent: list[str] = []
+        self.closed_with: int | None = None
+        self._gate = asyncio.Event()
+        if not blocked:
+            self._gate.set()
+
+    async def send_text(self, message: str) -> None:
+        await self._gate.wait()
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed_with = code
+
+
+async def _drain() -> None:
+    """Writer-Tasks laufen lassen."""
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+def _group_with(name: str, sockets: list[FakeWebSocket]) -> ConnectionGroup:
+    group = ConnectionGroup(name)
+    for ws in sockets:
+        group.add(ws)
+    return group
+
+
+@pytest.fixture
+async def alarm_clients(monkeypatch):
+    clients = [FakeWebSocket(), FakeWebSocket()]
+    monkeypatch.setattr(alarms_ws, "_alarm_connections", _group_with("alarms", clients))
+    return clients
+
+
+class TestWebSocketBroker:
+    """Broker: lokale Zustellung ohne Valkey, Envelope-Handling mit Valkey."""
+
+    @pytest.mark.asyncio
+    async def test_local_delivery_without_valkey(self, alarm_clients, monkeypatch):
+        """Ohne PubSub-Verbindung wird direkt lokal zugestellt."""
+        monkeypatch.setattr(ws_broker, "_subscribed", False)
+        await alarms_ws.broadcast_alarm({"type": "alarm.triggered", "severity": "critical"})
+        await _drain()
+        assert all(json.loads(c.sent[0])["severity"] == "critical" for c in alarm_clients)
+
+    @pytest.mark.asyncio
+    async def test_publish_goes_through_valkey(self, alarm_clients, monkeypatch):
+        """Mit PubSub-Verbindung wird publiziert, nicht direkt gesendet."""
+        client = MagicMock()
+        client.publish = AsyncMock()
+        monkeypatch.setattr(broker, "get_valkey", AsyncMock(return_value=client))
+        monkeypatch.setattr(ws_broker, "_subscribed", True)
+
+        await alarms_ws.broadcast_alarm({"type": "alarm.triggered"})
+
+        channel, raw = client.publish.call_args.args
+        envelope = json.loads(raw)
+        assert channel == CHANNEL_ALARMS
+        assert envelope["o"] == WORKER_ID
+        assert json.loads(envelope["m"]) == {"type": "alarm.triggered"}
+        assert all(not c.sent for c in alarm_clients)
+
+    @pytest.mark.asyncio
+    async def test_dispatch_exclude_only_for_own_worker(self, monkeypatch):
+        """Der Absender-Socket wird nur im publizierenden Worker ausgelassen."""
+        sender, watcher = FakeWebSocket(), FakeWebSocket()
+        monkeypatch.setattr(vitals_ws, "_vitals_connections", {"p1": _group_with("vitals:p1", [sender, watcher])})
+
+        own = json.dumps({"o": WORKER_ID, "k": "p1", "x": id(sender), "m": '{"hr": 70}'})
+        await ws_broker.dispatch(CHANNEL_VITALS, own)
+        await _drain()
+        assert sender.sent == [] and watcher.sent == ['{"hr": 70}']
+
+        foreign = json.dumps({"o": "other-worker", "k": "p1", "x": id(sender), "m": '{"hr": 71}'})
+        await ws_broker.dispatch(CHANNEL_VITALS, foreign)
+        await _drain()
+        assert sender.sent == ['{"hr": 71}']
+
+    @pytest.mark.asyncio
+    async def test_dispatch_malformed_envelope(self, alarm_clients):
+        """Ungültige Envelopes werden verworfen."""
+        await ws_broker.dispatch(CHANNEL_ALARMS, "not-json")
+        await _drain()
+        assert all(not c.sent for c in alarm_clients)
+
+
+class TestConnectionBackpressure:
+    """Sende-Queues pro Client: langsame Clients blockieren niemanden."""
+
+    @pytest.mark.asyncio
+    async def test_slow_client_does_not_block_others(self):
+        """Ein hängender Socket verzögert die Zustellung an andere Clients nicht."""
+        slow, fast = FakeWebSocket(blocked=True), FakeWebSocket()
+        group = _group_with("alarms", [slow, fast])
+
+        assert group.broadcast('{"a": 1}', priority=True) == 2
+        await _drain()
+
+        assert fast.sent == ['{"a": 1}']
+        assert slow.sent == []
+        assert group.stats()["queue_depth"] == 0 or group.stats()["queue_depth_max"] <= 1
+
+    @pytest.mark.asyncio
+    async def test_full_queue_coalesces_normal_messages(self):
+        """Volle Queue: älteste normale Nachricht wird verworfen, neueste bleibt."""
+        ws = FakeWebSocket(blocked=True)
+        conn = ClientConnection(ws, max_queue=3, send_timeout=5)
+        await _drain()  # Writer hängt in send_text der ersten Nachricht
+        for i in range(6):
+            conn.offer(str(i))
+        await _drain()
+
+        assert conn.dropped >= 2
+        ws._gate.set()
+        await _drain()
+        assert ws.sent[-1] == "5"
+        await conn.close()
+
+    @pytest.mark.asyncio
+    async def test_priority_overflow_disconnects_slow_client(self):
+        """Queue voller kritischer Alarme → Client wird mit 1013 getrennt."""
+        ws = FakeWebSocket(blocked=True)
+        group = ConnectionGroup("alarms")
+        conn = group.add(ws)
+        conn.max_queue = 2
+        for i in range(4):
+            group.broadcast(str(i), priority=True)
+        await _drain()
+
+        assert ws.closed_with == WS_CLOSE_TRY_AGAIN_LATER
+        assert len(group) == 0
+        assert group.stats()["slow_disconnects"] == 1
+
+    @pytest.mark.asyncio
+    async def test_warning_alarms_are_never_dropped_silently(self, alarm_clients):
+        """Auch Warn-Alarme sind Priorität: volle Queue → Trennung statt stillem Verlust."""
+        slow = FakeWebSocket(blocked=True)
+        conn = alarms_ws._alarm_connections.add(slow)
+        conn.max_queue = 2
+        await _drain()
+        for i in range(4):
+            await alarms_ws._deliver_alarm("warning", json.dumps({"n": i}), None)
+        await _drain()
+
+        assert conn.closed and slow.closed_with == WS_CLOSE_TRY_AGAIN_LATER
+        assert all(len(c.sent) == 4 for c in alarm_clients)
+
+    @pytest.mark.asyncio
+    async def test_send_timeout_disconnects(self):
+        """Hängender Send über dem Timeout trennt den Client."""
+        ws = FakeWebSocket(blocked=True)
+        conn = ClientConnection(ws, max_queue=10, send_timeout=0.01)
+        conn.offer("x", priority=True)
+        await asyncio.sleep(0.05)
+        assert conn.closed and ws.closed_with == WS_CLOSE_TRY_AGAIN_LATER